@@ -1,10 +1,24 @@
 import sys
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QLabel, QLineEdit, QCheckBox, QMessageBox,
-                             QFrame, QSizePolicy, QDialog, QFormLayout, QGroupBox)
+                             QFrame, QSizePolicy, QDialog, QFormLayout, QGroupBox,
+                             QComboBox, QSpinBox)
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont
 from data_base.database import Database
+from billing_tabs.weighing_scale import (SETTING_PORT, SETTING_BAUDRATE, SIMULATOR_PORT,
+                                         DEFAULT_BAUDRATE)
+from billing_tabs.thermal_printer import (PrinterConfig, CONNECTION_TYPES, CONNECTION_USB,
+                                          CONNECTION_SERIAL, CONNECTION_NETWORK, CONNECTION_VIRTUAL,
+                                          DEFAULT_USB_VENDOR,
+                                          DEFAULT_USB_PRODUCT, parse_int_setting)
+from billing_tabs.messaging import (SETTING_BACKEND, SETTING_API_URL, SETTING_PHONE_NUMBER_ID,
+                                    SETTING_ACCESS_TOKEN, BACKEND_LABELS, BACKEND_BROWSER,
+                                    BACKEND_CLOUD_API, DEFAULT_API_URL)
+from billing_tabs.image_encoding import (ImageEncoding, FORMAT_LABELS, PALETTE_FORMATS, get_image_encoding,
+                                         set_image_encoding)
+from billing_tabs.artifact_store import SETTING_RETENTION_DAYS, SETTING_MAX_MB, get_artifact_store
+from billing_tabs.gst_returns import SETTING_GSTIN, STATE_NAMES, normalize_gstin, is_valid_gstin
 import random
 import smtplib
 from email.mime.text import MIMEText
@@ -314,6 +328,13 @@ class EditDetailsDialog(QDialog):
 class AdminSettingsWindow(QMainWindow):
     # Signal emitted when shop details are updated
     shop_details_updated = pyqtSignal()
+    # Signal emitted when the weighing scale port/baud rate are saved
+    scale_settings_updated = pyqtSignal()
+    # Signal emitted when the WhatsApp sending backend is saved
+    whatsapp_settings_updated = pyqtSignal()
+    # Signals for the shared thermal printer (owned by the home dashboard)
+    printer_settings_updated = pyqtSignal()
+    test_print_requested = pyqtSignal()
     
     def __init__(self):
         super().__init__()
@@ -476,6 +497,170 @@ class AdminSettingsWindow(QMainWindow):
         
         main_layout.addWidget(security_group)
         
+        # GST Group (shop GSTIN for GSTR-1 returns)
+        gst_group = QGroupBox("GST")
+        gst_group.setFont(QFont("Poppins", 14, QFont.Bold))
+        gst_group.setStyleSheet(security_group.styleSheet())
+        gst_layout = QFormLayout()
+        gst_group.setLayout(gst_layout)
+        self.gstin_input = QLineEdit(self.db.get_setting(SETTING_GSTIN, ''))
+        self.gstin_input.setPlaceholderText("15 character GSTIN, e.g. 27AAPFU0939F1ZV")
+        self.gstin_input.setMaxLength(15)
+        gst_layout.addRow("GSTIN:", self.gstin_input)
+        save_gst_btn = QPushButton("Save GST Settings")
+        save_gst_btn.clicked.connect(self.save_gst_settings)
+        gst_layout.addRow(save_gst_btn)
+        main_layout.addWidget(gst_group)
+        
+        # Weighing Scale Group
+        scale_group = QGroupBox("Weighing Scale")
+        scale_group.setFont(QFont("Poppins", 14, QFont.Bold))
+        scale_group.setStyleSheet(security_group.styleSheet())
+        scale_layout = QFormLayout()
+        scale_group.setLayout(scale_layout)
+        self.scale_port_input = QLineEdit(self.db.get_setting(SETTING_PORT, ''))
+        self.scale_port_input.setPlaceholderText(f"e.g. COM3 or /dev/ttyUSB0, {SIMULATOR_PORT} for testing, empty = none")
+        scale_layout.addRow("Port:", self.scale_port_input)
+        self.scale_baud_combo = QComboBox()
+        for baudrate in (2400, 4800, 9600, 19200, 38400, 115200):
+            self.scale_baud_combo.addItem(str(baudrate), baudrate)
+        current_baud = self.db.get_setting(SETTING_BAUDRATE, str(DEFAULT_BAUDRATE))
+        self.scale_baud_combo.setCurrentText(current_baud)
+        scale_layout.addRow("Baud Rate:", self.scale_baud_combo)
+        save_scale_btn = QPushButton("Save Scale Settings")
+        save_scale_btn.clicked.connect(self.save_scale_settings)
+        scale_layout.addRow(save_scale_btn)
+        main_layout.addWidget(scale_group)
+        
+        # WhatsApp Group
+        whatsapp_group = QGroupBox("WhatsApp")
+        whatsapp_group.setFont(QFont("Poppins", 14, QFont.Bold))
+        whatsapp_group.setStyleSheet(security_group.styleSheet())
+        whatsapp_layout = QFormLayout()
+        whatsapp_group.setLayout(whatsapp_layout)
+        whatsapp_settings = self.db.get_settings('whatsapp_')
+        self.whatsapp_backend_combo = QComboBox()
+        for backend, label in BACKEND_LABELS.items():
+            self.whatsapp_backend_combo.addItem(label, backend)
+        index = self.whatsapp_backend_combo.findData(whatsapp_settings.get(SETTING_BACKEND, BACKEND_BROWSER))
+        self.whatsapp_backend_combo.setCurrentIndex(max(index, 0))
+        self.whatsapp_backend_combo.currentIndexChanged.connect(self.update_whatsapp_fields)
+        whatsapp_layout.addRow("Send Using:", self.whatsapp_backend_combo)
+        self.whatsapp_api_url_input = QLineEdit(whatsapp_settings.get(SETTING_API_URL) or DEFAULT_API_URL)
+        whatsapp_layout.addRow("API URL:", self.whatsapp_api_url_input)
+        self.whatsapp_phone_id_input = QLineEdit(whatsapp_settings.get(SETTING_PHONE_NUMBER_ID) or '')
+        self.whatsapp_phone_id_input.setPlaceholderText("Phone number ID from the WhatsApp Business dashboard")
+        whatsapp_layout.addRow("Phone Number ID:", self.whatsapp_phone_id_input)
+        self.whatsapp_token_input = QLineEdit(whatsapp_settings.get(SETTING_ACCESS_TOKEN) or '')
+        self.whatsapp_token_input.setEchoMode(QLineEdit.Password)
+        whatsapp_layout.addRow("Access Token:", self.whatsapp_token_input)
+        save_whatsapp_btn = QPushButton("Save WhatsApp Settings")
+        save_whatsapp_btn.clicked.connect(self.save_whatsapp_settings)
+        whatsapp_layout.addRow(save_whatsapp_btn)
+        main_layout.addWidget(whatsapp_group)
+        self.update_whatsapp_fields()
+        
+        # Bill Images Group (files shared on WhatsApp and kept in data_base/bills)
+        image_group = QGroupBox("Bill Images")
+        image_group.setFont(QFont("Poppins", 14, QFont.Bold))
+        image_group.setStyleSheet(security_group.styleSheet())
+        image_layout = QFormLayout()
+        image_group.setLayout(image_layout)
+        encoding = get_image_encoding()
+        self.image_format_combo = QComboBox()
+        for fmt, label in FORMAT_LABELS.items():
+            self.image_format_combo.addItem(label, fmt)
+        self.image_format_combo.setCurrentIndex(max(self.image_format_combo.findData(encoding.fmt), 0))
+        self.image_format_combo.currentIndexChanged.connect(self.update_image_fields)
+        image_layout.addRow("Format:", self.image_format_combo)
+        self.image_colors_combo = QComboBox()
+        for colors in (4, 8, 16, 32, 64, 256):
+            self.image_colors_combo.addItem(str(colors), colors)
+        self.image_colors_combo.setCurrentText(str(encoding.colors))
+        image_layout.addRow("Colours:", self.image_colors_combo)
+        self.image_quality_spin = QSpinBox()
+        self.image_quality_spin.setRange(40, 95)
+        self.image_quality_spin.setValue(encoding.quality)
+        image_layout.addRow("Quality:", self.image_quality_spin)
+        self.image_max_kb_spin = QSpinBox()
+        self.image_max_kb_spin.setRange(0, 5000)
+        self.image_max_kb_spin.setSuffix(" KB")
+        self.image_max_kb_spin.setSpecialValueText("No limit")
+        self.image_max_kb_spin.setValue(encoding.max_kb)
+        image_layout.addRow("Size Budget:", self.image_max_kb_spin)
+        store = get_artifact_store()
+        self.retention_days_spin = QSpinBox()
+        self.retention_days_spin.setRange(0, 3650)
+        self.retention_days_spin.setSuffix(" days")
+        self.retention_days_spin.setSpecialValueText("Forever")
+        self.retention_days_spin.setValue(store.retention_days)
+        image_layout.addRow("Keep Images For:", self.retention_days_spin)
+        self.artifact_max_mb_spin = QSpinBox()
+        self.artifact_max_mb_spin.setRange(0, 100000)
+        self.artifact_max_mb_spin.setSuffix(" MB")
+        self.artifact_max_mb_spin.setSpecialValueText("No limit")
+        self.artifact_max_mb_spin.setValue(store.max_mb)
+        image_layout.addRow("Disk Limit:", self.artifact_max_mb_spin)
+        self.artifact_usage_label = QLabel()
+        image_layout.addRow("Stored:", self.artifact_usage_label)
+        self.update_artifact_usage()
+        save_image_btn = QPushButton("Save Image Settings")
+        save_image_btn.clicked.connect(self.save_image_settings)
+        image_layout.addRow(save_image_btn)
+        main_layout.addWidget(image_group)
+        self.update_image_fields()
+        
+        # Thermal Printer Group
+        printer_group = QGroupBox("Thermal Printer")
+        printer_group.setFont(QFont("Poppins", 14, QFont.Bold))
+        printer_group.setStyleSheet(security_group.styleSheet())
+        printer_layout = QFormLayout()
+        printer_group.setLayout(printer_layout)
+        printer_config = PrinterConfig.from_settings(self.db.get_settings('printer_'))
+        self.printer_type_combo = QComboBox()
+        for connection, label in CONNECTION_TYPES.items():
+            self.printer_type_combo.addItem(label, connection)
+        self.printer_type_combo.setCurrentIndex(self.printer_type_combo.findData(printer_config.connection))
+        printer_layout.addRow("Connection:", self.printer_type_combo)
+        self.printer_usb_vendor_input = QLineEdit(f"0x{printer_config.usb_vendor:04x}")
+        self.printer_usb_product_input = QLineEdit(f"0x{printer_config.usb_product:04x}")
+        printer_layout.addRow("USB Vendor ID:", self.printer_usb_vendor_input)
+        printer_layout.addRow("USB Product ID:", self.printer_usb_product_input)
+        self.printer_serial_port_input = QLineEdit(printer_config.serial_port)
+        self.printer_serial_port_input.setPlaceholderText("e.g. COM1 or /dev/ttyUSB0")
+        printer_layout.addRow("Serial Port:", self.printer_serial_port_input)
+        self.printer_serial_baud_combo = QComboBox()
+        for baudrate in (9600, 19200, 38400, 115200):
+            self.printer_serial_baud_combo.addItem(str(baudrate), baudrate)
+        self.printer_serial_baud_combo.setCurrentText(str(printer_config.serial_baudrate))
+        printer_layout.addRow("Serial Baud Rate:", self.printer_serial_baud_combo)
+        self.printer_host_input = QLineEdit(printer_config.network_host)
+        self.printer_host_input.setPlaceholderText("e.g. 192.168.1.50")
+        printer_layout.addRow("Network Host:", self.printer_host_input)
+        self.printer_port_input = QLineEdit(str(printer_config.network_port))
+        printer_layout.addRow("Network Port:", self.printer_port_input)
+        self.printer_virtual_output_input = QLineEdit(printer_config.virtual_output)
+        self.printer_virtual_output_input.setPlaceholderText("Folder or .prn file (blank: data_base/virtual_printer)")
+        printer_layout.addRow("Virtual Output:", self.printer_virtual_output_input)
+        self.printer_virtual_baud_combo = QComboBox()
+        self.printer_virtual_baud_combo.addItem("Unthrottled", 0)
+        for baudrate in (9600, 19200, 38400, 115200):
+            self.printer_virtual_baud_combo.addItem(str(baudrate), baudrate)
+        self.printer_virtual_baud_combo.setCurrentIndex(
+            max(0, self.printer_virtual_baud_combo.findData(printer_config.virtual_baudrate)))
+        printer_layout.addRow("Simulated Baud Rate:", self.printer_virtual_baud_combo)
+        self.printer_type_combo.currentIndexChanged.connect(self.update_printer_fields)
+        self.update_printer_fields()
+        printer_buttons = QHBoxLayout()
+        save_printer_btn = QPushButton("Save Printer Settings")
+        save_printer_btn.clicked.connect(self.save_printer_settings)
+        printer_buttons.addWidget(save_printer_btn)
+        test_printer_btn = QPushButton("Print Test Page")
+        test_printer_btn.clicked.connect(self.test_print_requested.emit)
+        printer_buttons.addWidget(test_printer_btn)
+        printer_layout.addRow(printer_buttons)
+        main_layout.addWidget(printer_group)
+        
         # Add stretch to push everything to top
         main_layout.addStretch()
         
@@ -553,6 +738,128 @@ class AdminSettingsWindow(QMainWindow):
                 else:
                     QMessageBox.warning(self, "Error", "Invalid credentials!")
     
+    def update_whatsapp_fields(self):
+        """Only the Cloud API needs an account"""
+        is_api = self.whatsapp_backend_combo.currentData() == BACKEND_CLOUD_API
+        for widget in (self.whatsapp_api_url_input, self.whatsapp_phone_id_input, self.whatsapp_token_input):
+            widget.setEnabled(is_api)
+    
+    def save_whatsapp_settings(self):
+        """Save the WhatsApp sending backend and Cloud API account"""
+        backend = self.whatsapp_backend_combo.currentData()
+        if backend == BACKEND_CLOUD_API and not (self.whatsapp_phone_id_input.text().strip()
+                                                  and self.whatsapp_token_input.text().strip()):
+            QMessageBox.warning(self, "Error", "Please enter the phone number ID and access token.")
+            return
+        success = self.db.set_settings({
+            SETTING_BACKEND: backend,
+            SETTING_API_URL: self.whatsapp_api_url_input.text().strip() or DEFAULT_API_URL,
+            SETTING_PHONE_NUMBER_ID: self.whatsapp_phone_id_input.text().strip(),
+            SETTING_ACCESS_TOKEN: self.whatsapp_token_input.text().strip(),
+        })
+        if success:
+            self.whatsapp_settings_updated.emit()
+            QMessageBox.information(self, "Success", "WhatsApp settings saved!")
+        else:
+            QMessageBox.critical(self, "Error", "Failed to save WhatsApp settings.")
+    
+    def update_image_fields(self):
+        """Palette size applies to PNG and WebP, quality to JPEG"""
+        is_palette = self.image_format_combo.currentData() in PALETTE_FORMATS
+        self.image_colors_combo.setEnabled(is_palette)
+        self.image_quality_spin.setEnabled(not is_palette)
+    
+    def save_image_settings(self):
+        """Save how bill images are encoded; applies to images written from now on"""
+        encoding = ImageEncoding(self.image_format_combo.currentData(), self.image_colors_combo.currentData(),
+                                 self.image_max_kb_spin.value(), self.image_quality_spin.value())
+        settings = encoding.to_settings()
+        settings[SETTING_RETENTION_DAYS] = self.retention_days_spin.value()
+        settings[SETTING_MAX_MB] = self.artifact_max_mb_spin.value()
+        if self.db.set_settings(settings):
+            set_image_encoding(encoding)
+            get_artifact_store().reload_settings()
+            QMessageBox.information(self, "Success", f"Image settings saved!\n{encoding.describe()}")
+        else:
+            QMessageBox.critical(self, "Error", "Failed to save image settings.")
+    
+    def update_artifact_usage(self):
+        usage = get_artifact_store().usage()
+        self.artifact_usage_label.setText(f"{usage['count']} bill image(s), {usage['bytes'] / (1024 * 1024):.1f} MB")
+    
+    def save_gst_settings(self):
+        """Save the shop GSTIN used for GST returns (empty clears it)"""
+        gstin = normalize_gstin(self.gstin_input.text())
+        if gstin and not is_valid_gstin(gstin):
+            QMessageBox.warning(self, "Error", "Please enter a valid 15 character GSTIN.")
+            return
+        if self.db.set_settings({SETTING_GSTIN: gstin}):
+            self.gstin_input.setText(gstin)
+            state = f"\nState: {STATE_NAMES[gstin[:2]]}" if gstin else ""
+            QMessageBox.information(self, "Success", f"GST settings saved!{state}")
+        else:
+            QMessageBox.critical(self, "Error", "Failed to save GST settings.")
+    
+    def save_scale_settings(self):
+        """Save weighing scale connection settings"""
+        success = self.db.set_settings({
+            SETTING_PORT: self.scale_port_input.text().strip(),
+            SETTING_BAUDRATE: self.scale_baud_combo.currentData(),
+        })
+        if success:
+            self.scale_settings_updated.emit()
+            QMessageBox.information(self, "Success", "Scale settings saved!")
+        else:
+            QMessageBox.critical(self, "Error", "Failed to save scale settings.")
+    
+    def update_printer_fields(self):
+        """Enable only the inputs used by the selected connection type"""
+        connection = self.printer_type_combo.currentData()
+        for widget in (self.printer_usb_vendor_input, self.printer_usb_product_input):
+            widget.setEnabled(connection == CONNECTION_USB)
+        for widget in (self.printer_serial_port_input, self.printer_serial_baud_combo):
+            widget.setEnabled(connection == CONNECTION_SERIAL)
+        for widget in (self.printer_host_input, self.printer_port_input):
+            widget.setEnabled(connection == CONNECTION_NETWORK)
+        for widget in (self.printer_virtual_output_input, self.printer_virtual_baud_combo):
+            widget.setEnabled(connection == CONNECTION_VIRTUAL)
+    
+    def save_printer_settings(self):
+        """Save thermal printer connection settings"""
+        connection = self.printer_type_combo.currentData()
+        usb_vendor = parse_int_setting(self.printer_usb_vendor_input.text(), -1)
+        usb_product = parse_int_setting(self.printer_usb_product_input.text(), -1)
+        network_port = parse_int_setting(self.printer_port_input.text(), -1)
+        # Latency and paper-out simulation are only set in app_settings, keep them
+        saved = PrinterConfig.from_settings(self.db.get_settings('printer_'))
+        config = PrinterConfig(
+            connection,
+            usb_vendor if 0 <= usb_vendor <= 0xffff else DEFAULT_USB_VENDOR,
+            usb_product if 0 <= usb_product <= 0xffff else DEFAULT_USB_PRODUCT,
+            self.printer_serial_port_input.text().strip(),
+            self.printer_serial_baud_combo.currentData(),
+            self.printer_host_input.text().strip(),
+            network_port if 0 < network_port < 65536 else 9100,
+            self.printer_virtual_output_input.text().strip(),
+            self.printer_virtual_baud_combo.currentData(),
+            saved.virtual_latency_ms,
+            saved.virtual_paper_out_after,
+        )
+        if connection == CONNECTION_USB and not (0 <= usb_vendor <= 0xffff and 0 <= usb_product <= 0xffff):
+            QMessageBox.warning(self, "Error", "USB vendor/product IDs must be hex like 0x04b8!")
+            return
+        if connection == CONNECTION_SERIAL and not config.serial_port:
+            QMessageBox.warning(self, "Error", "Please enter the serial port!")
+            return
+        if connection == CONNECTION_NETWORK and (not config.network_host or not 0 < network_port < 65536):
+            QMessageBox.warning(self, "Error", "Please enter the printer's host and a valid port!")
+            return
+        if self.db.set_settings(config.to_settings()):
+            self.printer_settings_updated.emit()
+            QMessageBox.information(self, "Success", "Printer settings saved!")
+        else:
+            QMessageBox.critical(self, "Error", "Failed to save printer settings.")
+    
     def update_cred_toggle_btn(self):
         if self.admin_details['use_credentials']:
             self.cred_toggle_btn.setText('Disable Credentials')
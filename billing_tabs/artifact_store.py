@@ -0,0 +1,200 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Union
+from data_base.database import Database, app_dir
+from billing_tabs.bill_renderer import BillImageRenderer
+from billing_tabs.image_encoding import encode_image, get_image_encoding
+from billing_tabs.receipt_layout import get_receipt_cache
+
+# Setting keys (app_settings table)
+SETTING_RETENTION_DAYS = 'artifact_retention_days'
+SETTING_MAX_MB = 'artifact_max_mb'
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_MAX_MB = 500
+
+KIND_IMAGE = 'image'
+
+TEMP_MAX_AGE = 24 * 3600  # share dialog captures left in temp/
+
+
+def _int_setting(value, default: int) -> int:
+    try:
+        return max(int(str(value).strip()), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+class ArtifactStore:
+    """Rendered bill files, stored once per content hash and indexed in bill_artifacts.
+
+    Files live in data_base/artifacts/<first 2 hash chars>/<sha256>.<ext>,
+    so re-rendering an unchanged bill rewrites nothing and identical files
+    are kept once. bill_image() returns the stored file straight away for
+    recent bills and renders it (from the bill data or the database) when
+    it is missing or was cleaned up. cleanup() drops artifacts unused for
+    retention_days, then the least recently used ones while the store is
+    over max_mb (0 disables either limit); bills still waiting in the
+    WhatsApp outbox are never removed. It also clears the old
+    data_base/bills images past retention and stale temp/ captures.
+    """
+
+    CLEAN_INTERVAL = 6 * 3600  # seconds between background clean-ups
+
+    def __init__(self, root: Optional[str] = None, renderer: Optional[BillImageRenderer] = None):
+        self.root = root or os.path.join(app_dir(), 'data_base', 'artifacts')
+        self.db = Database()
+        self.renderer = renderer or BillImageRenderer()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._cleaner = None
+        self.reload_settings()
+
+    def reload_settings(self):
+        settings = self.db.get_settings('artifact_')
+        self.retention_days = _int_setting(settings.get(SETTING_RETENTION_DAYS), DEFAULT_RETENTION_DAYS)
+        self.max_mb = _int_setting(settings.get(SETTING_MAX_MB), DEFAULT_MAX_MB)
+
+    def path_for(self, file_name: str) -> str:
+        return os.path.join(self.root, file_name[:2], file_name)
+
+    # --- Bill images ---
+    def bill_image(self, bill: Union[int, Dict], refresh: bool = False, cache: bool = True) -> Optional[str]:
+        """Path of a bill's shareable image (given the bill id or data), rendered only when needed.
+
+        refresh=True renders it again, e.g. after the shop details or the
+        image settings changed. Returns None if the bill cannot be found or
+        rendered.
+        """
+        bill_id = bill['id'] if isinstance(bill, dict) else bill
+        if not refresh:
+            artifact = self.db.get_bill_artifact(bill_id, KIND_IMAGE, touch=True)
+            if artifact is not None:
+                path = self.path_for(artifact['file_name'])
+                if os.path.exists(path):
+                    return path
+        bill_data = bill if isinstance(bill, dict) else self.db.get_bill_by_id(bill_id)
+        if bill_data is None:
+            print(f"Bill #{bill_id} not found for its image")
+            return None
+        try:
+            data = encode_image(get_receipt_cache().render(bill_data, self.renderer, store=cache))
+        except Exception as e:
+            print(f"Error rendering bill image: {e}")
+            return None
+        return self._store(bill_id, KIND_IMAGE, data, get_image_encoding().extension)
+
+    def _store(self, bill_id: int, kind: str, data: bytes, extension: str) -> Optional[str]:
+        content_hash = hashlib.sha256(data).hexdigest()
+        file_name = content_hash + extension
+        path = self.path_for(file_name)
+        with self._lock:
+            try:
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    # Write next to the target and rename, so a sender never picks up a half-written file
+                    temp_path = f"{path}.tmp"
+                    with open(temp_path, 'wb') as f:
+                        f.write(data)
+                    os.replace(temp_path, path)
+                previous = self.db.save_bill_artifact(bill_id, kind, content_hash, file_name, len(data))
+                if previous is not None and previous['file_name'] != file_name:
+                    self._remove_if_unreferenced(previous)
+            except OSError as e:
+                print(f"Error storing bill artifact: {e}")
+                return None
+        return path
+
+    def _remove_if_unreferenced(self, artifact: Dict) -> int:
+        """Delete an artifact's file once no record points at it; returns the bytes freed (caller holds the lock)"""
+        if self.db.count_artifacts_with_hash(artifact['content_hash']):
+            return 0
+        try:
+            os.remove(self.path_for(artifact['file_name']))
+            return artifact['size_bytes']
+        except OSError:
+            return 0
+
+    # --- Retention ---
+    def usage(self) -> Dict:
+        return self.db.get_artifact_usage()
+
+    def cleanup(self) -> Dict:
+        """Apply the retention policy now; returns how many records and bytes were removed"""
+        removed: List[Dict] = []
+        with self._lock:
+            if self.retention_days:
+                removed.extend(self.db.get_expired_bill_artifacts(self.retention_days))
+                self.db.delete_bill_artifacts([artifact['id'] for artifact in removed])
+            if self.max_mb:
+                excess = self.db.get_artifact_usage()['bytes'] - self.max_mb * 1024 * 1024
+                victims = []
+                victim_hashes: Dict[str, int] = {}
+                for artifact in self.db.get_bill_artifacts_by_use() if excess > 0 else []:
+                    if excess <= 0:
+                        break
+                    victims.append(artifact)
+                    content_hash = artifact['content_hash']
+                    victim_hashes[content_hash] = victim_hashes.get(content_hash, 0) + 1
+                    # A file shared with other bills only frees space once its last record goes
+                    if victim_hashes[content_hash] == self.db.count_artifacts_with_hash(content_hash):
+                        excess -= artifact['size_bytes']
+                self.db.delete_bill_artifacts([artifact['id'] for artifact in victims])
+                removed.extend(victims)
+            freed = sum(self._remove_if_unreferenced(artifact) for artifact in removed)
+        freed += self._clean_folder(os.path.join(app_dir(), 'data_base', 'bills'), self.retention_days * 24 * 3600)
+        freed += self._clean_folder(os.path.join(app_dir(), 'temp'), TEMP_MAX_AGE)
+        return {'removed': len(removed), 'bytes': freed}
+
+    @staticmethod
+    def _clean_folder(folder: str, max_age: float) -> int:
+        """Delete files older than max_age seconds (0 keeps everything); returns the bytes freed"""
+        if not max_age or not os.path.isdir(folder):
+            return 0
+        cutoff = time.time() - max_age
+        freed = 0
+        for entry in os.scandir(folder):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                    freed += size
+            except OSError:
+                pass
+        return freed
+
+    def start_cleaner(self):
+        """Run cleanup() now and every CLEAN_INTERVAL seconds on a daemon thread"""
+        if self._cleaner is not None and self._cleaner.is_alive():
+            return
+        self._stop_event.clear()
+        self._cleaner = threading.Thread(target=self._clean_loop, name="artifact-cleaner", daemon=True)
+        self._cleaner.start()
+
+    def stop_cleaner(self):
+        self._stop_event.set()
+
+    def _clean_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                result = self.cleanup()
+                if result['removed'] or result['bytes']:
+                    print(f"Artifact cleanup: {result['removed']} bill file(s), "
+                          f"{result['bytes'] / 1024:.0f} KB freed")
+            except Exception as e:
+                print(f"Artifact cleanup failed: {e}")
+            self._stop_event.wait(self.CLEAN_INTERVAL)
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the application-wide bill artifact store"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ArtifactStore()
+        return _shared_store
@@ -0,0 +1,121 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from PyQt5.QtCore import QObject, pyqtSignal
+from data_base.database import Database
+from billing_tabs.bill_renderer import BillImageRenderer
+from billing_tabs.artifact_store import get_artifact_store
+
+ACTION_REPRINT = 'reprint'
+ACTION_IMAGES = 'images'
+ACTION_PDFS = 'pdfs'
+ACTION_WHATSAPP = 'whatsapp'
+ACTION_LABELS = {
+    ACTION_REPRINT: "Reprint",
+    ACTION_IMAGES: "Regenerate images",
+    ACTION_PDFS: "Export PDFs",
+    ACTION_WHATSAPP: "Send on WhatsApp",
+}
+
+
+class BillBatch(QObject):
+    """Runs one action (reprint, regenerate images, export PDFs, send on WhatsApp) over many bills.
+
+    Bills are loaded FETCH_CHUNK at a time with Database.get_bills_by_ids
+    (two queries per chunk). Reprints and WhatsApp messages are queued on
+    the PrintSpooler / WhatsAppOutbox in one transaction per chunk (bills
+    without a usable phone number count as failed); images and PDFs are
+    rendered on a pool of WORKERS threads, bypassing the receipt cache.
+    progress is emitted after every bill and finished once with a summary;
+    cancel() stops before the next bill.
+    """
+    progress = pyqtSignal(int, int, str)  # done, total, message
+    finished = pyqtSignal(object)         # summary dict
+
+    WORKERS = 4
+    FETCH_CHUNK = 200
+
+    def __init__(self, action: str, bill_ids: List[int], print_spooler=None,
+                 target_dir: Optional[str] = None, whatsapp_outbox=None, parent=None):
+        super().__init__(parent)
+        self.action = action
+        self.bill_ids = list(bill_ids)
+        self.print_spooler = print_spooler
+        self.whatsapp_outbox = whatsapp_outbox
+        self.target_dir = target_dir
+        self.db = Database()
+        self.renderer = BillImageRenderer()
+        self._cancel_event = threading.Event()
+        self._thread = None
+        self.done = 0
+        self.failed: List[Dict] = []
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"bill-batch-{self.action}", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def _run(self):
+        total = len(self.bill_ids)
+        try:
+            with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+                for start in range(0, total, self.FETCH_CHUNK):
+                    if self._cancel_event.is_set():
+                        break
+                    bills = self.db.get_bills_by_ids(self.bill_ids[start:start + self.FETCH_CHUNK])
+                    if self.action == ACTION_REPRINT:
+                        if not self.print_spooler.submit_bills(bills, reprint=True):
+                            self.failed.extend({'bill_id': bill['id'], 'error': "No printer configured"}
+                                               for bill in bills)
+                            self.progress.emit(self.done + len(self.failed), total, "No printer configured")
+                            continue
+                        self.done += len(bills)
+                        self.progress.emit(self.done, total, f"Queued {self.done} of {total} for printing")
+                        continue
+                    if self.action == ACTION_WHATSAPP:
+                        message_ids, skipped = self.whatsapp_outbox.submit_bills(bills)
+                        self.done += len(message_ids)
+                        self.failed.extend({'bill_id': bill_id, 'error': "No valid WhatsApp number"}
+                                           for bill_id in skipped)
+                        self.progress.emit(self.done + len(self.failed), total,
+                                           f"Queued {self.done} of {total} for WhatsApp")
+                        continue
+                    futures = {pool.submit(self._render, bill): bill['id'] for bill in bills}
+                    for future in as_completed(futures):
+                        bill_id = futures[future]
+                        try:
+                            ok = future.result()
+                            error = "" if ok else "Render failed"
+                        except Exception as e:
+                            ok, error = False, str(e)
+                        if ok:
+                            self.done += 1
+                        elif not future.cancelled() and error != "Cancelled":
+                            self.failed.append({'bill_id': bill_id, 'error': error})
+                        self.progress.emit(self.done + len(self.failed), total,
+                                           f"Bill #{bill_id}: {'done' if ok else error}")
+        except Exception as e:
+            print(f"Bill batch {self.action} failed: {e}")
+            self.failed.append({'bill_id': None, 'error': str(e)})
+        self.finished.emit({
+            'action': self.action,
+            'total': total,
+            'done': self.done,
+            'failed': self.failed,
+            'cancelled': self._cancel_event.is_set(),
+        })
+
+    def _render(self, bill: Dict) -> bool:
+        if self._cancel_event.is_set():
+            raise RuntimeError("Cancelled")
+        if self.action == ACTION_IMAGES:
+            return get_artifact_store().bill_image(bill, refresh=True, cache=False) is not None
+        path = os.path.join(self.target_dir, f"bill_{bill['id']}.pdf")
+        return self.renderer.save(bill, path, 'PDF', cache=False)
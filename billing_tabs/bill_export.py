@@ -0,0 +1,148 @@
+import csv
+import gzip
+import json
+import os
+import threading
+from typing import Dict, Optional
+from PyQt5.QtCore import QObject, pyqtSignal
+from data_base.database import Database, DB_TIMESTAMP_FORMAT, local_datetime
+
+FORMAT_CSV = 'csv'
+FORMAT_JSONL = 'jsonl'
+FORMAT_LABELS = {
+    FORMAT_CSV: "CSV",
+    FORMAT_JSONL: "JSON Lines",
+}
+EXTENSIONS = {FORMAT_CSV: '.csv', FORMAT_JSONL: '.jsonl'}
+
+CSV_FIELDS = [
+    'Bill ID', 'Customer Name', 'Customer Phone', 'Date/Time',
+    'Total Items', 'Total Weight (kg)', 'Total SGST (₹)', 'Total CGST (₹)',
+    'Total Amount (₹)', 'Items Details'
+]
+
+
+def export_file_name(prefix: str, fmt: str, compress: bool, timestamp: str) -> str:
+    return f"{prefix}_export_{timestamp}{EXTENSIONS[fmt]}{'.gz' if compress else ''}"
+
+
+def _local_time(created_at) -> str:
+    """Stored created_at (UTC) as local time, the way Bill History shows it"""
+    local = local_datetime(created_at)
+    return local.strftime(DB_TIMESTAMP_FORMAT) if local else (created_at or "")
+
+
+def _csv_row(bill: Dict) -> Dict:
+    items_details = "; ".join(
+        f"{item['name']} ({item['quantity']:.2f} × ₹{item.get('base_price', 0):.2f}, "
+        f"Final: ₹{item.get('final_price', 0):.2f})"
+        for item in bill['items']
+    )
+    return {
+        'Bill ID': bill['id'],
+        'Customer Name': bill['customer_name'],
+        'Customer Phone': bill['customer_phone'] or 'N/A',
+        'Date/Time': _local_time(bill['created_at']),
+        'Total Items': bill['total_items'],
+        'Total Weight (kg)': bill.get('total_weight', 0),
+        'Total SGST (₹)': bill.get('total_sgst', 0),
+        'Total CGST (₹)': bill.get('total_cgst', 0),
+        'Total Amount (₹)': bill['total_amount'],
+        'Items Details': items_details
+    }
+
+
+class BillExport(QObject):
+    """Writes bills to a CSV or JSON Lines file (optionally gzipped) on a background thread.
+
+    Bills stream from Database.iter_bills_with_items, which reads them a
+    chunk at a time with one JOIN over bills and bill_items and releases the
+    database between chunks, so memory stays flat however many bills match
+    and checkouts can keep saving during a long export. filters are the
+    Bill History filters (customer_name, start_date, end_date, local days);
+    none exports everything. CSV times are local; JSON Lines keeps the
+    stored UTC created_at. The file is written next to the target and
+    renamed when complete, so a cancelled or failed export leaves nothing
+    behind. progress is emitted every PROGRESS_EVERY bills and finished
+    once with a summary.
+    """
+    progress = pyqtSignal(int, int, str)  # done, total, message
+    finished = pyqtSignal(object)         # summary dict
+
+    PROGRESS_EVERY = 200
+
+    def __init__(self, path: str, fmt: str = FORMAT_CSV, filters: Optional[Dict] = None,
+                 compress: bool = False, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.fmt = fmt if fmt in EXTENSIONS else FORMAT_CSV
+        self.filters = dict(filters or {})
+        self.compress = compress
+        self.db = Database()
+        self._cancel_event = threading.Event()
+        self._thread = None
+        self.done = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="bill-export", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def _open(self, path: str):
+        if self.compress:
+            return gzip.open(path, 'wt', encoding='utf-8', newline='')
+        return open(path, 'w', encoding='utf-8', newline='')
+
+    def _run(self):
+        temp_path = f"{self.path}.part"
+        total = 0
+        error = ""
+        try:
+            total = self.db.count_bills(**self.filters)
+            self.progress.emit(0, total, f"Exporting {total} bill(s)...")
+            bills = self.db.iter_bills_with_items(**self.filters)
+            try:
+                with self._open(temp_path) as f:
+                    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS) if self.fmt == FORMAT_CSV else None
+                    if writer is not None:
+                        writer.writeheader()
+                    for bill in bills:
+                        if self._cancel_event.is_set():
+                            break
+                        if writer is not None:
+                            writer.writerow(_csv_row(bill))
+                        else:
+                            f.write(json.dumps(bill, ensure_ascii=False))
+                            f.write('\n')
+                        self.done += 1
+                        if self.done % self.PROGRESS_EVERY == 0:
+                            self.progress.emit(self.done, max(total, self.done),
+                                               f"Exported {self.done} of {total} bill(s)")
+            finally:
+                bills.close()
+            if not self._cancel_event.is_set():
+                os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"Bill export failed: {e}")
+            error = str(e)
+        if error or self._cancel_event.is_set():
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        else:
+            self.progress.emit(self.done, max(total, self.done), f"Exported {self.done} bill(s)")
+        self.finished.emit({
+            'path': self.path,
+            'format': self.fmt,
+            'total': total,
+            'done': self.done,
+            'error': error,
+            'cancelled': self._cancel_event.is_set(),
+        })
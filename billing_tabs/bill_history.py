@@ -1,19 +1,167 @@
 import sys
-import csv
 from datetime import datetime, date
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QPushButton, QLabel, QLineEdit, QTableWidget, 
-                             QTableWidgetItem, QMessageBox, QFileDialog,
+                             QPushButton, QLabel, QLineEdit, QTableView,
+                             QMessageBox, QFileDialog,
                              QHeaderView, QAbstractItemView, QComboBox,
                              QDateEdit, QGroupBox, QRadioButton, QSizePolicy,
-                             QApplication)
-from PyQt5.QtCore import Qt, QDate, QEvent
-from PyQt5.QtGui import QFont
-from data_base.database import Database
+                             QApplication, QProgressBar, QStyledItemDelegate, QStyle, QCheckBox)
+from PyQt5.QtCore import Qt, QDate, QEvent, QAbstractTableModel, QModelIndex, QSize, pyqtSignal
+from PyQt5.QtGui import QFont, QColor, QPainter
+from data_base.database import Database, local_datetime
 from billing_tabs.thermal_printer import ThermalPrinter
+from billing_tabs.print_spooler import PrintSpooler
+from billing_tabs.receipt_layout import HtmlReceiptRenderer, get_receipt_cache
+from billing_tabs.bill_batch import (BillBatch, ACTION_REPRINT, ACTION_IMAGES, ACTION_PDFS, ACTION_WHATSAPP,
+                                     ACTION_LABELS)
+from billing_tabs.whatsapp_outbox import WhatsAppOutbox, WhatsAppOutboxPanel
+from billing_tabs.bill_export import BillExport, FORMAT_LABELS, EXTENSIONS, export_file_name
+
+
+def format_bill_date(created_at):
+    """Stored '2024-05-01 09:00:00' (UTC) as local '01/05/2024 14:30' (other values are shown as they are)"""
+    local = local_datetime(created_at)
+    return local.strftime('%d/%m/%Y %H:%M') if local else (created_at or "")
+
+
+class BillTableModel(QAbstractTableModel):
+    """Bill rows for the history table, loaded a page at a time as the view scrolls.
+
+    set_filters() loads the first PAGE_SIZE bills; the view calls
+    fetchMore() when it scrolls near the end, which reads the next page
+    after the last (created_at, id) loaded. data() formats only the cells
+    being painted and no per-row widgets exist, so memory and paint time
+    follow what has been scrolled through, not the size of the history.
+    """
+
+    HEADERS = ["Bill ID", "Customer Name", "Phone", "Date/Time",
+               "Total Amount", "SGST", "CGST", "Actions", "Reprint"]
+    COLUMN_VIEW = 7
+    COLUMN_REPRINT = 8
+    PAGE_SIZE = 200
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.filters = {}
+        self._bills = []
+        self._exhausted = True
+
+    def set_filters(self, filters):
+        """Show the bills matching the Bill History filters (customer_name, start_date, end_date)"""
+        first_page = self.db.get_bills_page(limit=self.PAGE_SIZE, **filters)
+        self.beginResetModel()
+        self.filters = dict(filters)
+        self._bills = first_page
+        self._exhausted = len(first_page) < self.PAGE_SIZE
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        last = self._bills[-1]
+        try:
+            page = self.db.get_bills_page((last['created_at'], last['id']), self.PAGE_SIZE, **self.filters)
+        except Exception as e:
+            print(f"Error loading bills: {e}")
+            return
+        self._exhausted = len(page) < self.PAGE_SIZE
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self._bills), len(self._bills) + len(page) - 1)
+            self._bills.extend(page)
+            self.endInsertRows()
+
+    def bill_id(self, row):
+        return self._bills[row]['id']
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._bills)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        bill = self._bills[index.row()]
+        if role == Qt.UserRole:
+            return bill['id']
+        if role != Qt.DisplayRole:
+            return None
+        column = index.column()
+        if column == 0:
+            return str(bill['id'])
+        if column == 1:
+            return bill['customer_name']
+        if column == 2:
+            return bill['customer_phone'] or "N/A"
+        if column == 3:
+            return format_bill_date(bill['created_at'])
+        if column == 4:
+            return f"₹{bill['total_amount']:.2f}"
+        if column == 5:
+            return f"₹{bill.get('total_sgst') or 0:.2f}"
+        if column == 6:
+            return f"₹{bill.get('total_cgst') or 0:.2f}"
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Paints a flat button in every cell of a column and emits clicked(row) when it is pressed"""
+
+    clicked = pyqtSignal(int)
+
+    MARGIN_X = 4
+    MARGIN_Y = 5
+
+    def __init__(self, text, color, hover_color, min_width=60, parent=None):
+        super().__init__(parent)
+        self.text = text
+        self.color = QColor(color)
+        self.hover_color = QColor(hover_color)
+        self.min_width = min_width
+
+    def _button_rect(self, option):
+        return option.rect.adjusted(self.MARGIN_X, self.MARGIN_Y, -self.MARGIN_X, -self.MARGIN_Y)
+
+    def paint(self, painter, option, index):
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.hover_color if option.state & QStyle.State_MouseOver else self.color)
+        rect = self._button_rect(option)
+        painter.drawRoundedRect(rect, 5, 5)
+        font = QFont(option.font)
+        font.setPixelSize(11)
+        painter.setFont(font)
+        painter.setPen(Qt.white)
+        painter.drawText(rect, Qt.AlignCenter, self.text)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        width = option.fontMetrics.horizontalAdvance(self.text) + 24
+        return QSize(max(width, self.min_width) + 2 * self.MARGIN_X, 40)
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                and self._button_rect(option).contains(event.pos())):
+            self.clicked.emit(index.row())
+            return True
+        return super().editorEvent(event, model, option, index)
+
 
 class BillHistoryWindow(QMainWindow):
-    def __init__(self, printer_instance=None):
+    def __init__(self, printer_instance=None, print_spooler=None, whatsapp_outbox=None):
         super().__init__()
         self.setWindowTitle("Bill History")
         # Set window size based on screen resolution or sensible default
@@ -32,9 +180,14 @@ class BillHistoryWindow(QMainWindow):
         self.db = Database()
         # Use provided printer instance or create new one
         self.thermal_printer = printer_instance if printer_instance else ThermalPrinter()
+        self.print_spooler = print_spooler if print_spooler else PrintSpooler(self.thermal_printer, parent=self)
+        self.whatsapp_outbox = whatsapp_outbox if whatsapp_outbox else WhatsAppOutbox(parent=self)
+        self.html_renderer = HtmlReceiptRenderer()
+        self.batch = None
+        self.export = None
         
+        # Bills are loaded when the window is shown (showEvent)
         self.init_ui()
-        self.load_bills()
     
     def init_ui(self):
         """Initialize the user interface"""
@@ -119,7 +272,7 @@ class BillHistoryWindow(QMainWindow):
         
         export_all_btn = QPushButton("Export All Bills")
         export_all_btn.setFont(QFont("Arial", 12))
-        export_all_btn.clicked.connect(self.export_all_to_csv)
+        export_all_btn.clicked.connect(self.export_all_bills)
         export_all_btn.setStyleSheet("""
             QPushButton {
                 background-color: #3498db;
@@ -136,7 +289,7 @@ class BillHistoryWindow(QMainWindow):
         
         export_filtered_btn = QPushButton("Export Filtered Bills")
         export_filtered_btn.setFont(QFont("Arial", 12))
-        export_filtered_btn.clicked.connect(self.export_filtered_to_csv)
+        export_filtered_btn.clicked.connect(self.export_filtered_bills)
         export_filtered_btn.setStyleSheet("""
             QPushButton {
                 background-color: #f39c12;
@@ -150,6 +303,22 @@ class BillHistoryWindow(QMainWindow):
             }
         """)
         export_layout.addWidget(export_filtered_btn)
+        self.export_buttons = [export_all_btn, export_filtered_btn]
+        
+        self.export_format_combo = QComboBox()
+        for fmt, label in FORMAT_LABELS.items():
+            self.export_format_combo.addItem(label, fmt)
+        export_layout.addWidget(self.export_format_combo)
+        self.export_gzip_check = QCheckBox("gzip")
+        export_layout.addWidget(self.export_gzip_check)
+        self.export_progress = QProgressBar()
+        self.export_progress.setFormat("%v / %m")
+        self.export_progress.setValue(0)
+        export_layout.addWidget(self.export_progress, 1)
+        self.export_cancel_btn = QPushButton("Cancel")
+        self.export_cancel_btn.setEnabled(False)
+        self.export_cancel_btn.clicked.connect(self.cancel_export)
+        export_layout.addWidget(self.export_cancel_btn)
         
         export_group.setLayout(export_layout)
         buttons_layout.addWidget(export_group)
@@ -173,24 +342,61 @@ class BillHistoryWindow(QMainWindow):
         buttons_layout.addWidget(refresh_btn)
         
         controls_layout.addLayout(buttons_layout)
+        
+        # Batch actions over the selected rows or the date range above
+        batch_group = QGroupBox("Batch Actions")
+        batch_layout = QHBoxLayout()
+        self.batch_scope_combo = QComboBox()
+        self.batch_scope_combo.addItem("Selected bills", 'selected')
+        self.batch_scope_combo.addItem("Date range", 'range')
+        batch_layout.addWidget(self.batch_scope_combo)
+        self.batch_buttons = []
+        for action, label in ((ACTION_REPRINT, "Reprint"), (ACTION_IMAGES, "Regenerate Images"),
+                              (ACTION_PDFS, "Export PDFs"), (ACTION_WHATSAPP, "Send on WhatsApp")):
+            button = QPushButton(label)
+            button.clicked.connect(lambda checked, action=action: self.start_batch(action))
+            batch_layout.addWidget(button)
+            self.batch_buttons.append(button)
+        self.batch_progress = QProgressBar()
+        self.batch_progress.setFormat("%v / %m")
+        self.batch_progress.setValue(0)
+        batch_layout.addWidget(self.batch_progress, 1)
+        self.batch_cancel_btn = QPushButton("Cancel")
+        self.batch_cancel_btn.setEnabled(False)
+        self.batch_cancel_btn.clicked.connect(self.cancel_batch)
+        batch_layout.addWidget(self.batch_cancel_btn)
+        batch_group.setLayout(batch_layout)
+        controls_layout.addWidget(batch_group)
+        self.batch_status_label = QLabel("")
+        self.batch_status_label.setStyleSheet("color: #7f8c8d;")
+        controls_layout.addWidget(self.batch_status_label)
         main_layout.addLayout(controls_layout)
         
-        # Bills table
-        self.bills_table = QTableWidget()
-        self.bills_table.setColumnCount(9)
-        self.bills_table.setHorizontalHeaderLabels([
-            "Bill ID", "Customer Name", "Phone", "Date/Time", 
-            "Total Amount", "SGST", "CGST", "Actions", "Reprint"
-        ])
+        # Bills table (model/view: rows are painted on demand, buttons are drawn by delegates)
+        self.bills_model = BillTableModel(self.db, self)
+        self.bills_table = QTableView()
+        self.bills_table.setModel(self.bills_model)
+        self.bills_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         
         # Table settings
         self.bills_table.setAlternatingRowColors(True)
         self.bills_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.bills_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.bills_table.setMouseTracking(True)
+        self.bills_table.viewport().setAttribute(Qt.WA_Hover)
         
-        # Set proper row height for buttons
+        # Fixed row height for the buttons, so the view never measures rows
         self.bills_table.verticalHeader().setDefaultSectionSize(40)
+        self.bills_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.bills_table.horizontalHeader().setStretchLastSection(True)
         
+        self.view_delegate = ButtonDelegate("View Details", "#17a2b8", "#138496", min_width=80, parent=self)
+        self.view_delegate.clicked.connect(lambda row: self.view_bill_details(self.bills_model.bill_id(row)))
+        self.bills_table.setItemDelegateForColumn(BillTableModel.COLUMN_VIEW, self.view_delegate)
+        self.reprint_delegate = ButtonDelegate("Reprint", "#28a745", "#218838", min_width=60, parent=self)
+        self.reprint_delegate.clicked.connect(lambda row: self.reprint_bill(self.bills_model.bill_id(row)))
+        self.bills_table.setItemDelegateForColumn(BillTableModel.COLUMN_REPRINT, self.reprint_delegate)
+        
         # Set column widths
         header = self.bills_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)  # Bill ID
@@ -205,17 +411,22 @@ class BillHistoryWindow(QMainWindow):
         
         main_layout.addWidget(self.bills_table)
         
+        # Status of bills sent on WhatsApp (single and batch)
+        self.outbox_panel = WhatsAppOutboxPanel(self.whatsapp_outbox)
+        self.outbox_panel.setMaximumHeight(200)
+        main_layout.addWidget(self.outbox_panel)
+        
         # Set main window style
         self.setStyleSheet("""
             QMainWindow {
                 background-color: #f8f9fa;
             }
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 gridline-color: #dee2e6;
                 font-size: 12px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 font-size: 12px;
             }
@@ -227,101 +438,18 @@ class BillHistoryWindow(QMainWindow):
                 font-size: 12px;
             }
         """)
-        
-        # Store current bills for filtering
-        self.current_bills = []
+
     
     def load_bills(self):
         """Load all bills from database"""
         try:
-            bills = self.db.get_all_bills()
-            self.current_bills = bills
-            self.display_bills(bills)
+            self.display_bills({})
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load bills: {str(e)}")
     
-    def display_bills(self, bills):
-        """Display bills in the table"""
-        self.bills_table.setRowCount(len(bills))
-        
-        for row, bill in enumerate(bills):
-            # Bill ID
-            self.bills_table.setItem(row, 0, QTableWidgetItem(str(bill['id'])))
-            
-            # Customer Name
-            self.bills_table.setItem(row, 1, QTableWidgetItem(bill['customer_name']))
-            
-            # Phone
-            phone = bill['customer_phone'] if bill['customer_phone'] else "N/A"
-            self.bills_table.setItem(row, 2, QTableWidgetItem(phone))
-            
-            # Date/Time
-            try:
-                date_time = datetime.strptime(bill['created_at'], '%Y-%m-%d %H:%M:%S')
-                formatted_date = date_time.strftime('%d/%m/%Y %H:%M')
-            except:
-                formatted_date = bill['created_at']
-            self.bills_table.setItem(row, 3, QTableWidgetItem(formatted_date))
-            
-            # Total Amount
-            self.bills_table.setItem(row, 4, QTableWidgetItem(f"₹{bill['total_amount']:.2f}"))
-            
-            # SGST
-            sgst = bill.get('total_sgst', 0)
-            self.bills_table.setItem(row, 5, QTableWidgetItem(f"₹{sgst:.2f}"))
-            
-            # CGST
-            cgst = bill.get('total_cgst', 0)
-            self.bills_table.setItem(row, 6, QTableWidgetItem(f"₹{cgst:.2f}"))
-            
-            # Actions button (View Details)
-            view_btn = QPushButton("View Details")
-            view_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #17a2b8;
-                    color: white;
-                    border: none;
-                    border-radius: 5px;
-                    padding: 0px 0px;
-                    font-size: 11px;
-                    min-width: 80px;
-                    min-height: 30px;
-                    margin: 0px;
-                }
-                QPushButton:hover {
-                    background-color: #138496;
-                }
-            """)
-            view_btn.setMinimumHeight(30)
-            view_btn.setMaximumHeight(30)
-            view_btn.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-            view_btn.clicked.connect(lambda checked, bill_id=bill['id']: self.view_bill_details(bill_id))
-            self.bills_table.setCellWidget(row, 7, view_btn)
-            self.bills_table.setRowHeight(row, 40)
-            
-            # Reprint button
-            reprint_btn = QPushButton("Reprint")
-            reprint_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #28a745;
-                    color: white;
-                    border: none;
-                    border-radius: 5px;
-                    padding: 0px 0px;
-                    font-size: 11px;
-                    min-width: 60px;
-                    min-height: 30px;
-                    margin: 0px;
-                }
-                QPushButton:hover {
-                    background-color: #218838;
-                }
-            """)
-            reprint_btn.setMinimumHeight(30)
-            reprint_btn.setMaximumHeight(30)
-            reprint_btn.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
-            reprint_btn.clicked.connect(lambda checked, bill_id=bill['id']: self.reprint_bill(bill_id))
-            self.bills_table.setCellWidget(row, 8, reprint_btn)
+    def display_bills(self, filters):
+        """Display the bills matching the filters (pages are loaded as the table scrolls)"""
+        self.bills_model.set_filters(filters)
     
     def search_bills(self):
         """Search bills by customer name"""
@@ -329,9 +457,7 @@ class BillHistoryWindow(QMainWindow):
         
         if search_text:
             try:
-                bills = self.db.search_bills(search_text)
-                self.current_bills = bills
-                self.display_bills(bills)
+                self.display_bills({'customer_name': search_text})
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Search failed: {str(e)}")
         else:
@@ -343,9 +469,7 @@ class BillHistoryWindow(QMainWindow):
         end_date = self.end_date.date().toString("yyyy-MM-dd")
         
         try:
-            bills = self.db.get_bills_by_date_range(start_date, end_date)
-            self.current_bills = bills
-            self.display_bills(bills)
+            self.display_bills({'start_date': start_date, 'end_date': end_date})
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Date filter failed: {str(e)}")
     
@@ -356,48 +480,11 @@ class BillHistoryWindow(QMainWindow):
             if not bill:
                 QMessageBox.warning(self, "Error", "Bill not found!")
                 return
-            # Create detail message with GST breakdown
-            details = ""
-            details += f"Customer: {bill['customer_name']}\n"
-            if bill.get('customer_phone'):
-                details += f"Phone: {bill['customer_phone']}\n"
-            details += f"Date: {bill['created_at']}\n"
-            details += f"Total Items: {bill['total_items']}\n"
-            if bill.get('total_weight', 0) > 0:
-                details += f"Total Weight: {bill['total_weight']:.2f} kg\n"
-            details += "\nItems:\n"
-            details += f"{'Name':<10}{'Qty':>5}{'Base':>7}{'SGST':>6}{'CGST':>6}{'Total':>8}\n"
-            details += "-" * 48 + "\n"
-            sgst_percent_sum = 0
-            cgst_percent_sum = 0
-            sgst_count = 0
-            cgst_count = 0
-            for item in bill['items']:
-                name = item['name'][:10] if len(item['name']) > 10 else item['name']
-                qty = f"{item['quantity']:.2f}"
-                if item['item_type'] == 'loose':
-                    qty += "kg"
-                base = f"{item['base_price']:.2f}"
-                sgst_amt = item.get('sgst_amount', 0)
-                cgst_amt = item.get('cgst_amount', 0)
-                sgst = f"{sgst_amt:.2f}" if sgst_amt > 0 else "-"
-                cgst = f"{cgst_amt:.2f}" if cgst_amt > 0 else "-"
-                total = f"{item.get('final_price', 0):.2f}"
-                details += f"{name:<10}{qty:>5}{base:>7}{sgst:>6}{cgst:>6}{total:>8}\n"
-                if item.get('sgst_percent', 0) > 0:
-                    sgst_percent_sum += item['sgst_percent']
-                    sgst_count += 1
-                if item.get('cgst_percent', 0) > 0:
-                    cgst_percent_sum += item['cgst_percent']
-                    cgst_count += 1
-            details += "-" * 48 + "\n"
-            # Summary at end
-            avg_sgst = (sgst_percent_sum / sgst_count) if sgst_count else 0
-            avg_cgst = (cgst_percent_sum / cgst_count) if cgst_count else 0
-            details += f"Avg SGST%: {avg_sgst:.2f}%\n"
-            details += f"Avg CGST%: {avg_cgst:.2f}%\n"
-            details += f"Total Amount: ₹{bill['total_amount']:.2f}\n"
-            QMessageBox.information(self, f"Bill Details", details)
+            # Same layout and totals as the printed receipt and shared image
+            details = get_receipt_cache().render(bill, self.html_renderer)
+            box = QMessageBox(QMessageBox.Information, "Bill Details", details, QMessageBox.Ok, self)
+            box.setTextFormat(Qt.RichText)
+            box.exec_()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load bill details: {str(e)}")
     
@@ -409,82 +496,145 @@ class BillHistoryWindow(QMainWindow):
                 QMessageBox.warning(self, "Error", "Bill not found!")
                 return
             
-            # Try to connect to printer and print
-            if self.thermal_printer.connect_usb_printer():
-                if self.thermal_printer.print_bill(bill):
-                    QMessageBox.information(self, "Success", f"Bill #{bill_id} reprinted successfully!")
-                else:
-                    QMessageBox.warning(self, "Print Error", "Failed to print the bill!")
-            else:
-                QMessageBox.warning(self, "Printer Error", "Printer not connected!")
+            # Returns immediately; the spooler prints in order and retries if the printer is busy or offline
+            if self.print_spooler.submit_bill(bill, reprint=True) is None:
+                QMessageBox.warning(self, "Reprint", "No printer is configured. Set one up in Admin Settings.")
+                return
+            QMessageBox.information(self, "Reprint", f"Bill #{bill_id} sent to the print queue.")
                 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to reprint bill: {str(e)}")
     
-    def export_all_to_csv(self):
-        """Export all bills to CSV file"""
-        try:
-            bills = self.db.get_all_bills()
-            self._export_bills_to_csv(bills, "all_bills")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to export all bills: {str(e)}")
+    def _batch_bill_ids(self):
+        """Bill IDs for a batch action: the selected rows, or every bill in the date range"""
+        if self.batch_scope_combo.currentData() == 'range':
+            return self.db.get_bill_ids_by_date_range(self.start_date.date().toString("yyyy-MM-dd"),
+                                                      self.end_date.date().toString("yyyy-MM-dd"))
+        rows = sorted({index.row() for index in self.bills_table.selectionModel().selectedRows()})
+        return [self.bills_model.bill_id(row) for row in rows]
     
-    def export_filtered_to_csv(self):
-        """Export currently filtered bills to CSV file"""
+    def start_batch(self, action):
+        """Run a batch action in the background with progress and cancel"""
+        if self.batch is not None and self.batch.is_running:
+            QMessageBox.warning(self, "Batch Running", "Please wait for the current batch or cancel it.")
+            return
         try:
-            self._export_bills_to_csv(self.current_bills, "filtered_bills")
+            bill_ids = self._batch_bill_ids()
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to export filtered bills: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to load bills: {str(e)}")
+            return
+        if not bill_ids:
+            QMessageBox.warning(self, "No Bills", "Select bills in the table or choose a date range with bills.")
+            return
+        target_dir = None
+        if action == ACTION_PDFS:
+            target_dir = QFileDialog.getExistingDirectory(self, "Export PDFs to Folder")
+            if not target_dir:
+                return
+        reply = QMessageBox.question(self, ACTION_LABELS[action],
+                                     f"{ACTION_LABELS[action]} for {len(bill_ids)} bill(s)?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        
+        self.batch = BillBatch(action, bill_ids, self.print_spooler, target_dir,
+                               whatsapp_outbox=self.whatsapp_outbox, parent=self)
+        self.batch.progress.connect(self.on_batch_progress)
+        self.batch.finished.connect(self.on_batch_finished)
+        self.batch_progress.setRange(0, len(bill_ids))
+        self.batch_progress.setValue(0)
+        self.batch_status_label.setText(f"{ACTION_LABELS[action]}: starting...")
+        for button in self.batch_buttons:
+            button.setEnabled(False)
+        self.batch_cancel_btn.setEnabled(True)
+        self.batch.start()
+    
+    def cancel_batch(self):
+        if self.batch is not None:
+            self.batch.cancel()
+            self.batch_status_label.setText("Cancelling...")
+    
+    def on_batch_progress(self, done, total, message):
+        self.batch_progress.setValue(done)
+        self.batch_status_label.setText(message)
+    
+    def on_batch_finished(self, summary):
+        for button in self.batch_buttons:
+            button.setEnabled(True)
+        self.batch_cancel_btn.setEnabled(False)
+        label = ACTION_LABELS[summary['action']]
+        text = f"{label}: {summary['done']} of {summary['total']} bill(s) done"
+        if summary['cancelled']:
+            text += " (cancelled)"
+        if summary['failed']:
+            text += f", {len(summary['failed'])} failed"
+        self.batch_status_label.setText(text)
+        if summary['failed']:
+            details = "\n".join(f"Bill #{failure['bill_id']}: {failure['error']}" for failure in summary['failed'][:20])
+            QMessageBox.warning(self, label, f"{text}\n\n{details}")
     
-    def _export_bills_to_csv(self, bills, filename_prefix):
-        """Export bills to CSV file"""
-        if not bills:
+    def export_all_bills(self):
+        """Export every bill"""
+        self._start_export({}, "all_bills")
+    
+    def export_filtered_bills(self):
+        """Export the bills matching the current search or date filter"""
+        if not self.bills_model.rowCount():
             QMessageBox.warning(self, "No Data", "No bills to export!")
             return
-        
+        self._start_export(self.bills_model.filters, "filtered_bills")
+    
+    def _start_export(self, filters, filename_prefix):
+        """Ask for a file and stream the bills to it in the background"""
+        if self.export is not None and self.export.is_running:
+            QMessageBox.warning(self, "Export Running", "Please wait for the current export or cancel it.")
+            return
+        fmt = self.export_format_combo.currentData()
+        compress = self.export_gzip_check.isChecked()
+        file_filter = f"{FORMAT_LABELS[fmt]} Files (*{EXTENSIONS[fmt]}{'.gz' if compress else ''})"
         file_path, _ = QFileDialog.getSaveFileName(
-            self, "Export Bills to CSV", 
-            f"{filename_prefix}_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            "CSV Files (*.csv)"
+            self, "Export Bills",
+            export_file_name(filename_prefix, fmt, compress, datetime.now().strftime('%Y%m%d_%H%M%S')),
+            file_filter
         )
         
         if not file_path:
             return
         
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = [
-                'Bill ID', 'Customer Name', 'Customer Phone', 'Date/Time',
-                'Total Items', 'Total Weight (kg)', 'Total SGST (₹)', 'Total CGST (₹)', 
-                'Total Amount (₹)', 'Items Details'
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            writer.writeheader()
-            
-            for bill in bills:
-                # Get bill details
-                detailed_bill = self.db.get_bill_by_id(bill['id'])
-                
-                # Format items details
-                items_details = "; ".join([
-                    f"{item['name']} ({item['quantity']:.2f} × ₹{item.get('base_price', 0):.2f}, Final: ₹{item.get('final_price', 0):.2f})"
-                    for item in detailed_bill['items']
-                ])
-                
-                writer.writerow({
-                    'Bill ID': bill['id'],
-                    'Customer Name': bill['customer_name'],
-                    'Customer Phone': bill['customer_phone'] or 'N/A',
-                    'Date/Time': bill['created_at'],
-                    'Total Items': bill['total_items'],
-                    'Total Weight (kg)': bill.get('total_weight', 0),
-                    'Total SGST (₹)': bill.get('total_sgst', 0),
-                    'Total CGST (₹)': bill.get('total_cgst', 0),
-                    'Total Amount (₹)': bill['total_amount'],
-                    'Items Details': items_details
-                })
-        
-        QMessageBox.information(self, "Success", f"Bills exported successfully to:\n{file_path}")
+        self.export = BillExport(file_path, fmt, filters, compress, parent=self)
+        self.export.progress.connect(self.on_export_progress)
+        self.export.finished.connect(self.on_export_finished)
+        self.export_progress.setRange(0, 0)
+        self.export_progress.setValue(0)
+        for button in self.export_buttons:
+            button.setEnabled(False)
+        self.export_cancel_btn.setEnabled(True)
+        self.export.start()
+    
+    def cancel_export(self):
+        if self.export is not None:
+            self.export.cancel()
+    
+    def on_export_progress(self, done, total, message):
+        self.export_progress.setRange(0, max(total, 1))
+        self.export_progress.setValue(done)
+        self.batch_status_label.setText(message)
+    
+    def on_export_finished(self, summary):
+        for button in self.export_buttons:
+            button.setEnabled(True)
+        self.export_cancel_btn.setEnabled(False)
+        self.export_progress.setRange(0, max(summary['total'], 1))
+        if summary['error']:
+            self.batch_status_label.setText("Export failed")
+            QMessageBox.critical(self, "Error", f"Failed to export bills: {summary['error']}")
+        elif summary['cancelled']:
+            self.export_progress.setValue(0)
+            self.batch_status_label.setText(f"Export cancelled after {summary['done']} bill(s)")
+        else:
+            self.export_progress.setValue(summary['done'])
+            QMessageBox.information(self, "Success",
+                                    f"{summary['done']} bill(s) exported successfully to:\n{summary['path']}")
 
     def resizeEvent(self, event):
         """Handle window resize events"""
@@ -500,12 +650,12 @@ class BillHistoryWindow(QMainWindow):
         
         # Update table font sizes
         self.bills_table.setStyleSheet(f"""
-            QTableWidget {{
+            QTableView {{
                 background-color: white;
                 gridline-color: #dee2e6;
                 font-size: {font_size}px;
             }}
-            QTableWidget::item {{
+            QTableView::item {{
                 padding: 8px;
                 font-size: {font_size}px;
             }}
@@ -0,0 +1,243 @@
+import os
+from typing import Dict, List, Optional
+from PyQt5.QtCore import Qt, QRect, QRectF, QSizeF, QMarginsF, QBuffer, QIODevice
+from PyQt5.QtGui import QImage, QPainter, QFont, QColor, QPen, QPdfWriter, QPageSize
+from billing_tabs.receipt_assets import ReceiptAssets, get_receipt_assets, QR_SIZE
+from billing_tabs.receipt_layout import ReceiptLayout, get_receipt_cache
+from billing_tabs.image_encoding import encode_image
+
+
+class BillImageRenderer:
+    """Render the shareable bill image straight onto a QImage.
+
+    Only QImage, QPainter and QPdfWriter are used (no widgets, no QPixmap),
+    so a renderer can be created and used from a worker thread. render()
+    draws a ReceiptLayout; render_bill() and save() share the cached
+    layout. The image itself is not memoised (an RGB32 bill image is
+    several MB); encoded copies are kept by the artifact store.
+    """
+    name = 'image'
+    memoize = False
+
+    WIDTH = 1123
+    MARGIN = 12
+    HEADER_HEIGHT = 110
+    INFO_ROW_HEIGHT = 26
+    TABLE_HEADER_HEIGHT = 40
+    TABLE_ROW_HEIGHT = 36
+    GRAND_TOTAL_HEIGHT = 50
+    FOOTER_HEIGHT = 40
+    LOGO_HEIGHT = 90
+
+    COLUMNS = [
+        ("HSN Code", 120),
+        ("Item", 370),
+        ("Qty", 90),
+        ("Taxable Value", 170),
+        ("SGST (%/₹)", 120),
+        ("CGST (%/₹)", 120),
+        ("Final Price", 0),  # Stretches to fill remaining width
+    ]
+
+    def __init__(self, assets: Optional[ReceiptAssets] = None):
+        self.assets = assets or get_receipt_assets()
+
+    def _column_widths(self) -> List[int]:
+        """Return column widths, giving the last column whatever is left"""
+        table_width = self.WIDTH - 2 * self.MARGIN
+        widths = [width for _, width in self.COLUMNS]
+        widths[-1] = table_width - sum(widths[:-1])
+        return widths
+
+    def image_height(self, layout: ReceiptLayout) -> int:
+        """Compute the image height needed for the given bill"""
+        n_rows = len(layout.lines) + 1  # +1 for total row
+        return (self.MARGIN + self.HEADER_HEIGHT + 2 * self.INFO_ROW_HEIGHT + 10
+                + self.TABLE_HEADER_HEIGHT + n_rows * self.TABLE_ROW_HEIGHT + 15
+                + self.GRAND_TOTAL_HEIGHT + self.FOOTER_HEIGHT
+                + QR_SIZE + 30 + self.MARGIN)
+
+    def render(self, layout: ReceiptLayout) -> QImage:
+        """Draw the bill and return it as a QImage"""
+        image = QImage(self.WIDTH, self.image_height(layout), QImage.Format_RGB32)
+        image.fill(Qt.white)
+        painter = QPainter(image)
+        try:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setRenderHint(QPainter.TextAntialiasing)
+            self._paint(painter, layout)
+        finally:
+            painter.end()
+        return image
+
+    def render_bill(self, bill_data: Dict) -> QImage:
+        """Bill image, drawn from the cached layout"""
+        return get_receipt_cache().render(bill_data, self)
+
+    def _paint(self, painter: QPainter, layout: ReceiptLayout):
+        left = self.MARGIN
+        width = self.WIDTH - 2 * self.MARGIN
+        y = self.MARGIN
+        bill_time = layout.created_at
+        shop = layout.shop
+
+        # --- SHOP DETAILS ---
+        logo = self.assets.logo_image()
+        if logo is not None:
+            logo = logo.scaledToHeight(self.LOGO_HEIGHT, Qt.SmoothTransformation)
+            painter.drawImage(left, y, logo)
+        painter.setPen(Qt.black)
+        painter.setFont(QFont("Arial", 15, QFont.Bold))
+        painter.drawText(QRect(left, y, width, 34), Qt.AlignCenter, shop['shop_name'])
+        painter.setFont(QFont("Arial", 15))
+        painter.drawText(QRect(left, y + 34, width, 30), Qt.AlignCenter, f"📍{shop['address']}")
+        painter.drawText(QRect(left, y + 64, width, 30), Qt.AlignCenter, f"📞{shop['phone_number']}")
+        y += self.HEADER_HEIGHT
+        painter.setPen(QPen(Qt.black, 2))
+        painter.drawLine(left, y - 6, left + width, y - 6)
+
+        # --- BILL INFO ROWS ---
+        painter.setPen(Qt.black)
+        painter.setFont(QFont("Arial", 10))
+        row = QRect(left, y, width, self.INFO_ROW_HEIGHT)
+        painter.drawText(row, Qt.AlignLeft | Qt.AlignVCenter, f"Bill ID: {layout.bill_id}")
+        painter.drawText(row, Qt.AlignRight | Qt.AlignVCenter, f"Date: {bill_time.strftime('%d/%m/%Y')}")
+        y += self.INFO_ROW_HEIGHT
+        row = QRect(left, y, width, self.INFO_ROW_HEIGHT)
+        painter.drawText(row, Qt.AlignLeft | Qt.AlignVCenter, f"Customer: {layout.customer_name}")
+        painter.drawText(row, Qt.AlignRight | Qt.AlignVCenter, f"Time: {bill_time.strftime('%I:%M %p')}")
+        y += self.INFO_ROW_HEIGHT + 10
+
+        # --- TABLE ---
+        widths = self._column_widths()
+        grid_pen = QPen(QColor("#c0c0c0"), 1)
+
+        painter.fillRect(QRect(left, y, width, self.TABLE_HEADER_HEIGHT), QColor("#e0e0e0"))
+        painter.setFont(QFont("Arial", 12, QFont.Bold))
+        x = left
+        for (title, _), col_width in zip(self.COLUMNS, widths):
+            painter.setPen(grid_pen)
+            painter.drawRect(QRect(x, y, col_width, self.TABLE_HEADER_HEIGHT))
+            painter.setPen(Qt.black)
+            painter.drawText(QRect(x + 4, y, col_width - 8, self.TABLE_HEADER_HEIGHT),
+                             Qt.AlignCenter, title)
+            x += col_width
+        y += self.TABLE_HEADER_HEIGHT
+
+        rows = []
+        for line in layout.lines:
+            name = line.name
+            if line.discount_amount:
+                name += f"\n{line.promotion}: -₹{line.discount_amount:.2f}"
+            rows.append((False, [
+                line.hsn_code,
+                name,
+                line.quantity_label,
+                f"₹{line.taxable_amount:.2f}",
+                f"{line.sgst_percent:.1f}%\n₹{line.sgst_amount:.2f}",
+                f"{line.cgst_percent:.1f}%\n₹{line.cgst_amount:.2f}",
+                f"₹{line.final_price:.2f}",
+            ]))
+        # Every column adds up to its total
+        rows.append((True, [
+            "", "Total", "", f"₹{layout.taxable_amount:.2f}", f"₹{layout.total_sgst:.2f}",
+            f"₹{layout.total_cgst:.2f}", f"₹{layout.grand_total:.2f}",
+        ]))
+
+        regular_font = QFont("Arial", 11)
+        bold_font = QFont("Arial", 11, QFont.Bold)
+        for is_total, cells in rows:
+            x = left
+            for col, (text, col_width) in enumerate(zip(cells, widths)):
+                painter.setPen(grid_pen)
+                painter.drawRect(QRect(x, y, col_width, self.TABLE_ROW_HEIGHT))
+                painter.setPen(Qt.black)
+                painter.setFont(bold_font if is_total and col != 0 else regular_font)
+                painter.drawText(QRect(x + 6, y, col_width - 12, self.TABLE_ROW_HEIGHT),
+                                 Qt.AlignLeft | Qt.AlignVCenter, text)
+                x += col_width
+            y += self.TABLE_ROW_HEIGHT
+        y += 15
+
+        # --- GRAND TOTAL ---
+        total_rect = QRect(left, y, width, self.GRAND_TOTAL_HEIGHT)
+        painter.fillRect(total_rect, QColor("#e8f4fd"))
+        painter.setPen(QPen(QColor("#3498db"), 2))
+        painter.drawRect(total_rect)
+        painter.setPen(Qt.black)
+        painter.setFont(QFont("Arial", 16, QFont.Bold))
+        grand_total_text = f"GRAND TOTAL: ₹{layout.grand_total:.2f}"
+        if layout.total_discount > 0:
+            grand_total_text += f"   (You saved ₹{layout.total_discount:.2f})"
+        painter.drawText(total_rect, Qt.AlignCenter, grand_total_text)
+        y += self.GRAND_TOTAL_HEIGHT
+
+        # --- FOOTER ---
+        painter.setFont(QFont("Arial", 12))
+        painter.drawText(QRect(left, y, width, self.FOOTER_HEIGHT), Qt.AlignCenter,
+                         layout.thank_you)
+        y += self.FOOTER_HEIGHT
+
+        # --- QR CODE (bottom left) ---
+        try:
+            painter.drawImage(left, y, self.assets.qr_image())
+        except Exception as e:
+            print(f"Error generating QR code: {e}")
+        painter.setFont(QFont("Arial", 10))
+        painter.drawText(QRect(left, y + QR_SIZE + 4, width, 22),
+                         Qt.AlignLeft | Qt.AlignVCenter, "Scan QR for location")
+
+    def save(self, bill_data: Dict, path: str, fmt: Optional[str] = None, cache: bool = True) -> bool:
+        """Render the bill and save it as PNG, JPEG, WebP or PDF (picked from the extension by default).
+
+        Images go through the configured encoding (palette, quality, size
+        budget). cache=False keeps batch exports from filling the receipt cache.
+        """
+        fmt = (fmt or os.path.splitext(path)[1].lstrip('.') or 'PNG').upper()
+        if fmt == 'JPG':
+            fmt = 'JPEG'
+        if fmt not in ('PNG', 'JPEG', 'WEBP', 'PDF'):
+            print(f"Unsupported bill image format: {fmt}")
+            return False
+        # Write next to the target and rename, so a sender never picks up a half-written file
+        temp_path = f"{path}.tmp"
+        try:
+            if fmt == 'PDF':
+                data = get_receipt_cache().render(bill_data, BillPdfRenderer(self, cache), store=cache)
+            else:
+                data = encode_image(get_receipt_cache().render(bill_data, self, store=cache), fmt=fmt.lower())
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            return True
+        except Exception as e:
+            print(f"Error saving bill image: {e}")
+            return False
+
+
+class BillPdfRenderer:
+    """Renders a ReceiptLayout to a single-page PDF (bytes) holding the bill image"""
+    name = 'pdf'
+    RESOLUTION = 150
+
+    def __init__(self, image_renderer: Optional[BillImageRenderer] = None, cache_image: bool = True):
+        self.image_renderer = image_renderer or BillImageRenderer()
+        self.cache_image = cache_image
+
+    def render(self, layout: ReceiptLayout) -> bytes:
+        image = get_receipt_cache().render(layout, self.image_renderer, store=self.cache_image)
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        writer = QPdfWriter(buffer)
+        writer.setResolution(self.RESOLUTION)
+        page_size = QSizeF(image.width() * 25.4 / self.RESOLUTION, image.height() * 25.4 / self.RESOLUTION)
+        writer.setPageSize(QPageSize(page_size, QPageSize.Millimeter))
+        writer.setPageMargins(QMarginsF(0, 0, 0, 0))
+        painter = QPainter(writer)
+        try:
+            target = QRectF(0, 0, writer.width(), writer.height())
+            painter.drawImage(target, image)
+        finally:
+            painter.end()
+        buffer.close()
+        return bytes(buffer.data())
@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class Cart:
+    """A parked (on hold) bill: a label plus the same item dicts CreateBillWindow uses"""
+    __slots__ = ('cart_id', 'label', 'items', 'created_at')
+
+    def __init__(self, items: List[Dict], label: str = "", cart_id: Optional[int] = None,
+                 created_at: Optional[str] = None):
+        self.cart_id = cart_id
+        self.items = items
+        self.created_at = created_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.label = label or f"Hold {datetime.now().strftime('%H:%M:%S')}"
+
+    @classmethod
+    def from_db(cls, row: Dict) -> 'Cart':
+        return cls(row['items'], row['label'], row['id'], row['created_at'])
+
+    @property
+    def total_amount(self) -> float:
+        return sum(item.get('final_price', 0) for item in self.items)
+
+    def summary(self) -> str:
+        """One-line description for the parked carts list"""
+        return f"{self.label}  •  {len(self.items)} items  •  ₹{self.total_amount:.2f}"
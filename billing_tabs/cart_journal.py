@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+
+class CartJournal:
+    """Append-only, crash-safe log of changes to the bill being built.
+
+    Each cart change (add, update, remove) is appended as one JSON line and
+    flushed to the OS immediately, so an application crash loses nothing.
+    fsync (which protects against power loss) is the expensive part, so it is
+    coalesced: at most one fsync per sync_interval, with sync() called from a
+    timer to cover the tail. reset() checkpoints the cart and truncates the log,
+    which keeps replay on startup proportional to the current bill only.
+    """
+
+    def __init__(self, path: str, sync_interval: float = 0.5):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._file = None
+        self._dirty = False
+        self._last_sync = 0.0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def append(self, op: str, **data):
+        """Append one operation to the log"""
+        record = {'op': op}
+        record.update(data)
+        try:
+            journal_file = self._open()
+            journal_file.write(json.dumps(record, separators=(',', ':')) + '\n')
+            journal_file.flush()
+            self._dirty = True
+            if time.monotonic() - self._last_sync >= self.sync_interval:
+                self.sync()
+        except Exception as e:
+            print(f"Cart journal write failed: {e}")
+
+    def add(self, item: Dict):
+        self.append('add', item=item)
+
+    def update(self, row: int, item: Dict):
+        self.append('update', row=row, item=item)
+
+    def remove(self, row: int):
+        self.append('remove', row=row)
+
+    def sync(self):
+        """fsync pending writes to disk"""
+        if self._file is None or not self._dirty:
+            return
+        try:
+            os.fsync(self._file.fileno())
+        except Exception as e:
+            print(f"Cart journal sync failed: {e}")
+        self._dirty = False
+        self._last_sync = time.monotonic()
+
+    def reset(self, items: Optional[List[Dict]] = None):
+        """Truncate the log, optionally checkpointing the current cart as its first record"""
+        self.close()
+        try:
+            with open(self.path, 'w', encoding='utf-8') as journal_file:
+                if items:
+                    journal_file.write(json.dumps({'op': 'reset', 'items': items},
+                                                  separators=(',', ':')) + '\n')
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+        except Exception as e:
+            print(f"Cart journal reset failed: {e}")
+
+    def replay(self) -> List[Dict]:
+        """Rebuild the cart from the log (a torn final line is ignored)"""
+        items: List[Dict] = []
+        if not os.path.exists(self.path):
+            return items
+        with open(self.path, 'r', encoding='utf-8') as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Partially written record from a crash; everything before it is valid
+                    break
+                op = record.get('op')
+                if op == 'reset':
+                    items = list(record.get('items', []))
+                elif op == 'add':
+                    items.append(record['item'])
+                elif op == 'update' and 0 <= record['row'] < len(items):
+                    items[record['row']] = record['item']
+                elif op == 'remove' and 0 <= record['row'] < len(items):
+                    del items[record['row']]
+        return items
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
@@ -0,0 +1,172 @@
+import heapq
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(_TOKEN_RE.findall(str(text or '').lower()))
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _query_trigrams(tokens: List[str]) -> set:
+    """Trigrams of each query word, anchored at the word start but not its end
+    (the last word is usually still being typed) and independent of word order"""
+    grams = set()
+    for token in tokens:
+        padded = f" {token}"
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        if len(token) < 2:
+            grams.add(padded)
+    return grams
+
+
+class CatalogEntry:
+    """One searchable barcode or loose item"""
+    __slots__ = ('kind', 'name', 'hsn_code', 'barcode', 'category', 'text', 'words', 'item')
+
+    def __init__(self, kind: str, item: Dict):
+        self.kind = kind
+        self.item = item
+        self.name = item.get('name', '')
+        self.hsn_code = item.get('hsn_code', '') or ''
+        self.barcode = item.get('barcode', '') or ''
+        self.category = item.get('category_name', '') or ''
+        self.text = _normalize(f"{self.name} {self.barcode} {self.hsn_code}")
+        self.words = self.text.split()
+
+
+class CatalogIndex:
+    """In-memory fuzzy index over item names, barcodes and HSN codes.
+
+    Built once from the database and queried on every keystroke:
+    - queries shorter than 3 characters and barcode/HSN digits use a sorted
+      word list (prefix match via bisect),
+    - longer queries use a trigram inverted index. Posting lists are
+      intersected rarest-first so a query only touches the smallest lists;
+      if that finds too few items (typos), candidates sharing most of the
+      query's trigrams are scored instead, skipping very common trigrams.
+    """
+
+    COMMON_POSTING_LIMIT = 5000
+    FUZZY_MIN_SHARE = 0.6
+    RANK_POOL = 2000
+
+    def __init__(self):
+        self.entries: List[CatalogEntry] = []
+        self._postings: Dict[str, List[int]] = {}
+        self._words: List[Tuple[str, int]] = []
+        self._barcodes: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def build(self, barcode_items: List[Dict], loose_items: List[Dict]):
+        """(Re)build the index from item rows"""
+        entries = [CatalogEntry('barcode', item) for item in barcode_items]
+        entries.extend(CatalogEntry('loose', item) for item in loose_items)
+        # Shorter names first, so low entry ids are the better default matches
+        entries.sort(key=lambda entry: (len(entry.text), entry.text))
+        postings = defaultdict(list)
+        words = []
+        barcodes = {}
+        for entry_id, entry in enumerate(entries):
+            for gram in _trigrams(entry.text):
+                postings[gram].append(entry_id)
+            for word in set(entry.text.split()):
+                words.append((word, entry_id))
+            if entry.barcode:
+                barcodes[entry.barcode] = entry_id
+        words.sort()
+        self.entries = entries
+        self._postings = dict(postings)
+        self._words = words
+        self._barcodes = barcodes
+
+    def _prefix_candidates(self, token: str, cap: int) -> set:
+        found = set()
+        position = bisect_left(self._words, (token, -1))
+        while position < len(self._words) and len(found) < cap:
+            word, entry_id = self._words[position]
+            if not word.startswith(token):
+                break
+            found.add(entry_id)
+            position += 1
+        return found
+
+    def _trigram_candidates(self, query_grams: set, limit: int) -> Tuple[set, bool]:
+        grams = sorted(query_grams, key=lambda gram: len(self._postings.get(gram, ())))
+        candidates = None
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if not posting:
+                candidates = set()
+                break
+            candidates = set(posting) if candidates is None else candidates.intersection(posting)
+            if not candidates:
+                break
+        if candidates and len(candidates) >= limit:
+            return candidates, True
+
+        # Fuzzy fallback: count shared trigrams, ignoring very common ones
+        counts = defaultdict(int)
+        usable = 0
+        for gram in grams:
+            posting = self._postings.get(gram, ())
+            if len(posting) > self.COMMON_POSTING_LIMIT:
+                continue
+            usable += 1
+            for entry_id in posting:
+                counts[entry_id] += 1
+        needed = max(1, int(usable * self.FUZZY_MIN_SHARE))
+        fuzzy = {entry_id for entry_id, count in counts.items() if count >= needed}
+        return (candidates or set()) | fuzzy, False
+
+    def _rank(self, entry_id: int, query: str, tokens: List[str], query_grams: set) -> tuple:
+        entry = self.entries[entry_id]
+        text = entry.text
+        if query == entry.barcode or query == entry.hsn_code:
+            tier = 0
+        elif text.startswith(query):
+            tier = 1
+        elif all(any(word.startswith(token) for word in entry.words) for token in tokens):
+            tier = 2
+        elif query in text:
+            tier = 3
+        else:
+            shared = len(query_grams & _trigrams(text))
+            tier = 4 + (1.0 - shared / max(1, len(query_grams)))
+        return (tier, entry_id)
+
+    def search(self, query: str, limit: int = 20) -> List[CatalogEntry]:
+        """Return up to limit entries ranked best first"""
+        query = _normalize(query)
+        if not query or not self.entries:
+            return []
+        tokens = query.split()
+        query_grams = _query_trigrams(tokens)
+        if query in self._barcodes:
+            candidates = {self._barcodes[query]}
+        elif len(query) < 3 or query.isdigit():
+            # Short queries and barcode/HSN digits: word-prefix lookup
+            candidates = self._prefix_candidates(tokens[0], limit * 20)
+        else:
+            candidates, _ = self._trigram_candidates(query_grams, limit)
+        if len(candidates) > self.RANK_POOL:
+            # Very broad query: rank only the shortest names (lowest ids)
+            candidates = heapq.nsmallest(self.RANK_POOL, candidates)
+        ranked = heapq.nsmallest(
+            limit, candidates,
+            key=lambda entry_id: self._rank(entry_id, query, tokens, query_grams))
+        return [self.entries[entry_id] for entry_id in ranked]
+
+    def get_by_barcode(self, barcode: str) -> Optional[CatalogEntry]:
+        entry_id = self._barcodes.get(barcode)
+        return self.entries[entry_id] if entry_id is not None else None
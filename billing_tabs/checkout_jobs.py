@@ -0,0 +1,188 @@
+import itertools
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from PyQt5.QtCore import QObject, pyqtSignal
+from billing_tabs.queue_panel import QueuePanel
+
+
+class CheckoutJob:
+    """A single post-checkout task (print, render, send) with its status"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    RETRYING = 'retrying'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    _ids = itertools.count(1)
+
+    def __init__(self, kind: str, bill_id: int, func: Callable[[], bool],
+                 max_retries: int = 2, depends_on: Optional['CheckoutJob'] = None,
+                 description: str = ""):
+        self.job_id = next(self._ids)
+        self.kind = kind
+        self.bill_id = bill_id
+        self.func = func
+        self.max_retries = max_retries
+        self.depends_on = depends_on
+        self.description = description or kind.title()
+        self.status = self.QUEUED
+        self.attempts = 0
+        self.message = ""
+        self.updated_at = datetime.now()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+
+class CheckoutJobQueue(QObject):
+    """Runs post-checkout jobs on background lanes so the counter never waits.
+
+    Each lane is one worker thread that processes its jobs in order, so image
+    render and WhatsApp send stay ordered on the 'share' lane while lanes run
+    in parallel with each other and with the GUI. Receipts go through the
+    persistent PrintSpooler instead. Failed jobs are retried with
+    exponential backoff; job_updated is emitted on every status change.
+    Only the newest KEEP_DONE completed jobs are kept, so a long shift does
+    not grow the list (and the panel) without bound.
+    """
+    job_updated = pyqtSignal(object)
+
+    RETRY_BASE_DELAY = 2  # seconds, doubled after each failed attempt
+    KEEP_DONE = 50
+
+    def __init__(self, lanes=('share',), parent=None):
+        super().__init__(parent)
+        self._jobs: List[CheckoutJob] = []
+        self._job_lanes: Dict[int, str] = {}
+        self._queues: Dict[str, queue.Queue] = {}
+        self._threads: List[threading.Thread] = []
+        self._running = True
+        for lane in lanes:
+            lane_queue = queue.Queue()
+            self._queues[lane] = lane_queue
+            # Daemon threads so a long WhatsApp send never blocks application exit
+            thread = threading.Thread(target=self._worker, args=(lane_queue,),
+                                      name=f"checkout-{lane}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def enqueue(self, job: CheckoutJob, lane: str) -> CheckoutJob:
+        """Queue a job on the given lane and return it immediately"""
+        self._prune_done()
+        self._jobs.append(job)
+        self._job_lanes[job.job_id] = lane
+        self._queues[lane].put(job)
+        self.job_updated.emit(job)
+        return job
+
+    def retry(self, job: CheckoutJob) -> bool:
+        """Re-queue a failed job"""
+        if job.status != CheckoutJob.FAILED:
+            return False
+        job.attempts = 0
+        self._set_status(job, CheckoutJob.QUEUED, "")
+        self._queues[self._job_lanes[job.job_id]].put(job)
+        return True
+
+    def jobs(self) -> List[CheckoutJob]:
+        return list(self._jobs)
+
+    def clear_finished(self):
+        """Forget jobs that have completed successfully"""
+        self._forget({job.job_id for job in self._jobs if job.status == CheckoutJob.DONE})
+
+    def _prune_done(self):
+        done = [job.job_id for job in self._jobs if job.status == CheckoutJob.DONE]
+        if len(done) > self.KEEP_DONE:
+            self._forget(set(done[:len(done) - self.KEEP_DONE]))
+
+    def _forget(self, job_ids):
+        self._jobs = [job for job in self._jobs if job.job_id not in job_ids]
+        for job_id in job_ids:
+            self._job_lanes.pop(job_id, None)
+
+    def pending_count(self) -> int:
+        return sum(1 for job in self._jobs if not job.is_finished)
+
+    def shutdown(self):
+        """Stop the workers after their current job"""
+        self._running = False
+        for lane_queue in self._queues.values():
+            lane_queue.put(None)
+
+    def _set_status(self, job: CheckoutJob, status: str, message: str = ""):
+        job.status = status
+        job.message = message
+        job.updated_at = datetime.now()
+        self.job_updated.emit(job)
+
+    def _worker(self, lane_queue: queue.Queue):
+        while self._running:
+            job = lane_queue.get()
+            if job is None:
+                break
+            self._run_job(job)
+
+    def _run_job(self, job: CheckoutJob):
+        if job.depends_on is not None:
+            # Dependencies on another lane may still be running
+            while not job.depends_on.is_finished and self._running:
+                time.sleep(0.2)
+            if job.depends_on.status != CheckoutJob.DONE:
+                self._set_status(job, CheckoutJob.FAILED,
+                                 f"Skipped: {job.depends_on.description} failed")
+                return
+        while self._running:
+            job.attempts += 1
+            self._set_status(job, CheckoutJob.RUNNING, f"Attempt {job.attempts}")
+            try:
+                ok = job.func()
+                error = "" if ok is not False else "Job reported failure"
+            except Exception as e:
+                ok = False
+                error = str(e)
+            if ok is not False:
+                self._set_status(job, CheckoutJob.DONE, "")
+                return
+            print(f"[ERROR] {job.description} for bill #{job.bill_id} failed: {error}")
+            if job.attempts > job.max_retries:
+                self._set_status(job, CheckoutJob.FAILED, error)
+                return
+            delay = self.RETRY_BASE_DELAY * (2 ** (job.attempts - 1))
+            self._set_status(job, CheckoutJob.RETRYING, f"{error} (retrying in {delay}s)")
+            time.sleep(delay)
+
+
+class JobQueuePanel(QueuePanel):
+    """Compact view of the checkout job queue with retry for failed jobs"""
+    TITLE = "Background Jobs"
+    STATUS_COLORS = {
+        CheckoutJob.QUEUED: "#7f8c8d",
+        CheckoutJob.RUNNING: "#2980b9",
+        CheckoutJob.RETRYING: "#e67e22",
+        CheckoutJob.DONE: "#27ae60",
+        CheckoutJob.FAILED: "#c0392b",
+    }
+    PENDING_STATUSES = (CheckoutJob.QUEUED, CheckoutJob.RUNNING, CheckoutJob.RETRYING)
+    FAILED_STATUS = CheckoutJob.FAILED
+
+    def __init__(self, job_queue: CheckoutJobQueue, parent=None):
+        self.job_queue = job_queue
+        super().__init__(job_queue.job_updated, parent)
+
+    def entries(self) -> List[CheckoutJob]:
+        return self.job_queue.jobs()
+
+    def row(self, job: CheckoutJob):
+        return (job.job_id, job.bill_id, job.description, job.status, job.message,
+                job.updated_at if job.is_finished else None)
+
+    def retry_entry(self, job: CheckoutJob):
+        self.job_queue.retry(job)
+
+    def clear_finished(self):
+        self.job_queue.clear_finished()
@@ -4,19 +4,30 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QTableWidgetItem, QDialog, QGridLayout, QSpinBox,
                              QDoubleSpinBox, QMessageBox, QFrame, QScrollArea,
                              QTextEdit, QDialogButtonBox, QInputDialog, QSizePolicy,
-                             QHeaderView, QToolButton, QCompleter, QApplication)
+                             QHeaderView, QToolButton, QCompleter, QApplication,
+                             QListWidget, QListWidgetItem, QShortcut)
 from PyQt5.QtCore import Qt, QTimer, QEvent, QSize, QStringListModel
-from PyQt5.QtGui import QFont, QPixmap, QIcon, QImage
+from PyQt5.QtGui import QFont, QPixmap, QIcon, QKeySequence
 from data_base.database import Database
 from billing_tabs.thermal_printer import ThermalPrinter
 from billing_tabs.whatsapp_dialog import WhatsAppDialog
+from billing_tabs.bill_renderer import BillImageRenderer
+from billing_tabs.artifact_store import get_artifact_store
+from billing_tabs.checkout_jobs import CheckoutJob, CheckoutJobQueue, JobQueuePanel
+from billing_tabs.print_spooler import PrintSpooler, PrintQueuePanel
+from billing_tabs.whatsapp_outbox import WhatsAppOutbox, WhatsAppOutboxPanel, bill_caption
+from billing_tabs.cart import Cart
+from billing_tabs.cart_journal import CartJournal
+from billing_tabs import tax_engine
+from billing_tabs.catalog_search import CatalogIndex
+from billing_tabs.scale_barcode import ScaleBarcodeFormat
+from billing_tabs.promotions import PromotionEngine, active_promotions
 from PIL import Image, ImageDraw, ImageFont
 import os
-from datetime import datetime
+import copy
+import threading
 import re
 import pyautogui
-import qrcode
-import random
 
 class CustomerInfoDialog(QDialog):
     def __init__(self, customer_names=None, parent=None):
@@ -113,9 +124,13 @@ class CustomerInfoDialog(QDialog):
         self.accept()
 
 class LooseItemDialog(QDialog):
-    def __init__(self, item_data, parent=None):
+    def __init__(self, item_data, parent=None, scale_reader=None):
         super().__init__(parent)
         self.item_data = item_data
+        self.scale_reader = scale_reader
+        # Follow the scale until the cashier types a quantity by hand
+        self._follow_scale = scale_reader is not None
+        self._setting_scale_weight = False
         self.setWindowTitle(f"Add {item_data['name']}")
         self.setModal(True)
         self.resize(500, 400)
@@ -139,11 +154,21 @@ class LooseItemDialog(QDialog):
         self.quantity_input = QDoubleSpinBox()
         self.quantity_input.setMinimum(0.01)
         self.quantity_input.setMaximum(999.99)
-        self.quantity_input.setDecimals(2)
+        self.quantity_input.setDecimals(3)
         self.quantity_input.setSingleStep(0.1)
         self.quantity_input.setValue(1.0)
         self.quantity_input.valueChanged.connect(self.update_calculations)
+        self.quantity_input.valueChanged.connect(self.on_quantity_edited)
         layout.addWidget(self.quantity_input)
+        # Live scale weight
+        self.scale_label = QLabel()
+        self.scale_label.setFont(QFont("Arial", 11))
+        self.scale_label.setVisible(self.scale_reader is not None)
+        layout.addWidget(self.scale_label)
+        if self.scale_reader is not None:
+            self.scale_label.setText(f"Scale: {self.scale_reader.status}")
+            self.scale_reader.weight_updated.connect(self.on_scale_weight)
+            self.scale_reader.stable_weight.connect(self.apply_scale_weight)
         # Final Price (user input)
         layout.addWidget(QLabel("Final Price per kg (₹):"))
         self.final_price_input = QDoubleSpinBox()
@@ -173,6 +198,7 @@ class LooseItemDialog(QDialog):
         # Buttons
         button_layout = QHBoxLayout()
         add_button = QPushButton("Add to Bill")
+        add_button.setDefault(True)  # Enter adds the line (with the scale weight if present)
         cancel_button = QPushButton("Cancel")
         add_button.clicked.connect(self.accept_item)
         cancel_button.clicked.connect(self.reject)
@@ -180,6 +206,8 @@ class LooseItemDialog(QDialog):
         button_layout.addWidget(cancel_button)
         layout.addLayout(button_layout)
         self.setLayout(layout)
+        if self.scale_reader is not None and self.scale_reader.last_stable > 0:
+            self.apply_scale_weight(self.scale_reader.last_stable)
         self.update_calculations()
 
     def update_calculations(self):
@@ -187,23 +215,41 @@ class LooseItemDialog(QDialog):
         final_price = self.final_price_input.value()
         sgst_percent = self.sgst_percent
         cgst_percent = self.cgst_percent
-        divisor = 1 + (sgst_percent + cgst_percent) / 100
-        base_price = final_price / divisor if divisor != 0 else 0
+        base_price = tax_engine.base_from_inclusive(final_price, sgst_percent, cgst_percent)
         self.base_price = base_price
         self.final_price = final_price
         self.base_price_label.setText(f"Base Price per kg (calculated): ₹{base_price:.2f}")
-        base_amount = quantity * base_price
-        sgst_amount = base_amount * sgst_percent / 100
-        cgst_amount = base_amount * cgst_percent / 100
-        final_amount = base_amount + sgst_amount + cgst_amount
+        line = tax_engine.compute_line(quantity, base_price, sgst_percent, cgst_percent)
         calculations_text = f"""
-Base Amount: ₹{base_amount:.2f}
-SGST ({sgst_percent}%): ₹{sgst_amount:.2f}
-CGST ({cgst_percent}%): ₹{cgst_amount:.2f}
-Final Amount: ₹{final_amount:.2f}
+Base Amount: ₹{line['taxable_amount']:.2f}
+SGST ({sgst_percent}%): ₹{line['sgst_amount']:.2f}
+CGST ({cgst_percent}%): ₹{line['cgst_amount']:.2f}
+Final Amount: ₹{line['final_price']:.2f}
         """.strip()
         self.calculations_label.setText(calculations_text)
 
+    def on_quantity_edited(self):
+        if not self._setting_scale_weight:
+            self._follow_scale = False
+
+    def on_scale_weight(self, weight, stable):
+        self.scale_label.setText(f"Scale: {weight:.3f} kg{'' if stable else ' (settling...)'}")
+
+    def apply_scale_weight(self, weight):
+        """Put a stable scale reading into the quantity box"""
+        if not self._follow_scale or weight <= 0:
+            return
+        self._setting_scale_weight = True
+        self.quantity_input.setValue(weight)
+        self._setting_scale_weight = False
+
+    def done(self, result):
+        if self.scale_reader is not None:
+            self.scale_reader.weight_updated.disconnect(self.on_scale_weight)
+            self.scale_reader.stable_weight.disconnect(self.apply_scale_weight)
+            self.scale_reader = None
+        super().done(result)
+
     def accept_item(self):
         self.quantity = self.quantity_input.value()
         self.base_price = self.base_price
@@ -328,7 +374,8 @@ class LooseCategoryDialog(QDialog):
         self.accept()
 
 class CreateBillWindow(QMainWindow):
-    def __init__(self, printer_instance=None):
+    def __init__(self, printer_instance=None, job_queue=None, scale_reader=None, print_spooler=None,
+                 whatsapp_outbox=None):
         super().__init__()
         self.setWindowTitle("Create Bill")
         # Set window size based on screen resolution or sensible default
@@ -347,6 +394,14 @@ class CreateBillWindow(QMainWindow):
         self.db = Database()
         # Use provided printer instance or create new one
         self.thermal_printer = printer_instance if printer_instance else ThermalPrinter()
+        # Background queue for print/render/send jobs after checkout
+        self.job_queue = job_queue if job_queue else CheckoutJobQueue(parent=self)
+        # Persistent receipt queue; its worker owns the printer
+        self.print_spooler = print_spooler if print_spooler else PrintSpooler(self.thermal_printer, parent=self)
+        # Persistent, rate-limited WhatsApp sender
+        self.whatsapp_outbox = whatsapp_outbox if whatsapp_outbox else WhatsAppOutbox(parent=self)
+        # Weighing scale next to the counter (optional)
+        self.scale_reader = scale_reader
         
         # Bill data
         self.bill_items = []
@@ -355,9 +410,28 @@ class CreateBillWindow(QMainWindow):
         self.total_weight = 0.0
         self.total_sgst = 0.0
         self.total_cgst = 0.0
+        self.total_discount = 0.0
+        # Offers applied to the cart; only rules touching changed lines are re-evaluated
+        self.promotion_engine = PromotionEngine()
+        self._promo_changed = []  # None means re-evaluate the whole cart
+        self.load_promotions()
+        # Bills put on hold at this counter (persisted in parked_carts)
+        self.parked_carts = [Cart.from_db(row) for row in self.db.get_parked_carts()]
+        # In-memory search index over the catalog, rebuilt in the background when shown
+        self.catalog_index = CatalogIndex()
+        self._index_building = False
+        # Layout of weighing-scale labels (reloaded when the window is shown)
+        self.scale_format = ScaleBarcodeFormat()
         
         self.init_ui()
         
+        # Crash-safe journal of the bill in progress, replayed on startup
+        self.cart_journal = CartJournal(os.path.join(os.path.dirname(self.db.db_path), 'cart_journal.log'))
+        self.restore_journaled_bill()
+        self.journal_sync_timer = QTimer(self)
+        self.journal_sync_timer.timeout.connect(self.cart_journal.sync)
+        self.journal_sync_timer.start(500)
+        
         # Setup barcode scanner timer
         self.barcode_buffer = ""
         self.barcode_timer = QTimer()
@@ -424,6 +498,12 @@ class CreateBillWindow(QMainWindow):
         self.total_cgst_label.setFont(QFont("Arial", 12))
         totals_layout.addWidget(self.total_cgst_label)
         
+        self.total_discount_label = QLabel("Discount: ₹0.00")
+        self.total_discount_label.setFont(QFont("Arial", 12))
+        self.total_discount_label.setStyleSheet("color: #27ae60;")
+        self.total_discount_label.setVisible(False)
+        totals_layout.addWidget(self.total_discount_label)
+        
         self.total_amount_label = QLabel("Total Amount: ₹0.00")
         self.total_amount_label.setFont(QFont("Arial", 14, QFont.Bold))
         self.total_amount_label.setStyleSheet("color: #e74c3c;")
@@ -467,6 +547,38 @@ class CreateBillWindow(QMainWindow):
         self.barcode_input.textChanged.connect(self.on_barcode_input)
         right_layout.addWidget(self.barcode_input)
         
+        # Item search
+        search_label = QLabel("Search Items (Ctrl+F):")
+        search_label.setFont(QFont("Arial", 12, QFont.Bold))
+        right_layout.addWidget(search_label)
+        
+        self.search_input = QLineEdit()
+        self.search_input.setFont(QFont("Arial", 12))
+        self.search_input.setPlaceholderText("Name, barcode or HSN... (Enter to add)")
+        self.search_input.textChanged.connect(self.update_search_results)
+        self.search_input.returnPressed.connect(self.add_selected_search_result)
+        self.search_input.installEventFilter(self)
+        right_layout.addWidget(self.search_input)
+        
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(180)
+        self.search_results.setVisible(False)
+        self.search_results.itemActivated.connect(lambda item: self.add_selected_search_result())
+        right_layout.addWidget(self.search_results)
+        
+        QShortcut(QKeySequence("Ctrl+F"), self, activated=self.focus_search)
+        
+        # Live weighing-scale reading
+        self.scale_status_label = QLabel()
+        self.scale_status_label.setFont(QFont("Arial", 11))
+        right_layout.addWidget(self.scale_status_label)
+        if self.scale_reader is not None:
+            self.scale_reader.weight_updated.connect(self.on_scale_weight)
+            self.scale_reader.status_changed.connect(self.on_scale_status)
+            self.on_scale_status(self.scale_reader.status)
+        else:
+            self.scale_status_label.setVisible(False)
+        
         # Add loose items button
         loose_items_btn = QPushButton("Add Loose Items")
         loose_items_btn.setFont(QFont("Arial", 12, QFont.Bold))
@@ -486,7 +598,48 @@ class CreateBillWindow(QMainWindow):
         """)
         right_layout.addWidget(loose_items_btn)
         
-        right_layout.addStretch()
+        # Hold / parked bills
+        hold_btn = QPushButton("Hold Bill (F6)")
+        hold_btn.setFont(QFont("Arial", 12, QFont.Bold))
+        hold_btn.setMinimumHeight(50)
+        hold_btn.clicked.connect(self.hold_current_bill)
+        hold_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #8e44ad;
+                color: white;
+                border: none;
+                border-radius: 8px;
+                padding: 10px;
+            }
+            QPushButton:hover {
+                background-color: #9b59b6;
+            }
+        """)
+        right_layout.addWidget(hold_btn)
+        
+        parked_label = QLabel("Parked Bills (F7: next, Ctrl+1-9: switch):")
+        parked_label.setFont(QFont("Arial", 10, QFont.Bold))
+        right_layout.addWidget(parked_label)
+        self.parked_list = QListWidget()
+        self.parked_list.setMaximumHeight(120)
+        self.parked_list.itemActivated.connect(
+            lambda item: self.resume_parked_cart(self.parked_list.row(item)))
+        right_layout.addWidget(self.parked_list)
+        self.refresh_parked_list()
+        
+        QShortcut(QKeySequence(Qt.Key_F6), self, activated=self.hold_current_bill)
+        QShortcut(QKeySequence(Qt.Key_F7), self, activated=self.resume_next_parked_cart)
+        for number in range(1, 10):
+            QShortcut(QKeySequence(f"Ctrl+{number}"), self,
+                      activated=lambda index=number - 1: self.resume_parked_cart(index))
+        
+        # Print queue, WhatsApp outbox and post-checkout job queue
+        self.print_panel = PrintQueuePanel(self.print_spooler)
+        right_layout.addWidget(self.print_panel, 1)
+        self.outbox_panel = WhatsAppOutboxPanel(self.whatsapp_outbox)
+        right_layout.addWidget(self.outbox_panel, 1)
+        self.job_panel = JobQueuePanel(self.job_queue)
+        right_layout.addWidget(self.job_panel, 1)
         
         # Add panels to main layout
         main_layout.addWidget(left_panel, 2)
@@ -528,6 +681,8 @@ class CreateBillWindow(QMainWindow):
         """Add item by barcode"""
         item = self.db.get_barcode_item(barcode)
         if not item:
+            if self.add_scale_barcode_item(barcode):
+                return
             QMessageBox.warning(self, "Error", f"Item with barcode {barcode} not found!")
             return
         
@@ -536,6 +691,7 @@ class CreateBillWindow(QMainWindow):
             if existing_item.get('item_type') == 'barcode' and existing_item.get('barcode') == barcode:
                 existing_item['quantity'] += 1
                 self.calculate_item_totals(existing_item)
+                self.journal_item(existing_item)
                 self.update_bill_display()
                 return
         
@@ -557,67 +713,215 @@ class CreateBillWindow(QMainWindow):
         
         self.calculate_item_totals(bill_item)
         self.bill_items.append(bill_item)
+        self.cart_journal.add(bill_item)
+        self.update_bill_display()
+    
+    def add_scale_barcode_item(self, barcode):
+        """Add a loose item line from a weighing-scale label (PLU + weight or price)"""
+        reading = self.scale_format.decode(barcode)
+        if reading is None:
+            return False
+        loose_item = self.db.get_loose_item_by_plu(reading.plu)
+        if not loose_item:
+            QMessageBox.warning(self, "Error", f"Scale PLU {reading.plu} is not mapped to a loose item!\n"
+                                "Map it under Inventory > Loose Items > Scale PLU Mapping.")
+            return True
+        if reading.weight is not None:
+            quantity = float(reading.weight)
+        else:
+            unit_price = tax_engine.inclusive_unit_price(loose_item['base_price'],
+                                                         loose_item.get('sgst_percent', 0),
+                                                         loose_item.get('cgst_percent', 0))
+            if not unit_price:
+                QMessageBox.warning(self, "Error", f"{loose_item['name']} has no price per kg set!")
+                return True
+            quantity = float(round(reading.price / unit_price, 3))
+        # Each label is a separate packet, so it always gets its own row
+        new_item = {
+            'name': loose_item['name'],
+            'hsn_code': loose_item.get('hsn_code', ''),
+            'quantity': quantity,
+            'base_price': loose_item['base_price'],
+            'sgst_percent': loose_item.get('sgst_percent', 0),
+            'cgst_percent': loose_item.get('cgst_percent', 0),
+            'item_type': 'loose',
+            'item_id': loose_item['id'],
+            'category_id': loose_item.get('category_id'),
+            'barcode': barcode
+        }
+        if reading.price is not None:
+            # Charge what the label says; the derived weight is rounded to grams
+            new_item['label_price'] = float(reading.price)
+        self.calculate_item_totals(new_item)
+        self.bill_items.append(new_item)
+        self.cart_journal.add(new_item)
         self.update_bill_display()
+        return True
+    
+    def load_scale_format(self):
+        try:
+            self.scale_format = ScaleBarcodeFormat.from_settings(self.db.get_settings('scale_barcode_'))
+        except Exception as e:
+            print(f"Error loading scale barcode settings: {e}")
     
     def calculate_item_totals(self, item):
         """Calculate SGST, CGST, and final price for an item"""
-        base_amount = item['quantity'] * item['base_price']
-        sgst_amount = base_amount * item['sgst_percent'] / 100
-        cgst_amount = base_amount * item['cgst_percent'] / 100
-        final_price = base_amount + sgst_amount + cgst_amount
-        
-        item['sgst_amount'] = sgst_amount
-        item['cgst_amount'] = cgst_amount
-        item['final_price'] = final_price
+        tax_engine.apply_line_totals(item)
+        if self._promo_changed is not None:
+            self._promo_changed.append(item)
+    
+    def load_promotions(self):
+        """Load the currently active promotions and re-apply them to the cart"""
+        try:
+            self.promotion_engine.load(active_promotions(self.db.get_promotions()))
+        except Exception as e:
+            print(f"Error loading promotions: {e}")
+        self._promo_changed = None
+    
+    def apply_promotions(self):
+        """Re-evaluate offers affected by the latest cart changes"""
+        changed = self._promo_changed
+        self._promo_changed = []
+        for item in self.promotion_engine.apply(self.bill_items, changed):
+            tax_engine.apply_line_totals(item)
+            self.journal_item(item)
     
     def add_loose_items(self):
         """Add loose items"""
         dialog = LooseCategoryDialog(self)
         if dialog.exec_() == QDialog.Accepted and dialog.selected_item:
-            item_dialog = LooseItemDialog(dialog.selected_item, self)
-            if item_dialog.exec_() == QDialog.Accepted:
-                # Prepare new item
-                new_item = {
-                    'name': dialog.selected_item['name'],
-                    'hsn_code': dialog.selected_item.get('hsn_code', ''),
-                    'quantity': item_dialog.quantity,
-                    'base_price': item_dialog.base_price,
-                    # Always use DB values for SGST/CGST
-                    'sgst_percent': dialog.selected_item.get('sgst_percent', 0),
-                    'cgst_percent': dialog.selected_item.get('cgst_percent', 0),
-                    'item_type': 'loose'
-                }
-                self.calculate_item_totals(new_item)
-                # Check for existing loose item with same name and price
-                for existing_item in self.bill_items:
-                    if (
-                        existing_item.get('item_type') == 'loose' and
-                        existing_item.get('name') == new_item['name'] and
-                        abs(existing_item.get('base_price', 0) - new_item['base_price']) < 0.01  # Allow small float diff
-                    ):
-                        # Same item and price: add quantity and update totals
-                        existing_item['quantity'] += new_item['quantity']
-                        self.calculate_item_totals(existing_item)
-                        self.update_bill_display()
-                        return
-                # Otherwise, add as new row
-                self.bill_items.append(new_item)
-                self.update_bill_display()
+            self.add_loose_item(dialog.selected_item)
+    
+    def add_loose_item(self, selected_item):
+        """Ask for quantity/price of a loose item and add it to the bill"""
+        scale_reader = self.scale_reader if self.scale_reader and self.scale_reader.is_configured else None
+        item_dialog = LooseItemDialog(selected_item, self, scale_reader=scale_reader)
+        if item_dialog.exec_() == QDialog.Accepted:
+            # Prepare new item
+            new_item = {
+                'name': selected_item['name'],
+                'hsn_code': selected_item.get('hsn_code', ''),
+                'quantity': item_dialog.quantity,
+                'base_price': item_dialog.base_price,
+                # Always use DB values for SGST/CGST
+                'sgst_percent': selected_item.get('sgst_percent', 0),
+                'cgst_percent': selected_item.get('cgst_percent', 0),
+                'item_type': 'loose',
+                'item_id': selected_item.get('id'),
+                'category_id': selected_item.get('category_id')
+            }
+            self.calculate_item_totals(new_item)
+            # Check for existing loose item with same name and price
+            for existing_item in self.bill_items:
+                if (
+                    existing_item.get('item_type') == 'loose' and
+                    'label_price' not in existing_item and
+                    existing_item.get('name') == new_item['name'] and
+                    abs(existing_item.get('base_price', 0) - new_item['base_price']) < 0.01  # Allow small float diff
+                ):
+                    # Same item and price: add quantity and update totals
+                    existing_item['quantity'] += new_item['quantity']
+                    self.calculate_item_totals(existing_item)
+                    self.journal_item(existing_item)
+                    self.update_bill_display()
+                    return
+            # Otherwise, add as new row
+            self.bill_items.append(new_item)
+            self.cart_journal.add(new_item)
+            self.update_bill_display()
+    
+    def on_scale_weight(self, weight, stable):
+        self.scale_status_label.setText(f"Scale: {weight:.3f} kg{'' if stable else ' (settling...)'}")
+    
+    def on_scale_status(self, status):
+        self.scale_status_label.setText(f"Scale: {status}")
+        self.scale_status_label.setVisible(self.scale_reader.is_configured)
+    
+    def refresh_search_index(self):
+        """Rebuild the catalog search index in a background thread"""
+        if self._index_building:
+            return
+        self._index_building = True
+
+        def build():
+            try:
+                # The worker thread gets its own Database, separate from self.db
+                db = Database()
+                index = CatalogIndex()
+                index.build(db.get_all_barcode_items(), db.get_all_loose_items())
+                # Swap in the finished index; searches keep using the old one until then
+                self.catalog_index = index
+            except Exception as e:
+                print(f"Error building item search index: {e}")
+            finally:
+                self._index_building = False
+
+        threading.Thread(target=build, name="catalog-index", daemon=True).start()
+    
+    def focus_search(self):
+        self.search_input.setFocus()
+        self.search_input.selectAll()
+    
+    def update_search_results(self, text):
+        """Show ranked catalog matches for the current search text"""
+        self.search_results.clear()
+        results = self.catalog_index.search(text, limit=20) if text.strip() else []
+        for entry in results:
+            price = entry.item.get('total_price') or 0
+            if entry.kind == 'barcode':
+                label = f"{entry.name}  ₹{price:.2f}  [{entry.barcode}]"
+            else:
+                label = f"{entry.name}  ₹{price:.2f}/kg  ({entry.category or 'Loose'})"
+            list_item = QListWidgetItem(label)
+            list_item.setData(Qt.UserRole, entry)
+            self.search_results.addItem(list_item)
+        if results:
+            self.search_results.setCurrentRow(0)
+        self.search_results.setVisible(bool(results))
+    
+    def add_selected_search_result(self):
+        """Add the highlighted search result to the bill"""
+        list_item = self.search_results.currentItem()
+        if list_item is None:
+            return
+        entry = list_item.data(Qt.UserRole)
+        self.search_input.clear()
+        if entry.kind == 'barcode':
+            self.add_barcode_item(entry.barcode)
+        else:
+            self.add_loose_item(entry.item)
+        self.search_input.setFocus()
+    
+    def eventFilter(self, obj, event):
+        """Arrow keys move through search results while typing; Esc clears the search"""
+        if obj is self.search_input and event.type() == QEvent.KeyPress:
+            key = event.key()
+            count = self.search_results.count()
+            if key in (Qt.Key_Down, Qt.Key_Up) and count:
+                step = 1 if key == Qt.Key_Down else -1
+                row = min(max(self.search_results.currentRow() + step, 0), count - 1)
+                self.search_results.setCurrentRow(row)
+                return True
+            if key == Qt.Key_Escape and self.search_input.text():
+                self.search_input.clear()
+                return True
+        return super().eventFilter(obj, event)
     
     def update_bill_display(self):
         """Update the bill table and totals"""
+        self.apply_promotions()
         self.bill_table.setRowCount(len(self.bill_items))
-        total_amount = 0
-        total_items = len(self.bill_items)
-        total_sgst = 0
-        total_cgst = 0
         sgst_percent_sum = 0
         cgst_percent_sum = 0
         sgst_count = 0
         cgst_count = 0
         for row, item in enumerate(self.bill_items):
-            # Item name
-            self.bill_table.setItem(row, 0, QTableWidgetItem(item['name']))
+            # Item name (with any offer applied)
+            name_item = QTableWidgetItem(item['name'])
+            if item.get('discount_amount'):
+                name_item.setText(f"{item['name']} (-₹{item['discount_amount']:.2f})")
+                name_item.setToolTip(item.get('promotion', ''))
+            self.bill_table.setItem(row, 0, name_item)
             
             # HSN Code
             self.bill_table.setItem(row, 1, QTableWidgetItem(item.get('hsn_code', '')))
@@ -697,26 +1001,29 @@ class CreateBillWindow(QMainWindow):
             remove_btn.clicked.connect(lambda checked, r=row: self.remove_item(r))
             self.bill_table.setCellWidget(row, 8, remove_btn)
             
-            # Calculate totals
-            total_amount += item['final_price']
-            total_sgst += item['sgst_amount']
-            total_cgst += item['cgst_amount']
             if item.get('sgst_percent', 0) > 0:
                 sgst_percent_sum += item['sgst_percent']
                 sgst_count += 1
             if item.get('cgst_percent', 0) > 0:
                 cgst_percent_sum += item['cgst_percent']
                 cgst_count += 1
-        # Update totals display
+        # Update totals display (line amounts are already computed, this is a single summing pass)
+        totals = tax_engine.cart_totals(self.bill_items)
+        total_amount = totals['total_amount']
+        total_items = totals['total_items']
         self.total_amount = total_amount
         self.total_items = total_items
-        self.total_sgst = total_sgst
-        self.total_cgst = total_cgst
+        self.total_sgst = totals['total_sgst']
+        self.total_cgst = totals['total_cgst']
+        self.total_weight = totals['total_weight']
+        self.total_discount = totals['total_discount']
         self.items_count_label.setText(f"Total Items: {total_items}")
         avg_sgst = (sgst_percent_sum / sgst_count) if sgst_count else 0
         avg_cgst = (cgst_percent_sum / cgst_count) if cgst_count else 0
         self.total_sgst_label.setText(f"Avg SGST%: {avg_sgst:.2f}%")
         self.total_cgst_label.setText(f"Avg CGST%: {avg_cgst:.2f}%")
+        self.total_discount_label.setText(f"Discount: ₹{self.total_discount:.2f}")
+        self.total_discount_label.setVisible(self.total_discount > 0)
         self.total_amount_label.setText(f"Total Amount: ₹{total_amount:.2f}")
     
     def increase_quantity(self, row):
@@ -726,15 +1033,11 @@ class CreateBillWindow(QMainWindow):
             if item['item_type'] == 'barcode':
                 item['quantity'] += 1
             else:
-                item['quantity'] += 0.1
-                # Recalculate base_price for loose items
-                divisor = 1 + (item.get('sgst_percent', 0) + item.get('cgst_percent', 0)) / 100
-                final_price_per_unit = item['base_price'] * divisor
-                if final_price_per_unit == 0:
-                    item['base_price'] = 0
-                else:
-                    item['base_price'] = final_price_per_unit / divisor if divisor != 0 else 0
+                # Round so repeated 0.1 steps don't accumulate float error
+                item['quantity'] = round(item['quantity'] + 0.1, 3)
+                item.pop('label_price', None)
             self.calculate_item_totals(item)
+            self.journal_item(item)
             self.update_bill_display()
     
     def decrease_quantity(self, row):
@@ -745,18 +1048,14 @@ class CreateBillWindow(QMainWindow):
                 if item['quantity'] > 1:
                     item['quantity'] -= 1
                     self.calculate_item_totals(item)
+                    self.journal_item(item)
                     self.update_bill_display()
             else:  # loose item
                 if item['quantity'] > 0.1:
-                    item['quantity'] -= 0.1
-                    # Recalculate base_price for loose items
-                    divisor = 1 + (item.get('sgst_percent', 0) + item.get('cgst_percent', 0)) / 100
-                    final_price_per_unit = item['base_price'] * divisor
-                    if final_price_per_unit == 0:
-                        item['base_price'] = 0
-                    else:
-                        item['base_price'] = final_price_per_unit / divisor if divisor != 0 else 0
+                    item['quantity'] = round(item['quantity'] - 0.1, 3)
+                    item.pop('label_price', None)
                     self.calculate_item_totals(item)
+                    self.journal_item(item)
                     self.update_bill_display()
     
     def edit_item(self, row):
@@ -766,8 +1065,8 @@ class CreateBillWindow(QMainWindow):
         item = self.bill_items[row]
         if item['item_type'] == 'loose':
             # Prepare item_data for dialog
-            divisor = 1 + (item.get('sgst_percent', 0) + item.get('cgst_percent', 0)) / 100
-            per_unit_final_price = item['base_price'] * divisor
+            per_unit_final_price = float(tax_engine.inclusive_unit_price(
+                item['base_price'], item.get('sgst_percent', 0), item.get('cgst_percent', 0)))
             item_data = {
                 'name': item['name'],
                 'hsn_code': item.get('hsn_code', ''),
@@ -780,14 +1079,13 @@ class CreateBillWindow(QMainWindow):
             dialog.final_price_input.setValue(per_unit_final_price)
             if dialog.exec_() == QDialog.Accepted:
                 item['quantity'] = dialog.quantity
+                item.pop('label_price', None)
                 # Always recalculate base_price from final_price
                 final_price = dialog.final_price_input.value()
-                divisor = 1 + (item.get('sgst_percent', 0) + item.get('cgst_percent', 0)) / 100
-                if final_price == 0:
-                    item['base_price'] = 0
-                else:
-                    item['base_price'] = final_price / divisor if divisor != 0 else 0
+                item['base_price'] = tax_engine.base_from_inclusive(
+                    final_price, item.get('sgst_percent', 0), item.get('cgst_percent', 0))
                 self.calculate_item_totals(item)
+                self.journal_item(item)
                 self.update_bill_display()
         else:
             # For barcode items, keep old logic (edit quantity only)
@@ -799,14 +1097,81 @@ class CreateBillWindow(QMainWindow):
             if ok:
                 item['quantity'] = quantity
                 self.calculate_item_totals(item)
+                self.journal_item(item)
                 self.update_bill_display()
     
     def remove_item(self, row):
         """Remove item from bill"""
         if row < len(self.bill_items):
-            del self.bill_items[row]
+            removed = self.bill_items.pop(row)
+            if self._promo_changed is not None:
+                self._promo_changed.append(removed)
+            self.cart_journal.remove(row)
+            self.update_bill_display()
+    
+    def journal_item(self, item):
+        """Record a changed bill row in the cart journal"""
+        # Match by identity: list.index compares dicts by value, and two rows
+        # can be equal (e.g. two scale labels with the same weight)
+        row = next(index for index, line in enumerate(self.bill_items) if line is item)
+        self.cart_journal.update(row, item)
+    
+    def restore_journaled_bill(self):
+        """Reload the bill that was in progress when the app last stopped"""
+        try:
+            items = self.cart_journal.replay()
+        except Exception as e:
+            print(f"Could not replay cart journal: {e}")
+            items = []
+        # Compact the log to a single checkpoint of the recovered bill
+        self.cart_journal.reset(items)
+        if items:
+            print(f"[INFO] Recovered {len(items)} items from the cart journal.")
+            self.bill_items = items
+            self._promo_changed = None
             self.update_bill_display()
     
+    def refresh_parked_list(self):
+        """Show parked carts in the side list"""
+        self.parked_list.clear()
+        for number, cart in enumerate(self.parked_carts, start=1):
+            self.parked_list.addItem(f"{number}. {cart.summary()}")
+    
+    def hold_current_bill(self):
+        """Park the current bill so the next customer can be served"""
+        if not self.bill_items:
+            return
+        cart = Cart(self.bill_items)
+        cart.cart_id = self.db.save_parked_cart(cart.label, cart.items)
+        self.parked_carts.append(cart)
+        self.bill_items = []
+        self.cart_journal.reset()
+        self._promo_changed = None
+        self.update_bill_display()
+        self.refresh_parked_list()
+        self.barcode_input.setFocus()
+    
+    def resume_parked_cart(self, index):
+        """Bring a parked cart back, parking the current bill in its place if it has items"""
+        if index < 0 or index >= len(self.parked_carts):
+            return
+        cart = self.parked_carts.pop(index)
+        self.db.delete_parked_cart(cart.cart_id)
+        if self.bill_items:
+            current = Cart(self.bill_items)
+            current.cart_id = self.db.save_parked_cart(current.label, current.items)
+            self.parked_carts.append(current)
+        self.bill_items = cart.items
+        self.cart_journal.reset(self.bill_items)
+        self._promo_changed = None
+        self.update_bill_display()
+        self.refresh_parked_list()
+        self.barcode_input.setFocus()
+    
+    def resume_next_parked_cart(self):
+        """Cycle to the oldest parked cart"""
+        self.resume_parked_cart(0)
+    
     def finish_bill(self):
         """Finish the bill and print"""
         if not self.bill_items:
@@ -840,7 +1205,7 @@ class CreateBillWindow(QMainWindow):
         bill_id = self.db.save_bill(
             customer_name, customer_phone, self.bill_items,
             self.total_amount, self.total_items, self.total_weight,
-            self.total_sgst, self.total_cgst
+            self.total_sgst, self.total_cgst, self.total_discount
         )
         
         # Prepare bill data for printing
@@ -853,29 +1218,17 @@ class CreateBillWindow(QMainWindow):
             'total_weight': self.total_weight,
             'total_sgst': self.total_sgst,
             'total_cgst': self.total_cgst,
+            'total_discount': self.total_discount,
             'items': self.bill_items
         }
         
-        # --- Print to console and perform both actions ---
-        print("[INFO] Starting thermal print...")
-        thermal_success = False
-        if self.thermal_printer.connect_usb_printer():
-            thermal_success = self.thermal_printer.print_bill(bill_data)
-            if thermal_success:
-                print("[INFO] Thermal print completed.")
-            else:
-                print("[ERROR] Thermal print failed.")
-                QMessageBox.warning(self, "Print Error", "Thermal print failed!")
-        else:
-            print("[ERROR] Could not connect to thermal printer.")
-            QMessageBox.warning(self, "Printer Error", "Could not connect to thermal printer!")
-        
-        print("[INFO] Sending bill to WhatsApp...")
-        self.save_and_send_whatsapp(bill_data, customer_name, customer_phone)
-        print("[INFO] WhatsApp send triggered.")
+        # Print, render and send run in the background; the next bill can start now
+        self.enqueue_checkout_jobs(copy.deepcopy(bill_data))
         
         # Clear the bill
         self.bill_items = []
+        self.cart_journal.reset()
+        self._promo_changed = None
         self.update_bill_display()
         self.barcode_input.setFocus()
 
@@ -885,8 +1238,12 @@ class CreateBillWindow(QMainWindow):
             # Create a temporary widget to render the bill for WhatsApp sharing
             bill_widget = self.create_bill_widget_for_sharing(bill_data)
             
+            # Share the bill's stored image rather than a second capture
+            image_path = get_artifact_store().bill_image(bill_data) or ''
+            
             # Open WhatsApp dialog
-            whatsapp_dialog = WhatsAppDialog(bill_widget, customer_name, self)
+            whatsapp_dialog = WhatsAppDialog(bill_widget, customer_name, self, outbox=self.whatsapp_outbox,
+                                             bill_id=bill_data.get('id'), image_path=image_path)
             if whatsapp_dialog.exec_() == QDialog.Accepted:
                 # Optionally save customer data if requested
                 customer_data = whatsapp_dialog.get_customer_data()
@@ -901,279 +1258,38 @@ class CreateBillWindow(QMainWindow):
             QMessageBox.critical(self, "WhatsApp Error", f"Failed to share via WhatsApp: {str(e)}")
     
     def create_bill_widget_for_sharing(self, bill_data):
-        """Create a widget containing the bill layout for image capture, matching the requested format"""
-        from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QFrame, QTableWidget, QTableWidgetItem, QHBoxLayout
-        from PyQt5.QtCore import Qt
-        from PyQt5.QtGui import QFont
-
-        n_items = len(bill_data['items'])
-        table_row_height = 36  # Approximate row height in pixels
-        table_header_height = 40
-        table_height = (n_items + 1) * table_row_height + table_header_height  # +1 for total row
-        widget_height = 250 + table_height + 120  # 250 for header/info, 120 for footer, adjust as needed
-        widget_width = 1123
-
-        widget = QWidget()
-        widget.setFixedSize(widget_width, widget_height)
-        widget.setStyleSheet("""
-            QWidget {
-                background-color: white;
-                font-family: Arial;
-            }
-        """)
-        layout = QVBoxLayout()
-        widget.setLayout(layout)
-
-        # --- SHOP DETAILS (fetch once and reuse) ---
-        if hasattr(self, '_cached_admin_details'):
-            admin_details = self._cached_admin_details
-        else:
-            db = Database()
-            admin_details = db.get_admin_details() or {}
-            self._cached_admin_details = admin_details
-        shop_name = admin_details.get('shop_name', 'Shop Name')
-        shop_address = admin_details.get('address', 'Shop Address')
-        shop_phone = admin_details.get('phone_number', 'Shop Phone')
-        # Shop name bold, address and phone not bold, emojis
-        shop_label = QLabel(f"<b>{shop_name}</b><br/>📍{shop_address}<br/>📞{shop_phone}")
-        shop_label.setFont(QFont("Arial", 15))
-        shop_label.setAlignment(Qt.AlignCenter)
-        shop_label.setStyleSheet("padding: 8px; border-bottom: 2px solid #000;")
-        layout.addWidget(shop_label)
-
-        # --- BILL INFO ROW: Bill ID (left), Date (right, date only) ---
-        info_row = QHBoxLayout()
-        bill_id_label = QLabel(f"Bill ID: {bill_data['id']}")
-        bill_id_label.setFont(QFont("Arial", 10))
-        bill_id_label.setAlignment(Qt.AlignLeft)
-        info_row.addWidget(bill_id_label, alignment=Qt.AlignLeft)
-        info_row.addStretch()
-        # Format date only
-        date_label = QLabel(f"Date: {datetime.now().strftime('%d/%m/%Y')}")
-        date_label.setFont(QFont("Arial", 10))
-        date_label.setAlignment(Qt.AlignRight)
-        info_row.addWidget(date_label, alignment=Qt.AlignRight)
-        layout.addLayout(info_row)
-
-        # --- CUSTOMER NAME (left) AND TIME (right) ROW ---
-        customer_time_row = QHBoxLayout()
-        customer_time_row.setContentsMargins(0, 0, 0, 0)  # Remove all margins
-
-        customer_label = QLabel(f"Customer: {bill_data['customer_name']}")
-        customer_label.setFont(QFont("Arial", 10))
-        customer_label.setAlignment(Qt.AlignLeft)
-        customer_label.setStyleSheet("padding: 0px; margin: 0px;")  # Remove all padding/margin
-        customer_time_row.addWidget(customer_label, alignment=Qt.AlignLeft)
-
-        customer_time_row.addStretch()
-
-        time_label = QLabel(f"Time: {datetime.now().strftime('%I:%M %p')}")
-        time_label.setFont(QFont("Arial", 10))
-        time_label.setAlignment(Qt.AlignRight)
-        customer_time_row.addWidget(time_label, alignment=Qt.AlignRight)
-
-        layout.addLayout(customer_time_row)
-
-        # --- TABLE HEADER ---
-        table = QTableWidget()
-        table.setColumnCount(7)
-        table.setHorizontalHeaderLabels([
-            "HSN Code", "Item", "Qty", "Base Price", "SGST (%/₹)", "CGST (%/₹)", "Final Price"
-        ])
-        table.setRowCount(n_items + 1)  # +1 for total row
-        table.setStyleSheet("""
-            QTableWidget { font-size: 15px; }
-            QHeaderView::section { font-size: 16px; font-weight: bold; background: #e0e0e0; }
-        """)
-        table.verticalHeader().setVisible(False)
-        table.horizontalHeader().setStretchLastSection(True)
-        table.setEditTriggers(QTableWidget.NoEditTriggers)
-        table.setSelectionMode(QTableWidget.NoSelection)
-        table.setFocusPolicy(Qt.NoFocus)
-        table.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        table.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        table.setFixedHeight(table_height)
-
-        # Set column widths for A4 landscape (sum should be <= 1123)
-        table.setColumnWidth(0, 120)   # HSN
-        table.setColumnWidth(1, 370)   # Item
-        table.setColumnWidth(2, 90)    # Qty
-        table.setColumnWidth(3, 170)   # Base Price
-        table.setColumnWidth(4, 120)   # SGST
-        table.setColumnWidth(5, 120)   # CGST
-        # Final Price will stretch to fill remaining space
-
-        # Set row heights
-        for row in range(n_items + 1):
-            table.setRowHeight(row, table_row_height)
-        table.horizontalHeader().setFixedHeight(table_header_height)
-
-        # --- FILL TABLE ROWS ---
-        total_base = 0
-        total_sgst = 0
-        total_cgst = 0
-        total_final = 0
-        for row, item in enumerate(bill_data['items']):
-            hsn = str(item.get('hsn_code', ''))
-            name = str(item.get('name', ''))
-            qty = f"{item.get('quantity', 0):.2f}"
-            base_price_val = item.get('base_price', 0)
-            base_price = f"₹{base_price_val:.2f}"
-            sgst_percent = item.get('sgst_percent', 0)
-            sgst_amt = item.get('sgst_amount', 0)
-            cgst_percent = item.get('cgst_percent', 0)
-            cgst_amt = item.get('cgst_amount', 0)
-            final_price_val = item.get('final_price', 0)
-            final_price = f"₹{final_price_val:.2f}"
-
-            table.setItem(row, 0, QTableWidgetItem(hsn))
-            table.setItem(row, 1, QTableWidgetItem(name))
-            table.setItem(row, 2, QTableWidgetItem(qty))
-            table.setItem(row, 3, QTableWidgetItem(base_price))
-            table.setItem(row, 4, QTableWidgetItem(f"{sgst_percent:.1f}%\n₹{sgst_amt:.2f}"))
-            table.setItem(row, 5, QTableWidgetItem(f"{cgst_percent:.1f}%\n₹{cgst_amt:.2f}"))
-            table.setItem(row, 6, QTableWidgetItem(final_price))
-
-            total_base += base_price_val
-            total_sgst += sgst_amt
-            total_cgst += cgst_amt
-            total_final += final_price_val
+        """Create a widget showing the rendered bill image, for dialogs that capture a widget"""
+        image = BillImageRenderer().render_bill(bill_data)
+        widget = QLabel()
+        widget.setPixmap(QPixmap.fromImage(image))
+        widget.setFixedSize(image.width(), image.height())
+        return widget
 
-        # --- TOTAL ROW ---
-        total_row = n_items
-        table.setItem(total_row, 0, QTableWidgetItem(""))
-        table.setItem(total_row, 1, QTableWidgetItem("Total"))
-        table.setItem(total_row, 2, QTableWidgetItem(""))
-        table.setItem(total_row, 3, QTableWidgetItem(f"₹{total_base:.2f}"))
-        table.setItem(total_row, 4, QTableWidgetItem(f"₹{total_sgst:.2f}"))
-        table.setItem(total_row, 5, QTableWidgetItem(f"₹{total_cgst:.2f}"))
-        table.setItem(total_row, 6, QTableWidgetItem(f"₹{total_final:.2f}"))
-        for col in [1,3,4,5,6]:
-            item = table.item(total_row, col)
-            if item:
-                font = item.font()
-                font.setBold(True)
-                item.setFont(font)
-        table.setSpan(total_row, 0, 1, 1)  # No span, just label in Item column
+    def build_whatsapp_caption(self, bill_data):
+        return bill_caption(bill_data)
 
-        layout.addWidget(table)
+    def enqueue_checkout_jobs(self, bill_data):
+        """Queue the thermal print, bill image render and WhatsApp message for a saved bill"""
+        bill_id = bill_data['id']
+        self.print_spooler.submit_bill(bill_data)
 
-        # --- GRAND TOTAL FOOTER ---
-        total_label = QLabel(f"GRAND TOTAL: ₹{total_final:.2f}")
-        total_label.setFont(QFont("Arial", 16, QFont.Bold))
-        total_label.setAlignment(Qt.AlignCenter)
-        total_label.setStyleSheet("padding: 10px; background-color: #e8f4fd; border: 2px solid #3498db;")
-        layout.addWidget(total_label)
+        def render_job():
+            return get_artifact_store().bill_image(bill_data) is not None
 
-        # Footer label with random thank you message
-        db = Database()
-        admin_details = db.get_admin_details() or {}
-        shop_name = admin_details.get('shop_name', 'Shop Name')
-        thank_you_messages = [
-            f"Thank you for shopping in {shop_name}!",
-            f"We appreciate your business at {shop_name}.",
-            f"Hope to see you again at {shop_name}!",
-            f"Your support means a lot to {shop_name}!",
-            f"Thanks for choosing {shop_name}!",
-            f"Thank you for shopping at {shop_name}! We hope you had a great experience.",
-            f"Your purchase at {shop_name} made our day!",
-            f"Thank you for trusting {shop_name}!",
-            f"{shop_name} is grateful for your business!",
-            f"Thanks for shopping local with {shop_name}!",
-        ]
-        footer_label = QLabel(random.choice(thank_you_messages))
-        footer_label.setFont(QFont("Arial", 12))
-        footer_label.setAlignment(Qt.AlignCenter)
-        layout.addWidget(footer_label)
+        self.job_queue.enqueue(
+            CheckoutJob('render', bill_id, render_job, description="Bill image"), 'share')
 
-        # --- QR CODE (bottom left) ---
-        qr_data = admin_details.get('location', 'https://maps.app.goo.gl/qthz7Drt5WBdwBj49?g_st=aw')
-        qr = qrcode.QRCode(box_size=2, border=1)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
-        qr_size = 80
-        img = img.resize((qr_size, qr_size))
-        qimg = QImage(img.tobytes(), img.size[0], img.size[1], QImage.Format_RGB888)
-        qr_pixmap = QPixmap.fromImage(qimg)
-        qr_label = QLabel()
-        qr_label.setPixmap(qr_pixmap)
-        qr_label.setAlignment(Qt.AlignLeft | Qt.AlignBottom)
-        qr_text = QLabel("Scan QR for location")
-        qr_text.setAlignment(Qt.AlignLeft | Qt.AlignBottom)
-        qr_layout = QVBoxLayout()
-        qr_layout.addWidget(qr_label)
-        qr_layout.addWidget(qr_text)
-        qr_layout.setAlignment(Qt.AlignLeft | Qt.AlignBottom)
-        # Add QR layout to the main layout at the bottom
-        layout.addLayout(qr_layout)
-        layout.addStretch()
-        return widget
+        # The outbox takes the stored image when it sends (rendering it if the job has not yet)
+        if self.whatsapp_outbox.submit_bill(bill_data) is None:
+            print("Bill image queued, but phone number is invalid or not provided.")
 
-    def send_bill_image_via_whatsapp(self, phone, image_path, caption):
-        import pywhatkit
-        import time
-        pywhatkit.sendwhats_image(phone, image_path, caption=caption, wait_time=30, tab_close=False, close_time=3)
-        # Wait for WhatsApp Web to be ready, then press Enter to send
-        try:
-            import pyautogui
-            time.sleep(10)  # Increased wait time for WhatsApp Web to load
-            pyautogui.press('enter')
-            time.sleep(3)  # Wait for message to be sent
-            pyautogui.hotkey('ctrl', 'w')  # Close the tab
-        except Exception as e:
-            print(f"pyautogui not available or failed to press enter/close tab: {e}")
-
-    def save_and_send_whatsapp(self, bill_data, customer_name, customer_phone):
-        """Save the bill as an image in a 'bills' folder and send via WhatsApp using pywhatkit, ensuring the correct Chrome profile is used."""
-        try:
-            from PyQt5.QtWidgets import QApplication, QMessageBox
-            from PyQt5.QtCore import QBuffer, QIODevice
-            import os
-            # Create a widget for the bill
-            bill_widget = self.create_bill_widget_for_sharing(bill_data)
-            # Render to QPixmap
-            pixmap = bill_widget.grab()
-            # Ensure 'data_base/bills' folder exists in both development and PyInstaller modes
-            if getattr(sys, 'frozen', False):
-                # Running as a PyInstaller bundle
-                base_dir = os.path.dirname(sys.executable)
-            else:
-                # Running as a script
-                base_dir = os.getcwd()
-            bills_dir = os.path.join(base_dir, 'data_base', 'bills')
-            os.makedirs(bills_dir, exist_ok=True)
-            # Save to file in 'data_base/bills' folder
-            image_path = os.path.join(bills_dir, f"bill_{bill_data['id']}.png")
-            pixmap.save(image_path, 'PNG')
-            # Send via WhatsApp if phone number is valid
-            if customer_phone and customer_phone.startswith('+') and len(customer_phone) > 7:
-                try:
-                    db = Database()
-                    admin_details = db.get_admin_details() or {}
-                    shop_name = admin_details.get('shop_name', 'Shop Name')
-                    greetings = ["Hi", "Hello", "Hey", "Dear"]
-                    thanks = [
-                        "Thanks for shopping with us!",
-                        "We appreciate your purchase!",
-                        "Hope to see you again!",
-                    ]
-                    caption = f"{random.choice(greetings)} {customer_name},\nBill #{bill_data['id']} from {shop_name} is attached.\n{random.choice(thanks)}"
-                    QMessageBox.information(self, "Debug", f"About to send bill image via WhatsApp\nNumber: {customer_phone}\nImage: {image_path}")
-                    print(f"About to send bill image via WhatsApp\nNumber: {customer_phone}\nImage: {image_path}")
-                    self.send_bill_image_via_whatsapp(customer_phone, image_path, caption)
-                    QMessageBox.information(self, "WhatsApp", "✅ Bill sent via WhatsApp!")
-                    print("✅ Bill sent via WhatsApp!")
-                except Exception as e:
-                    QMessageBox.warning(self, "WhatsApp Error", f"❌ Failed to send bill via WhatsApp.\n{str(e)}")
-                    print(f"❌ Failed to send bill via WhatsApp. {str(e)}")
-            else:
-                QMessageBox.information(self, "WhatsApp", "Bill image saved, but phone number is invalid or not provided.")
-                print("Bill image saved, but phone number is invalid or not provided.")
-            bill_widget.deleteLater()
-        except Exception as e:
-            QMessageBox.critical(self, "WhatsApp Error", f"Failed to share via WhatsApp: {str(e)}")
-            print(f"Failed to share via WhatsApp: {str(e)}")
+    def showEvent(self, event):
+        """Reload catalog data so inventory edits are picked up"""
+        super().showEvent(event)
+        self.load_scale_format()
+        self.load_promotions()
+        self.update_bill_display()
+        self.refresh_search_index()
 
     def resizeEvent(self, event):
         """Handle window resize events"""
@@ -0,0 +1,218 @@
+"""
+GSTR-1 return data for a tax period, built from SQL aggregates over bill_items.
+
+QuickBill bills are retail sales to unregistered customers within the shop's
+state (SGST + CGST only, no customer GSTIN), so a return consists of:
+
+    B2CS   (Table 7)   taxable value and tax per GST rate, "OE" type, place
+                       of supply = the shop's state
+    NIL    (Table 8)   0% lines, reported as nil rated intra-state B2C supplies
+    HSN    (Table 12)  quantity, taxable value and tax per HSN code, unit and rate
+    DOCS   (Table 13)  first/last bill number and the number of bills issued
+
+Amounts are summed by SQLite (one GROUP BY query per table) and rounded to
+paise here. write_json() produces the JSON uploaded on the GST portal,
+write_csv() the b2cs/exemp/hsn/docs sheets of the GST offline tool.
+"""
+
+import csv
+import json
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional
+from data_base.database import Database
+from billing_tabs.tax_engine import money, to_decimal
+
+# Setting keys (app_settings table)
+SETTING_GSTIN = 'gst_gstin'
+
+GSTIN_PATTERN = re.compile(r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][1-9A-Z]Z[0-9A-Z]$')
+GSTIN_CHARS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+STATE_NAMES = {
+    '01': "Jammu and Kashmir", '02': "Himachal Pradesh", '03': "Punjab", '04': "Chandigarh",
+    '05': "Uttarakhand", '06': "Haryana", '07': "Delhi", '08': "Rajasthan", '09': "Uttar Pradesh",
+    '10': "Bihar", '11': "Sikkim", '12': "Arunachal Pradesh", '13': "Nagaland", '14': "Manipur",
+    '15': "Mizoram", '16': "Tripura", '17': "Meghalaya", '18': "Assam", '19': "West Bengal",
+    '20': "Jharkhand", '21': "Odisha", '22': "Chhattisgarh", '23': "Madhya Pradesh", '24': "Gujarat",
+    '26': "Dadra and Nagar Haveli and Daman and Diu", '27': "Maharashtra", '29': "Karnataka",
+    '30': "Goa", '31': "Lakshadweep", '32': "Kerala", '33': "Tamil Nadu", '34': "Puducherry",
+    '35': "Andaman and Nicobar Islands", '36': "Telangana", '37': "Andhra Pradesh", '38': "Ladakh",
+    '97': "Other Territory",
+}
+
+# Unit quantity codes by item type: loose items are sold by weight, barcode items by count
+UQC = {
+    'loose': ('KGS', "KILOGRAMS"),
+    'barcode': ('NOS', "NUMBERS"),
+}
+DEFAULT_UQC = ('OTH', "OTHERS")
+
+DOC_NATURE = "Invoices for outward supply"
+NIL_DESCRIPTION = "Intra-State supplies to unregistered persons"
+
+B2CS_FIELDS = ["Type", "Place Of Supply", "Applicable % of Tax Rate", "Rate", "Taxable Value",
+               "Cess Amount", "E-Commerce GSTIN"]
+EXEMP_FIELDS = ["Description", "Nil Rated Supplies", "Exempted(other than nil rated/non GST supply)",
+                "Non-GST Supplies"]
+HSN_FIELDS = ["HSN", "Description", "UQC", "Total Quantity", "Total Value", "Rate", "Taxable Value",
+              "Integrated Tax Amount", "Central Tax Amount", "State/UT Tax Amount", "Cess Amount"]
+DOCS_FIELDS = ["Nature of Document", "Sr. No. From", "Sr. No. To", "Total Number", "Cancelled"]
+
+
+def normalize_gstin(gstin) -> str:
+    return re.sub(r'\s', '', str(gstin or '')).upper()
+
+
+def is_valid_gstin(gstin: str) -> bool:
+    """Format and check digit of a 15 character GSTIN"""
+    if not GSTIN_PATTERN.match(gstin) or gstin[:2] not in STATE_NAMES:
+        return False
+    total = 0
+    for position, char in enumerate(gstin[:14]):
+        value = GSTIN_CHARS.index(char) * (2 if position % 2 else 1)
+        total += value // 36 + value % 36
+    return GSTIN_CHARS[(36 - total % 36) % 36] == gstin[14]
+
+
+def filing_period(period_end: date) -> str:
+    """Return period as the portal expects it (MMYYYY of the last month covered)"""
+    return f"{period_end.month:02d}{period_end.year}"
+
+
+def _amount(value) -> float:
+    return float(money(value))
+
+
+def _quantity(value) -> float:
+    return float(to_decimal(value).quantize(to_decimal('0.001')))
+
+
+class Gstr1Return:
+    """B2CS, nil rated, HSN and document summaries of one GSTIN for a tax period"""
+
+    def __init__(self, gstin: str, start_date: date, end_date: date, rate_rows: List[Dict],
+                 hsn_rows: List[Dict], bill_range: Dict):
+        self.gstin = gstin
+        self.start_date = start_date
+        self.end_date = end_date
+        self.period = filing_period(end_date)
+        self.state_code = gstin[:2]
+        self.rate_rows = rate_rows
+        self.hsn_rows = hsn_rows
+        self.bill_range = bill_range
+
+    @classmethod
+    def generate(cls, gstin: str, start_date: date, end_date: date,
+                 db: Optional[Database] = None) -> 'Gstr1Return':
+        db = db or Database()
+        start, end = start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+        return cls(gstin, start_date, end_date, db.get_gst_rate_summary(start, end),
+                   db.get_gst_hsn_summary(start, end), db.get_bill_number_range(start, end))
+
+    @property
+    def place_of_supply(self) -> str:
+        return f"{self.state_code}-{STATE_NAMES.get(self.state_code, '')}"
+
+    @property
+    def missing_hsn_lines(self) -> int:
+        """Bill lines without an HSN code (the portal rejects these rows)"""
+        return sum(row['lines'] for row in self.hsn_rows if not row['hsn_code'])
+
+    def b2cs(self) -> List[Dict]:
+        return [row for row in self.rate_rows if row['gst_rate']]
+
+    def nil_rated_amount(self) -> float:
+        return _amount(sum(to_decimal(row['total_amount']) for row in self.rate_rows if not row['gst_rate']))
+
+    def totals(self) -> Dict:
+        return {
+            'bills': self.bill_range['count'],
+            'taxable_amount': _amount(sum(to_decimal(row['taxable_amount']) for row in self.rate_rows)),
+            'sgst_amount': _amount(sum(to_decimal(row['sgst_amount']) for row in self.rate_rows)),
+            'cgst_amount': _amount(sum(to_decimal(row['cgst_amount']) for row in self.rate_rows)),
+        }
+
+    def to_json(self) -> Dict:
+        data = {
+            'gstin': self.gstin,
+            'fp': self.period,
+            'b2cs': [
+                {
+                    'sply_ty': 'INTRA',
+                    'rt': row['gst_rate'],
+                    'typ': 'OE',
+                    'pos': self.state_code,
+                    'txval': _amount(row['taxable_amount']),
+                    'camt': _amount(row['cgst_amount']),
+                    'samt': _amount(row['sgst_amount']),
+                    'csamt': 0,
+                }
+                for row in self.b2cs()
+            ],
+            'hsn': {
+                'data': [
+                    {
+                        'num': number,
+                        'hsn_sc': row['hsn_code'],
+                        'desc': row['description'],
+                        'uqc': UQC.get(row['item_type'], DEFAULT_UQC)[0],
+                        'qty': _quantity(row['quantity']),
+                        'rt': row['gst_rate'],
+                        'txval': _amount(row['taxable_amount']),
+                        'iamt': 0,
+                        'camt': _amount(row['cgst_amount']),
+                        'samt': _amount(row['sgst_amount']),
+                        'csamt': 0,
+                    }
+                    for number, row in enumerate(self.hsn_rows, start=1)
+                ]
+            },
+        }
+        nil_amount = self.nil_rated_amount()
+        if nil_amount:
+            data['nil'] = {'inv': [{'sply_ty': 'INTRAB2C', 'nil_amt': nil_amount, 'expt_amt': 0, 'ngsup_amt': 0}]}
+        if self.bill_range['count']:
+            data['doc_issue'] = {'doc_det': [{'doc_num': 1, 'doc': [{
+                'num': 1,
+                'from': str(self.bill_range['first']),
+                'to': str(self.bill_range['last']),
+                'totnum': self.bill_range['count'],
+                'cancel': 0,
+                'net_issue': self.bill_range['count'],
+            }]}]}
+        return data
+
+    def write_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, ensure_ascii=False, indent=2)
+
+    def write_csv(self, folder: str) -> List[str]:
+        """Write b2cs.csv, exemp.csv, hsn.csv and docs.csv into folder; returns their paths"""
+        os.makedirs(folder, exist_ok=True)
+        sheets = {
+            'b2cs.csv': (B2CS_FIELDS, [
+                ["OE", self.place_of_supply, "", row['gst_rate'], _amount(row['taxable_amount']), 0, ""]
+                for row in self.b2cs()
+            ]),
+            'exemp.csv': (EXEMP_FIELDS, [[NIL_DESCRIPTION, self.nil_rated_amount(), 0, 0]]),
+            'hsn.csv': (HSN_FIELDS, [
+                [row['hsn_code'], row['description'], "-".join(UQC.get(row['item_type'], DEFAULT_UQC)),
+                 _quantity(row['quantity']), _amount(row['total_amount']), row['gst_rate'],
+                 _amount(row['taxable_amount']), 0, _amount(row['cgst_amount']), _amount(row['sgst_amount']), 0]
+                for row in self.hsn_rows
+            ]),
+            'docs.csv': (DOCS_FIELDS, [
+                [DOC_NATURE, self.bill_range['first'], self.bill_range['last'], self.bill_range['count'], 0]
+            ] if self.bill_range['count'] else []),
+        }
+        paths = []
+        for file_name, (fields, rows) in sheets.items():
+            path = os.path.join(folder, file_name)
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(fields)
+                writer.writerows(rows)
+            paths.append(path)
+        return paths
@@ -1,6 +1,7 @@
 import sys
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QPushButton, QLabel, QApplication, QFrame, QSizePolicy, QSpacerItem)
+                             QPushButton, QLabel, QApplication, QFrame, QSizePolicy, QSpacerItem,
+                             QMessageBox)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QPixmap, QIcon
 from billing_tabs.create_bill import CreateBillWindow
@@ -8,7 +9,15 @@ from billing_tabs.bill_history import BillHistoryWindow
 from billing_tabs.inventory import InventoryWindow
 from billing_tabs.admin_settings import AdminSettingsWindow
 from billing_tabs.sales_report import SalesReportWindow
-from billing_tabs.thermal_printer import ThermalPrinter
+from billing_tabs.thermal_printer import ThermalPrinter, PrinterConfig, PrinterHealthMonitor
+from billing_tabs.receipt_assets import get_receipt_assets
+from billing_tabs.checkout_jobs import CheckoutJobQueue
+from billing_tabs.print_spooler import PrintSpooler
+from billing_tabs.whatsapp_outbox import WhatsAppOutbox
+from billing_tabs.messaging import create_messaging_backend
+from billing_tabs.artifact_store import get_artifact_store
+from billing_tabs.weighing_scale import WeighingScaleReader, create_scale_backend
+from data_base.database import Database
 
 class HomeDashboard(QMainWindow):
     def __init__(self):
@@ -32,10 +41,24 @@ class HomeDashboard(QMainWindow):
         self.sales_report_window = None
         self.admin_settings_window = None
         
-        # Initialize printer instance
+        # Initialize printer instance (one long-lived connection shared by all windows)
         self.printer = ThermalPrinter()
+        self.printer_monitor = PrinterHealthMonitor(self.printer, parent=self)
+        # Persistent print queue; its worker is the only code that prints
+        self.print_spooler = PrintSpooler(self.printer, parent=self)
+        # Background jobs (bill image) shared across windows
+        self.job_queue = CheckoutJobQueue(parent=self)
+        # Persistent WhatsApp outbox; its worker is the only code that sends
+        self.whatsapp_outbox = WhatsAppOutbox(parent=self)
+        # Weighing scale reader (idle until a port is configured in Admin Settings)
+        self.scale_reader = WeighingScaleReader(parent=self)
+        self.restart_scale_reader()
         
         self.init_ui()
+        self.printer_monitor.status_changed.connect(self.on_printer_status)
+        self.printer_monitor.start()
+        # Keep stored bill images within the retention policy
+        get_artifact_store().start_cleaner()
         
     def init_ui(self):
         """Initialize the user interface"""
@@ -119,6 +142,13 @@ class HomeDashboard(QMainWindow):
         footer_label.setStyleSheet("color: #95a5a6; padding: 20px;")
         main_layout.addWidget(footer_label)
 
+        # Printer status
+        self.printer_status_label = QLabel("Printer: checking...")
+        self.printer_status_label.setFont(QFont("Poppins", 12))
+        self.printer_status_label.setAlignment(Qt.AlignCenter)
+        self.printer_status_label.setStyleSheet("color: #95a5a6;")
+        main_layout.addWidget(self.printer_status_label)
+
         # Set main window background
         self.setStyleSheet("""
             QMainWindow {
@@ -139,7 +169,8 @@ class HomeDashboard(QMainWindow):
     def open_create_bill(self):
         """Open Create Bill window"""
         if self.create_bill_window is None:
-            self.create_bill_window = CreateBillWindow(self.printer)
+            self.create_bill_window = CreateBillWindow(self.printer, self.job_queue, self.scale_reader,
+                                                       self.print_spooler, self.whatsapp_outbox)
         self.create_bill_window.showMaximized()
         self.create_bill_window.raise_()
         self.create_bill_window.activateWindow()
@@ -147,7 +178,7 @@ class HomeDashboard(QMainWindow):
     def open_bill_history(self):
         """Open Bill History window"""
         if self.bill_history_window is None:
-            self.bill_history_window = BillHistoryWindow(self.printer)
+            self.bill_history_window = BillHistoryWindow(self.printer, self.print_spooler, self.whatsapp_outbox)
         self.bill_history_window.showMaximized()
         self.bill_history_window.raise_()
         self.bill_history_window.activateWindow()
@@ -172,8 +203,13 @@ class HomeDashboard(QMainWindow):
         """Open admin settings window"""
         if self.admin_settings_window is None:
             self.admin_settings_window = AdminSettingsWindow()
-            # Connect signal to refresh printer shop details
+            # Connect signal to drop cached receipt assets and refresh printer shop details
+            self.admin_settings_window.shop_details_updated.connect(get_receipt_assets().invalidate)
             self.admin_settings_window.shop_details_updated.connect(self.refresh_printer_details)
+            self.admin_settings_window.scale_settings_updated.connect(self.restart_scale_reader)
+            self.admin_settings_window.whatsapp_settings_updated.connect(self.reconfigure_whatsapp)
+            self.admin_settings_window.printer_settings_updated.connect(self.reconfigure_printer)
+            self.admin_settings_window.test_print_requested.connect(self.print_test_page)
         # Always restore and bring to front
         self.admin_settings_window.showNormal()
         self.admin_settings_window.raise_()
@@ -184,6 +220,41 @@ class HomeDashboard(QMainWindow):
         if self.printer:
             self.printer.refresh_shop_details()
     
+    def reconfigure_printer(self):
+        """Reconnect the printer with the saved connection settings"""
+        try:
+            config = PrinterConfig.from_settings(Database().get_settings('printer_'))
+        except Exception as e:
+            print(f"Error loading printer settings: {e}")
+            return
+        self.printer.configure(config)
+        self.printer_monitor.probe_now()
+    
+    def print_test_page(self):
+        """Queue a test page so the settings window stays responsive"""
+        if self.print_spooler.submit_test_page() is None:
+            QMessageBox.warning(self.admin_settings_window or self, "Test Page", "No printer is configured.")
+    
+    def on_printer_status(self, healthy, status):
+        self.printer_status_label.setText(f"Printer: {status}")
+        self.printer_status_label.setStyleSheet("color: #27ae60;" if healthy else "color: #e74c3c;")
+    
+    def restart_scale_reader(self):
+        """(Re)connect the weighing scale from the saved settings"""
+        try:
+            backend = create_scale_backend(Database().get_settings('weighing_scale_'))
+        except Exception as e:
+            print(f"Error loading scale settings: {e}")
+            backend = None
+        self.scale_reader.set_backend(backend)
+    
+    def reconfigure_whatsapp(self):
+        """Send queued WhatsApp messages through the newly saved backend"""
+        try:
+            self.whatsapp_outbox.set_backend(create_messaging_backend(Database().get_settings('whatsapp_')))
+        except Exception as e:
+            print(f"Error loading WhatsApp settings: {e}")
+    
     def closeEvent(self, event):
         """Handle window close event"""
         # Close all child windows
@@ -197,6 +268,13 @@ class HomeDashboard(QMainWindow):
             self.sales_report_window.close()
         if self.admin_settings_window:
             self.admin_settings_window.close()
+        self.job_queue.shutdown()
+        self.scale_reader.stop()
+        self.print_spooler.shutdown()
+        self.whatsapp_outbox.shutdown()
+        get_artifact_store().stop_cleaner()
+        self.printer_monitor.stop()
+        self.printer.shutdown()
         
         event.accept()
 
@@ -0,0 +1,120 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Total GST slabs (%); intra-state sales split each one equally into SGST and CGST
+GST_SLABS = (0.0, 0.25, 3.0, 5.0, 12.0, 18.0, 28.0, 40.0)
+HSN_LENGTHS = (8, 6, 4, 2)  # tariff item, sub-heading, heading, chapter
+
+# Seeded into an empty hsn_codes table; shops should review these for their own catalog
+DEFAULT_HSN_CODES = [
+    ('0401', 'Milk and cream, fresh', 0.0),
+    ('0407', 'Eggs in shell, fresh', 0.0),
+    ('07', 'Vegetables, fresh', 0.0),
+    ('0713', 'Dried pulses (dals)', 5.0),
+    ('0803', 'Bananas, fresh', 0.0),
+    ('0806', 'Grapes, fresh', 0.0),
+    ('0808', 'Apples and pears, fresh', 0.0),
+    ('0902', 'Tea', 5.0),
+    ('0904', 'Pepper and chillies, dried or ground', 5.0),
+    ('0910', 'Ginger, turmeric and other spices', 5.0),
+    ('1006', 'Rice', 5.0),
+    ('1101', 'Wheat flour (atta)', 5.0),
+    ('1512', 'Sunflower and safflower oil', 5.0),
+    ('1513', 'Coconut oil', 5.0),
+    ('1701', 'Cane or beet sugar', 5.0),
+    ('1704', 'Sugar confectionery', 12.0),
+    ('2501', 'Salt', 0.0),
+]
+
+
+def normalize_hsn(code) -> str:
+    """Strip spaces and dots, e.g. '0401.10 00' -> '04011000'"""
+    return ''.join(ch for ch in str(code or '') if ch.isalnum())
+
+
+def is_valid_hsn(code: str) -> bool:
+    return code.isdigit() and len(code) in HSN_LENGTHS
+
+
+def split_gst(gst_rate: float) -> Tuple[float, float]:
+    """(sgst_percent, cgst_percent) for a total GST rate"""
+    half = round(float(gst_rate) / 2, 3)
+    return half, half
+
+
+class HsnEntry:
+    __slots__ = ('code', 'description', 'gst_rate')
+
+    def __init__(self, code: str, description: str, gst_rate: float):
+        self.code = code
+        self.description = description
+        self.gst_rate = float(gst_rate)
+
+    @property
+    def sgst_percent(self) -> float:
+        return split_gst(self.gst_rate)[0]
+
+    @property
+    def cgst_percent(self) -> float:
+        return split_gst(self.gst_rate)[1]
+
+    def label(self) -> str:
+        return f"{self.code} - {self.description} (GST {self.gst_rate:g}%)"
+
+
+class HsnMaster:
+    """In-memory HSN master.
+
+    HSN codes are hierarchical, so an item's code resolves to the most
+    specific master entry that is a prefix of it (8, 6, 4 then 2 digits);
+    each step is a dict lookup. A sorted code list serves as-you-type
+    suggestions by prefix.
+    """
+
+    def __init__(self, rows: Iterable[Dict] = ()):
+        self._entries: Dict[str, HsnEntry] = {}
+        for row in rows:
+            code = normalize_hsn(row['code'])
+            self._entries[code] = HsnEntry(code, row.get('description', ''), row.get('gst_rate', 0))
+        self._codes = sorted(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, code) -> Optional[HsnEntry]:
+        """Exact master entry for code"""
+        return self._entries.get(normalize_hsn(code))
+
+    def lookup(self, code) -> Optional[HsnEntry]:
+        """Most specific master entry covering an item's HSN code"""
+        code = normalize_hsn(code)
+        for length in HSN_LENGTHS:
+            if len(code) >= length:
+                entry = self._entries.get(code[:length])
+                if entry is not None:
+                    return entry
+        return None
+
+    def suggestions(self, prefix, limit: int = 10) -> List[HsnEntry]:
+        """Master entries whose code starts with prefix"""
+        prefix = normalize_hsn(prefix)
+        found = []
+        position = bisect_left(self._codes, prefix)
+        while position < len(self._codes) and len(found) < limit:
+            code = self._codes[position]
+            if not code.startswith(prefix):
+                break
+            found.append(self._entries[code])
+            position += 1
+        return found
+
+    def check_rates(self, code, sgst_percent: float, cgst_percent: float) -> Optional[str]:
+        """Return an error message if the rates disagree with the master, else None"""
+        entry = self.lookup(code)
+        if entry is None:
+            return None
+        if abs(float(sgst_percent) - entry.sgst_percent) > 0.001 or \
+                abs(float(cgst_percent) - entry.cgst_percent) > 0.001:
+            return (f"GST {float(sgst_percent) + float(cgst_percent):g}% does not match "
+                    f"HSN {entry.code} ({entry.gst_rate:g}%)")
+        return None
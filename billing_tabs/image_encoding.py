@@ -0,0 +1,166 @@
+import io
+import threading
+from typing import Dict, Iterator, Optional
+from PIL import Image, features
+from PyQt5.QtGui import QImage
+from data_base.database import Database
+
+# Setting keys (app_settings table)
+SETTING_FORMAT = 'bill_image_format'
+SETTING_COLORS = 'bill_image_colors'
+SETTING_MAX_KB = 'bill_image_max_kb'
+SETTING_QUALITY = 'bill_image_quality'
+
+FORMAT_PNG = 'png'
+FORMAT_JPEG = 'jpeg'
+FORMAT_WEBP = 'webp'
+FORMAT_LABELS = {
+    FORMAT_PNG: "PNG (palette)",
+    FORMAT_JPEG: "JPEG (blurs text, larger for receipts)",
+    FORMAT_WEBP: "WebP (palette, smallest; not for the Cloud API)",
+}
+PALETTE_FORMATS = (FORMAT_PNG, FORMAT_WEBP)
+EXTENSIONS = {FORMAT_PNG: '.png', FORMAT_JPEG: '.jpg', FORMAT_WEBP: '.webp'}
+
+DEFAULT_COLORS = 16
+DEFAULT_MAX_KB = 150
+DEFAULT_QUALITY = 80
+MIN_QUALITY = 40
+MIN_WIDTH = 560  # narrower than this and the item table is hard to read on a phone
+
+
+def _int_setting(value, default: int) -> int:
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return default
+
+
+class ImageEncoding:
+    """How shareable bill images are encoded, as saved in app_settings.
+
+    A receipt is black text on white with a small logo, so a 16 colour
+    palette keeps it sharp at a fraction of the RGB size: PNG and WebP
+    store the palette image losslessly (WebP about half the PNG size),
+    while JPEG is lossy and mostly worse for text. max_kb is a byte
+    budget: fewer colours (PNG/WebP) or a lower quality (JPEG) are tried
+    first, then a smaller width, and the smallest result is kept if the
+    budget cannot be met. 0 disables the budget.
+    """
+
+    def __init__(self, fmt: str = FORMAT_PNG, colors: int = DEFAULT_COLORS, max_kb: int = DEFAULT_MAX_KB,
+                 quality: int = DEFAULT_QUALITY):
+        self.fmt = fmt if fmt in EXTENSIONS else FORMAT_PNG
+        self.colors = min(max(colors, 2), 256)
+        self.max_kb = max(max_kb, 0)
+        self.quality = min(max(quality, MIN_QUALITY), 95)
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, str]) -> 'ImageEncoding':
+        return cls((settings.get(SETTING_FORMAT) or FORMAT_PNG).strip().lower(),
+                   _int_setting(settings.get(SETTING_COLORS), DEFAULT_COLORS),
+                   _int_setting(settings.get(SETTING_MAX_KB), DEFAULT_MAX_KB),
+                   _int_setting(settings.get(SETTING_QUALITY), DEFAULT_QUALITY))
+
+    def to_settings(self) -> Dict[str, str]:
+        return {
+            SETTING_FORMAT: self.fmt,
+            SETTING_COLORS: str(self.colors),
+            SETTING_MAX_KB: str(self.max_kb),
+            SETTING_QUALITY: str(self.quality),
+        }
+
+    @property
+    def effective_format(self) -> str:
+        """The configured format, or PNG when this Pillow build cannot write WebP"""
+        if self.fmt == FORMAT_WEBP and not features.check('webp'):
+            return FORMAT_PNG
+        return self.fmt
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS[self.effective_format]
+
+    def describe(self) -> str:
+        fmt = self.effective_format
+        detail = f"{self.colors} colours" if fmt in PALETTE_FORMATS else f"quality {self.quality}"
+        budget = f", up to {self.max_kb} KB" if self.max_kb else ""
+        return f"{FORMAT_LABELS[fmt]}, {detail}{budget}"
+
+
+def qimage_to_pil(image: QImage) -> Image.Image:
+    rgb = image.convertToFormat(QImage.Format_RGB888)
+    data = rgb.constBits().asstring(rgb.sizeInBytes())
+    return Image.frombuffer('RGB', (rgb.width(), rgb.height()), data, 'raw', 'RGB', rgb.bytesPerLine(), 1)
+
+
+def _encode(image: Image.Image, fmt: str, colors: int, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == FORMAT_JPEG:
+        image.save(buffer, 'JPEG', quality=quality, optimize=True)
+        return buffer.getvalue()
+    # No dithering: flat palette areas keep text crisp and compress far better
+    palette_image = image.quantize(colors=colors, dither=Image.Dither.NONE)
+    if fmt == FORMAT_PNG:
+        palette_image.save(buffer, 'PNG', optimize=True)
+    else:
+        palette_image.save(buffer, 'WEBP', lossless=True)
+    return buffer.getvalue()
+
+
+def _candidates(image: Image.Image, encoding: ImageEncoding, fmt: str) -> Iterator[bytes]:
+    """Encodings of one image, from best looking to smallest"""
+    if fmt in PALETTE_FORMATS:
+        colors = encoding.colors
+        while True:
+            yield _encode(image, fmt, colors, 0)
+            if colors <= 4:
+                return
+            colors = max(colors // 2, 4)
+    else:
+        quality = encoding.quality
+        while True:
+            yield _encode(image, fmt, 0, quality)
+            if quality <= MIN_QUALITY:
+                return
+            quality = max(quality - 15, MIN_QUALITY)
+
+
+def encode_image(image: QImage, encoding: Optional[ImageEncoding] = None, fmt: Optional[str] = None) -> bytes:
+    """Encode a bill image within the encoding's byte budget (fmt overrides the configured format)"""
+    encoding = encoding or get_image_encoding()
+    fmt = fmt or encoding.effective_format
+    budget = encoding.max_kb * 1024
+    pil_image = qimage_to_pil(image)
+    smallest = None
+    while True:
+        for data in _candidates(pil_image, encoding, fmt):
+            if not budget or len(data) <= budget:
+                return data
+            if smallest is None or len(data) < len(smallest):
+                smallest = data
+        width, height = pil_image.size
+        if width <= MIN_WIDTH:
+            return smallest
+        scale = max(0.8, MIN_WIDTH / width)
+        pil_image = pil_image.resize((int(width * scale), int(height * scale)), Image.LANCZOS)
+
+
+_shared_encoding = None
+_shared_encoding_lock = threading.Lock()
+
+
+def get_image_encoding() -> ImageEncoding:
+    """Return the application-wide bill image encoding, loaded from app_settings on first use"""
+    global _shared_encoding
+    with _shared_encoding_lock:
+        if _shared_encoding is None:
+            _shared_encoding = ImageEncoding.from_settings(Database().get_settings('bill_image_'))
+        return _shared_encoding
+
+
+def set_image_encoding(encoding: ImageEncoding):
+    """Use a newly saved encoding for every bill image written from now on"""
+    global _shared_encoding
+    with _shared_encoding_lock:
+        _shared_encoding = encoding
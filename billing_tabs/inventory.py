@@ -5,16 +5,76 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QTableWidgetItem, QTabWidget, QDialog, QGridLayout,
                              QDoubleSpinBox, QMessageBox, QFileDialog, QComboBox,
                              QHeaderView, QAbstractItemView, QDialogButtonBox,
-                             QSpinBox, QSizePolicy, QApplication)
-from PyQt5.QtCore import Qt, QEvent
+                             QSpinBox, QSizePolicy, QApplication, QListWidget,
+                             QListWidgetItem, QCheckBox, QDateEdit)
+from PyQt5.QtCore import Qt, QEvent, QDate
 from PyQt5.QtGui import QFont, QPixmap
 from data_base.database import Database
+from billing_tabs import tax_engine
+from billing_tabs.scale_barcode import (ScaleBarcodeFormat, VALUE_WEIGHT, VALUE_PRICE,
+                                        make_scale_barcode)
+from billing_tabs.promotions import (PROMOTION_TYPES, PERCENT, FLAT, BUY_X_GET_Y, COMBO,
+                                     barcode_item_key, loose_item_key)
+from billing_tabs.hsn_master import GST_SLABS, normalize_hsn, is_valid_hsn
 from PIL import Image
 
-class BarcodeItemDialog(QDialog):
-    def __init__(self, item_data=None, parent=None):
+class HsnLookupMixin:
+    """HSN field with a hint line that auto-fills SGST/CGST from the HSN master"""
+    def create_hsn_widget(self):
+        self.hsn_input = QLineEdit()
+        self.hsn_input.setFont(QFont("Arial", 12))
+        self.hsn_input.textEdited.connect(self.on_hsn_edited)
+        self.hsn_hint_label = QLabel()
+        self.hsn_hint_label.setStyleSheet("color: #7f8c8d; font-size: 11px;")
+        self.hsn_hint_label.setWordWrap(True)
+        hsn_layout = QVBoxLayout()
+        hsn_layout.setContentsMargins(0, 0, 0, 0)
+        hsn_layout.setSpacing(2)
+        hsn_layout.addWidget(self.hsn_input)
+        hsn_layout.addWidget(self.hsn_hint_label)
+        hsn_widget = QWidget()
+        hsn_widget.setLayout(hsn_layout)
+        return hsn_widget
+    
+    def on_hsn_edited(self, text):
+        """Fill tax rates from the most specific matching HSN master entry"""
+        if self.hsn_master is None or not text.strip():
+            self.hsn_hint_label.clear()
+            return
+        entry = self.hsn_master.lookup(text)
+        if entry is not None:
+            self.sgst_input.setValue(entry.sgst_percent)
+            self.cgst_input.setValue(entry.cgst_percent)
+            self.hsn_hint_label.setText(entry.label())
+            return
+        matches = self.hsn_master.suggestions(text, 3)
+        if matches:
+            self.hsn_hint_label.setText("Matches: " + ", ".join(f"{m.code} {m.description}" for m in matches))
+        else:
+            self.hsn_hint_label.setText("Not in HSN master")
+    
+    def confirm_hsn_rates(self, data):
+        """Validate the HSN code; ask before saving rates that disagree with the master"""
+        hsn_code = normalize_hsn(data['hsn_code'])
+        if hsn_code and not is_valid_hsn(hsn_code):
+            QMessageBox.warning(self, "Error", "HSN code must be 2, 4, 6 or 8 digits!")
+            return False
+        if self.hsn_master is None or not hsn_code:
+            return True
+        error = self.hsn_master.check_rates(hsn_code, data['sgst_percent'], data['cgst_percent'])
+        if error is None:
+            return True
+        reply = QMessageBox.question(
+            self, "GST Mismatch", f"{error}.\n\nSave with these rates anyway?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        return reply == QMessageBox.Yes
+
+class BarcodeItemDialog(HsnLookupMixin, QDialog):
+    def __init__(self, item_data=None, parent=None, hsn_master=None):
         super().__init__(parent)
         self.item_data = item_data
+        self.hsn_master = hsn_master
         self.setWindowTitle("Add/Edit Barcode Item" if not item_data else "Edit Barcode Item")
         self.setModal(True)
         self.resize(500, 450)  # Reduced from 600
@@ -47,10 +107,8 @@ class BarcodeItemDialog(QDialog):
         form_layout.addWidget(self.name_input, 1, 1)
         
         # HSN Code
-        form_layout.addWidget(QLabel("HSN Code:"), 2, 0)
-        self.hsn_input = QLineEdit()
-        self.hsn_input.setFont(QFont("Arial", 12))
-        form_layout.addWidget(self.hsn_input, 2, 1)
+        form_layout.addWidget(QLabel("HSN Code:"), 2, 0, Qt.AlignTop)
+        form_layout.addWidget(self.create_hsn_widget(), 2, 1)
         
         # Quantity
         form_layout.addWidget(QLabel("Quantity:"), 3, 0)
@@ -122,8 +180,7 @@ class BarcodeItemDialog(QDialog):
         sgst_percent = self.sgst_input.value()
         cgst_percent = self.cgst_input.value()
         
-        divisor = 1 + (sgst_percent + cgst_percent) / 100
-        base_price = final_price / divisor if divisor != 0 else 0
+        base_price = tax_engine.base_from_inclusive(final_price, sgst_percent, cgst_percent)
         self.base_price_input.setValue(base_price)
     
     def load_item_data(self):
@@ -142,7 +199,7 @@ class BarcodeItemDialog(QDialog):
                 sgst = self.item_data.get('sgst_percent', 0)
                 cgst = self.item_data.get('cgst_percent', 0)
                 base = self.item_data.get('base_price', self.item_data.get('price', 0))
-                self.final_price_input.setValue(base * (1 + (sgst + cgst) / 100))
+                self.final_price_input.setValue(float(tax_engine.inclusive_unit_price(base, sgst, cgst)))
             self.calculate_base_price()
     
     def get_item_data(self):
@@ -150,7 +207,7 @@ class BarcodeItemDialog(QDialog):
         return {
             'barcode': self.barcode_input.text().strip(),
             'name': self.name_input.text().strip(),
-            'hsn_code': self.hsn_input.text().strip(),
+            'hsn_code': normalize_hsn(self.hsn_input.text()),
             'quantity': self.quantity_input.value(),
             'sgst_percent': self.sgst_input.value(),
             'cgst_percent': self.cgst_input.value(),
@@ -169,13 +226,17 @@ class BarcodeItemDialog(QDialog):
             QMessageBox.warning(self, "Error", "Item name is required!")
             return
         
+        if not self.confirm_hsn_rates(data):
+            return
+        
         super().accept()
 
-class LooseItemDialog(QDialog):
-    def __init__(self, categories, item_data=None, parent=None):
+class LooseItemDialog(HsnLookupMixin, QDialog):
+    def __init__(self, categories, item_data=None, parent=None, hsn_master=None):
         super().__init__(parent)
         self.categories = categories
         self.item_data = item_data
+        self.hsn_master = hsn_master
         self.setWindowTitle("Add/Edit Loose Item")
         self.setModal(True)
         self.resize(500, 550)  # Reduced from 700
@@ -210,10 +271,8 @@ class LooseItemDialog(QDialog):
         form_layout.addWidget(self.name_input, 1, 1)
         
         # HSN Code
-        form_layout.addWidget(QLabel("HSN Code:"), 2, 0)
-        self.hsn_input = QLineEdit()
-        self.hsn_input.setFont(QFont("Arial", 12))
-        form_layout.addWidget(self.hsn_input, 2, 1)
+        form_layout.addWidget(QLabel("HSN Code:"), 2, 0, Qt.AlignTop)
+        form_layout.addWidget(self.create_hsn_widget(), 2, 1)
         
         # Quantity
         form_layout.addWidget(QLabel("Quantity:"), 3, 0)
@@ -301,8 +360,7 @@ class LooseItemDialog(QDialog):
         sgst_percent = self.sgst_input.value()
         cgst_percent = self.cgst_input.value()
         
-        divisor = 1 + (sgst_percent + cgst_percent) / 100
-        base_price = final_price / divisor if divisor != 0 else 0
+        base_price = tax_engine.base_from_inclusive(final_price, sgst_percent, cgst_percent)
         self.base_price_input.setValue(base_price)
     
     def browse_image(self):
@@ -356,7 +414,7 @@ class LooseItemDialog(QDialog):
                 sgst = self.item_data.get('sgst_percent', 0)
                 cgst = self.item_data.get('cgst_percent', 0)
                 base = self.item_data.get('base_price', self.item_data.get('price_per_kg', 0))
-                self.final_price_input.setValue(base * (1 + (sgst + cgst) / 100))
+                self.final_price_input.setValue(float(tax_engine.inclusive_unit_price(base, sgst, cgst)))
             
             if self.item_data.get('image_path'):
                 self.image_path_input.setText(self.item_data['image_path'])
@@ -367,7 +425,7 @@ class LooseItemDialog(QDialog):
         return {
             'category_id': self.category_combo.currentData(),
             'name': self.name_input.text().strip(),
-            'hsn_code': self.hsn_input.text().strip(),
+            'hsn_code': normalize_hsn(self.hsn_input.text()),
             'quantity': self.quantity_input.value(),
             'sgst_percent': self.sgst_input.value(),
             'cgst_percent': self.cgst_input.value(),
@@ -387,6 +445,9 @@ class LooseItemDialog(QDialog):
             QMessageBox.warning(self, "Error", "Please select a category!")
             return
         
+        if not self.confirm_hsn_rates(data):
+            return
+        
         super().accept()
 
 class CategoryDialog(QDialog):
@@ -433,6 +494,473 @@ class CategoryDialog(QDialog):
         
         super().accept()
 
+class HsnMasterDialog(QDialog):
+    """Maintain the HSN master (code, description, GST slab) used to fill item tax rates"""
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.items_updated = False
+        self.setWindowTitle("HSN Master")
+        self.setModal(True)
+        self.resize(620, 560)
+        self.init_ui()
+        self.load_codes()
+    
+    def init_ui(self):
+        layout = QVBoxLayout()
+        
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("Filter by code or description...")
+        self.filter_input.textChanged.connect(self.apply_filter)
+        layout.addWidget(self.filter_input)
+        
+        self.code_table = QTableWidget()
+        self.code_table.setColumnCount(3)
+        self.code_table.setHorizontalHeaderLabels(["HSN Code", "Description", "GST %"])
+        self.code_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.code_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.code_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.code_table.itemSelectionChanged.connect(self.load_selected)
+        layout.addWidget(self.code_table)
+        
+        edit_layout = QHBoxLayout()
+        self.code_input = QLineEdit()
+        self.code_input.setPlaceholderText("HSN code")
+        self.code_input.setMaximumWidth(110)
+        edit_layout.addWidget(self.code_input)
+        self.description_input = QLineEdit()
+        self.description_input.setPlaceholderText("Description")
+        edit_layout.addWidget(self.description_input, 1)
+        self.rate_combo = QComboBox()
+        for slab in GST_SLABS:
+            self.rate_combo.addItem(f"{slab:g}%", slab)
+        edit_layout.addWidget(self.rate_combo)
+        save_btn = QPushButton("Save")
+        save_btn.clicked.connect(self.save_code)
+        edit_layout.addWidget(save_btn)
+        delete_btn = QPushButton("Delete Selected")
+        delete_btn.clicked.connect(self.delete_codes)
+        edit_layout.addWidget(delete_btn)
+        layout.addLayout(edit_layout)
+        
+        hint_label = QLabel("Items resolve to the most specific code that prefixes their HSN "
+                            "(e.g. 0713 covers 07131000).")
+        hint_label.setStyleSheet("color: #7f8c8d;")
+        hint_label.setWordWrap(True)
+        layout.addWidget(hint_label)
+        
+        bottom_layout = QHBoxLayout()
+        apply_btn = QPushButton("Apply Rates to Items")
+        apply_btn.setToolTip("Update SGST/CGST of items whose rates differ from the HSN master "
+                             "(final prices are kept)")
+        apply_btn.clicked.connect(self.apply_to_items)
+        bottom_layout.addWidget(apply_btn)
+        bottom_layout.addStretch()
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        bottom_layout.addWidget(close_btn)
+        layout.addLayout(bottom_layout)
+        
+        self.setLayout(layout)
+    
+    def load_codes(self):
+        codes = self.db.get_hsn_codes()
+        self.code_table.setRowCount(len(codes))
+        for row, code in enumerate(codes):
+            self.code_table.setItem(row, 0, QTableWidgetItem(code['code']))
+            self.code_table.setItem(row, 1, QTableWidgetItem(code['description']))
+            rate_item = QTableWidgetItem(f"{code['gst_rate']:g}")
+            rate_item.setData(Qt.UserRole, code['gst_rate'])
+            self.code_table.setItem(row, 2, rate_item)
+        self.apply_filter(self.filter_input.text())
+    
+    def apply_filter(self, text):
+        text = text.strip().lower()
+        for row in range(self.code_table.rowCount()):
+            haystack = f"{self.code_table.item(row, 0).text()} {self.code_table.item(row, 1).text()}".lower()
+            self.code_table.setRowHidden(row, bool(text) and text not in haystack)
+    
+    def load_selected(self):
+        rows = self.code_table.selectionModel().selectedRows()
+        if not rows:
+            return
+        row = rows[0].row()
+        self.code_input.setText(self.code_table.item(row, 0).text())
+        self.description_input.setText(self.code_table.item(row, 1).text())
+        index = self.rate_combo.findData(self.code_table.item(row, 2).data(Qt.UserRole))
+        if index >= 0:
+            self.rate_combo.setCurrentIndex(index)
+    
+    def save_code(self):
+        code = normalize_hsn(self.code_input.text())
+        if not is_valid_hsn(code):
+            QMessageBox.warning(self, "Error", "HSN code must be 2, 4, 6 or 8 digits!")
+            return
+        if self.db.save_hsn_code(code, self.description_input.text().strip(), self.rate_combo.currentData()):
+            self.code_input.clear()
+            self.description_input.clear()
+            self.load_codes()
+        else:
+            QMessageBox.warning(self, "Error", "Failed to save HSN code.")
+    
+    def delete_codes(self):
+        for index in self.code_table.selectionModel().selectedRows():
+            self.db.delete_hsn_code(self.code_table.item(index.row(), 0).text())
+        self.load_codes()
+    
+    def apply_to_items(self):
+        count = self.db.apply_hsn_rates(dry_run=True)
+        if count == 0:
+            QMessageBox.information(self, "HSN Master", "All item rates already match the HSN master.")
+            return
+        reply = QMessageBox.question(
+            self, "Apply Rates",
+            f"{count} item(s) have SGST/CGST different from the HSN master.\n"
+            "Update them? Final prices are kept; base prices are recalculated.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            updated = self.db.apply_hsn_rates()
+            self.items_updated = True
+            QMessageBox.information(self, "HSN Master", f"Updated {updated} item(s).")
+
+class ScalePluDialog(QDialog):
+    """Configure weighing-scale label format and the PLU -> loose item mapping"""
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.setWindowTitle("Scale PLU Mapping")
+        self.setModal(True)
+        self.resize(520, 520)
+        self.init_ui()
+        self.load_mappings()
+    
+    def init_ui(self):
+        layout = QVBoxLayout()
+        
+        # Label format
+        scale_format = ScaleBarcodeFormat.from_settings(self.db.get_settings('scale_barcode_'))
+        form_layout = QGridLayout()
+        form_layout.addWidget(QLabel("Barcode Prefixes:"), 0, 0)
+        self.prefixes_input = QLineEdit(','.join(scale_format.prefixes))
+        self.prefixes_input.setToolTip("Comma-separated 2-digit prefixes printed by the scale, e.g. 20,21")
+        form_layout.addWidget(self.prefixes_input, 0, 1)
+        form_layout.addWidget(QLabel("PLU Digits:"), 1, 0)
+        self.plu_digits_input = QSpinBox()
+        self.plu_digits_input.setRange(4, 6)
+        self.plu_digits_input.setValue(scale_format.plu_digits)
+        form_layout.addWidget(self.plu_digits_input, 1, 1)
+        form_layout.addWidget(QLabel("Embedded Value:"), 2, 0)
+        self.value_type_combo = QComboBox()
+        self.value_type_combo.addItem("Weight (grams)", VALUE_WEIGHT)
+        self.value_type_combo.addItem("Price (paise)", VALUE_PRICE)
+        self.value_type_combo.setCurrentIndex(0 if scale_format.value_type == VALUE_WEIGHT else 1)
+        form_layout.addWidget(self.value_type_combo, 2, 1)
+        self.example_label = QLabel()
+        form_layout.addWidget(self.example_label, 3, 0, 1, 2)
+        layout.addLayout(form_layout)
+        self.prefixes_input.textChanged.connect(self.update_example)
+        self.plu_digits_input.valueChanged.connect(self.update_example)
+        self.value_type_combo.currentIndexChanged.connect(self.update_example)
+        self.update_example()
+        
+        # Mappings
+        self.mapping_table = QTableWidget()
+        self.mapping_table.setColumnCount(2)
+        self.mapping_table.setHorizontalHeaderLabels(["PLU", "Loose Item"])
+        self.mapping_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.mapping_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.mapping_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        layout.addWidget(self.mapping_table)
+        
+        add_layout = QHBoxLayout()
+        self.plu_input = QLineEdit()
+        self.plu_input.setPlaceholderText("PLU")
+        self.plu_input.setMaximumWidth(90)
+        add_layout.addWidget(self.plu_input)
+        self.item_combo = QComboBox()
+        for item in self.db.get_all_loose_items():
+            self.item_combo.addItem(f"{item['name']} ({item['category_name']})", item['id'])
+        add_layout.addWidget(self.item_combo, 1)
+        add_btn = QPushButton("Map")
+        add_btn.clicked.connect(self.add_mapping)
+        add_layout.addWidget(add_btn)
+        remove_btn = QPushButton("Remove Selected")
+        remove_btn.clicked.connect(self.remove_mapping)
+        add_layout.addWidget(remove_btn)
+        layout.addLayout(add_layout)
+        
+        button_box = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Close)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+        
+        self.setLayout(layout)
+    
+    def current_format(self):
+        return ScaleBarcodeFormat(self.prefixes_input.text(), self.plu_digits_input.value(),
+                                  self.value_type_combo.currentData())
+    
+    def update_example(self):
+        scale_format = self.current_format()
+        if not scale_format.prefixes:
+            self.example_label.setText("Example: (enter at least one prefix)")
+            return
+        value = 1250 if scale_format.value_type == VALUE_WEIGHT else 9900
+        meaning = "1.250 kg" if scale_format.value_type == VALUE_WEIGHT else "₹99.00"
+        example = make_scale_barcode(scale_format.prefixes[0], '42', value, scale_format.plu_digits)
+        self.example_label.setText(f"Example: {example} = PLU {'42'.zfill(scale_format.plu_digits)}, {meaning}")
+    
+    def load_mappings(self):
+        mappings = self.db.get_scale_plu_map()
+        self.mapping_table.setRowCount(len(mappings))
+        for row, mapping in enumerate(mappings):
+            self.mapping_table.setItem(row, 0, QTableWidgetItem(mapping['plu']))
+            self.mapping_table.setItem(row, 1, QTableWidgetItem(mapping['name']))
+    
+    def add_mapping(self):
+        plu = self.plu_input.text().strip()
+        plu_digits = self.plu_digits_input.value()
+        if not plu.isdigit() or len(plu) > plu_digits:
+            QMessageBox.warning(self, "Error", f"PLU must be up to {plu_digits} digits!")
+            return
+        if self.item_combo.currentData() is None:
+            QMessageBox.warning(self, "Error", "Please add a loose item first!")
+            return
+        if self.db.set_scale_plu(plu.zfill(plu_digits), self.item_combo.currentData()):
+            self.plu_input.clear()
+            self.load_mappings()
+        else:
+            QMessageBox.warning(self, "Error", "Failed to save PLU mapping.")
+    
+    def remove_mapping(self):
+        for index in self.mapping_table.selectionModel().selectedRows():
+            self.db.delete_scale_plu(self.mapping_table.item(index.row(), 0).text())
+        self.load_mappings()
+    
+    def accept(self):
+        """Validate and save the label format"""
+        scale_format = self.current_format()
+        if not scale_format.prefixes or not all(p.isdigit() and len(p) == 2 for p in scale_format.prefixes):
+            QMessageBox.warning(self, "Error", "Prefixes must be 2-digit numbers, e.g. 20,21")
+            return
+        if not self.db.set_settings(scale_format.to_settings()):
+            QMessageBox.warning(self, "Error", "Failed to save scale settings.")
+            return
+        super().accept()
+
+class PromotionDialog(QDialog):
+    """Add or edit a promotion (offer) and the items/categories it applies to"""
+    def __init__(self, db, promotion=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.promotion = promotion
+        self.setWindowTitle("Edit Promotion" if promotion else "Add Promotion")
+        self.setModal(True)
+        self.resize(560, 680)
+        self.init_ui()
+        if promotion:
+            self.load_promotion()
+        self.update_fields()
+    
+    def init_ui(self):
+        layout = QVBoxLayout()
+        form_layout = QGridLayout()
+        
+        form_layout.addWidget(QLabel("Name:"), 0, 0)
+        self.name_input = QLineEdit()
+        self.name_input.setPlaceholderText("Shown on the bill, e.g. Diwali 10% off")
+        form_layout.addWidget(self.name_input, 0, 1)
+        
+        form_layout.addWidget(QLabel("Type:"), 1, 0)
+        self.type_combo = QComboBox()
+        for promo_type, label in PROMOTION_TYPES.items():
+            self.type_combo.addItem(label, promo_type)
+        self.type_combo.currentIndexChanged.connect(self.update_fields)
+        form_layout.addWidget(self.type_combo, 1, 1)
+        
+        self.value_label = QLabel("Value:")
+        form_layout.addWidget(self.value_label, 2, 0)
+        self.value_input = QDoubleSpinBox()
+        self.value_input.setRange(0, 999999.99)
+        self.value_input.setDecimals(2)
+        form_layout.addWidget(self.value_input, 2, 1)
+        
+        form_layout.addWidget(QLabel("Buy Qty:"), 3, 0)
+        self.buy_qty_input = QDoubleSpinBox()
+        self.buy_qty_input.setRange(0, 9999)
+        self.buy_qty_input.setDecimals(0)
+        form_layout.addWidget(self.buy_qty_input, 3, 1)
+        
+        form_layout.addWidget(QLabel("Get Qty:"), 4, 0)
+        self.get_qty_input = QDoubleSpinBox()
+        self.get_qty_input.setRange(0, 9999)
+        self.get_qty_input.setDecimals(0)
+        form_layout.addWidget(self.get_qty_input, 4, 1)
+        
+        form_layout.addWidget(QLabel("Minimum Qty:"), 5, 0)
+        self.min_qty_input = QDoubleSpinBox()
+        self.min_qty_input.setRange(0, 9999)
+        self.min_qty_input.setDecimals(3)
+        self.min_qty_input.setToolTip("Total quantity of matching items needed before the offer applies (0 = any)")
+        form_layout.addWidget(self.min_qty_input, 5, 1)
+        
+        self.starts_check = QCheckBox("Starts On:")
+        self.starts_input = QDateEdit(QDate.currentDate())
+        self.starts_input.setCalendarPopup(True)
+        self.starts_check.toggled.connect(self.starts_input.setEnabled)
+        form_layout.addWidget(self.starts_check, 6, 0)
+        form_layout.addWidget(self.starts_input, 6, 1)
+        
+        self.ends_check = QCheckBox("Ends On:")
+        self.ends_input = QDateEdit(QDate.currentDate())
+        self.ends_input.setCalendarPopup(True)
+        self.ends_check.toggled.connect(self.ends_input.setEnabled)
+        form_layout.addWidget(self.ends_check, 7, 0)
+        form_layout.addWidget(self.ends_input, 7, 1)
+        self.starts_input.setEnabled(False)
+        self.ends_input.setEnabled(False)
+        
+        self.active_check = QCheckBox("Active")
+        self.active_check.setChecked(True)
+        form_layout.addWidget(self.active_check, 8, 1)
+        layout.addLayout(form_layout)
+        
+        # Target items
+        layout.addWidget(QLabel("Items:"))
+        self.item_filter = QLineEdit()
+        self.item_filter.setPlaceholderText("Filter items...")
+        self.item_filter.textChanged.connect(self.filter_items)
+        layout.addWidget(self.item_filter)
+        self.item_list = QListWidget()
+        for item in self.db.get_all_barcode_items():
+            self.add_target_item(f"{item['name']} [{item['barcode']}]", barcode_item_key(item['barcode']))
+        for item in self.db.get_all_loose_items():
+            self.add_target_item(f"{item['name']} (Loose - {item['category_name']})", loose_item_key(item['id']))
+        layout.addWidget(self.item_list, 2)
+        
+        # Target categories
+        self.category_label = QLabel("Loose Categories:")
+        layout.addWidget(self.category_label)
+        self.category_list = QListWidget()
+        for category in self.db.get_loose_categories():
+            list_item = QListWidgetItem(category['name'])
+            list_item.setData(Qt.UserRole, category['id'])
+            list_item.setFlags(list_item.flags() | Qt.ItemIsUserCheckable)
+            list_item.setCheckState(Qt.Unchecked)
+            self.category_list.addItem(list_item)
+        layout.addWidget(self.category_list, 1)
+        
+        button_box = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+        
+        self.setLayout(layout)
+    
+    def add_target_item(self, text, key):
+        list_item = QListWidgetItem(text)
+        list_item.setData(Qt.UserRole, key)
+        list_item.setFlags(list_item.flags() | Qt.ItemIsUserCheckable)
+        list_item.setCheckState(Qt.Unchecked)
+        self.item_list.addItem(list_item)
+    
+    def filter_items(self, text):
+        text = text.strip().lower()
+        for row in range(self.item_list.count()):
+            list_item = self.item_list.item(row)
+            list_item.setHidden(bool(text) and text not in list_item.text().lower())
+    
+    def update_fields(self):
+        """Show only the inputs that matter for the selected type"""
+        promo_type = self.type_combo.currentData()
+        self.value_label.setText({
+            PERCENT: "Discount %:",
+            FLAT: "₹ Off per Unit:",
+            BUY_X_GET_Y: "% Off Free Units:",
+            COMBO: "Combo Price ₹:",
+        }[promo_type])
+        self.buy_qty_input.setEnabled(promo_type == BUY_X_GET_Y)
+        self.get_qty_input.setEnabled(promo_type == BUY_X_GET_Y)
+        self.min_qty_input.setEnabled(promo_type != COMBO)
+        # Combos are defined by their exact items only
+        self.category_label.setEnabled(promo_type != COMBO)
+        self.category_list.setEnabled(promo_type != COMBO)
+    
+    def load_promotion(self):
+        promotion = self.promotion
+        self.name_input.setText(promotion['name'])
+        self.type_combo.setCurrentIndex(max(0, self.type_combo.findData(promotion['promo_type'])))
+        self.value_input.setValue(promotion['value'] or 0)
+        self.buy_qty_input.setValue(promotion['buy_qty'] or 0)
+        self.get_qty_input.setValue(promotion['get_qty'] or 0)
+        self.min_qty_input.setValue(promotion['min_qty'] or 0)
+        if promotion['starts_on']:
+            self.starts_check.setChecked(True)
+            self.starts_input.setDate(QDate.fromString(promotion['starts_on'], Qt.ISODate))
+        if promotion['ends_on']:
+            self.ends_check.setChecked(True)
+            self.ends_input.setDate(QDate.fromString(promotion['ends_on'], Qt.ISODate))
+        self.active_check.setChecked(promotion['active'])
+        item_keys = set(promotion['item_keys'])
+        for row in range(self.item_list.count()):
+            list_item = self.item_list.item(row)
+            if list_item.data(Qt.UserRole) in item_keys:
+                list_item.setCheckState(Qt.Checked)
+        category_ids = set(promotion['category_ids'])
+        for row in range(self.category_list.count()):
+            list_item = self.category_list.item(row)
+            if list_item.data(Qt.UserRole) in category_ids:
+                list_item.setCheckState(Qt.Checked)
+    
+    def checked_values(self, list_widget):
+        return [list_widget.item(row).data(Qt.UserRole) for row in range(list_widget.count())
+                if list_widget.item(row).checkState() == Qt.Checked]
+    
+    def get_promotion_data(self):
+        promo_type = self.type_combo.currentData()
+        return {
+            'id': self.promotion['id'] if self.promotion else None,
+            'name': self.name_input.text().strip(),
+            'promo_type': promo_type,
+            'value': self.value_input.value(),
+            'buy_qty': self.buy_qty_input.value() if promo_type == BUY_X_GET_Y else 0,
+            'get_qty': self.get_qty_input.value() if promo_type == BUY_X_GET_Y else 0,
+            'min_qty': self.min_qty_input.value() if promo_type != COMBO else 0,
+            'item_keys': self.checked_values(self.item_list),
+            'category_ids': self.checked_values(self.category_list) if promo_type != COMBO else [],
+            'starts_on': self.starts_input.date().toString(Qt.ISODate) if self.starts_check.isChecked() else None,
+            'ends_on': self.ends_input.date().toString(Qt.ISODate) if self.ends_check.isChecked() else None,
+            'active': self.active_check.isChecked()
+        }
+    
+    def accept(self):
+        """Validate and accept"""
+        data = self.get_promotion_data()
+        if not data['name']:
+            QMessageBox.warning(self, "Error", "Please enter a promotion name!")
+            return
+        if not data['item_keys'] and not data['category_ids']:
+            QMessageBox.warning(self, "Error", "Please select at least one item or category!")
+            return
+        if data['promo_type'] == PERCENT and not 0 < data['value'] <= 100:
+            QMessageBox.warning(self, "Error", "Discount % must be between 0 and 100!")
+            return
+        if data['promo_type'] in (FLAT, COMBO) and data['value'] <= 0:
+            QMessageBox.warning(self, "Error", "Please enter a price greater than zero!")
+            return
+        if data['promo_type'] == BUY_X_GET_Y and (data['buy_qty'] <= 0 or data['get_qty'] <= 0
+                                                   or data['value'] > 100):
+            QMessageBox.warning(self, "Error", "Buy and Get quantities are required, and % off is at most 100!")
+            return
+        if data['promo_type'] == COMBO and len(data['item_keys']) < 2:
+            QMessageBox.warning(self, "Error", "A combo needs at least two items!")
+            return
+        if data['starts_on'] and data['ends_on'] and data['starts_on'] > data['ends_on']:
+            QMessageBox.warning(self, "Error", "End date must be on or after the start date!")
+            return
+        super().accept()
+
 class InventoryWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -468,6 +996,11 @@ class InventoryWindow(QMainWindow):
         self.init_loose_tab()
         self.tab_widget.addTab(self.loose_tab, "Loose Items")
 
+        # Promotions Tab
+        self.promotions_tab = QWidget()
+        self.init_promotions_tab()
+        self.tab_widget.addTab(self.promotions_tab, "Promotions")
+
         # Set global font to Poppins for the entire inventory window
         poppins_font = QFont("Poppins", 12)
         self.setFont(poppins_font)
@@ -529,6 +1062,22 @@ class InventoryWindow(QMainWindow):
         """)
         refresh_btn.clicked.connect(self.load_barcode_items)
         controls_layout.addWidget(refresh_btn)
+        hsn_btn = QPushButton("HSN Master")
+        hsn_btn.setFont(QFont("Poppins", 12))
+        hsn_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #6c757d;
+                color: white;
+                border: none;
+                border-radius: 6px;
+                padding: 8px 18px;
+            }
+            QPushButton:hover {
+                background-color: #5a6268;
+            }
+        """)
+        hsn_btn.clicked.connect(self.open_hsn_master)
+        controls_layout.addWidget(hsn_btn)
         controls_layout.addStretch()
         layout.addLayout(controls_layout)
 
@@ -640,6 +1189,22 @@ class InventoryWindow(QMainWindow):
         """)
         refresh_btn.clicked.connect(self.load_loose_items)
         controls_layout.addWidget(refresh_btn)
+        scale_btn = QPushButton("Scale PLU Mapping")
+        scale_btn.setFont(QFont("Poppins", 12))
+        scale_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #6c757d;
+                color: white;
+                border: none;
+                border-radius: 6px;
+                padding: 8px 18px;
+            }
+            QPushButton:hover {
+                background-color: #5a6268;
+            }
+        """)
+        scale_btn.clicked.connect(self.open_scale_plu_mapping)
+        controls_layout.addWidget(scale_btn)
         controls_layout.addStretch()
         layout.addLayout(controls_layout)
 
@@ -666,10 +1231,56 @@ class InventoryWindow(QMainWindow):
         header.setSectionResizeMode(10, QHeaderView.ResizeToContents)
         layout.addWidget(self.loose_table)
 
+    def init_promotions_tab(self):
+        layout = QVBoxLayout()
+        self.promotions_tab.setLayout(layout)
+
+        # Controls
+        controls_layout = QHBoxLayout()
+        add_btn = QPushButton("Add Promotion")
+        add_btn.setFont(QFont("Poppins", 12))
+        add_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #28a745;
+                color: white;
+                border: none;
+                border-radius: 6px;
+                padding: 8px 18px;
+            }
+            QPushButton:hover {
+                background-color: #218838;
+            }
+        """)
+        add_btn.clicked.connect(self.add_promotion)
+        controls_layout.addWidget(add_btn)
+        controls_layout.addStretch()
+        layout.addLayout(controls_layout)
+
+        # Table
+        self.promotions_table = QTableWidget()
+        self.promotions_table.setColumnCount(7)
+        self.promotions_table.setHorizontalHeaderLabels([
+            "ID", "Name", "Type", "Details", "Applies To", "Valid", "Actions"
+        ])
+        self.promotions_table.setAlternatingRowColors(True)
+        self.promotions_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.promotions_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.promotions_table.verticalHeader().setDefaultSectionSize(40)
+        header = self.promotions_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(4, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(5, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(6, QHeaderView.ResizeToContents)
+        layout.addWidget(self.promotions_table)
+
     # --- Barcode Items Logic ---
     def load_data(self):
         self.load_barcode_items()
         self.load_loose_items()
+        self.load_promotions()
 
     def load_barcode_items(self):
         items = self.db.get_all_barcode_items()
@@ -735,7 +1346,7 @@ class InventoryWindow(QMainWindow):
             self.barcode_table.setRowHeight(row, 40)
 
     def add_barcode_item(self):
-        dialog = BarcodeItemDialog(parent=self)
+        dialog = BarcodeItemDialog(parent=self, hsn_master=self.db.get_hsn_master())
         if dialog.exec_() == QDialog.Accepted:
             data = dialog.get_item_data()
             if self.db.add_barcode_item(data['barcode'], data['name'], data['hsn_code'], 
@@ -746,7 +1357,7 @@ class InventoryWindow(QMainWindow):
                 QMessageBox.warning(self, "Error", "Failed to add barcode item. Barcode might already exist.")
     
     def edit_barcode_item(self, item_data):
-        dialog = BarcodeItemDialog(item_data, parent=self)
+        dialog = BarcodeItemDialog(item_data, parent=self, hsn_master=self.db.get_hsn_master())
         if dialog.exec_() == QDialog.Accepted:
             data = dialog.get_item_data()
             if self.db.update_barcode_item(item_data['id'], data['barcode'], data['name'], data['hsn_code'],
@@ -908,7 +1519,7 @@ class InventoryWindow(QMainWindow):
             QMessageBox.warning(self, "Error", "Please add at least one category first!")
             return
         
-        dialog = LooseItemDialog(categories, parent=self)
+        dialog = LooseItemDialog(categories, parent=self, hsn_master=self.db.get_hsn_master())
         if dialog.exec_() == QDialog.Accepted:
             data = dialog.get_item_data()
             if self.db.add_loose_item(data['category_id'], data['name'], data['hsn_code'], data['quantity'],
@@ -920,7 +1531,7 @@ class InventoryWindow(QMainWindow):
     
     def edit_loose_item(self, item_data):
         categories = self.db.get_loose_categories()
-        dialog = LooseItemDialog(categories, item_data, parent=self)
+        dialog = LooseItemDialog(categories, item_data, parent=self, hsn_master=self.db.get_hsn_master())
         if dialog.exec_() == QDialog.Accepted:
             data = dialog.get_item_data()
             if self.db.update_loose_item(item_data['id'], data['name'], data['hsn_code'], data['quantity'],
@@ -930,6 +1541,16 @@ class InventoryWindow(QMainWindow):
             else:
                 QMessageBox.warning(self, "Error", "Failed to update loose item.")
     
+    def open_hsn_master(self):
+        dialog = HsnMasterDialog(self.db, parent=self)
+        dialog.exec_()
+        if dialog.items_updated:
+            self.load_data()
+    
+    def open_scale_plu_mapping(self):
+        dialog = ScalePluDialog(self.db, parent=self)
+        dialog.exec_()
+    
     def delete_loose_item(self, item_id):
         reply = QMessageBox.question(
             self, "Confirm Delete", 
@@ -961,6 +1582,113 @@ class InventoryWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Failed to import loose items from CSV: {e}")
 
+    # --- Promotions Logic ---
+    def load_promotions(self):
+        promotions = self.db.get_promotions()
+        self.promotions_table.setRowCount(len(promotions))
+        for row, promotion in enumerate(promotions):
+            promo_type = promotion['promo_type']
+            value = promotion['value'] or 0
+            if promo_type == PERCENT:
+                details = f"{value:g}% off"
+            elif promo_type == FLAT:
+                details = f"₹{value:.2f} off per unit"
+            elif promo_type == BUY_X_GET_Y:
+                details = f"Buy {promotion['buy_qty']:g} Get {promotion['get_qty']:g}"
+                if value and value < 100:
+                    details += f" at {value:g}% off"
+            else:
+                details = f"Combo for ₹{value:.2f}"
+            if promotion['min_qty'] and promo_type != COMBO:
+                details += f" (min {promotion['min_qty']:g})"
+            applies_to = f"{len(promotion['item_keys'])} items"
+            if promotion['category_ids']:
+                applies_to += f", {len(promotion['category_ids'])} categories"
+            if not promotion['active']:
+                valid = "Disabled"
+            elif promotion['starts_on'] or promotion['ends_on']:
+                valid = f"{promotion['starts_on'] or '...'} to {promotion['ends_on'] or '...'}"
+            else:
+                valid = "Always"
+            self.promotions_table.setItem(row, 0, QTableWidgetItem(str(promotion['id'])))
+            self.promotions_table.setItem(row, 1, QTableWidgetItem(promotion['name']))
+            self.promotions_table.setItem(row, 2, QTableWidgetItem(PROMOTION_TYPES.get(promo_type, promo_type)))
+            self.promotions_table.setItem(row, 3, QTableWidgetItem(details))
+            self.promotions_table.setItem(row, 4, QTableWidgetItem(applies_to))
+            self.promotions_table.setItem(row, 5, QTableWidgetItem(valid))
+            # Actions
+            actions_widget = QWidget()
+            actions_layout = QHBoxLayout()
+            actions_layout.setContentsMargins(0, 0, 0, 0)
+            actions_layout.setSpacing(8)
+            edit_btn = QPushButton("Edit")
+            edit_btn.setMinimumHeight(32)
+            edit_btn.setMaximumHeight(32)
+            edit_btn.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+            edit_btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #17a2b8;
+                    color: white;
+                    border: none;
+                    border-radius: 4px;
+                    font-size: 11px;
+                }
+                QPushButton:hover {
+                    background-color: #138496;
+                }
+            """)
+            edit_btn.clicked.connect(lambda checked, data=promotion: self.edit_promotion(data))
+            actions_layout.addWidget(edit_btn)
+            delete_btn = QPushButton("Delete")
+            delete_btn.setMinimumHeight(32)
+            delete_btn.setMaximumHeight(32)
+            delete_btn.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+            delete_btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #e74c3c;
+                    color: white;
+                    border: none;
+                    border-radius: 4px;
+                    font-size: 11px;
+                }
+                QPushButton:hover {
+                    background-color: #c0392b;
+                }
+            """)
+            delete_btn.clicked.connect(lambda checked, promotion_id=promotion['id']: self.delete_promotion(promotion_id))
+            actions_layout.addWidget(delete_btn)
+            actions_widget.setLayout(actions_layout)
+            self.promotions_table.setCellWidget(row, 6, actions_widget)
+            self.promotions_table.setRowHeight(row, 40)
+
+    def add_promotion(self):
+        dialog = PromotionDialog(self.db, parent=self)
+        if dialog.exec_() == QDialog.Accepted:
+            if self.db.save_promotion(dialog.get_promotion_data()):
+                self.load_promotions()
+            else:
+                QMessageBox.warning(self, "Error", "Failed to save promotion.")
+
+    def edit_promotion(self, promotion):
+        dialog = PromotionDialog(self.db, promotion, parent=self)
+        if dialog.exec_() == QDialog.Accepted:
+            if self.db.save_promotion(dialog.get_promotion_data()):
+                self.load_promotions()
+            else:
+                QMessageBox.warning(self, "Error", "Failed to save promotion.")
+
+    def delete_promotion(self, promotion_id):
+        reply = QMessageBox.question(
+            self, "Confirm Delete",
+            "Are you sure you want to delete this promotion?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            if self.db.delete_promotion(promotion_id):
+                self.load_promotions()
+            else:
+                QMessageBox.warning(self, "Error", "Failed to delete promotion.")
+
     def apply_loose_category_filter(self):
         selected = self.category_filter.currentText()
         if selected == "All":
@@ -994,6 +1722,7 @@ class InventoryWindow(QMainWindow):
         # Update table font sizes
         self.barcode_table.setStyleSheet(f"font-size: {font_size}px;")
         self.loose_table.setStyleSheet(f"font-size: {font_size}px;")
+        self.promotions_table.setStyleSheet(f"font-size: {font_size}px;")
 
     def changeEvent(self, event):
         if event.type() == QEvent.WindowStateChange:
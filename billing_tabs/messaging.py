@@ -0,0 +1,417 @@
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from data_base.database import app_dir
+
+# Setting keys (app_settings table)
+SETTING_BACKEND = 'whatsapp_backend'
+SETTING_API_URL = 'whatsapp_api_url'
+SETTING_PHONE_NUMBER_ID = 'whatsapp_phone_number_id'
+SETTING_ACCESS_TOKEN = 'whatsapp_access_token'
+
+BACKEND_BROWSER = 'browser'
+BACKEND_CLOUD_API = 'cloud_api'
+BACKEND_MOCK = 'mock'
+BACKEND_LABELS = {
+    BACKEND_BROWSER: "WhatsApp Web (browser automation)",
+    BACKEND_CLOUD_API: "WhatsApp Business Cloud API",
+    BACKEND_MOCK: "Mock server (testing, nothing is sent)",
+}
+
+DEFAULT_API_URL = 'https://graph.facebook.com/v19.0'
+MOCK_PHONE_NUMBER_ID = '100000000000000'
+MOCK_ACCESS_TOKEN = 'mock-token'
+
+# Image types the Cloud API accepts for image messages
+IMAGE_TYPES = {'.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg'}
+
+
+class MessagingError(Exception):
+    """A send that did not go through; retryable is False when sending again cannot help"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def default_output_dir() -> str:
+    return os.path.join(app_dir(), 'data_base', 'mock_whatsapp')
+
+
+class BrowserBackend:
+    """Sends through WhatsApp Web with pywhatkit + pyautogui (needs a logged-in, visible browser)"""
+    min_interval = 20  # seconds; each send opens and drives a browser tab
+
+    @property
+    def name(self) -> str:
+        return "WhatsApp Web"
+
+    def send_image(self, phone: str, image_path: str, caption: str = '') -> str:
+        import pywhatkit
+        pywhatkit.sendwhats_image(phone, image_path, caption=caption, wait_time=30, tab_close=False, close_time=3)
+        # Wait for WhatsApp Web to be ready, then press Enter to send
+        try:
+            import pyautogui
+            time.sleep(10)  # Increased wait time for WhatsApp Web to load
+            pyautogui.press('enter')
+            time.sleep(3)  # Wait for message to be sent
+            pyautogui.hotkey('ctrl', 'w')  # Close the tab
+        except Exception as e:
+            print(f"pyautogui not available or failed to press enter/close tab: {e}")
+        return ''
+
+    def close(self):
+        pass
+
+
+class HttpSession:
+    """One keep-alive HTTP(S) connection to an API host, reused for every request.
+
+    Saves the TCP and TLS handshakes (most of the latency of a small API
+    call) after the first request. A kept-alive connection the server has
+    since dropped is reopened once, transparently.
+    """
+
+    def __init__(self, base_url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 15):
+        parsed = urlsplit(base_url)
+        self.scheme = parsed.scheme or 'https'
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip('/')
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            self._conn = connection_class(self.host, self.port, timeout=self.timeout)
+            self.connections_opened += 1
+        return self._conn
+
+    def request(self, method: str, path: str, body: bytes = b'',
+                content_type: str = 'application/json') -> Dict:
+        """Send a request and return the decoded JSON reply; raises MessagingError"""
+        url = f"{self.base_path}/{path.lstrip('/')}"
+        headers = dict(self.headers)
+        headers['Content-Type'] = content_type
+        headers['Content-Length'] = str(len(body))
+        with self._lock:
+            while True:
+                reused = self._conn is not None
+                try:
+                    connection = self._connection()
+                    connection.request(method, url, body, headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                    self._close_connection()
+                    if not reused:
+                        raise MessagingError(f"Connection to {self.host} failed: {e}")
+                    # The server closed the idle connection; try once on a fresh one
+                except (OSError, http.client.HTTPException) as e:
+                    self._close_connection()
+                    raise MessagingError(f"Connection to {self.host} failed: {e}")
+            if response.will_close:
+                self._close_connection()
+        try:
+            payload = json.loads(data.decode('utf-8')) if data else {}
+        except ValueError:
+            payload = {}
+        if response.status >= 400:
+            error = payload.get('error', {}) if isinstance(payload, dict) else {}
+            message = error.get('message') or response.reason
+            # Rate limits and server errors pass; bad requests and auth errors will not
+            retryable = response.status in (408, 429) or response.status >= 500
+            raise MessagingError(f"HTTP {response.status}: {message}", retryable)
+        return payload
+
+    def _close_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def close(self):
+        with self._lock:
+            self._close_connection()
+
+
+def _multipart(fields: Dict[str, str], file_field: str, filename: str, data: bytes,
+               mime_type: str) -> Tuple[bytes, str]:
+    """multipart/form-data body and content type for one file plus text fields"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for key, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{filename}"\r\nContent-Type: {mime_type}\r\n\r\n'.encode())
+    parts.append(data)
+    parts.append(f'\r\n--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class CloudApiBackend:
+    """Sends through the WhatsApp Business Cloud API over one pooled keep-alive connection.
+
+    An image is uploaded once (POST /<phone number id>/media) and then
+    sent by media ID, so a retry or a resend of the same bill skips the
+    upload. Media IDs are cached by file content for MEDIA_TTL, inside the
+    API's 30 day media lifetime.
+    """
+    min_interval = 0.2  # seconds; well inside the API's per-number throughput limits
+
+    MEDIA_TTL = 25 * 24 * 3600
+    MEDIA_CACHE_SIZE = 500
+
+    def __init__(self, phone_number_id: str, access_token: str, base_url: str = DEFAULT_API_URL,
+                 timeout: float = 15):
+        self.phone_number_id = phone_number_id
+        self.session = HttpSession(base_url, {'Authorization': f"Bearer {access_token}"}, timeout)
+        self._media: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+
+    @property
+    def name(self) -> str:
+        return f"Cloud API ({self.session.host})"
+
+    def _upload(self, image_path: str) -> Tuple[str, str]:
+        """(content digest, media ID) for an image, uploading it only if not cached"""
+        mime_type = IMAGE_TYPES.get(os.path.splitext(image_path)[1].lower())
+        if mime_type is None:
+            raise MessagingError("The Cloud API only sends PNG or JPEG images; change the bill image format "
+                                 "in Admin Settings", retryable=False)
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        cached = self._media.get(digest)
+        if cached is not None and time.time() - cached[1] < self.MEDIA_TTL:
+            self._media.move_to_end(digest)
+            return digest, cached[0]
+        body, content_type = _multipart({'messaging_product': 'whatsapp', 'type': mime_type}, 'file',
+                                        os.path.basename(image_path), data, mime_type)
+        reply = self.session.request('POST', f"{self.phone_number_id}/media", body, content_type)
+        media_id = reply.get('id')
+        if not media_id:
+            raise MessagingError("Media upload returned no ID")
+        self._media[digest] = (media_id, time.time())
+        while len(self._media) > self.MEDIA_CACHE_SIZE:
+            self._media.popitem(last=False)
+        return digest, media_id
+
+    def send_image(self, phone: str, image_path: str, caption: str = '') -> str:
+        """Send an image message and return the API's message ID"""
+        if not self.phone_number_id or not self.session.headers['Authorization'][7:]:
+            raise MessagingError("Cloud API needs a phone number ID and an access token (Admin Settings)",
+                                 retryable=False)
+        digest, media_id = self._upload(image_path)
+        payload = {
+            'messaging_product': 'whatsapp',
+            'to': phone.lstrip('+'),
+            'type': 'image',
+            'image': {'id': media_id, 'caption': caption},
+        }
+        try:
+            reply = self.session.request('POST', f"{self.phone_number_id}/messages",
+                                         json.dumps(payload).encode('utf-8'))
+        except MessagingError as e:
+            if not e.retryable:
+                # The media may have expired on the server; upload again next time
+                self._media.pop(digest, None)
+            raise
+        messages = reply.get('messages') or [{}]
+        return messages[0].get('id', '')
+
+    def close(self):
+        self.session.close()
+
+
+class MockMessagingServer:
+    """Local HTTP server speaking the Cloud API's media and messages endpoints.
+
+    Point a CloudApiBackend at base_url to exercise the real HTTP path
+    without network access or an account. Uploads are saved to output_dir
+    (if given); accepted messages are kept in `messages`. fail_next()
+    makes the next requests fail with a given status, and latency adds a
+    delay per request.
+    """
+
+    def __init__(self, output_dir: Optional[str] = None, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0):
+        self.output_dir = output_dir
+        self.latency = latency
+        self.messages: List[Dict] = []
+        self.media: Dict[str, Dict] = {}
+        self.connections = 0
+        self._failures: List[int] = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+            disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                status, reply = server._handle(self.path, self.headers, body)
+                data = json.dumps(reply).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v19.0"
+
+    def start(self) -> 'MockMessagingServer':
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="mock-whatsapp", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+    def fail_next(self, count: int = 1, status: int = 500):
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    @staticmethod
+    def _error(status: int, message: str) -> Tuple[int, Dict]:
+        return status, {'error': {'message': message, 'type': 'MockException', 'code': status}}
+
+    def _handle(self, path: str, headers, body: bytes) -> Tuple[int, Dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failure = self._failures.pop(0) if self._failures else None
+        if failure:
+            return self._error(failure, "Injected failure")
+        authorization = headers.get('Authorization') or ''
+        if not authorization.startswith('Bearer ') or not authorization[7:].strip():
+            return self._error(401, "Missing access token")
+        if path.endswith('/media'):
+            return self._upload(headers.get('Content-Type') or '', body)
+        if path.endswith('/messages'):
+            return self._message(body)
+        return self._error(404, f"Unknown endpoint {path}")
+
+    def _upload(self, content_type: str, body: bytes) -> Tuple[int, Dict]:
+        if 'boundary=' not in content_type:
+            return self._error(400, "Expected multipart/form-data")
+        boundary = content_type.split('boundary=', 1)[1].strip('"').encode()
+        for part in body.split(b'--' + boundary):
+            head, _, data = part.partition(b'\r\n\r\n')
+            if b'name="file"' in head:
+                data = data[:-2] if data.endswith(b'\r\n') else data
+                break
+        else:
+            return self._error(400, "No file in upload")
+        with self._lock:
+            media_id = str(1000000 + len(self.media))
+            self.media[media_id] = {'size': len(data)}
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(os.path.join(self.output_dir, f"media_{media_id}.png"), 'wb') as f:
+                f.write(data)
+        return 200, {'id': media_id}
+
+    def _message(self, body: bytes) -> Tuple[int, Dict]:
+        try:
+            payload = json.loads(body.decode('utf-8'))
+        except ValueError:
+            return self._error(400, "Invalid JSON")
+        to = str(payload.get('to', ''))
+        if not to.isdigit() or len(to) < 8:
+            return self._error(400, f"Invalid recipient {to!r}")
+        media_id = (payload.get('image') or {}).get('id')
+        if media_id not in self.media:
+            return self._error(400, f"Unknown media ID {media_id!r}")
+        with self._lock:
+            message_id = f"wamid.mock{len(self.messages) + 1}"
+            self.messages.append({'id': message_id, 'to': to, 'media_id': media_id,
+                                  'caption': payload['image'].get('caption', '')})
+        return 200, {'messaging_product': 'whatsapp', 'contacts': [{'input': to, 'wa_id': to}],
+                     'messages': [{'id': message_id}]}
+
+
+_mock_server = None
+_mock_server_lock = threading.Lock()
+
+
+def get_mock_server() -> MockMessagingServer:
+    """Return the application-wide mock server, started on first use"""
+    global _mock_server
+    with _mock_server_lock:
+        if _mock_server is None:
+            _mock_server = MockMessagingServer(default_output_dir()).start()
+        return _mock_server
+
+
+def create_messaging_backend(settings: Dict[str, str]):
+    """Build the backend configured in app_settings (browser automation by default)"""
+    backend = (settings.get(SETTING_BACKEND) or BACKEND_BROWSER).strip()
+    if backend == BACKEND_CLOUD_API:
+        return CloudApiBackend((settings.get(SETTING_PHONE_NUMBER_ID) or '').strip(),
+                               (settings.get(SETTING_ACCESS_TOKEN) or '').strip(),
+                               (settings.get(SETTING_API_URL) or '').strip() or DEFAULT_API_URL)
+    if backend == BACKEND_MOCK:
+        return CloudApiBackend(MOCK_PHONE_NUMBER_ID, MOCK_ACCESS_TOKEN, get_mock_server().base_url)
+    return BrowserBackend()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send images through a local mock WhatsApp Cloud API")
+    parser.add_argument('image', help="PNG or JPEG to send")
+    parser.add_argument('--count', type=int, default=20, help="number of messages")
+    parser.add_argument('--phone', default='+919876543210')
+    parser.add_argument('--latency', type=float, default=0.0, help="simulated server delay per request")
+    args = parser.parse_args(argv)
+
+    server = MockMessagingServer(latency=args.latency).start()
+    backend = CloudApiBackend(MOCK_PHONE_NUMBER_ID, MOCK_ACCESS_TOKEN, server.base_url)
+    start = time.perf_counter()
+    try:
+        for index in range(args.count):
+            backend.send_image(args.phone, args.image, f"Message {index + 1}")
+    finally:
+        elapsed = time.perf_counter() - start
+        backend.close()
+        server.stop()
+    print(f"{len(server.messages)} messages, {len(server.media)} upload(s), "
+          f"{backend.session.connections_opened} connection(s) in {elapsed:.3f}s "
+          f"({elapsed / max(args.count, 1) * 1000:.1f} ms per message)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import threading
+from typing import Dict, List, Optional
+from PyQt5.QtCore import QObject, pyqtSignal
+from data_base.database import Database
+from billing_tabs.queue_panel import QueuePanel
+from billing_tabs.thermal_printer import CONNECTION_NONE
+
+QUEUED = 'queued'
+PRINTING = 'printing'
+WAITING = 'waiting'    # printer offline / paper out; retried without using up attempts
+RETRYING = 'retrying'  # the print itself failed part-way
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+SKIPPED = 'skipped'    # no printer configured; can be retried once one is set up
+
+PENDING_STATUSES = (QUEUED, PRINTING, WAITING, RETRYING)
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED, SKIPPED)
+
+KIND_BILL = 'bill'
+KIND_REPRINT = 'reprint'
+KIND_TEST = 'test'
+KIND_LABELS = {KIND_BILL: "Bill", KIND_REPRINT: "Reprint", KIND_TEST: "Test page"}
+
+
+class PrintSpooler(QObject):
+    """Persistent, ordered print queue with a single worker thread that owns the printer.
+
+    Jobs are stored in the print_jobs table before anything is printed, so
+    a crash or power cut never loses a receipt: jobs left 'printing' are
+    queued again on the next start. Jobs print strictly oldest first. While
+    the printer is offline (unplugged, paper out) the head job waits with
+    backoff without using up attempts; a print that fails part-way is
+    retried from the start up to MAX_ATTEMPTS times, then marked failed so
+    the queue moves on. With the connection set to "No printer" nothing
+    is queued, and jobs left from before are marked skipped rather than
+    piling up to print all at once later. Every job stores its bill, so
+    only the newest KEEP_FINISHED done, cancelled and skipped jobs are kept
+    (failed ones stay until retried or cleared). job_updated is emitted
+    with the job dict on every status change.
+    """
+    job_updated = pyqtSignal(object)
+
+    MAX_ATTEMPTS = 3
+    RETRY_BASE_DELAY = 2   # seconds, doubled after each failure
+    RETRY_MAX_DELAY = 60
+    KEEP_FINISHED = 50
+
+    def __init__(self, printer, parent=None):
+        super().__init__(parent)
+        self.printer = printer
+        self.db = Database()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        # A receipt cut off by a crash is printed again from the start
+        self.db.reset_print_jobs((PRINTING,), QUEUED)
+        self._prune_finished()
+        self._thread = threading.Thread(target=self._worker, name="print-spooler", daemon=True)
+        self._thread.start()
+
+    # --- Status API ---
+    @property
+    def is_configured(self) -> bool:
+        return self.printer.config.connection != CONNECTION_NONE
+
+    def submit_bill(self, bill_data: Dict, reprint: bool = False) -> Optional[int]:
+        """Queue a bill receipt and return the job ID immediately (None when no printer is configured)"""
+        return self._submit(KIND_REPRINT if reprint else KIND_BILL, bill_data.get('id'), bill_data)
+
+    def submit_bills(self, bills: List[Dict], reprint: bool = True) -> List[int]:
+        """Queue many receipts in one transaction; they print in the given order"""
+        if not self.is_configured:
+            return []
+        kind = KIND_REPRINT if reprint else KIND_BILL
+        job_ids = self.db.add_print_jobs(kind, [(bill.get('id'), bill) for bill in bills])
+        for job_id in job_ids:
+            self._emit(job_id)
+        self._wake_event.set()
+        return job_ids
+
+    def submit_test_page(self) -> Optional[int]:
+        return self._submit(KIND_TEST, None, {})
+
+    def _submit(self, kind: str, bill_id: Optional[int], payload: Dict) -> Optional[int]:
+        if not self.is_configured:
+            return None
+        job_id = self.db.add_print_job(kind, bill_id, payload)
+        self._emit(job_id)
+        self._wake_event.set()
+        return job_id
+
+    def jobs(self, limit: int = 100) -> List[Dict]:
+        return self.db.get_print_jobs(limit)
+
+    def pending_count(self) -> int:
+        return sum(1 for job in self.jobs() if job['status'] in PENDING_STATUSES)
+
+    def retry(self, job_id: int) -> bool:
+        """Re-queue a failed, cancelled or skipped job (it keeps its place by ID order)"""
+        job = self.db.get_print_job(job_id)
+        if job is None or job['status'] not in (FAILED, CANCELLED, SKIPPED):
+            return False
+        self.db.update_print_job(job_id, QUEUED, attempts=0, last_error='')
+        self._emit(job_id)
+        self._wake_event.set()
+        return True
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a job that has not started printing"""
+        job = self.db.get_print_job(job_id)
+        if job is None or job['status'] not in (QUEUED, WAITING, RETRYING):
+            return False
+        self.db.update_print_job(job_id, CANCELLED)
+        self._emit(job_id)
+        self._wake_event.set()
+        return True
+
+    def clear_finished(self):
+        self.db.delete_print_jobs((DONE, CANCELLED, SKIPPED))
+
+    def _prune_finished(self):
+        self.db.delete_print_jobs((DONE, CANCELLED, SKIPPED), keep=self.KEEP_FINISHED)
+
+    def shutdown(self):
+        """Stop the worker after the receipt it is printing, if any"""
+        self._stop_event.set()
+        self._wake_event.set()
+        self._thread.join(timeout=10)
+
+    # --- Worker ---
+    def _emit(self, job_id: int):
+        job = self.db.get_print_job(job_id)
+        if job is not None:
+            job.pop('payload', None)
+            self.job_updated.emit(job)
+
+    def _set_status(self, job_id: int, status: str, attempts: Optional[int] = None, error: Optional[str] = None):
+        self.db.update_print_job(job_id, status, attempts, error)
+        self._emit(job_id)
+
+    def _sleep(self, seconds: float):
+        """Wait, but wake early for new/retried/cancelled jobs or shutdown"""
+        self._wake_event.wait(seconds)
+        self._wake_event.clear()
+
+    def _print(self, job: Dict) -> bool:
+        if job['kind'] == KIND_TEST:
+            return self.printer.print_test_page()
+        return self.printer.print_bill(job['payload'])
+
+    def _worker(self):
+        offline_delay = self.RETRY_BASE_DELAY
+        while not self._stop_event.is_set():
+            job = self.db.get_next_print_job((QUEUED, WAITING, RETRYING))
+            if job is None:
+                self._sleep(5)
+                continue
+            job_id = job['id']
+            if not self.is_configured:
+                self._set_status(job_id, SKIPPED, error="No printer configured")
+                continue
+            # Probe only when the last health check saw a problem (a probe can take a second)
+            ready = self.printer.is_online and self.printer.ensure_connected()
+            if not ready and not self.printer.check_health():
+                # Nothing was sent; keep the job at the head until the printer is back
+                self._set_status(job_id, WAITING, error=f"{self.printer.status} (retrying in {offline_delay}s)")
+                self._sleep(offline_delay)
+                offline_delay = min(offline_delay * 2, self.RETRY_MAX_DELAY)
+                continue
+            offline_delay = self.RETRY_BASE_DELAY
+            current = self.db.get_print_job(job_id)
+            if current is None or current['status'] == CANCELLED:
+                continue
+            attempts = job['attempts'] + 1
+            self._set_status(job_id, PRINTING, attempts, f"Attempt {attempts}")
+            try:
+                ok = self._print(job)
+            except Exception as e:
+                print(f"Print job #{job_id} raised: {e}")
+                ok = False
+            if ok:
+                self._set_status(job_id, DONE, error='')
+                self._prune_finished()
+                continue
+            error = f"Print failed: {self.printer.status}"
+            print(f"[ERROR] Print job #{job_id} (bill #{job['bill_id']}): {error}")
+            if attempts >= self.MAX_ATTEMPTS:
+                self._set_status(job_id, FAILED, error=error)
+                continue
+            delay = min(self.RETRY_BASE_DELAY * (2 ** (attempts - 1)), self.RETRY_MAX_DELAY)
+            self._set_status(job_id, RETRYING, error=f"{error} (retrying in {delay}s)")
+            self._sleep(delay)
+
+
+class PrintQueuePanel(QueuePanel):
+    """Print queue view with retry and cancel"""
+    TITLE = "Print Queue"
+    CANCEL_LABEL = "Cancel"
+    STATUS_COLORS = {
+        QUEUED: "#7f8c8d",
+        PRINTING: "#2980b9",
+        WAITING: "#e67e22",
+        RETRYING: "#e67e22",
+        DONE: "#27ae60",
+        FAILED: "#c0392b",
+        CANCELLED: "#95a5a6",
+        SKIPPED: "#95a5a6",
+    }
+    PENDING_STATUSES = PENDING_STATUSES
+    FAILED_STATUS = FAILED
+
+    def __init__(self, spooler: PrintSpooler, parent=None):
+        self.spooler = spooler
+        super().__init__(spooler.job_updated, parent)
+
+    def entries(self) -> List[Dict]:
+        return self.spooler.jobs()
+
+    def row(self, job: Dict):
+        return (job['id'], job['bill_id'], KIND_LABELS.get(job['kind'], job['kind']), job['status'],
+                job['last_error'], job['updated_at'] if job['status'] in FINISHED_STATUSES else None)
+
+    def retry_entry(self, job: Dict):
+        self.spooler.retry(job['id'])
+
+    def cancel_entry(self, job_id: int):
+        self.spooler.cancel(job_id)
+
+    def clear_finished(self):
+        self.spooler.clear_finished()
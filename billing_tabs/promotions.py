@@ -0,0 +1,279 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+from billing_tabs.tax_engine import ZERO, money, to_decimal, inclusive_unit_price
+
+PERCENT = 'percent'            # value % off matching lines
+FLAT = 'flat'                  # ₹ value off each unit (piece or kg) of matching lines
+BUY_X_GET_Y = 'buy_x_get_y'    # for every buy_qty + get_qty units, get_qty cheapest units at value % off
+COMBO = 'combo'                # one unit of each listed item for ₹ value
+
+PROMOTION_TYPES = {
+    PERCENT: "Percentage Off",
+    FLAT: "Flat ₹ Off per Unit",
+    BUY_X_GET_Y: "Buy X Get Y",
+    COMBO: "Combo Price",
+}
+
+
+def barcode_item_key(barcode: str) -> str:
+    return f"barcode:{barcode}"
+
+
+def loose_item_key(item_id: int) -> str:
+    return f"loose:{item_id}"
+
+
+def item_key(line: Dict) -> str:
+    """Identity of the catalog item behind a cart line, as used in promotion targets"""
+    if line.get('item_type') == 'loose':
+        if line.get('item_id') is not None:
+            return loose_item_key(line['item_id'])
+        return f"name:{line.get('name', '')}"
+    return barcode_item_key(line.get('barcode', ''))
+
+
+class Promotion:
+    """One configured offer, built from a promotions table row"""
+
+    def __init__(self, row: Dict):
+        self.id = row['id']
+        self.name = row['name']
+        self.promo_type = row['promo_type']
+        self.value = to_decimal(row.get('value') or 0)
+        self.buy_qty = to_decimal(row.get('buy_qty') or 0)
+        self.get_qty = to_decimal(row.get('get_qty') or 0)
+        self.min_qty = to_decimal(row.get('min_qty') or 0)
+        self.item_keys = set(row.get('item_keys') or [])
+        self.category_ids = set(int(c) for c in (row.get('category_ids') or []))
+
+    def matches(self, line: Dict) -> bool:
+        if item_key(line) in self.item_keys:
+            return True
+        # Combos are defined by their exact items only
+        return (self.promo_type != COMBO
+                and line.get('category_id') is not None and int(line['category_id']) in self.category_ids)
+
+    def evaluate(self, lines: List[Dict], other: Optional[Dict[int, Decimal]] = None) -> Dict[int, Decimal]:
+        """Return {id(line): discount} for the lines this promotion applies to.
+
+        other is {id(line): discount} already given by non-combo rules; a
+        combo prices its items net of it.
+        """
+        if not lines:
+            return {}
+        if self.promo_type == COMBO:
+            return self._evaluate_combo(lines, other or {})
+        total_qty = sum(to_decimal(line['quantity']) for line in lines)
+        if self.min_qty and total_qty < self.min_qty:
+            return {}
+        if self.promo_type == PERCENT:
+            return {id(line): money(_gross(line) * self.value / 100) for line in lines}
+        if self.promo_type == FLAT:
+            return {id(line): money(to_decimal(line['quantity']) * self.value) for line in lines}
+        if self.promo_type == BUY_X_GET_Y:
+            return self._evaluate_buy_x_get_y(lines, total_qty)
+        return {}
+
+    def _evaluate_buy_x_get_y(self, lines: List[Dict], total_qty: Decimal) -> Dict[int, Decimal]:
+        group = self.buy_qty + self.get_qty
+        if group <= 0 or self.get_qty <= 0:
+            return {}
+        free_units = int(total_qty // group) * self.get_qty
+        percent_off = self.value or Decimal(100)
+        discounts = {}
+        # Cheapest units are the free ones
+        for line in sorted(lines, key=_unit_price):
+            if free_units <= 0:
+                break
+            units = min(free_units, to_decimal(line['quantity']))
+            discounts[id(line)] = money(units * _unit_price(line) * percent_off / 100)
+            free_units -= units
+        return discounts
+
+    def _evaluate_combo(self, lines: List[Dict], other: Dict[int, Decimal]) -> Dict[int, Decimal]:
+        by_key = defaultdict(list)
+        for line in lines:
+            by_key[item_key(line)].append(line)
+        if not self.item_keys or set(by_key) != self.item_keys:
+            return {}
+        combos = min(int(sum(to_decimal(l['quantity']) for l in group)) for group in by_key.values())
+        if combos <= 0:
+            return {}
+        # A combo is a fixed price, so each item is priced after the other
+        # rules' discounts on its lines instead of stacking on top of them
+        unit_prices = [
+            sum(_available(line, other) for line in group) / sum(to_decimal(line['quantity']) for line in group)
+            for group in by_key.values()
+        ]
+        regular_price = sum(unit_prices)
+        saving = (regular_price - self.value) * combos
+        if saving <= 0:
+            return {}
+        # Spread the saving over the combo items in proportion to their price,
+        # then each item's share over its cart lines
+        discounts = {}
+        remaining = money(saving)
+        groups = list(by_key.values())
+        for index, group in enumerate(groups):
+            if index == len(groups) - 1:
+                share = remaining
+            else:
+                share = money(saving * unit_prices[index] / regular_price)
+                remaining -= share
+            discounts.update(_spread(share, group, other))
+        return discounts
+
+
+def _unit_price(line: Dict) -> Decimal:
+    return inclusive_unit_price(line['base_price'], line.get('sgst_percent', 0), line.get('cgst_percent', 0))
+
+
+def _gross(line: Dict) -> Decimal:
+    return money(to_decimal(line['quantity']) * _unit_price(line))
+
+
+def _available(line: Dict, other: Dict[int, Decimal]) -> Decimal:
+    """Gross of a line less the discounts other rules already give it"""
+    return max(ZERO, _gross(line) - other.get(id(line), ZERO))
+
+
+def _spread(amount: Decimal, lines: List[Dict], other: Optional[Dict[int, Decimal]] = None) -> Dict[int, Decimal]:
+    """Split amount over lines in proportion to what is left of their gross, never more than that"""
+    gross = [_available(line, other or {}) for line in lines]
+    total = sum(gross)
+    if total <= 0:
+        return {}
+    remaining = min(amount, total)
+    shares = {}
+    for index, line in enumerate(lines):
+        if index == len(lines) - 1:
+            share = remaining
+        else:
+            share = money(amount * gross[index] / total)
+        share = min(share, gross[index], remaining)
+        shares[id(line)] = share
+        remaining -= share
+    return shares
+
+
+class PromotionEngine:
+    """Applies promotions to a cart, re-evaluating only the rules a change touches.
+
+    Rules are indexed by the item keys and category ids they target. When a
+    line changes, only rules reachable from that line through the index are
+    re-evaluated; their previous allocations are replaced and the per-line
+    discount is re-summed for the lines involved. Discounts from different
+    rules stack, capped at the line's gross amount by the tax engine, except
+    combos: they are evaluated last, against the lines' price after the
+    other rules, so the items never cost less than the combo price.
+    """
+
+    def __init__(self, promotions: Iterable[Dict] = ()):
+        self.promotions: Dict[int, Promotion] = {}
+        self._by_item = defaultdict(set)
+        self._by_category = defaultdict(set)
+        self._allocations: Dict[int, Dict[int, Decimal]] = {}
+        self.load(promotions)
+
+    def load(self, promotions: Iterable[Dict]):
+        self.promotions = {}
+        self._by_item = defaultdict(set)
+        self._by_category = defaultdict(set)
+        for row in promotions:
+            promotion = Promotion(row)
+            self.promotions[promotion.id] = promotion
+            for key in promotion.item_keys:
+                self._by_item[key].add(promotion.id)
+            for category_id in promotion.category_ids:
+                self._by_category[category_id].add(promotion.id)
+        self.reset()
+
+    def reset(self):
+        """Forget cached allocations (new or replaced cart)"""
+        self._allocations = {}
+
+    def rules_for(self, line: Dict) -> set:
+        """Rules that target this line's item or category (via the index)"""
+        rule_ids = set(self._by_item.get(item_key(line), ()))
+        if line.get('category_id') is not None:
+            rule_ids |= self._by_category.get(int(line['category_id']), set())
+        return rule_ids
+
+    def apply(self, lines: List[Dict], changed: Optional[Iterable[Dict]] = None) -> List[Dict]:
+        """Update discount_amount/promotion on lines; return the lines whose discount changed.
+
+        changed lists the lines that were added, edited or removed since the
+        last call; None re-evaluates every rule reachable from the cart.
+        """
+        touched_ids = set()
+        if changed is None:
+            self.reset()
+            changed = lines
+            # Clear discounts a resumed/restored cart may carry from older rules
+            touched_ids = {id(line) for line in lines}
+        affected = set()
+        for line in changed:
+            affected |= self.rules_for(line)
+        if not affected and not touched_ids:
+            return []
+
+        combo_ids = {rule_id for rule_id in affected if self.promotions[rule_id].promo_type == COMBO}
+        for rule_id in affected - combo_ids:
+            touched_ids |= self._evaluate(rule_id, lines)
+        # Combos are priced net of the other rules, so re-price every combo
+        # on a line whose other discounts may have moved
+        for line in lines:
+            if id(line) in touched_ids:
+                combo_ids |= {rule_id for rule_id in self.rules_for(line)
+                              if self.promotions[rule_id].promo_type == COMBO}
+        if combo_ids:
+            other = defaultdict(Decimal)
+            for rule_id, allocation in self._allocations.items():
+                if self.promotions[rule_id].promo_type != COMBO:
+                    for line_id, amount in allocation.items():
+                        other[line_id] += amount
+            for rule_id in combo_ids:
+                touched_ids |= self._evaluate(rule_id, lines, other)
+
+        updated = []
+        for line in lines:
+            if id(line) not in touched_ids:
+                continue
+            discount = ZERO
+            names = []
+            for rule_id, allocation in self._allocations.items():
+                amount = allocation.get(id(line))
+                if amount:
+                    discount += amount
+                    names.append(self.promotions[rule_id].name)
+            discount = float(discount)
+            promotion_names = ', '.join(names)
+            if discount != line.get('discount_amount', 0) or promotion_names != line.get('promotion', ''):
+                line['discount_amount'] = discount
+                line['promotion'] = promotion_names
+                updated.append(line)
+        return updated
+
+
+    def _evaluate(self, rule_id: int, lines: List[Dict], other: Optional[Dict[int, Decimal]] = None) -> set:
+        """Replace a rule's allocation; return the ids of the lines it gave or took a discount"""
+        promotion = self.promotions[rule_id]
+        touched_ids = set(self._allocations.pop(rule_id, {}))
+        new = {line_id: amount for line_id, amount in
+               promotion.evaluate([line for line in lines if promotion.matches(line)], other).items()
+               if amount > 0}
+        if new:
+            self._allocations[rule_id] = new
+            touched_ids.update(new)
+        return touched_ids
+
+
+def active_promotions(rows: Iterable[Dict], today: Optional[date] = None) -> List[Dict]:
+    """Filter promotion rows to the ones enabled and within their date range"""
+    today = (today or date.today()).isoformat()
+    return [row for row in rows
+            if row.get('active') and (not row.get('starts_on') or row['starts_on'] <= today)
+            and (not row.get('ends_on') or row['ends_on'] >= today)]
+
@@ -0,0 +1,159 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QFont, QColor
+from data_base.database import local_datetime
+
+DEFAULT_COLOR = "#2c3e50"
+
+
+class QueuePanel(QWidget):
+    """Status table for a background queue (print spooler, WhatsApp outbox, checkout jobs).
+
+    One row per entry: bill, what it is, coloured status and info, with the
+    local time prefixed once an entry has finished. Rows are updated in
+    place from the queue's update signal and the title counts the entries
+    still pending. Subclasses set the class attributes and implement
+    entries(), row(), retry_entry(), clear_finished() and, when
+    CANCEL_LABEL is set, cancel_entry().
+    """
+    TITLE = ""
+    KIND_HEADER = "Job"
+    CLEAR_LABEL = "Clear Finished"
+    CANCEL_LABEL: Optional[str] = None
+    SELECTION_MODE = QAbstractItemView.SingleSelection
+    STATUS_COLORS: Dict[str, str] = {}
+    PENDING_STATUSES: Tuple[str, ...] = ()
+    FAILED_STATUS = 'failed'
+
+    def __init__(self, updated_signal, parent=None):
+        super().__init__(parent)
+        self._rows: Dict[int, int] = {}
+        self._pending = set()
+        self.init_ui()
+        updated_signal.connect(self.on_entry_updated)
+        self.refresh()
+
+    # --- Per-queue hooks ---
+    def entries(self) -> List:
+        raise NotImplementedError
+
+    def row(self, entry) -> Tuple[int, Optional[int], str, str, str, object]:
+        """(id, bill_id, kind label, status, info, finished at) of an entry.
+
+        finished at is a local datetime, a stored UTC timestamp or None.
+        """
+        raise NotImplementedError
+
+    def retry_entry(self, entry):
+        raise NotImplementedError
+
+    def cancel_entry(self, entry_id: int):
+        raise NotImplementedError
+
+    def clear_finished(self):
+        raise NotImplementedError
+
+    # --- Table ---
+    def init_ui(self):
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+
+        self.title_label = QLabel(self.TITLE)
+        self.title_label.setFont(QFont("Arial", 12, QFont.Bold))
+        layout.addWidget(self.title_label)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(["Bill", self.KIND_HEADER, "Status", "Info"])
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(self.SELECTION_MODE)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        buttons_layout = QHBoxLayout()
+        retry_btn = QPushButton("Retry Failed")
+        retry_btn.clicked.connect(self.retry_selected)
+        buttons_layout.addWidget(retry_btn)
+        if self.CANCEL_LABEL:
+            cancel_btn = QPushButton(self.CANCEL_LABEL)
+            cancel_btn.clicked.connect(self.cancel_selected)
+            buttons_layout.addWidget(cancel_btn)
+        clear_btn = QPushButton(self.CLEAR_LABEL)
+        clear_btn.clicked.connect(self.on_clear_clicked)
+        buttons_layout.addWidget(clear_btn)
+        layout.addLayout(buttons_layout)
+
+    def refresh(self):
+        """Rebuild the table from the queue"""
+        entries = self.entries()
+        self._rows = {}
+        self._pending = set()
+        self.table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            self._rows[self.row(entry)[0]] = row
+            self._fill_row(row, entry)
+        self._update_title()
+
+    @staticmethod
+    def _time_text(value) -> str:
+        local = value if isinstance(value, datetime) else local_datetime(value)
+        return local.strftime('%H:%M:%S') if local else ""
+
+    def _fill_row(self, row: int, entry):
+        entry_id, bill_id, kind, status, info, finished_at = self.row(entry)
+        bill_item = QTableWidgetItem(f"#{bill_id}" if bill_id else "-")
+        bill_item.setData(Qt.UserRole, entry_id)
+        self.table.setItem(row, 0, bill_item)
+        self.table.setItem(row, 1, QTableWidgetItem(kind))
+        status_item = QTableWidgetItem(status.title())
+        status_item.setForeground(QColor(self.STATUS_COLORS.get(status, DEFAULT_COLOR)))
+        self.table.setItem(row, 2, status_item)
+        if finished_at:
+            info = f"{self._time_text(finished_at)} {info}".strip()
+        self.table.setItem(row, 3, QTableWidgetItem(info))
+        if status in self.PENDING_STATUSES:
+            self._pending.add(entry_id)
+        else:
+            self._pending.discard(entry_id)
+
+    def _update_title(self):
+        pending = len(self._pending)
+        self.title_label.setText(f"{self.TITLE} ({pending} pending)" if pending else self.TITLE)
+
+    def on_entry_updated(self, entry):
+        row = self._rows.get(self.row(entry)[0])
+        if row is None:
+            self.refresh()
+            return
+        self._fill_row(row, entry)
+        self._update_title()
+
+    def _selected_ids(self):
+        selected = self.table.selectionModel().selectedRows()
+        return {self.table.item(index.row(), 0).data(Qt.UserRole) for index in selected}
+
+    def retry_selected(self):
+        """Retry the selected entry, or every failed entry if none is selected"""
+        selected_ids = self._selected_ids()
+        for entry in self.entries():
+            entry_id, _, _, status, _, _ = self.row(entry)
+            if status == self.FAILED_STATUS and (not selected_ids or entry_id in selected_ids):
+                self.retry_entry(entry)
+
+    def cancel_selected(self):
+        for entry_id in self._selected_ids():
+            self.cancel_entry(entry_id)
+
+    def on_clear_clicked(self):
+        self.clear_finished()
+        self.refresh()
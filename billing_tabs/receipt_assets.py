@@ -0,0 +1,220 @@
+import os
+import struct
+import threading
+from typing import Dict, Optional
+from PIL import Image, ImageOps
+from PyQt5.QtGui import QImage
+from data_base.database import Database, app_dir
+import qrcode
+
+DEFAULT_LOCATION = 'https://maps.app.goo.gl/qthz7Drt5WBdwBj49?g_st=aw'
+QR_SIZE = 80
+LOGO_FILENAME = 'shop_logo.png'
+
+# Thermal receipt bitmaps, stored as ready-to-send ESC/POS bytes next to the logo
+RASTER_WIDTH = 384  # printable dots across 58mm paper
+LOGO_RASTER_MAX_HEIGHT = 160
+QR_RASTER_BOX_SIZE = 4  # dots per QR module
+RASTER_FILENAMES = {'logo': 'shop_logo.escpos', 'qr': 'shop_qr.escpos'}
+
+
+def escpos_raster(image, max_width: int = RASTER_WIDTH, max_height: Optional[int] = None) -> bytes:
+    """Dither a PIL image to 1 bit and encode it as a centred ESC/POS raster (GS v 0)"""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Transparent areas print as paper, not black
+        image = image.convert('RGBA')
+        image = Image.alpha_composite(Image.new('RGBA', image.size, 'white'), image)
+    image = image.convert('L')
+    scale = min(1.0, max_width / image.width, (max_height or image.height) / image.height)
+    if scale < 1:
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                             Image.LANCZOS)
+    # Rows are sent as whole bytes; pad the right edge with white
+    width = (image.width + 7) // 8 * 8
+    if width != image.width:
+        padded = Image.new('L', (width, image.height), 255)
+        padded.paste(image, (0, 0))
+        image = padded
+    # Floyd-Steinberg dither; after inverting, a set bit is a black dot as ESC/POS expects
+    bitmap = ImageOps.invert(image).convert('1')
+    return (b'\x1ba\x01'
+            + b'\x1dv0\x00' + struct.pack('<HH', width // 8, image.height) + bitmap.tobytes()
+            + b'\x1ba\x00')
+
+
+class ReceiptAssets:
+    """Cache of the static receipt parts: shop details, location QR code and logo.
+
+    These only change when the shop details are saved in Admin Settings, so
+    everything is built lazily once and reused for every bill until
+    invalidate() is called (connected to AdminSettingsWindow.shop_details_updated).
+    Access is guarded by a lock so worker threads can share the cache.
+    generation is bumped on every invalidate() so caches built from these
+    assets (see receipt_layout.ReceiptCache) can tell they are stale.
+
+    The thermal printer's logo and QR bitmaps are dithered and encoded
+    once and kept as ESC/POS bytes, in memory and in data_base/images, so
+    printing a receipt does no image processing. They are rebuilt by
+    build_escpos_assets() when shop details are saved.
+    """
+
+    def __init__(self, db: Optional[Database] = None):
+        self.db = db or Database()
+        self._lock = threading.RLock()
+        self._shop_details = None
+        self._qr_image = None
+        self._logo_image = None
+        self._logo_loaded = False
+        self._escpos = {}
+        self.generation = 0
+
+    def invalidate(self):
+        """Drop all cached assets so they are rebuilt on next use"""
+        with self._lock:
+            self.generation += 1
+            self._shop_details = None
+            self._qr_image = None
+            self._logo_image = None
+            self._logo_loaded = False
+            self._escpos = {}
+            for name in RASTER_FILENAMES:
+                try:
+                    os.remove(self._raster_path(name))
+                except OSError:
+                    pass
+
+    def shop_details(self) -> Dict:
+        """Return the shop header details, with defaults filled in"""
+        with self._lock:
+            if self._shop_details is None:
+                try:
+                    admin_details = self.db.get_admin_details() or {}
+                except Exception as e:
+                    print(f"Error loading shop details: {e}")
+                    admin_details = {}
+                self._shop_details = {
+                    'shop_name': admin_details.get('shop_name') or 'Your Shop Name',
+                    'address': admin_details.get('address') or 'Your Shop Address',
+                    'phone_number': admin_details.get('phone_number') or 'Your Phone Number',
+                    'location': admin_details.get('location') or DEFAULT_LOCATION,
+                }
+            return self._shop_details
+
+    def qr_pil_image(self, size: int = QR_SIZE):
+        """Encode the shop location as a QR code and return it as a PIL RGB image"""
+        qr = qrcode.QRCode(box_size=2, border=1)
+        qr.add_data(self.shop_details()['location'])
+        qr.make(fit=True)
+        img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
+        return img.resize((size, size))
+
+    def qr_image(self) -> QImage:
+        """Return the cached location QR code as a QImage"""
+        with self._lock:
+            if self._qr_image is None:
+                img = self.qr_pil_image()
+                data = img.tobytes()
+                # copy() detaches the QImage from the Python bytes buffer
+                self._qr_image = QImage(data, img.size[0], img.size[1], img.size[0] * 3,
+                                        QImage.Format_RGB888).copy()
+            return self._qr_image
+
+    def images_dir(self) -> str:
+        return os.path.join(app_dir(), 'data_base', 'images')
+
+    def logo_path(self) -> str:
+        return os.path.join(self.images_dir(), LOGO_FILENAME)
+
+    def logo_image(self) -> Optional[QImage]:
+        """Return the shop logo (data_base/images/shop_logo.png) or None if there is none"""
+        with self._lock:
+            if not self._logo_loaded:
+                self._logo_loaded = True
+                path = self.logo_path()
+                if os.path.isfile(path):
+                    image = QImage(path)
+                    if not image.isNull():
+                        self._logo_image = image
+            return self._logo_image
+
+
+    # --- Thermal printer bitmaps ---
+    def escpos_logo(self) -> bytes:
+        """Shop logo as ESC/POS raster bytes (b'' when there is no logo)"""
+        return self._escpos_asset('logo')
+
+    def escpos_qr(self) -> bytes:
+        """Location QR code as ESC/POS raster bytes"""
+        return self._escpos_asset('qr')
+
+    def build_escpos_assets(self):
+        """Dither and encode the logo and QR now (called when shop details are saved)"""
+        with self._lock:
+            for name in RASTER_FILENAMES:
+                self._escpos[name] = self._build_raster(name)
+
+    def _raster_path(self, name: str) -> str:
+        return os.path.join(self.images_dir(), RASTER_FILENAMES[name])
+
+    def _escpos_asset(self, name: str) -> bytes:
+        with self._lock:
+            if name not in self._escpos:
+                data = self._read_raster(name)
+                if data is None:
+                    data = self._build_raster(name)
+                self._escpos[name] = data
+            return self._escpos[name]
+
+    def _read_raster(self, name: str) -> Optional[bytes]:
+        """Stored raster bytes, or None if missing or older than the logo file"""
+        path = self._raster_path(name)
+        if not os.path.isfile(path):
+            return None
+        if name == 'logo':
+            logo_path = self.logo_path()
+            if os.path.isfile(logo_path) != (os.path.getsize(path) > 0):
+                return None
+            if os.path.isfile(logo_path) and os.path.getmtime(logo_path) > os.path.getmtime(path):
+                return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _build_raster(self, name: str) -> bytes:
+        try:
+            if name == 'logo':
+                logo_path = self.logo_path()
+                data = b''
+                if os.path.isfile(logo_path):
+                    with Image.open(logo_path) as logo:
+                        data = escpos_raster(logo, max_height=LOGO_RASTER_MAX_HEIGHT)
+            else:
+                qr = qrcode.QRCode(box_size=QR_RASTER_BOX_SIZE, border=2)
+                qr.add_data(self.shop_details()['location'])
+                qr.make(fit=True)
+                data = escpos_raster(qr.make_image(fill_color="black", back_color="white").convert("L"))
+        except Exception as e:
+            print(f"Error preparing receipt {name} bitmap: {e}")
+            return b''
+        try:
+            os.makedirs(self.images_dir(), exist_ok=True)
+            with open(self._raster_path(name), 'wb') as f:
+                f.write(data)
+        except OSError as e:
+            print(f"Could not store receipt {name} bitmap: {e}")
+        return data
+
+
+_shared_assets = None
+_shared_assets_lock = threading.Lock()
+
+
+def get_receipt_assets() -> ReceiptAssets:
+    """Return the application-wide receipt asset cache"""
+    global _shared_assets
+    with _shared_assets_lock:
+        if _shared_assets is None:
+            _shared_assets = ReceiptAssets()
+        return _shared_assets
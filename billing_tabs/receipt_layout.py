@@ -0,0 +1,241 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from html import escape
+from typing import Dict, List, Optional, Union
+from data_base.database import local_datetime
+from billing_tabs.receipt_assets import ReceiptAssets, get_receipt_assets
+from billing_tabs import tax_engine
+
+THANK_YOU_MESSAGES = [
+    "Thank you for shopping in {shop_name}!",
+    "We appreciate your business at {shop_name}.",
+    "Hope to see you again at {shop_name}!",
+    "Your support means a lot to {shop_name}!",
+    "Thanks for choosing {shop_name}!",
+    "Thank you for shopping at {shop_name}! We hope you had a great experience.",
+    "Your purchase at {shop_name} made our day!",
+    "Thank you for trusting {shop_name}!",
+    "{shop_name} is grateful for your business!",
+    "Thanks for shopping local with {shop_name}!",
+]
+
+
+class ReceiptLine:
+    """One bill item as shown on a receipt"""
+    __slots__ = ('name', 'hsn_code', 'quantity', 'is_loose', 'base_price', 'taxable_amount',
+                 'sgst_percent', 'sgst_amount', 'cgst_percent', 'cgst_amount',
+                 'discount_amount', 'promotion', 'final_price')
+
+    def __init__(self, item: Dict):
+        self.name = str(item.get('name', ''))
+        self.hsn_code = str(item.get('hsn_code', '') or '')
+        self.quantity = float(item.get('quantity', 0))
+        self.is_loose = item.get('item_type') == 'loose'
+        self.base_price = float(item.get('base_price', 0))
+        self.taxable_amount = float(tax_engine.line_taxable(item))
+        self.sgst_percent = float(item.get('sgst_percent', 0))
+        self.sgst_amount = float(item.get('sgst_amount', 0))
+        self.cgst_percent = float(item.get('cgst_percent', 0))
+        self.cgst_amount = float(item.get('cgst_amount', 0))
+        self.discount_amount = float(item.get('discount_amount', 0) or 0)
+        self.promotion = item.get('promotion') or 'Offer'
+        self.final_price = float(item.get('final_price', 0))
+
+    @property
+    def quantity_label(self) -> str:
+        return f"{self.quantity:.2f}kg" if self.is_loose else f"{self.quantity:.2f}"
+
+
+class ReceiptLayout:
+    """Everything a receipt shows, derived once from the bill data.
+
+    Totals and the GST rate breakup come from tax_engine here, so the
+    printed receipt, the shared image, the PDF and the history view all
+    show the same figures. Renderers only format these fields.
+    """
+
+    def __init__(self, bill_data: Dict, shop: Dict, generation: int = 0):
+        self.generation = generation  # ReceiptAssets generation the shop details came from
+        self.shop = shop
+        self.bill_id = bill_data.get('id')
+        self.customer_name = bill_data.get('customer_name') or ''
+        self.customer_phone = bill_data.get('customer_phone') or ''
+        self.created_at = self._bill_datetime(bill_data)
+        self.lines: List[ReceiptLine] = [ReceiptLine(item) for item in bill_data['items']]
+        totals = tax_engine.cart_totals(bill_data['items'])
+        self.total_items = bill_data.get('total_items', totals['total_items'])
+        self.total_weight = totals['total_weight']
+        self.taxable_amount = totals['taxable_amount']
+        self.total_sgst = totals['total_sgst']
+        self.total_cgst = totals['total_cgst']
+        self.total_discount = totals['total_discount']
+        self.grand_total = totals['total_amount']
+        self.rate_rows = tax_engine.rate_summary(bill_data['items'])
+        # Same message every time this bill is rendered
+        message = THANK_YOU_MESSAGES[(self.bill_id or 0) % len(THANK_YOU_MESSAGES)]
+        self.thank_you = message.format(shop_name=shop['shop_name'])
+
+    @classmethod
+    def from_bill(cls, bill_data: Dict, assets: Optional[ReceiptAssets] = None) -> 'ReceiptLayout':
+        assets = assets or get_receipt_assets()
+        generation = assets.generation
+        return cls(bill_data, assets.shop_details(), generation)
+
+    @staticmethod
+    def _bill_datetime(bill_data: Dict) -> datetime:
+        """Use the stored bill timestamp (UTC, shown in local time) when available, otherwise now"""
+        created_at = bill_data.get('created_at')
+        if isinstance(created_at, datetime):
+            return created_at
+        return (local_datetime(created_at) if created_at else None) or datetime.now()
+
+    @property
+    def has_gst(self) -> bool:
+        return self.total_sgst > 0 or self.total_cgst > 0
+
+
+class HtmlReceiptRenderer:
+    """Receipt as an HTML fragment (Qt rich text subset)"""
+    name = 'html'
+
+    def render(self, layout: ReceiptLayout) -> str:
+        shop = layout.shop
+        parts = [
+            f"<h3 align='center'>{escape(shop['shop_name'])}</h3>",
+            f"<p align='center'>{escape(shop['address'])}<br>Phone: {escape(shop['phone_number'])}</p>",
+            "<table width='100%'>",
+            f"<tr><td>Bill ID: {layout.bill_id}</td>"
+            f"<td align='right'>Date: {layout.created_at.strftime('%d/%m/%Y %I:%M %p')}</td></tr>",
+            f"<tr><td>Customer: {escape(layout.customer_name)}</td>"
+            f"<td align='right'>{escape(layout.customer_phone)}</td></tr>",
+            "</table><br>",
+            "<table border='1' cellspacing='0' cellpadding='3' width='100%'>",
+            "<tr bgcolor='#e0e0e0'><th>HSN</th><th>Item</th><th>Qty</th><th>Taxable</th>"
+            "<th>SGST</th><th>CGST</th><th>Amount</th></tr>",
+        ]
+        for line in layout.lines:
+            name = escape(line.name)
+            if line.discount_amount:
+                name += f"<br><small>{escape(line.promotion)}: -₹{line.discount_amount:.2f}</small>"
+            parts.append(
+                f"<tr><td>{escape(line.hsn_code)}</td><td>{name}</td>"
+                f"<td align='right'>{line.quantity_label}</td>"
+                f"<td align='right'>₹{line.taxable_amount:.2f}</td>"
+                f"<td align='right'>{line.sgst_percent:g}%<br>₹{line.sgst_amount:.2f}</td>"
+                f"<td align='right'>{line.cgst_percent:g}%<br>₹{line.cgst_amount:.2f}</td>"
+                f"<td align='right'>₹{line.final_price:.2f}</td></tr>")
+        parts.append(
+            f"<tr><td></td><td><b>Total</b></td><td></td>"
+            f"<td align='right'><b>₹{layout.taxable_amount:.2f}</b></td>"
+            f"<td align='right'><b>₹{layout.total_sgst:.2f}</b></td>"
+            f"<td align='right'><b>₹{layout.total_cgst:.2f}</b></td>"
+            f"<td align='right'><b>₹{layout.grand_total:.2f}</b></td></tr></table>")
+        summary = [f"Total Items: {layout.total_items}"]
+        if layout.total_weight > 0:
+            summary.append(f"Total Weight: {layout.total_weight:.2f} kg")
+        if layout.total_discount > 0:
+            summary.append(f"Total Discount: ₹{layout.total_discount:.2f}")
+        for rate_row in layout.rate_rows if layout.has_gst else []:
+            gst_amount = rate_row['sgst_amount'] + rate_row['cgst_amount']
+            summary.append(f"GST {rate_row['gst_rate']:g}%: ₹{rate_row['taxable_amount']:.2f} "
+                           f"+ ₹{gst_amount:.2f}")
+        parts.append(f"<p>{'<br>'.join(summary)}</p>")
+        parts.append(f"<h3 align='center'>GRAND TOTAL: ₹{layout.grand_total:.2f}</h3>")
+        return ''.join(parts)
+
+
+class ReceiptCache:
+    """Receipt layouts and renderer output, memoised per bill id.
+
+    A renderer is any object with a `name` and a `render(layout)` method;
+    its output is kept per (bill id, renderer name), so reprints and
+    reshares of a recent bill cost a dict lookup. Renderers with
+    memoize = False (the full-size bill image, several MB per bill) are
+    run every time and only their layout is shared. Everything is dropped
+    when the shop details change (ReceiptAssets.generation moves on).
+    Rendering runs outside the lock, so the print, share and GUI threads
+    never wait on each other's renderers.
+    """
+
+    MAX_BILLS = 50
+
+    def __init__(self, assets: Optional[ReceiptAssets] = None):
+        self.assets = assets or get_receipt_assets()
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[int, Dict]' = OrderedDict()
+        self._generation = None
+
+    def _entry(self, bill_id, create: bool = True) -> Optional[Dict]:
+        """Cache slot for a bill (caller holds the lock); None for unsaved bills"""
+        if bill_id is None:
+            return None
+        if self._generation != self.assets.generation:
+            self._entries.clear()
+            self._generation = self.assets.generation
+        entry = self._entries.get(bill_id)
+        if entry is None:
+            if not create:
+                return None
+            entry = self._entries[bill_id] = {}
+            while len(self._entries) > self.MAX_BILLS:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(bill_id)
+        return entry
+
+    def layout(self, bill_data: Dict, store: bool = True) -> ReceiptLayout:
+        with self._lock:
+            entry = self._entry(bill_data.get('id'), create=False)
+            layout = entry.get('layout') if entry is not None else None
+        if layout is None:
+            layout = ReceiptLayout.from_bill(bill_data, self.assets)
+            if store:
+                with self._lock:
+                    entry = self._entry(layout.bill_id)
+                    if entry is not None and layout.generation == self._generation:
+                        layout = entry.setdefault('layout', layout)
+        return layout
+
+    def render(self, source: Union[Dict, ReceiptLayout], renderer, store: bool = True):
+        """Renderer output for a bill (given as bill data or an already built layout).
+
+        store=False reuses a cached output but does not keep a new one, for
+        batch runs that would otherwise push recent bills out of the cache.
+        """
+        layout = source if isinstance(source, ReceiptLayout) else self.layout(source, store)
+        if not getattr(renderer, 'memoize', True):
+            return renderer.render(layout)
+        key = ('output', renderer.name)
+        with self._lock:
+            entry = self._entry(layout.bill_id, create=False)
+            if entry is not None and key in entry:
+                return entry[key]
+        output = renderer.render(layout)
+        if store:
+            with self._lock:
+                entry = self._entry(layout.bill_id)
+                if entry is not None and layout.generation == self._generation:
+                    entry[key] = output
+        return output
+
+    def forget(self, bill_id: int):
+        with self._lock:
+            self._entries.pop(bill_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_receipt_cache() -> ReceiptCache:
+    """Return the application-wide receipt render cache"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ReceiptCache()
+        return _shared_cache
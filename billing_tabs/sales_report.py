@@ -1,4 +1,5 @@
 import sys
+import os
 import csv
 from datetime import datetime, date, timedelta
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
@@ -12,6 +13,7 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import matplotlib.dates as mdates
 from data_base.database import Database
+from billing_tabs.gst_returns import Gstr1Return, SETTING_GSTIN, is_valid_gstin
 import numpy as np
 
 class ReportGeneratorThread(QThread):
@@ -149,6 +151,38 @@ class ReportGeneratorThread(QThread):
                 for item in self.report_data['top_items'][:10]:
                     f.write(f"{item['name']}: {item['quantity']} units, ₹{item['revenue']:.2f}\n")
 
+class GstReturnThread(QThread):
+    """Thread for generating GSTR-1 files"""
+    finished = pyqtSignal(bool, str)
+    
+    def __init__(self, gstin, start_date, end_date, path, format_type):
+        super().__init__()
+        self.gstin = gstin
+        self.start_date = start_date
+        self.end_date = end_date
+        self.path = path
+        self.format_type = format_type
+    
+    def run(self):
+        try:
+            gst_return = Gstr1Return.generate(self.gstin, self.start_date, self.end_date)
+            if self.format_type == 'json':
+                gst_return.write_json(self.path)
+            else:
+                gst_return.write_csv(self.path)
+            totals = gst_return.totals()
+            message = (f"GSTR-1 for {gst_return.period[:2]}/{gst_return.period[2:]} exported to {self.path}\n\n"
+                       f"Bills: {totals['bills']}\n"
+                       f"Taxable value: ₹{totals['taxable_amount']:.2f}\n"
+                       f"SGST: ₹{totals['sgst_amount']:.2f}  CGST: ₹{totals['cgst_amount']:.2f}")
+            if gst_return.missing_hsn_lines:
+                message += (f"\n\n{gst_return.missing_hsn_lines} bill line(s) have no HSN code; "
+                            f"fix them before filing.")
+            self.finished.emit(True, message)
+        except Exception as e:
+            self.finished.emit(False, f"Failed to export GSTR-1: {str(e)}")
+
+
 class ChartWidget(QWidget):
     """Custom widget for displaying matplotlib charts"""
     
@@ -502,12 +536,22 @@ class SalesReportWindow(QMainWindow):
         export_pdf_btn.clicked.connect(lambda: self.export_report('pdf'))
         export_pdf_btn.setStyleSheet(self.get_button_style('#f39c12'))
         
+        gstr1_json_btn = QPushButton("GSTR-1 JSON")
+        gstr1_json_btn.clicked.connect(lambda: self.export_gst_return('json'))
+        gstr1_json_btn.setStyleSheet(self.get_button_style('#8e44ad'))
+        
+        gstr1_csv_btn = QPushButton("GSTR-1 CSV")
+        gstr1_csv_btn.clicked.connect(lambda: self.export_gst_return('csv'))
+        gstr1_csv_btn.setStyleSheet(self.get_button_style('#8e44ad'))
+        
         refresh_btn = QPushButton("Refresh Data")
         refresh_btn.clicked.connect(self.load_report_data)
         refresh_btn.setStyleSheet(self.get_button_style('#17a2b8'))
         
         export_layout.addWidget(export_csv_btn)
         export_layout.addWidget(export_pdf_btn)
+        export_layout.addWidget(gstr1_json_btn)
+        export_layout.addWidget(gstr1_csv_btn)
         export_layout.addStretch()
         export_layout.addWidget(self.progress_bar)
         export_layout.addStretch()
@@ -848,6 +892,39 @@ class SalesReportWindow(QMainWindow):
         self.export_thread.finished.connect(self.on_export_finished)
         self.export_thread.start()
     
+    def export_gst_return(self, format_type):
+        """Export GSTR-1 B2C and HSN-wise summaries for the selected date range"""
+        gstin = self.db.get_setting(SETTING_GSTIN, '') or ''
+        if not is_valid_gstin(gstin):
+            QMessageBox.warning(self, "GSTIN Missing", "Please set the shop GSTIN in Admin Settings first.")
+            return
+        if (self.start_date.year, self.start_date.month) != (self.end_date.year, self.end_date.month):
+            reply = QMessageBox.question(
+                self, "GSTR-1",
+                f"The date range covers more than one month; it will be filed for "
+                f"{self.end_date.strftime('%m/%Y')}. Continue?",
+                QMessageBox.Yes | QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                return
+        
+        name = f"GSTR1_{gstin}_{self.end_date.strftime('%m%Y')}"
+        if format_type == 'json':
+            path, _ = QFileDialog.getSaveFileName(self, "Export GSTR-1 as JSON", f"{name}.json",
+                                                  "JSON Files (*.json)")
+        else:
+            folder = QFileDialog.getExistingDirectory(self, "Export GSTR-1 CSV Files to Folder")
+            path = os.path.join(folder, name) if folder else ''
+        
+        if not path:
+            return
+        
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 0)  # Indeterminate progress
+        
+        self.gst_return_thread = GstReturnThread(gstin, self.start_date, self.end_date, path, format_type)
+        self.gst_return_thread.finished.connect(self.on_export_finished)
+        self.gst_return_thread.start()
+    
     def on_export_finished(self, success, message):
         """Handle export completion"""
         self.progress_bar.setVisible(False)
@@ -0,0 +1,84 @@
+from decimal import Decimal
+from typing import Dict, Optional
+
+# Setting keys (app_settings table) and their defaults
+SETTING_PREFIXES = 'scale_barcode_prefixes'
+SETTING_PLU_DIGITS = 'scale_barcode_plu_digits'
+SETTING_VALUE_TYPE = 'scale_barcode_value_type'
+
+DEFAULT_PREFIXES = '20,21,22,23,24,25,26,27,28,29'
+DEFAULT_PLU_DIGITS = 5
+VALUE_WEIGHT = 'weight'  # embedded value is grams
+VALUE_PRICE = 'price'    # embedded value is paise
+
+
+def ean13_check_digit(digits: str) -> int:
+    """Check digit for the first 12 digits of an EAN-13"""
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits[:12]))
+    return (10 - total % 10) % 10
+
+
+def is_valid_ean13(code: str) -> bool:
+    return len(code) == 13 and code.isdigit() and ean13_check_digit(code) == int(code[12])
+
+
+class ScaleReading:
+    """A decoded scale label: PLU plus either a weight (kg) or a price (₹)"""
+    __slots__ = ('barcode', 'plu', 'weight', 'price')
+
+    def __init__(self, barcode: str, plu: str, weight: Optional[Decimal] = None,
+                 price: Optional[Decimal] = None):
+        self.barcode = barcode
+        self.plu = plu
+        self.weight = weight
+        self.price = price
+
+
+class ScaleBarcodeFormat:
+    """Layout of in-store EAN-13 labels printed by weighing scales.
+
+    prefix (2 digits) + PLU (plu_digits) + value (10 - plu_digits digits) + check digit.
+    The value is grams for weight labels or paise for price labels.
+    """
+
+    def __init__(self, prefixes=DEFAULT_PREFIXES, plu_digits: int = DEFAULT_PLU_DIGITS,
+                 value_type: str = VALUE_WEIGHT):
+        if isinstance(prefixes, str):
+            prefixes = [p.strip() for p in prefixes.split(',') if p.strip()]
+        self.prefixes = tuple(prefixes)
+        self.plu_digits = int(plu_digits)
+        self.value_type = value_type if value_type in (VALUE_WEIGHT, VALUE_PRICE) else VALUE_WEIGHT
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, str]) -> 'ScaleBarcodeFormat':
+        try:
+            plu_digits = int(settings.get(SETTING_PLU_DIGITS) or DEFAULT_PLU_DIGITS)
+        except ValueError:
+            plu_digits = DEFAULT_PLU_DIGITS
+        return cls(settings.get(SETTING_PREFIXES) or DEFAULT_PREFIXES,
+                   min(max(plu_digits, 4), 6),
+                   settings.get(SETTING_VALUE_TYPE) or VALUE_WEIGHT)
+
+    def to_settings(self) -> Dict[str, str]:
+        return {
+            SETTING_PREFIXES: ','.join(self.prefixes),
+            SETTING_PLU_DIGITS: str(self.plu_digits),
+            SETTING_VALUE_TYPE: self.value_type,
+        }
+
+    def decode(self, code: str) -> Optional[ScaleReading]:
+        """Decode a scanned code, or return None if it is not a scale label"""
+        code = code.strip()
+        if not is_valid_ean13(code) or not code.startswith(self.prefixes):
+            return None
+        plu = code[2:2 + self.plu_digits]
+        value = int(code[2 + self.plu_digits:12])
+        if self.value_type == VALUE_PRICE:
+            return ScaleReading(code, plu, price=Decimal(value) / 100)
+        return ScaleReading(code, plu, weight=Decimal(value) / 1000)
+
+
+def make_scale_barcode(prefix: str, plu: str, value: int, plu_digits: int = DEFAULT_PLU_DIGITS) -> str:
+    """Build a label code (used for test labels in the mapping dialog)"""
+    body = f"{prefix}{str(plu).zfill(plu_digits)}{str(value).zfill(10 - plu_digits)}"
+    return body + str(ean13_check_digit(body))
@@ -0,0 +1,200 @@
+"""
+GST calculations shared by billing, printing, bill images and the database.
+
+All arithmetic is done with Decimal and rounded to paise with ROUND_HALF_UP.
+Prices in QuickBill are tax inclusive (the shop enters the final price and
+the base price is derived from it), so a line is computed the way the
+customer sees it:
+
+    unit price (incl. GST) = base price * (1 + GST%)      rounded to paise
+    gross amount           = quantity * unit price          rounded to paise
+    line total             = gross amount - discount
+    taxable value          = line total / (1 + GST%)        rounded to paise
+    GST                    = line total - taxable value, split into SGST/CGST
+
+so the printed total always matches the shelf price, discounts reduce the
+taxable value (GST is charged on the discounted price), and every output
+that sums stored line values (receipt, image, database, reports) agrees.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, List
+
+PAISE = Decimal('0.01')
+BASE_PRICE_PLACES = Decimal('0.000001')
+HUNDRED = Decimal(100)
+ZERO = Decimal(0)
+
+
+def to_decimal(value) -> Decimal:
+    """Convert a float/int/str to Decimal without binary float artefacts"""
+    if isinstance(value, Decimal):
+        return value
+    if value is None or value == '':
+        return ZERO
+    return Decimal(str(value))
+
+
+def money(value) -> Decimal:
+    """Round to paise"""
+    return to_decimal(value).quantize(PAISE, rounding=ROUND_HALF_UP)
+
+
+def base_from_inclusive(total_price, sgst_percent, cgst_percent) -> float:
+    """Derive the base (pre-GST) unit price from a GST-inclusive price"""
+    rate = to_decimal(sgst_percent) + to_decimal(cgst_percent)
+    base = to_decimal(total_price) * HUNDRED / (HUNDRED + rate)
+    return float(base.quantize(BASE_PRICE_PLACES, rounding=ROUND_HALF_UP))
+
+
+def inclusive_unit_price(base_price, sgst_percent, cgst_percent) -> Decimal:
+    """GST-inclusive unit price, rounded to paise"""
+    rate = to_decimal(sgst_percent) + to_decimal(cgst_percent)
+    return money(to_decimal(base_price) * (HUNDRED + rate) / HUNDRED)
+
+
+def compute_line(quantity, base_price, sgst_percent, cgst_percent, discount=0,
+                 gross=None) -> Dict[str, Decimal]:
+    """Compute the amounts for one bill line (discount is in ₹, GST inclusive).
+
+    gross overrides quantity × unit price, for lines sold at a fixed printed
+    amount such as price-embedded scale labels.
+    """
+    sgst_rate = to_decimal(sgst_percent)
+    cgst_rate = to_decimal(cgst_percent)
+    rate = sgst_rate + cgst_rate
+    unit_price = inclusive_unit_price(base_price, sgst_rate, cgst_rate)
+    if gross is None:
+        gross_amount = money(to_decimal(quantity) * unit_price)
+    else:
+        gross_amount = money(gross)
+    discount_amount = min(money(discount), gross_amount)
+    final_price = gross_amount - discount_amount
+    taxable = money(final_price * HUNDRED / (HUNDRED + rate))
+    tax = final_price - taxable
+    sgst_amount = money(tax * sgst_rate / rate) if rate else ZERO
+    cgst_amount = tax - sgst_amount
+    return {
+        'unit_price': unit_price,
+        'gross_amount': gross_amount,
+        'discount_amount': discount_amount,
+        'taxable_amount': taxable,
+        'sgst_amount': sgst_amount,
+        'cgst_amount': cgst_amount,
+        'final_price': final_price,
+    }
+
+
+def apply_line_totals(item: Dict) -> Dict:
+    """Fill sgst_amount, cgst_amount, taxable_amount and final_price on a bill item dict
+
+    Rows carrying label_price (the amount printed on a scale label) are
+    charged exactly that amount before discount.
+    """
+    line = compute_line(item['quantity'], item['base_price'],
+                        item.get('sgst_percent', 0), item.get('cgst_percent', 0),
+                        item.get('discount_amount', 0), item.get('label_price'))
+    item['discount_amount'] = float(line['discount_amount'])
+    item['taxable_amount'] = float(line['taxable_amount'])
+    item['sgst_amount'] = float(line['sgst_amount'])
+    item['cgst_amount'] = float(line['cgst_amount'])
+    item['final_price'] = float(line['final_price'])
+    return item
+
+
+def line_taxable(item: Dict) -> Decimal:
+    """Taxable value of a computed line (also works for bills loaded from the database)"""
+    if 'taxable_amount' in item:
+        return money(item['taxable_amount'])
+    return (money(item.get('final_price', 0)) - money(item.get('sgst_amount', 0))
+            - money(item.get('cgst_amount', 0)))
+
+
+def cart_totals(items: Iterable[Dict]) -> Dict:
+    """Sum already-computed lines in one pass.
+
+    Lines are computed once when they change (apply_line_totals), so a cart
+    change costs one line computation plus this cheap summation.
+    """
+    taxable = ZERO
+    sgst = ZERO
+    cgst = ZERO
+    total = ZERO
+    discount = ZERO
+    total_weight = ZERO
+    count = 0
+    for item in items:
+        count += 1
+        taxable += line_taxable(item)
+        discount += money(item.get('discount_amount', 0))
+        sgst += money(item.get('sgst_amount', 0))
+        cgst += money(item.get('cgst_amount', 0))
+        total += money(item.get('final_price', 0))
+        if item.get('item_type') == 'loose':
+            total_weight += to_decimal(item.get('quantity', 0))
+    return {
+        'total_items': count,
+        'taxable_amount': float(taxable),
+        'total_sgst': float(sgst),
+        'total_cgst': float(cgst),
+        'total_amount': float(total),
+        'total_discount': float(discount),
+        'total_weight': float(total_weight),
+    }
+
+
+def compute_cart(items: List[Dict]) -> Dict:
+    """Recompute every line of a cart and return its totals"""
+    for item in items:
+        apply_line_totals(item)
+    return cart_totals(items)
+
+
+def hsn_summary(items: Iterable[Dict]) -> List[Dict]:
+    """Group lines by HSN code and GST rate (as required on GST invoices and returns)"""
+    groups: Dict = {}
+    for item in items:
+        sgst_percent = to_decimal(item.get('sgst_percent', 0))
+        cgst_percent = to_decimal(item.get('cgst_percent', 0))
+        key = (item.get('hsn_code', '') or '', sgst_percent, cgst_percent)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'quantity': ZERO, 'taxable': ZERO, 'sgst': ZERO, 'cgst': ZERO, 'total': ZERO
+            }
+        group['quantity'] += to_decimal(item.get('quantity', 0))
+        group['taxable'] += line_taxable(item)
+        group['sgst'] += money(item.get('sgst_amount', 0))
+        group['cgst'] += money(item.get('cgst_amount', 0))
+        group['total'] += money(item.get('final_price', 0))
+    return [
+        {
+            'hsn_code': hsn_code,
+            'gst_rate': float(sgst_percent + cgst_percent),
+            'sgst_percent': float(sgst_percent),
+            'cgst_percent': float(cgst_percent),
+            'quantity': float(group['quantity']),
+            'taxable_amount': float(group['taxable']),
+            'sgst_amount': float(group['sgst']),
+            'cgst_amount': float(group['cgst']),
+            'total_amount': float(group['total']),
+        }
+        for (hsn_code, sgst_percent, cgst_percent), group in sorted(
+            groups.items(), key=lambda entry: (entry[0][0], entry[0][1] + entry[0][2]))
+    ]
+
+
+def rate_summary(items: Iterable[Dict]) -> List[Dict]:
+    """Group lines by total GST rate only"""
+    by_rate: Dict = {}
+    for row in hsn_summary(items):
+        group = by_rate.setdefault(row['gst_rate'], {
+            'gst_rate': row['gst_rate'], 'taxable_amount': ZERO,
+            'sgst_amount': ZERO, 'cgst_amount': ZERO, 'total_amount': ZERO
+        })
+        for field in ('taxable_amount', 'sgst_amount', 'cgst_amount', 'total_amount'):
+            group[field] += to_decimal(row[field])
+    return [
+        {key: (float(value) if isinstance(value, Decimal) else value) for key, value in group.items()}
+        for _, group in sorted(by_rate.items())
+    ]
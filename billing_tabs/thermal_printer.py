@@ -1,183 +1,441 @@
-from escpos.printer import Usb, Serial, Network
+from escpos.printer import Usb, Serial, Network, Dummy
 from escpos.exceptions import Error as EscposError
 from datetime import datetime
 from typing import Dict, List, Optional
 import os
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
 from data_base.database import Database
+from billing_tabs.receipt_assets import ReceiptAssets, get_receipt_assets
+from billing_tabs.receipt_layout import ReceiptLayout, get_receipt_cache
+from billing_tabs.virtual_printer import default_output_dir, get_virtual_printer
+
+# Setting keys (app_settings table)
+SETTING_CONNECTION = 'printer_connection'
+SETTING_USB_VENDOR = 'printer_usb_vendor'
+SETTING_USB_PRODUCT = 'printer_usb_product'
+SETTING_SERIAL_PORT = 'printer_serial_port'
+SETTING_SERIAL_BAUDRATE = 'printer_serial_baudrate'
+SETTING_NETWORK_HOST = 'printer_network_host'
+SETTING_NETWORK_PORT = 'printer_network_port'
+SETTING_VIRTUAL_OUTPUT = 'printer_virtual_output'
+SETTING_VIRTUAL_BAUDRATE = 'printer_virtual_baudrate'
+SETTING_VIRTUAL_LATENCY_MS = 'printer_virtual_latency_ms'
+SETTING_VIRTUAL_PAPER_OUT_AFTER = 'printer_virtual_paper_out_after'
+
+CONNECTION_NONE = 'none'
+CONNECTION_USB = 'usb'
+CONNECTION_SERIAL = 'serial'
+CONNECTION_NETWORK = 'network'
+CONNECTION_VIRTUAL = 'virtual'
+CONNECTION_TYPES = {
+    CONNECTION_USB: "USB",
+    CONNECTION_SERIAL: "Serial",
+    CONNECTION_NETWORK: "Network (LAN/Wi-Fi)",
+    CONNECTION_VIRTUAL: "Virtual (testing, no hardware)",
+    CONNECTION_NONE: "No printer",
+}
+DEFAULT_USB_VENDOR = 0x04b8
+DEFAULT_USB_PRODUCT = 0x0202
+
+
+def parse_int_setting(value, default: int) -> int:
+    """Parse '0x04b8', '04b8h' style hex ids or plain integers"""
+    text = str(value or '').strip().lower()
+    if not text:
+        return default
+    try:
+        if text.startswith('0x'):
+            return int(text, 16)
+        if text.endswith('h'):
+            return int(text[:-1], 16)
+        return int(text)
+    except ValueError:
+        return default
+
+
+class PrinterConfig:
+    """Where the thermal printer is attached, as saved in app_settings"""
+
+    def __init__(self, connection: str = CONNECTION_USB, usb_vendor: int = DEFAULT_USB_VENDOR,
+                 usb_product: int = DEFAULT_USB_PRODUCT, serial_port: str = "COM1",
+                 serial_baudrate: int = 9600, network_host: str = "", network_port: int = 9100,
+                 virtual_output: str = "", virtual_baudrate: int = 0, virtual_latency_ms: int = 0,
+                 virtual_paper_out_after: int = 0):
+        self.connection = connection if connection in CONNECTION_TYPES else CONNECTION_USB
+        self.usb_vendor = usb_vendor
+        self.usb_product = usb_product
+        self.serial_port = serial_port
+        self.serial_baudrate = serial_baudrate
+        self.network_host = network_host
+        self.network_port = network_port
+        # Virtual printer: blank output means data_base/virtual_printer, 0 disables a simulation
+        self.virtual_output = virtual_output
+        self.virtual_baudrate = virtual_baudrate
+        self.virtual_latency_ms = virtual_latency_ms
+        self.virtual_paper_out_after = virtual_paper_out_after
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, str]) -> 'PrinterConfig':
+        # No saved settings means the original default: an Epson USB printer
+        return cls(settings.get(SETTING_CONNECTION) or CONNECTION_USB,
+                   parse_int_setting(settings.get(SETTING_USB_VENDOR), DEFAULT_USB_VENDOR),
+                   parse_int_setting(settings.get(SETTING_USB_PRODUCT), DEFAULT_USB_PRODUCT),
+                   (settings.get(SETTING_SERIAL_PORT) or "COM1").strip(),
+                   parse_int_setting(settings.get(SETTING_SERIAL_BAUDRATE), 9600),
+                   (settings.get(SETTING_NETWORK_HOST) or "").strip(),
+                   parse_int_setting(settings.get(SETTING_NETWORK_PORT), 9100),
+                   (settings.get(SETTING_VIRTUAL_OUTPUT) or "").strip(),
+                   parse_int_setting(settings.get(SETTING_VIRTUAL_BAUDRATE), 0),
+                   parse_int_setting(settings.get(SETTING_VIRTUAL_LATENCY_MS), 0),
+                   parse_int_setting(settings.get(SETTING_VIRTUAL_PAPER_OUT_AFTER), 0))
+
+    def to_settings(self) -> Dict[str, str]:
+        return {
+            SETTING_CONNECTION: self.connection,
+            SETTING_USB_VENDOR: f"0x{self.usb_vendor:04x}",
+            SETTING_USB_PRODUCT: f"0x{self.usb_product:04x}",
+            SETTING_SERIAL_PORT: self.serial_port,
+            SETTING_SERIAL_BAUDRATE: str(self.serial_baudrate),
+            SETTING_NETWORK_HOST: self.network_host,
+            SETTING_NETWORK_PORT: str(self.network_port),
+            SETTING_VIRTUAL_OUTPUT: self.virtual_output,
+            SETTING_VIRTUAL_BAUDRATE: str(self.virtual_baudrate),
+            SETTING_VIRTUAL_LATENCY_MS: str(self.virtual_latency_ms),
+            SETTING_VIRTUAL_PAPER_OUT_AFTER: str(self.virtual_paper_out_after),
+        }
+
+    def describe(self) -> str:
+        if self.connection == CONNECTION_USB:
+            return f"USB {self.usb_vendor:04x}:{self.usb_product:04x}"
+        if self.connection == CONNECTION_SERIAL:
+            return f"Serial {self.serial_port} @ {self.serial_baudrate}"
+        if self.connection == CONNECTION_NETWORK:
+            return f"Network {self.network_host}:{self.network_port}"
+        if self.connection == CONNECTION_VIRTUAL:
+            speed = f" @ {self.virtual_baudrate}" if self.virtual_baudrate else ""
+            return f"Virtual {self.virtual_output or default_output_dir()}{speed}"
+        return "No printer"
+
+
+class EscPosReceiptRenderer:
+    """Renders a ReceiptLayout to ESC/POS bytes for a 32-column printer.
+
+    The shop logo and location QR are the raster bytes precomputed by
+    ReceiptAssets, spliced in as-is.
+    """
+    name = 'escpos'
+
+    def __init__(self, assets: Optional[ReceiptAssets] = None):
+        self.assets = assets or get_receipt_assets()
+        self._lock = threading.Lock()
+        # (assets generation, encoded bytes)
+        self._header = None
+        self._footer = None
+
+    def _header_bytes(self, layout: ReceiptLayout) -> bytes:
+        """Shop header, encoded once per shop details change"""
+        with self._lock:
+            if self._header is None or self._header[0] != layout.generation:
+                p = Dummy()
+                p._raw(self.assets.escpos_logo())
+                p.set(align='center', font='a', bold=True, double_height=True)
+                p.text(f"{layout.shop['shop_name']}\n")
+                p.set(align='center', font='a', bold=False, double_height=False)
+                p.text(f"{layout.shop['address']}\n")
+                p.text(f"Phone: {layout.shop['phone_number']}\n")
+                p.text("-" * 32 + "\n")
+                self._header = (layout.generation, p.output)
+            return self._header[1]
+
+    def _footer_bytes(self, layout: ReceiptLayout) -> bytes:
+        """Location QR, closing lines and paper cut, encoded once per shop details change"""
+        with self._lock:
+            if self._footer is None or self._footer[0] != layout.generation:
+                p = Dummy()
+                p.set(align='center')
+                qr = self.assets.escpos_qr()
+                if qr:
+                    p._raw(qr)
+                    p.text("Scan QR for location\n")
+                p.text("Thank you for shopping!\n")
+                p.text("Visit us again!\n")
+                # Cut paper
+                p.cut()
+                self._footer = (layout.generation, p.output)
+            return self._footer[1]
+
+    def render(self, layout: ReceiptLayout) -> bytes:
+        p = Dummy()
+        # Bill details
+        p.set(align='left', font='a', bold=False)
+        p.text(f"Bill ID: {layout.bill_id}\n")
+        p.text(f"Date: {layout.created_at.strftime('%d/%m/%Y %H:%M:%S')}\n")
+        p.text("-" * 32 + "\n")
+        # Items header as table
+        p.set(bold=True)
+        p.text(f"{'Name':<10}{'Qty':>5}{'Rate':>7}{'Amount':>8}\n")
+        p.set(bold=False)
+        p.text("-" * 32 + "\n")
+        # Items as table rows
+        for line in layout.lines:
+            name = line.name[:10]
+            name_hsn = f"{name} (HSN: {line.hsn_code})" if line.hsn_code else name
+            # Print item line with HSN code beside name
+            p.text(f"{name_hsn:<22}{line.quantity_label:>5}{line.base_price:>7.2f}{line.final_price:>8.2f}\n")
+            if line.discount_amount:
+                p.text(f"  {line.promotion[:20]:<20}{-line.discount_amount:>10.2f}\n")
+        p.text("-" * 32 + "\n")
+        # Bill summary
+        p.set(bold=True)
+        p.text("BILL SUMMARY\n")
+        p.set(bold=False)
+        p.text(f"Total Items: {layout.total_items}\n")
+        if layout.total_weight > 0:
+            p.text(f"Total Weight: {layout.total_weight:.2f}kg\n")
+        if layout.total_discount > 0:
+            p.text(f"Total Discount: ₹{layout.total_discount:.2f}\n")
+        p.text(f"Base Amount: ₹{layout.taxable_amount:.2f}\n")
+        if layout.total_sgst > 0:
+            p.text(f"Total SGST: ₹{layout.total_sgst:.2f}\n")
+        if layout.total_cgst > 0:
+            p.text(f"Total CGST: ₹{layout.total_cgst:.2f}\n")
+        if layout.has_gst:
+            # GST breakup per rate (taxable value + tax)
+            for rate_row in layout.rate_rows:
+                gst_amount = rate_row['sgst_amount'] + rate_row['cgst_amount']
+                p.text(f"GST {rate_row['gst_rate']:g}%: "
+                       f"{rate_row['taxable_amount']:.2f} + {gst_amount:.2f}\n")
+        p.text("-" * 32 + "\n")
+        p.set(bold=True, double_height=True)
+        p.text(f"GRAND TOTAL: ₹{layout.grand_total:.2f}\n")
+        p.set(bold=False, double_height=False)
+        p.text("-" * 32 + "\n")
+        return self._header_bytes(layout) + p.output + self._footer_bytes(layout)
+
 
 class ThermalPrinter:
-    def __init__(self):
+    """Owns one long-lived connection to the receipt printer.
+
+    The device is opened on first use and kept open between prints. All
+    printer I/O is serialised by a lock (print lane, health monitor and
+    test prints may run on different threads). When a print or probe fails
+    the handle is closed, and the next print or health check reconnects.
+    Receipts are encoded into one ESC/POS buffer (escpos Dummy printer) and
+    sent with a single write, so a receipt is either sent whole or not at all.
+    """
+    NETWORK_TIMEOUT = 10  # seconds
+
+    def __init__(self, config: Optional[PrinterConfig] = None):
         self.printer = None
         self.is_connected = False
+        self.is_online = True  # result of the last health probe
+        self.status = "Not connected"
+        self._lock = threading.RLock()
         self.db = Database()
+        self.config = config or PrinterConfig.from_settings(self.db.get_settings('printer_'))
+        self.assets = get_receipt_assets()
+        self.receipt_renderer = EscPosReceiptRenderer(self.assets)
         self.load_shop_details()
     
     def load_shop_details(self):
-        """Load shop details from database"""
-        try:
-            admin_details = self.db.get_admin_details()
-            if admin_details:
-                self.shop_name = admin_details.get('shop_name', 'Your Shop Name')
-                self.shop_address = admin_details.get('address', 'Your Shop Address')
-                self.shop_phone = admin_details.get('phone_number', 'Your Phone Number')
-            else:
-                # Fallback to defaults if no admin details found
-                self.shop_name = "Your Shop Name"
-                self.shop_address = "Your Shop Address"
-                self.shop_phone = "Your Phone Number"
-        except Exception as e:
-            print(f"Error loading shop details: {e}")
-            # Fallback to defaults
-            self.shop_name = "Your Shop Name"
-            self.shop_address = "Your Shop Address"
-            self.shop_phone = "Your Phone Number"
+        """Load shop details from the shared receipt asset cache"""
+        shop = self.assets.shop_details()
+        self.shop_name = shop['shop_name']
+        self.shop_address = shop['address']
+        self.shop_phone = shop['phone_number']
         
-    def connect_usb_printer(self, vendor_id: int = 0x04b8, product_id: int = 0x0202):
+    def configure(self, config: PrinterConfig):
+        """Switch to new connection settings; the old handle is closed"""
+        with self._lock:
+            self.close_connection()
+            self.config = config
+            self.status = "Not connected"
+    
+    def _open(self, device_factory, description: str) -> bool:
+        with self._lock:
+            self.close_connection()
+            try:
+                self.printer = device_factory()
+                self.is_connected = True
+                self.status = f"Connected ({description})"
+                return True
+            except Exception as e:
+                print(f"{description} connection failed: {e}")
+                self.status = f"Printer error: {e}"
+                return False
+    
+    def connect_usb_printer(self, vendor_id: int = DEFAULT_USB_VENDOR, product_id: int = DEFAULT_USB_PRODUCT):
         """Connect to USB thermal printer"""
-        try:
-            self.printer = Usb(vendor_id, product_id)
-            self.is_connected = True
-            return True
-        except Exception as e:
-            print(f"USB connection failed: {e}")
-            return False
+        return self._open(lambda: Usb(vendor_id, product_id), f"USB {vendor_id:04x}:{product_id:04x}")
     
     def connect_serial_printer(self, port: str = "COM1", baudrate: int = 9600):
         """Connect to Serial thermal printer"""
-        try:
-            self.printer = Serial(port, baudrate)
-            self.is_connected = True
-            return True
-        except Exception as e:
-            print(f"Serial connection failed: {e}")
-            return False
+        return self._open(lambda: Serial(port, baudrate), f"Serial {port}")
     
     def connect_network_printer(self, host: str, port: int = 9100):
         """Connect to Network thermal printer"""
-        try:
-            self.printer = Network(host, port)
-            self.is_connected = True
+        return self._open(lambda: Network(host, port, timeout=self.NETWORK_TIMEOUT), f"Network {host}:{port}")
+    
+    def connect_virtual_printer(self, output: str = "", baudrate: int = 0, latency_ms: int = 0,
+                                paper_out_after: int = 0):
+        """Connect to a software printer that captures receipts to files"""
+        return self._open(lambda: get_virtual_printer(output or default_output_dir(), baudrate,
+                                                      latency_ms / 1000, paper_out_after or None),
+                          "Virtual")
+    
+    def connect(self) -> bool:
+        """Open the printer configured in settings"""
+        config = self.config
+        if config.connection == CONNECTION_USB:
+            return self.connect_usb_printer(config.usb_vendor, config.usb_product)
+        if config.connection == CONNECTION_SERIAL:
+            return self.connect_serial_printer(config.serial_port, config.serial_baudrate)
+        if config.connection == CONNECTION_NETWORK and config.network_host:
+            return self.connect_network_printer(config.network_host, config.network_port)
+        if config.connection == CONNECTION_VIRTUAL:
+            return self.connect_virtual_printer(config.virtual_output, config.virtual_baudrate,
+                                                config.virtual_latency_ms, config.virtual_paper_out_after)
+        self.status = "Not configured"
+        return False
+    
+    def ensure_connected(self) -> bool:
+        """Reuse the open connection, or reconnect if it was never opened or was dropped"""
+        with self._lock:
+            if self.is_connected and self.printer:
+                return True
+            return self.connect()
+    
+    def _connection_lost(self, error):
+        """Drop a handle that failed mid-operation so the next use reconnects"""
+        print(f"Printer connection lost: {error}")
+        self.close_connection()
+        self.status = f"Disconnected: {error}"
+    
+    def check_health(self) -> bool:
+        """Probe the printer, reconnecting if needed. Safe to call from a background thread."""
+        with self._lock:
+            self.is_online = False
+            if not self.ensure_connected():
+                return False
+            try:
+                is_online = getattr(self.printer, 'is_online', None)
+                if is_online is not None and not is_online():
+                    self.status = "Offline (check paper/cover)"
+                    return False
+            except NotImplementedError:
+                pass  # Device cannot report status; an open handle is the best we know
+            except Exception as e:
+                self._connection_lost(e)
+                return False
+            self.is_online = True
+            self.status = f"Connected ({self.config.describe()})"
             return True
-        except Exception as e:
-            print(f"Network connection failed: {e}")
-            return False
     
     def test_connection(self) -> bool:
         """Test printer connection"""
-        if not self.is_connected or not self.printer:
-            return False
-        
-        try:
-            self.printer.text("Test\n")
-            self.printer.cut()
-            return True
-        except Exception as e:
-            print(f"Test failed: {e}")
-            return False
+        p = Dummy()
+        p.text("Test\n")
+        p.cut()
+        return self.write_raw(p.output)
     
     def print_bill(self, bill_data: Dict) -> bool:
-        """Print a formatted bill with GST details"""
-        if not self.is_connected or not self.printer:
-            return False
+        """Print a formatted bill with GST details in a single write"""
         try:
-            # Set font and alignment
-            self.printer.set(align='center', font='a', bold=True, double_height=True)
-            self.printer.text(f"{self.shop_name}\n")
-            self.printer.set(align='center', font='a', bold=False, double_height=False)
-            self.printer.text(f"{self.shop_address}\n")
-            self.printer.text(f"Phone: {self.shop_phone}\n")
-            self.printer.text("-" * 32 + "\n")
-            # Bill details
-            self.printer.set(align='left', font='a', bold=False)
-            self.printer.text(f"Bill ID: {bill_data['id']}\n")
-            self.printer.text(f"Date: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
-            self.printer.text("-" * 32 + "\n")
-            # Items header as table
-            self.printer.set(bold=True)
-            self.printer.text(f"{'Name':<10}{'Qty':>5}{'Rate':>7}{'Amount':>8}\n")
-            self.printer.set(bold=False)
-            self.printer.text("-" * 32 + "\n")
-            # Items as table rows
-            total_base_amount = 0
-            total_sgst_amount = 0
-            total_cgst_amount = 0
-            for item in bill_data['items']:
-                name = item['name'][:10] if len(item['name']) > 10 else item['name']
-                hsn_code = item.get('hsn_code', '')
-                name_hsn = f"{name} (HSN: {hsn_code})" if hsn_code else name
-                qty = f"{item['quantity']:.2f}"
-                if item['item_type'] == 'loose':
-                    qty += "kg"
-                rate = f"{item['base_price']:.2f}"
-                amount = f"{item.get('final_price', 0):.2f}"
-                # Print item line with HSN code beside name
-                self.printer.text(f"{name_hsn:<22}{qty:>5}{rate:>7}{amount:>8}\n")
-                
-                # Add to totals
-                sgst_amt = item.get('sgst_amount', 0)
-                cgst_amt = item.get('cgst_amount', 0)
-                total_base_amount += item['quantity'] * item['base_price']
-                total_sgst_amount += sgst_amt
-                total_cgst_amount += cgst_amt
-            self.printer.text("-" * 32 + "\n")
-            # Bill summary
-            self.printer.set(bold=True)
-            self.printer.text("BILL SUMMARY\n")
-            self.printer.set(bold=False)
-            self.printer.text(f"Total Items: {bill_data['total_items']}\n")
-            if bill_data.get('total_weight', 0) > 0:
-                self.printer.text(f"Total Weight: {bill_data['total_weight']:.2f}kg\n")
-            self.printer.text(f"Base Amount: ₹{total_base_amount:.2f}\n")
-            if total_sgst_amount > 0:
-                self.printer.text(f"Total SGST: ₹{total_sgst_amount:.2f}\n")
-            if total_cgst_amount > 0:
-                self.printer.text(f"Total CGST: ₹{total_cgst_amount:.2f}\n")
-            self.printer.text("-" * 32 + "\n")
-            self.printer.set(bold=True, double_height=True)
-            self.printer.text(f"GRAND TOTAL: ₹{bill_data['total_amount']:.2f}\n")
-            self.printer.set(bold=False, double_height=False)
-            self.printer.text("-" * 32 + "\n")
-            self.printer.set(align='center')
-            self.printer.text("Thank you for shopping!\n")
-            self.printer.text("Visit us again!\n")
-            # Cut paper
-            self.printer.cut()
-            return True
+            data = self.build_receipt(bill_data)
         except Exception as e:
-            print(f"Print failed: {e}")
+            print(f"Could not build receipt: {e}")
             return False
+        return self.write_raw(data)
+    
+    def write_raw(self, data: bytes) -> bool:
+        """Send a pre-encoded ESC/POS buffer to the printer in one write"""
+        with self._lock:
+            if not self.ensure_connected():
+                return False
+            try:
+                self.printer._raw(data)
+                return True
+            except Exception as e:
+                print(f"Print failed: {e}")
+                self._connection_lost(e)
+                return False
+    
+    def build_receipt(self, bill_data: Dict) -> bytes:
+        """Encode a complete receipt as one ESC/POS buffer (memoised per bill id)"""
+        return get_receipt_cache().render(bill_data, self.receipt_renderer)
     
     def print_test_page(self) -> bool:
         """Print a test page"""
-        if not self.is_connected or not self.printer:
-            return False
-        
-        try:
-            self.printer.set(align='center', font='a', bold=True, double_height=True)
-            self.printer.text("TEST PAGE\n")
-            self.printer.set(align='center', font='a', bold=False, double_height=False)
-            self.printer.text(f"{self.shop_name}\n")
-            self.printer.text("-" * 32 + "\n")
-            self.printer.text(f"Date: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
-            self.printer.text("Printer is working correctly!\n")
-            self.printer.text("GST-enabled billing system\n")
-            self.printer.text("-" * 32 + "\n")
-            self.printer.cut()
-            return True
-        except Exception as e:
-            print(f"Test print failed: {e}")
-            return False
+        p = Dummy()
+        p.set(align='center', font='a', bold=True, double_height=True)
+        p.text("TEST PAGE\n")
+        p.set(align='center', font='a', bold=False, double_height=False)
+        p.text(f"{self.shop_name}\n")
+        p.text("-" * 32 + "\n")
+        p.text(f"Date: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
+        p.text("Printer is working correctly!\n")
+        p.text("GST-enabled billing system\n")
+        p.text("-" * 32 + "\n")
+        p.cut()
+        return self.write_raw(p.output)
     
     def refresh_shop_details(self):
         """Refresh shop details from database (useful after admin settings changes)"""
+        self.assets.invalidate()
         self.load_shop_details()
+        # Dither the logo and QR now rather than on the next print
+        self.assets.build_escpos_assets()
     
     def close_connection(self):
         """Close printer connection"""
-        if self.printer:
-            try:
-                self.printer.close()
-            except:
-                pass
-        self.is_connected = False
-        self.printer = None
\ No newline at end of file
+        with self._lock:
+            if self.printer:
+                try:
+                    self.printer.close()
+                except:
+                    pass
+            self.is_connected = False
+            self.printer = None
+    
+    def shutdown(self):
+        """Release the device on application exit"""
+        self.close_connection()
+        self.status = "Closed"
+
+
+class PrinterHealthMonitor(QThread):
+    """Probes the printer every PROBE_INTERVAL seconds on a background thread,
+    reconnecting a dropped or unplugged printer before the next bill is printed."""
+    status_changed = pyqtSignal(bool, str)
+
+    PROBE_INTERVAL = 30
+
+    def __init__(self, printer: ThermalPrinter, parent=None):
+        super().__init__(parent)
+        self.printer = printer
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+
+    def probe_now(self):
+        """Run a probe immediately (e.g. after the settings changed)"""
+        self._wake_event.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+        self.wait(3000)
+
+    def run(self):
+        last = None
+        while not self._stop_event.is_set():
+            if self.printer.config.connection == CONNECTION_NONE:
+                healthy = False
+                self.printer.status = "Not configured"
+            else:
+                healthy = self.printer.check_health()
+            if (healthy, self.printer.status) != last:
+                last = (healthy, self.printer.status)
+                self.status_changed.emit(healthy, self.printer.status)
+            self._wake_event.wait(self.PROBE_INTERVAL)
+            self._wake_event.clear()
\ No newline at end of file
@@ -0,0 +1,388 @@
+import argparse
+import os
+import socketserver
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from data_base.database import app_dir
+
+ESC = 0x1b
+GS = 0x1d
+DLE = 0x10
+FS = 0x1c
+
+# ESC t n -> Python codec, for decoding captured text
+CODEPAGES = {0: 'cp437', 2: 'cp850', 3: 'cp860', 4: 'cp863', 5: 'cp865', 16: 'cp1252',
+             17: 'cp866', 18: 'cp852', 19: 'cp858'}
+
+# DLE EOT n replies (bit 3 of the online status is set when offline,
+# bits 5/6 of the paper status when the roll is out)
+STATUS_ONLINE = b'\x12'
+STATUS_OFFLINE = b'\x1a'
+STATUS_PAPER_OK = b'\x12'
+STATUS_PAPER_OUT = b'\x72'
+
+
+class PaperOutError(IOError):
+    pass
+
+
+def default_output_dir() -> str:
+    return os.path.join(app_dir(), 'data_base', 'virtual_printer')
+
+
+class VirtualPrinter:
+    """Software printer with the device interface ThermalPrinter uses (_raw, is_online, close).
+
+    Each write is one receipt: it is kept in `receipts` and, if output is
+    set, saved to disk (a directory gets one .prn file per receipt, any
+    other path is appended to as one stream). baudrate throttles writes
+    like a serial line (10 bits per byte, 0 = unthrottled), latency adds
+    a fixed delay per write, and paper_out_after makes the printer go
+    offline after that many receipts until reload_paper() is called.
+    """
+
+    def __init__(self, output: Optional[str] = None, baudrate: int = 0, latency: float = 0.0,
+                 paper_out_after: Optional[int] = None):
+        self.output = output
+        self.baudrate = baudrate
+        self.latency = latency
+        self.paper_out_after = paper_out_after
+        self.receipts: List[bytes] = []
+        self.bytes_written = 0
+        self.busy_seconds = 0.0
+        self._printed_since_reload = 0
+        self._lock = threading.Lock()
+        self.closed = False
+
+    @property
+    def paper_out(self) -> bool:
+        return self.paper_out_after is not None and self._printed_since_reload >= self.paper_out_after
+
+    def open(self):
+        self.closed = False
+
+    def reload_paper(self):
+        self._printed_since_reload = 0
+
+    def is_online(self) -> bool:
+        return not self.closed and not self.paper_out
+
+    def _raw(self, data: bytes):
+        with self._lock:
+            if self.closed:
+                raise IOError("Virtual printer is closed")
+            if self.paper_out:
+                raise PaperOutError("Paper out")
+            started = time.perf_counter()
+            delay = self.latency
+            if self.baudrate:
+                delay += len(data) * 10 / self.baudrate
+            if delay > 0:
+                time.sleep(delay)
+            self._save(data)
+            self.receipts.append(bytes(data))
+            self.bytes_written += len(data)
+            self._printed_since_reload += 1
+            self.busy_seconds += time.perf_counter() - started
+
+    def _save(self, data: bytes):
+        if not self.output:
+            return
+        if os.path.isdir(self.output) or not os.path.splitext(self.output)[1]:
+            os.makedirs(self.output, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            path = os.path.join(self.output, f"receipt_{stamp}_{len(self.receipts) + 1}.prn")
+            with open(path, 'wb') as f:
+                f.write(data)
+        else:
+            with open(self.output, 'ab') as f:
+                f.write(data)
+
+    def texts(self) -> List[str]:
+        """Captured receipts decoded to plain text"""
+        return [decode_escpos(receipt) for receipt in self.receipts]
+
+    def close(self):
+        self.closed = True
+
+
+_devices: Dict[tuple, VirtualPrinter] = {}
+_devices_lock = threading.Lock()
+
+
+def get_virtual_printer(output: Optional[str] = None, baudrate: int = 0, latency: float = 0.0,
+                        paper_out_after: Optional[int] = None) -> VirtualPrinter:
+    """Shared device per configuration, so captures and a paper-out fault survive reconnects"""
+    key = (output, baudrate, latency, paper_out_after)
+    with _devices_lock:
+        device = _devices.get(key)
+        if device is None:
+            device = _devices[key] = VirtualPrinter(output, baudrate, latency, paper_out_after)
+        device.open()
+        return device
+
+
+def _cut_length(data: bytes, i: int) -> int:
+    """Length of a paper cut command at data[i], or 0 if there is none"""
+    if data[i] == GS and i + 2 < len(data) and data[i + 1] == ord('V'):
+        return 4 if data[i + 2] in (65, 66, 97, 98, 103, 104) else 3
+    if data[i] == ESC and i + 1 < len(data) and data[i + 1] in (ord('i'), ord('m')):
+        return 2
+    return 0
+
+
+def _command_length(data: bytes, i: int) -> int:
+    """Bytes taken by the command (or text byte) at data[i], payload included.
+
+    Raster images, barcodes and GS ( data blocks carry binary payloads that
+    may contain any byte, so streams are scanned command by command with
+    this instead of searching the raw bytes.
+    """
+    n = len(data)
+    byte = data[i]
+    if byte == ESC and i + 1 < n:
+        cmd = chr(data[i + 1])
+        if cmd in '@2im':
+            return 2
+        if cmd == '*' and i + 4 < n:
+            dots = data[i + 3] + data[i + 4] * 256
+            return 5 + dots * (1 if data[i + 2] in (0, 1) else 3)
+        if cmd == '$' or cmd == 'c':
+            return 4
+        if cmd == 'p':
+            return 5
+        return 3  # ESC x n: codepage, alignment, bold, underline, font, feed...
+    if byte == GS and i + 1 < n:
+        cmd = chr(data[i + 1])
+        if cmd == 'V':
+            return _cut_length(data, i) or 3
+        if cmd == 'v' and i + 7 < n:
+            width_bytes = data[i + 4] + data[i + 5] * 256
+            height = data[i + 6] + data[i + 7] * 256
+            return 8 + width_bytes * height
+        if cmd == '(' and i + 4 < n:
+            return 5 + data[i + 3] + data[i + 4] * 256
+        if cmd == 'k' and i + 2 < n:
+            if data[i + 2] <= 6:
+                end = data.find(b'\x00', i + 3)
+                return n - i if end < 0 else end + 1 - i
+            return 4 + (data[i + 3] if i + 3 < n else 0)
+        if cmd in 'LWP':
+            return 4
+        return 3  # GS x n: character size, barcode height/width, HRI...
+    if byte == DLE and i + 1 < n:
+        return 3 if data[i + 1] in (0x04, 0x05) else 5
+    if byte == FS and i + 1 < n:
+        cmd = chr(data[i + 1])
+        return 2 if cmd in '.&' else (4 if cmd == 'p' else 3)
+    return 1
+
+
+def _commands(data: bytes):
+    """Yield (offset, length) of each command and text byte in an ESC/POS stream"""
+    i = 0
+    while i < len(data):
+        length = _command_length(data, i)
+        yield i, length
+        i += length
+
+
+def _ends_with_cut(data: bytes) -> bool:
+    last = None
+    for last, _ in _commands(data):
+        pass
+    return last is not None and _cut_length(data, last) == len(data) - last
+
+
+def split_receipts(data: bytes) -> List[bytes]:
+    """Split an ESC/POS stream into receipts, each ending with its paper cut"""
+    receipts = []
+    start = 0
+    for i, length in _commands(data):
+        if _cut_length(data, i):
+            receipts.append(data[start:i + length])
+            start = i + length
+    if data[start:].strip():
+        receipts.append(data[start:])
+    return receipts
+
+
+def decode_escpos(data: bytes) -> str:
+    """Render an ESC/POS stream as plain text, dropping formatting commands.
+
+    Raster images, barcodes, QR codes and cuts become [image WxH], [barcode],
+    [qr] and [cut] lines so receipts can be compared in tests.
+    """
+    out = []
+    text = bytearray()
+    codec = 'cp437'
+
+    def flush():
+        if text:
+            out.append(text.decode(codec, errors='replace'))
+            text.clear()
+
+    def marker(label):
+        flush()
+        if out and not out[-1].endswith('\n'):
+            out.append('\n')
+        out.append(f"[{label}]\n")
+
+    n = len(data)
+    for i, length in _commands(data):
+        byte = data[i]
+        if byte == ESC and i + 1 < n:
+            cmd = chr(data[i + 1])
+            if cmd in 'im':
+                marker('cut')
+            elif cmd == 't' and i + 2 < n:
+                flush()
+                codec = CODEPAGES.get(data[i + 2], codec)
+            elif cmd == '*' and i + 4 < n:
+                marker(f"image {data[i + 3] + data[i + 4] * 256} dots")
+        elif byte == GS and i + 1 < n:
+            cmd = chr(data[i + 1])
+            if cmd == 'V':
+                marker('cut')
+            elif cmd == 'v' and i + 7 < n:
+                marker(f"image {(data[i + 4] + data[i + 5] * 256) * 8}x{data[i + 6] + data[i + 7] * 256}")
+            elif cmd == '(' and i + 6 < n and data[i + 2] == ord('k') and data[i + 6] == 81:
+                # GS ( k ... fn 81 prints the stored QR symbol
+                marker('qr')
+            elif cmd == 'k' and i + 2 < n:
+                marker('barcode')
+        elif length == 1 and (byte >= 0x20 or byte in (0x09, 0x0a)):
+            text.append(byte)
+    flush()
+    return ''.join(out)
+
+
+class VirtualNetworkPrinter:
+    """Local TCP listener standing in for a network printer's raw port (9100).
+
+    Point a ThermalPrinter's network connection at it. Incoming streams
+    are split into receipts at paper cuts and passed to a VirtualPrinter,
+    so capture, throttling and paper-out faults behave as they do for a
+    direct virtual connection. DLE EOT status queries are answered, so
+    health checks see the simulated printer state.
+    """
+
+    def __init__(self, printer: Optional[VirtualPrinter] = None, host: str = '127.0.0.1', port: int = 9100):
+        self.printer = printer or VirtualPrinter()
+        listener = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                listener._serve(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self) -> 'VirtualNetworkPrinter':
+        self._thread = threading.Thread(target=self._server.serve_forever, name="virtual-printer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _serve(self, connection):
+        buffer = b''
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            buffer += chunk
+            buffer = self._answer_status_queries(connection, buffer)
+            receipts = split_receipts(buffer)
+            if receipts and not _ends_with_cut(receipts[-1]):
+                buffer = receipts.pop()  # incomplete receipt, wait for the rest
+            else:
+                buffer = b''
+            for receipt in receipts:
+                try:
+                    self.printer._raw(receipt)
+                except IOError as e:
+                    print(f"Virtual printer dropped a receipt: {e}")
+        if buffer.strip():
+            self.printer._raw(buffer)
+
+    def _answer_status_queries(self, connection, buffer: bytes) -> bytes:
+        """Reply to the DLE EOT queries in buffer and return it without them"""
+        kept = []
+        start = 0
+        for i, _ in _commands(buffer):
+            if buffer[i] != DLE or i + 1 >= len(buffer) or buffer[i + 1] != 0x04:
+                continue
+            if i + 2 >= len(buffer):
+                break  # query byte not received yet
+            if buffer[i + 2] == 4:
+                reply = STATUS_PAPER_OUT if self.printer.paper_out else STATUS_PAPER_OK
+            else:
+                reply = STATUS_ONLINE if self.printer.is_online() else STATUS_OFFLINE
+            connection.sendall(reply)
+            kept.append(buffer[start:i])
+            start = i + 3
+        kept.append(buffer[start:])
+        return b''.join(kept)
+
+
+def measure_throughput(thermal_printer, bills: List[Dict]) -> Dict:
+    """Print bills through a ThermalPrinter (typically on a virtual connection) and time it"""
+    started = time.perf_counter()
+    printed = 0
+    for bill in bills:
+        if thermal_printer.print_bill(bill):
+            printed += 1
+    seconds = time.perf_counter() - started
+    return {
+        'receipts': printed,
+        'failed': len(bills) - printed,
+        'seconds': seconds,
+        'receipts_per_minute': printed * 60 / seconds if seconds > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a virtual network receipt printer")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--output', default=default_output_dir(),
+                        help="folder for one .prn file per receipt, or a file to append to")
+    parser.add_argument('--baudrate', type=int, default=0, help="simulated line speed (0 = unthrottled)")
+    parser.add_argument('--latency', type=float, default=0.0, help="extra seconds per receipt")
+    parser.add_argument('--paper-out-after', type=int, default=None, help="go offline after N receipts")
+    parser.add_argument('--quiet', action='store_true', help="do not print decoded receipts")
+    args = parser.parse_args(argv)
+
+    printer = VirtualPrinter(args.output, args.baudrate, args.latency, args.paper_out_after)
+    if not args.quiet:
+        raw = printer._raw
+
+        def echo(data):
+            raw(data)
+            print(decode_escpos(data))
+        printer._raw = echo
+    server = VirtualNetworkPrinter(printer, args.host, args.port).start()
+    print(f"Virtual printer listening on {server.address[0]}:{server.address[1]}, saving to {args.output}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"{len(printer.receipts)} receipts, {printer.bytes_written} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import re
+import threading
+import time
+import random
+from collections import deque
+from typing import Dict, Optional, Tuple
+from PyQt5.QtCore import QThread, pyqtSignal
+
+try:
+    import serial
+except ImportError:  # pyserial is optional; only needed for a real scale
+    serial = None
+
+# Setting keys (app_settings table)
+SETTING_PORT = 'weighing_scale_port'
+SETTING_BAUDRATE = 'weighing_scale_baudrate'
+SIMULATOR_PORT = 'SIMULATOR'
+DEFAULT_BAUDRATE = 9600
+
+# e.g. "ST,GS,+0001.250kg", "US,NT,-0.005 kg", "  1250 g", "0.875"
+_FRAME_RE = re.compile(r'([+-]?\s*\d+(?:\.\d+)?)\s*(kg|g)?', re.IGNORECASE)
+
+
+def parse_weight_frame(frame: str) -> Optional[Tuple[float, Optional[bool]]]:
+    """Parse one scale output line into (weight in kg, stable flag or None if the scale has none)"""
+    text = frame.strip()
+    if not text:
+        return None
+    stable = None
+    upper = text.upper()
+    if upper.startswith('ST'):
+        stable = True
+    elif upper.startswith('US') or upper.startswith('OL'):
+        stable = False
+    match = _FRAME_RE.search(text)
+    if not match:
+        return None
+    weight = float(match.group(1).replace(' ', ''))
+    if (match.group(2) or 'kg').lower() == 'g':
+        weight /= 1000
+    return weight, stable
+
+
+class StableWeightFilter:
+    """Debounce raw readings into one stable weight per placement.
+
+    A weight is reported once the last `window` readings agree within
+    `tolerance` kg (and the scale does not flag them unstable). It is not
+    reported again until the weight changes or the pan is emptied.
+    """
+
+    def __init__(self, window: int = 5, tolerance: float = 0.002, min_weight: float = 0.005):
+        self.window = window
+        self.tolerance = tolerance
+        self.min_weight = min_weight
+        self._readings = deque(maxlen=window)
+        self._last_reported = None
+
+    def reset(self):
+        self._readings.clear()
+        self._last_reported = None
+
+    def feed(self, weight: float, stable: Optional[bool] = None) -> Optional[float]:
+        """Add a reading; return the stable weight if it just settled"""
+        if weight < self.min_weight:
+            # Pan emptied: the next placement is reported even if it weighs the same
+            self.reset()
+            return None
+        if stable is False:
+            self._readings.clear()
+            return None
+        self._readings.append(weight)
+        if len(self._readings) < self.window:
+            return None
+        if max(self._readings) - min(self._readings) > self.tolerance:
+            return None
+        settled = round(sorted(self._readings)[len(self._readings) // 2], 3)
+        if self._last_reported is not None and abs(settled - self._last_reported) <= self.tolerance:
+            return None
+        self._last_reported = settled
+        return settled
+
+
+class SerialScaleBackend:
+    """Scale on a serial/USB-serial port that streams one weight per line"""
+
+    def __init__(self, port: str, baudrate: int = DEFAULT_BAUDRATE, timeout: float = 0.5):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self._serial = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.port} @ {self.baudrate}"
+
+    def open(self):
+        if serial is None:
+            raise RuntimeError("pyserial is not installed")
+        self._serial = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
+
+    def read_frame(self) -> Optional[str]:
+        line = self._serial.readline()
+        return line.decode('ascii', errors='ignore') if line else None
+
+    def close(self):
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except Exception:
+                pass
+            self._serial = None
+
+
+class SimulatedScaleBackend:
+    """Fake scale for testing without hardware.
+
+    Repeats: empty pan, item placed (readings wobble, flagged unstable),
+    settled weight (flagged stable, tiny noise), item removed.
+    """
+
+    def __init__(self, weights=(0.250, 0.5, 1.0, 1.25, 2.0), interval: float = 0.1, seed=None):
+        self.weights = list(weights)
+        self.interval = interval
+        self._random = random.Random(seed)
+        self._frames = None
+
+    @property
+    def name(self) -> str:
+        return "Simulator"
+
+    def open(self):
+        self._frames = self._generate()
+
+    def _generate(self):
+        while True:
+            for _ in range(20):
+                yield "ST,GS,+0000.000kg"
+            target = self._random.choice(self.weights)
+            for step in range(1, 6):
+                wobble = target * step / 5 + self._random.uniform(-0.05, 0.05)
+                yield f"US,GS,{wobble:+010.3f}kg"
+            for _ in range(30):
+                yield f"ST,GS,{target + self._random.choice((-0.001, 0, 0, 0.001)):+010.3f}kg"
+
+    def read_frame(self) -> Optional[str]:
+        time.sleep(self.interval)
+        return next(self._frames)
+
+    def close(self):
+        self._frames = None
+
+
+def create_scale_backend(settings: Dict[str, str]):
+    """Build the backend configured in app_settings, or None if no scale is set up"""
+    port = (settings.get(SETTING_PORT) or '').strip()
+    if not port:
+        return None
+    if port.upper() == SIMULATOR_PORT:
+        return SimulatedScaleBackend()
+    try:
+        baudrate = int(settings.get(SETTING_BAUDRATE) or DEFAULT_BAUDRATE)
+    except ValueError:
+        baudrate = DEFAULT_BAUDRATE
+    return SerialScaleBackend(port, baudrate)
+
+
+class WeighingScaleReader(QThread):
+    """Reads the scale continuously on a background thread.
+
+    weight_updated is emitted for every reading (for a live display) and
+    stable_weight once per settled placement. The backend can be swapped at
+    runtime with set_backend(); on errors the reader reconnects after
+    RECONNECT_DELAY seconds.
+    """
+    weight_updated = pyqtSignal(float, bool)
+    stable_weight = pyqtSignal(float)
+    status_changed = pyqtSignal(str)
+
+    RECONNECT_DELAY = 3
+
+    def __init__(self, backend=None, parent=None):
+        super().__init__(parent)
+        self._backend = backend
+        self._pending_backend = None
+        self._backend_changed = False
+        self._lock = threading.Lock()
+        self._running = False
+        self.filter = StableWeightFilter()
+        self.last_weight = 0.0
+        self.last_stable = 0.0
+        self.status = "Not configured"
+
+    @property
+    def is_configured(self) -> bool:
+        return self._backend is not None or self._pending_backend is not None
+
+    def set_backend(self, backend):
+        """Switch to another scale (or None to disable); takes effect on the reader thread"""
+        with self._lock:
+            self._pending_backend = backend
+            self._backend_changed = True
+        if backend is not None and not self.isRunning():
+            self.start()
+
+    def start(self):
+        self._running = True
+        super().start()
+
+    def stop(self):
+        self._running = False
+        self.wait(2000)
+
+    def _set_status(self, status: str):
+        self.status = status
+        self.status_changed.emit(status)
+
+    def _take_backend_change(self):
+        with self._lock:
+            if not self._backend_changed:
+                return False
+            self._backend = self._pending_backend
+            self._pending_backend = None
+            self._backend_changed = False
+            return True
+
+    def run(self):
+        backend = None
+        while self._running:
+            if self._take_backend_change() and backend is not None:
+                backend.close()
+                backend = None
+            if self._backend is None:
+                self._set_status("Not configured")
+                return
+            if backend is None:
+                try:
+                    self._backend.open()
+                    backend = self._backend
+                    self.filter.reset()
+                    self._set_status(f"Connected ({backend.name})")
+                except Exception as e:
+                    self._set_status(f"Scale error: {e}")
+                    time.sleep(self.RECONNECT_DELAY)
+                    continue
+            try:
+                frame = backend.read_frame()
+            except Exception as e:
+                backend.close()
+                backend = None
+                self._set_status(f"Scale disconnected: {e}")
+                time.sleep(self.RECONNECT_DELAY)
+                continue
+            parsed = parse_weight_frame(frame) if frame else None
+            if parsed is None:
+                continue
+            weight, stable_flag = parsed
+            self.last_weight = weight
+            settled = self.filter.feed(weight, stable_flag)
+            if weight < self.filter.min_weight:
+                self.last_stable = 0.0
+            self.weight_updated.emit(weight, stable_flag is not False)
+            if settled is not None:
+                self.last_stable = settled
+                self.stable_weight.emit(settled)
+        if backend is not None:
+            backend.close()
@@ -1,11 +1,13 @@
 import sys
 import os
-import re
+from datetime import datetime
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                              QLineEdit, QPushButton, QMessageBox, QFormLayout,
                              QCheckBox, QProgressBar, QTextEdit)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont, QPixmap, QPainter
+from billing_tabs.whatsapp_outbox import normalize_phone
+from billing_tabs.image_encoding import encode_image, get_image_encoding
 
 class WhatsAppSender(QThread):
     """Thread for sending WhatsApp message to avoid blocking UI"""
@@ -46,17 +48,22 @@ class WhatsAppSender(QThread):
 class WhatsAppDialog(QDialog):
     """Dialog for WhatsApp bill sharing"""
     
-    def __init__(self, bill_widget, customer_name="", parent=None):
+    def __init__(self, bill_widget, customer_name="", parent=None, outbox=None, bill_id=None, image_path=""):
         super().__init__(parent)
         self.bill_widget = bill_widget
         self.customer_name = customer_name
+        # With a WhatsAppOutbox the image is queued and sent in the background
+        self.outbox = outbox
+        self.bill_id = bill_id
         self.setWindowTitle("Share Bill via WhatsApp")
         self.setModal(True)
         self.resize(450, 350)
         
         self.phone_number = ""
         self.save_customer = False
-        self.image_path = ""
+        # The bill's saved image when there is one; otherwise the widget is captured to temp/
+        self.image_path = image_path
+        self.captured_image = False
         
         self.init_ui()
     
@@ -192,21 +199,7 @@ class WhatsAppDialog(QDialog):
     
     def validate_phone_number(self, phone):
         """Validate WhatsApp phone number format"""
-        # Remove all non-digit characters except +
-        cleaned = re.sub(r'[^\d+]', '', phone)
-        
-        # Check if it starts with + and has country code
-        if cleaned.startswith('+') and len(cleaned) >= 10:
-            return cleaned
-        
-        # If no +, assume it's an Indian number and add +91
-        if not cleaned.startswith('+'):
-            if cleaned.startswith('91') and len(cleaned) >= 12:
-                return '+' + cleaned
-            elif len(cleaned) == 10:
-                return '+91' + cleaned
-        
-        return None
+        return normalize_phone(phone)
     
     def capture_bill_image(self):
         """Capture bill widget as image"""
@@ -232,12 +225,12 @@ class WhatsAppDialog(QDialog):
             os.makedirs(temp_dir, exist_ok=True)
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            self.image_path = os.path.join(temp_dir, f"bill_{timestamp}.png")
+            self.image_path = os.path.join(temp_dir, f"bill_{timestamp}{get_image_encoding().extension}")
             
-            if pixmap.save(self.image_path, "PNG"):
-                return True
-            else:
-                return False
+            with open(self.image_path, 'wb') as f:
+                f.write(encode_image(pixmap.toImage()))
+            self.captured_image = True
+            return True
                 
         except Exception as e:
             print(f"Error capturing bill image: {e}")
@@ -264,16 +257,26 @@ class WhatsAppDialog(QDialog):
         self.phone_number = validated_phone
         self.save_customer = self.save_customer_checkbox.isChecked()
         
-        # Capture bill image
+        # Capture bill image (unless the bill's saved image was given)
         self.status_label.setText("Capturing bill image...")
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)  # Indeterminate progress
         
-        if not self.capture_bill_image():
+        has_image = bool(self.image_path) and os.path.exists(self.image_path)
+        if not has_image and not self.capture_bill_image():
             QMessageBox.critical(self, "Error", "Failed to capture bill image!")
             self.progress_bar.setVisible(False)
             return
         
+        if self.outbox is not None:
+            self.outbox.submit(self.phone_number, self.image_path, bill_id=self.bill_id)
+            self.progress_bar.setVisible(False)
+            QMessageBox.information(self, "Queued",
+                                    "The bill has been added to the WhatsApp outbox.\n"
+                                    "Its status shows in the outbox panel.")
+            self.accept()
+            return
+        
         # Disable buttons during sending
         self.send_button.setEnabled(False)
         self.cancel_button.setEnabled(False)
@@ -303,7 +306,7 @@ class WhatsAppDialog(QDialog):
         if success:
             # Clean up temporary image file
             try:
-                if os.path.exists(self.image_path):
+                if self.captured_image and os.path.exists(self.image_path):
                     os.remove(self.image_path)
             except:
                 pass
@@ -0,0 +1,263 @@
+import os
+import re
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from PyQt5.QtWidgets import QAbstractItemView
+from PyQt5.QtCore import QObject, pyqtSignal
+from data_base.database import Database
+from billing_tabs.queue_panel import QueuePanel
+from billing_tabs.artifact_store import get_artifact_store
+from billing_tabs.receipt_assets import get_receipt_assets
+from billing_tabs.messaging import create_messaging_backend
+
+QUEUED = 'queued'    # waiting to be sent (possibly until next_attempt_at after a failure)
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+PENDING_STATUSES = (QUEUED, SENDING)
+FINISHED_STATUSES = (SENT, FAILED, CANCELLED)
+
+
+def normalize_phone(phone: str) -> Optional[str]:
+    """WhatsApp number in +<country code><number> form, or None if it is not usable"""
+    # Remove all non-digit characters except +
+    cleaned = re.sub(r'[^\d+]', '', phone or '')
+    if cleaned.startswith('+') and len(cleaned) >= 10:
+        return cleaned
+    # If no +, assume it's an Indian number and add +91
+    if not cleaned.startswith('+'):
+        if cleaned.startswith('91') and len(cleaned) >= 12:
+            return '+' + cleaned
+        elif len(cleaned) == 10:
+            return '+91' + cleaned
+    return None
+
+
+def bill_caption(bill_data: Dict) -> str:
+    shop_name = get_receipt_assets().shop_details()['shop_name']
+    greetings = ["Hi", "Hello", "Hey", "Dear"]
+    thanks = [
+        "Thanks for shopping with us!",
+        "We appreciate your purchase!",
+        "Hope to see you again!",
+    ]
+    return (f"{random.choice(greetings)} {bill_data['customer_name']},\n"
+            f"Bill #{bill_data['id']} from {shop_name} is attached.\n{random.choice(thanks)}")
+
+
+class WhatsAppOutbox(QObject):
+    """Persistent WhatsApp outbox with a single, rate-limited sender thread.
+
+    Messages are stored in the whatsapp_outbox table before anything is
+    sent, so bulk sends return at once and survive a restart. The worker
+    sends them one at a time, oldest first, through a messaging backend
+    (see billing_tabs.messaging), waiting at least the backend's
+    min_interval between sends. A failed send is queued again after a
+    doubling delay (other messages go ahead meanwhile) and marked failed
+    after MAX_ATTEMPTS, or at once if the backend says a retry cannot help
+    (e.g. an invalid number). A message left 'sending' by a crash
+    may already have gone out, so it is marked failed for a manual retry
+    rather than sent twice. Bill messages take the bill's image from the
+    artifact store when they are sent (rendered again from the saved bill
+    if it was cleaned up). message_updated is emitted with the message
+    dict on every status change.
+    """
+    message_updated = pyqtSignal(object)
+
+    MAX_ATTEMPTS = 3
+    RETRY_BASE_DELAY = 60    # seconds, doubled after each failure
+    RETRY_MAX_DELAY = 900
+    POLL_INTERVAL = 10       # how often to look for messages whose retry time has come
+
+    def __init__(self, backend=None, parent=None):
+        super().__init__(parent)
+        self.db = Database()
+        self.backend = backend or create_messaging_backend(self.db.get_settings('whatsapp_'))
+        self._backend_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._last_send = None
+        self.db.reset_outbox_messages(SENDING, FAILED, "Interrupted while sending; check WhatsApp before retrying")
+        self._thread = threading.Thread(target=self._worker, name="whatsapp-outbox", daemon=True)
+        self._thread.start()
+
+    # --- Status API ---
+    def submit(self, phone: str, image_path: str = '', caption: str = '', bill_id: Optional[int] = None) -> int:
+        """Queue one image and return the message ID immediately"""
+        message_id = self.db.add_outbox_messages(
+            [{'bill_id': bill_id, 'phone': phone, 'image_path': image_path, 'caption': caption}])[0]
+        self._emit(message_id)
+        self._wake_event.set()
+        return message_id
+
+    def submit_bill(self, bill_data: Dict, image_path: Optional[str] = None) -> Optional[int]:
+        """Queue a bill image to the customer's number; None if the bill has no usable number"""
+        message_ids, _skipped = self.submit_bills([bill_data], [image_path] if image_path else None)
+        return message_ids[0] if message_ids else None
+
+    def submit_bills(self, bills: List[Dict], image_paths: Optional[List[str]] = None) -> Tuple[List[int], List[int]]:
+        """Queue many bills in one transaction; returns (message IDs, IDs of bills without a usable number)"""
+        messages, skipped = [], []
+        for index, bill in enumerate(bills):
+            phone = normalize_phone(bill.get('customer_phone') or '')
+            if phone is None:
+                skipped.append(bill.get('id'))
+                continue
+            messages.append({
+                'bill_id': bill.get('id'),
+                'phone': phone,
+                'image_path': image_paths[index] if image_paths else '',  # resolved when sent
+                'caption': bill_caption(bill),
+            })
+        message_ids = self.db.add_outbox_messages(messages) if messages else []
+        if message_ids:
+            # One update is enough for views to reload; thousands would flood the GUI thread
+            self._emit(message_ids[-1])
+        self._wake_event.set()
+        return message_ids, skipped
+
+    def messages(self, limit: int = 100) -> List[Dict]:
+        return self.db.get_outbox_messages(limit)
+
+    def pending_count(self) -> int:
+        return sum(1 for message in self.messages() if message['status'] in PENDING_STATUSES)
+
+    def retry(self, message_id: int) -> bool:
+        """Queue a failed or cancelled message again, to be sent right away"""
+        message = self.db.get_outbox_message(message_id)
+        if message is None or message['status'] not in (FAILED, CANCELLED):
+            return False
+        self.db.update_outbox_message(message_id, QUEUED, attempts=0, last_error='')
+        self._emit(message_id)
+        self._wake_event.set()
+        return True
+
+    def cancel(self, message_id: int) -> bool:
+        """Cancel a message that is not being sent"""
+        message = self.db.get_outbox_message(message_id)
+        if message is None or message['status'] != QUEUED:
+            return False
+        self.db.update_outbox_message(message_id, CANCELLED)
+        self._emit(message_id)
+        return True
+
+    def clear_finished(self):
+        self.db.delete_outbox_messages((SENT, CANCELLED))
+
+    def set_backend(self, backend):
+        """Switch the messaging backend; a send in progress finishes on the old one"""
+        with self._backend_lock:
+            old_backend, self.backend = self.backend, backend
+        old_backend.close()
+        self._wake_event.set()
+
+    def shutdown(self):
+        """Stop the worker; a send in progress finishes on its own (the thread is a daemon)"""
+        self._stop_event.set()
+        self._wake_event.set()
+        self._thread.join(timeout=10)
+        self.backend.close()
+
+    # --- Worker ---
+    def _emit(self, message_id: int):
+        message = self.db.get_outbox_message(message_id)
+        if message is not None:
+            self.message_updated.emit(message)
+
+    def _set_status(self, message_id: int, status: str, error: Optional[str] = None,
+                    retry_in: Optional[int] = None):
+        self.db.update_outbox_message(message_id, status, last_error=error, retry_in=retry_in)
+        self._emit(message_id)
+
+    def _sleep(self, seconds: float):
+        """Wait, but wake early for new/retried messages or shutdown"""
+        self._wake_event.wait(seconds)
+        self._wake_event.clear()
+
+    def _image_for(self, message: Dict) -> str:
+        """The message's image, or the bill's stored image (rendered again if it was cleaned up)"""
+        image_path = message['image_path']
+        if image_path and os.path.exists(image_path):
+            return image_path
+        if message['bill_id'] is None:
+            raise FileNotFoundError(f"Image not found: {image_path}")
+        image_path = get_artifact_store().bill_image(message['bill_id'], cache=False)
+        if image_path is None:
+            raise RuntimeError(f"Could not render the image for bill #{message['bill_id']}")
+        return image_path
+
+    def _worker(self):
+        while not self._stop_event.is_set():
+            message = self.db.get_next_outbox_message(QUEUED)
+            if message is None:
+                self._sleep(self.POLL_INTERVAL)
+                continue
+            with self._backend_lock:
+                backend = self.backend
+            if self._last_send is not None:
+                wait = self._last_send + backend.min_interval - time.monotonic()
+                if wait > 0:
+                    # Look at the queue again afterwards; the message may have been cancelled
+                    self._sleep(wait)
+                    continue
+            message_id = message['id']
+            attempts = message['attempts'] + 1
+            if not self.db.claim_outbox_message(message_id, attempts):
+                continue
+            self._emit(message_id)
+            self._last_send = time.monotonic()
+            try:
+                backend.send_image(message['phone'], self._image_for(message), message['caption'])
+            except Exception as e:
+                error = f"Send failed: {e}"
+                print(f"[ERROR] WhatsApp message #{message_id} (bill #{message['bill_id']}): {error}")
+                if attempts >= self.MAX_ATTEMPTS or not getattr(e, 'retryable', True):
+                    self._set_status(message_id, FAILED, error=error)
+                    continue
+                delay = min(self.RETRY_BASE_DELAY * (2 ** (attempts - 1)), self.RETRY_MAX_DELAY)
+                self._set_status(message_id, QUEUED, error=f"{error} (retrying in {delay}s)", retry_in=delay)
+                continue
+            self._set_status(message_id, SENT, error='')
+
+
+class WhatsAppOutboxPanel(QueuePanel):
+    """WhatsApp outbox view with retry and cancel"""
+    TITLE = "WhatsApp Outbox"
+    KIND_HEADER = "Phone"
+    CLEAR_LABEL = "Clear Sent"
+    CANCEL_LABEL = "Cancel"
+    SELECTION_MODE = QAbstractItemView.ExtendedSelection
+    STATUS_COLORS = {
+        QUEUED: "#7f8c8d",
+        SENDING: "#2980b9",
+        SENT: "#27ae60",
+        FAILED: "#c0392b",
+        CANCELLED: "#95a5a6",
+    }
+    PENDING_STATUSES = PENDING_STATUSES
+    FAILED_STATUS = FAILED
+
+    def __init__(self, outbox: WhatsAppOutbox, parent=None):
+        self.outbox = outbox
+        super().__init__(outbox.message_updated, parent)
+
+    def entries(self) -> List[Dict]:
+        return self.outbox.messages()
+
+    def row(self, message: Dict):
+        info = f"Attempt {message['attempts']}" if message['status'] == SENDING else message['last_error']
+        return (message['id'], message['bill_id'], message['phone'], message['status'], info,
+                message['sent_at'] if message['status'] == SENT else None)
+
+    def retry_entry(self, message: Dict):
+        self.outbox.retry(message['id'])
+
+    def cancel_entry(self, message_id: int):
+        self.outbox.cancel(message_id)
+
+    def clear_finished(self):
+        self.outbox.clear_finished()
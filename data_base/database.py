@@ -1,20 +1,45 @@
 import sqlite3
 import os
-from datetime import datetime
-from typing import List, Tuple, Optional, Dict
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple, Optional, Dict, Iterator
 import sys
 import csv
+import json
+from billing_tabs.tax_engine import base_from_inclusive
+from billing_tabs.hsn_master import HsnMaster, DEFAULT_HSN_CODES, normalize_hsn, is_valid_hsn
+
+# HsnMaster per database file, rebuilt after the hsn_codes table changes
+_hsn_master_cache: Dict[str, HsnMaster] = {}
+
+DB_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def app_dir() -> str:
+    """Folder the application runs from; data_base/, temp/ and the other data folders live here"""
+    if getattr(sys, 'frozen', False):
+        # Running as a PyInstaller bundle
+        return os.path.dirname(sys.executable)
+    # Running as a script
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def local_datetime(timestamp) -> Optional[datetime]:
+    """A stored CURRENT_TIMESTAMP value (UTC) as naive local time; None if it cannot be parsed"""
+    try:
+        utc = datetime.strptime(str(timestamp)[:19], DB_TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+    return utc.astimezone().replace(tzinfo=None)
+
+
+def utc_timestamp(local: datetime) -> str:
+    """A naive local time in the stored CURRENT_TIMESTAMP form (UTC), for comparing with created_at"""
+    return local.astimezone(timezone.utc).strftime(DB_TIMESTAMP_FORMAT)
 
 class Database:
     def __init__(self, db_path: str = None):
         if db_path is None:
-            if getattr(sys, 'frozen', False):
-                # Running as a PyInstaller bundle
-                base_dir = os.path.dirname(sys.executable)
-            else:
-                # Running as a script
-                base_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
-            db_path = os.path.join(base_dir, 'data_base', 'billing.db')
+            db_path = os.path.join(app_dir(), 'data_base', 'billing.db')
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self.db_path = db_path
         self.init_database()
@@ -103,6 +128,9 @@ class Database:
                 FOREIGN KEY (bill_id) REFERENCES bills (id)
             )
         ''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_bill_items_bill ON bill_items (bill_id)''')
+        # Lets exports walk the bills newest first without sorting the whole table
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_bills_created ON bills (created_at, id)''')
         
         # Create admin_details table
         cursor.execute('''
@@ -119,6 +147,106 @@ class Database:
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        # Create parked_carts table (bills put on hold at the counter)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS parked_carts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                label TEXT NOT NULL,
+                items_json TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Create app_settings table (simple key/value configuration)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS app_settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        # Create scale_plu_map table (weighing-scale PLU -> loose item)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scale_plu_map (
+                plu TEXT PRIMARY KEY,
+                loose_item_id INTEGER NOT NULL,
+                FOREIGN KEY (loose_item_id) REFERENCES loose_items (id)
+            )
+        ''')
+        # Create promotions table (item_keys/category_ids are JSON lists)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS promotions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                promo_type TEXT NOT NULL,
+                value REAL DEFAULT 0,
+                buy_qty REAL DEFAULT 0,
+                get_qty REAL DEFAULT 0,
+                min_qty REAL DEFAULT 0,
+                item_keys TEXT DEFAULT '[]',
+                category_ids TEXT DEFAULT '[]',
+                starts_on TEXT,
+                ends_on TEXT,
+                active INTEGER DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        # Create print_jobs table (persistent print spooler queue)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS print_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                bill_id INTEGER,
+                payload_json TEXT NOT NULL DEFAULT '{}',
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER DEFAULT 0,
+                last_error TEXT DEFAULT '',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_print_jobs_status ON print_jobs (status, id)''')
+        # Create whatsapp_outbox table (bill images waiting to be sent, with send status)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS whatsapp_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bill_id INTEGER,
+                phone TEXT NOT NULL,
+                image_path TEXT DEFAULT '',
+                caption TEXT DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER DEFAULT 0,
+                last_error TEXT DEFAULT '',
+                next_attempt_at TIMESTAMP,
+                sent_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_whatsapp_outbox_status ON whatsapp_outbox (status, id)''')
+        # Create bill_artifacts table (rendered bill files, stored by content hash)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bill_artifacts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bill_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                file_name TEXT NOT NULL,
+                size_bytes INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (bill_id, kind)
+            )
+        ''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_bill_artifacts_hash ON bill_artifacts (content_hash)''')
+        cursor.execute('''CREATE INDEX IF NOT EXISTS idx_bill_artifacts_used ON bill_artifacts (last_used_at)''')
+        # Create hsn_codes table (HSN master: code -> description and total GST slab)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hsn_codes (
+                code TEXT PRIMARY KEY,
+                description TEXT DEFAULT '',
+                gst_rate REAL NOT NULL DEFAULT 0
+            )
+        ''')
         # --- MIGRATION: Ensure 'location' and 'gmail' columns exist ---
         cursor.execute("PRAGMA table_info(admin_details)")
         columns = [col[1] for col in cursor.fetchall()]
@@ -192,6 +320,8 @@ class Database:
         if 'total_sgst' not in columns:
             cursor.execute('ALTER TABLE bills ADD COLUMN total_sgst REAL DEFAULT 0')
             cursor.execute('ALTER TABLE bills ADD COLUMN total_cgst REAL DEFAULT 0')
+        if 'total_discount' not in columns:
+            cursor.execute('ALTER TABLE bills ADD COLUMN total_discount REAL DEFAULT 0')
         
         # Migrate bill_items table
         cursor.execute("PRAGMA table_info(bill_items)")
@@ -208,6 +338,9 @@ class Database:
             
             # Update existing records
             cursor.execute('UPDATE bill_items SET base_price = unit_price, final_price = subtotal WHERE base_price = 0')
+        if 'discount_amount' not in columns:
+            cursor.execute('ALTER TABLE bill_items ADD COLUMN discount_amount REAL DEFAULT 0')
+            cursor.execute('ALTER TABLE bill_items ADD COLUMN promotion TEXT DEFAULT ""')
     
     def _insert_default_data(self, cursor):
         """Insert default categories and items if they don't exist"""
@@ -233,12 +366,19 @@ class Database:
                 ('Oil', 'Coconut Oil', '1513', 180.0, 2.5, 2.5),
             ]
             for category_name, item_name, hsn, total_price, sgst, cgst in default_items:
-                base_price = total_price / (1 + (sgst + cgst) / 100)
+                base_price = base_from_inclusive(total_price, sgst, cgst)
                 cursor.execute('''
                     INSERT OR IGNORE INTO loose_items (category_id, name, hsn_code, base_price, sgst_percent, cgst_percent, total_price)
                     SELECT id, ?, ?, ?, ?, ?, ? FROM loose_categories WHERE name = ?
                 ''', (item_name, hsn, base_price, sgst, cgst, total_price, category_name))
         
+        # Seed the HSN master if it is empty
+        cursor.execute('SELECT COUNT(*) FROM hsn_codes')
+        if cursor.fetchone()[0] == 0:
+            cursor.executemany('''
+                INSERT OR IGNORE INTO hsn_codes (code, description, gst_rate) VALUES (?, ?, ?)
+            ''', DEFAULT_HSN_CODES)
+        
         # Insert default barcode items if table is empty
         cursor.execute('SELECT COUNT(*) FROM barcode_items')
         if cursor.fetchone()[0] == 0:
@@ -250,7 +390,7 @@ class Database:
                 ('56789012', 'Munch', '1704', 5.0, 6.0, 6.0),
             ]
             for barcode, name, hsn, total_price, sgst, cgst in default_barcodes:
-                base_price = total_price / (1 + (sgst + cgst) / 100)
+                base_price = base_from_inclusive(total_price, sgst, cgst)
                 cursor.execute('''
                     INSERT OR IGNORE INTO barcode_items (barcode, name, hsn_code, base_price, sgst_percent, cgst_percent, total_price) 
                     VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -274,7 +414,7 @@ class Database:
                         total_price: float, sgst_percent: float, cgst_percent: float) -> bool:
         """Add a new barcode item (user supplies final price)"""
         try:
-            base_price = total_price / (1 + (sgst_percent + cgst_percent) / 100)
+            base_price = base_from_inclusive(total_price, sgst_percent, cgst_percent)
             conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute('''
@@ -342,7 +482,7 @@ class Database:
                            quantity: int, total_price: float, sgst_percent: float, cgst_percent: float) -> bool:
         """Update barcode item (user supplies final price)"""
         try:
-            base_price = total_price / (1 + (sgst_percent + cgst_percent) / 100)
+            base_price = base_from_inclusive(total_price, sgst_percent, cgst_percent)
             conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute('''
@@ -383,7 +523,8 @@ class Database:
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT id, name, hsn_code, quantity, base_price, sgst_percent, cgst_percent, total_price, image_path 
+            SELECT id, name, hsn_code, quantity, base_price, sgst_percent, cgst_percent, total_price, image_path,
+                   category_id
             FROM loose_items WHERE category_id = ? ORDER BY name
         ''', (category_id,))
         results = cursor.fetchall()
@@ -399,11 +540,42 @@ class Database:
                 'sgst_percent': row[5],
                 'cgst_percent': row[6],
                 'total_price': row[7],
-                'image_path': row[8]
+                'image_path': row[8],
+                'category_id': row[9]
             }
             for row in results
         ]
-    
+
+    def get_all_loose_items(self) -> List[Dict]:
+        """Get all loose items with their category name"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT li.id, li.name, li.hsn_code, li.quantity, li.base_price, li.sgst_percent,
+                   li.cgst_percent, li.total_price, li.image_path, li.category_id, lc.name
+            FROM loose_items li LEFT JOIN loose_categories lc ON lc.id = li.category_id
+            ORDER BY li.name
+        ''')
+        results = cursor.fetchall()
+        conn.close()
+
+        return [
+            {
+                'id': row[0],
+                'name': row[1],
+                'hsn_code': row[2],
+                'quantity': row[3],
+                'base_price': row[4],
+                'sgst_percent': row[5],
+                'cgst_percent': row[6],
+                'total_price': row[7],
+                'image_path': row[8],
+                'category_id': row[9],
+                'category_name': row[10] or ''
+            }
+            for row in results
+        ]
+
     def add_loose_category(self, name: str) -> bool:
         """Add a new loose category"""
         try:
@@ -420,7 +592,7 @@ class Database:
                       total_price: float, sgst_percent: float, cgst_percent: float, image_path: str = None) -> bool:
         """Add a new loose item (user supplies final price)"""
         try:
-            base_price = total_price / (1 + (sgst_percent + cgst_percent) / 100)
+            base_price = base_from_inclusive(total_price, sgst_percent, cgst_percent)
             conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute('''
@@ -437,7 +609,7 @@ class Database:
                          total_price: float, sgst_percent: float, cgst_percent: float, image_path: str = None) -> bool:
         """Update loose item (user supplies final price)"""
         try:
-            base_price = total_price / (1 + (sgst_percent + cgst_percent) / 100)
+            base_price = base_from_inclusive(total_price, sgst_percent, cgst_percent)
             conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute('''
@@ -464,16 +636,18 @@ class Database:
     # Bills Methods
     def save_bill(self, customer_name: str, customer_phone: str, bill_items: List[Dict], 
                   total_amount: float, total_items: int, total_weight: float, 
-                  total_sgst: float, total_cgst: float) -> int:
+                  total_sgst: float, total_cgst: float, total_discount: float = 0.0) -> int:
         """Save a new bill and return bill ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         # Insert bill
         cursor.execute('''
-            INSERT INTO bills (customer_name, customer_phone, total_amount, total_items, total_weight, total_sgst, total_cgst)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (customer_name, customer_phone, total_amount, total_items, total_weight, total_sgst, total_cgst))
+            INSERT INTO bills (customer_name, customer_phone, total_amount, total_items, total_weight, total_sgst, total_cgst,
+            total_discount)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (customer_name, customer_phone, total_amount, total_items, total_weight, total_sgst, total_cgst,
+              total_discount))
         
         bill_id = cursor.lastrowid
         
@@ -481,11 +655,13 @@ class Database:
         for item in bill_items:
             cursor.execute('''
                 INSERT INTO bill_items (bill_id, item_name, hsn_code, quantity, base_price, 
-                sgst_percent, cgst_percent, sgst_amount, cgst_amount, final_price, item_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                sgst_percent, cgst_percent, sgst_amount, cgst_amount, final_price, item_type,
+                discount_amount, promotion)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (bill_id, item['name'], item['hsn_code'], item['quantity'], item['base_price'],
                   item['sgst_percent'], item['cgst_percent'], item['sgst_amount'], 
-                  item['cgst_amount'], item['final_price'], item['item_type']))
+                  item['cgst_amount'], item['final_price'], item['item_type'],
+                  item.get('discount_amount', 0), item.get('promotion', '')))
         
         conn.commit()
         conn.close()
@@ -526,7 +702,7 @@ class Database:
         # Get bill details
         cursor.execute('''
             SELECT id, customer_name, customer_phone, total_amount, total_items, 
-                   total_weight, total_sgst, total_cgst, created_at 
+                   total_weight, total_sgst, total_cgst, created_at, total_discount 
             FROM bills WHERE id = ?
         ''', (bill_id,))
         bill_result = cursor.fetchone()
@@ -538,7 +714,7 @@ class Database:
         # Get bill items
         cursor.execute('''
             SELECT item_name, hsn_code, quantity, base_price, sgst_percent, cgst_percent, 
-            sgst_amount, cgst_amount, final_price, item_type
+            sgst_amount, cgst_amount, final_price, item_type, discount_amount, promotion
             FROM bill_items WHERE bill_id = ?
         ''', (bill_id,))
         items_results = cursor.fetchall()
@@ -555,23 +731,273 @@ class Database:
             'total_sgst': bill_result[6],
             'total_cgst': bill_result[7],
             'created_at': bill_result[8],
-            'items': [
-                {
-                    'name': row[0],
-                    'hsn_code': row[1],
-                    'quantity': row[2],
-                    'base_price': row[3],
-                    'sgst_percent': row[4],
-                    'cgst_percent': row[5],
-                    'sgst_amount': row[6],
-                    'cgst_amount': row[7],
-                    'final_price': row[8],
-                    'item_type': row[9]
-                }
-                for row in items_results
-            ]
+            'total_discount': bill_result[9] or 0,
+            'items': [self._bill_item_from_row(row) for row in items_results]
+        }
+    
+    def _bill_item_from_row(self, row) -> Dict:
+        return {
+            'name': row[0],
+            'hsn_code': row[1],
+            'quantity': row[2],
+            'base_price': row[3],
+            'sgst_percent': row[4],
+            'cgst_percent': row[5],
+            'sgst_amount': row[6],
+            'cgst_amount': row[7],
+            'final_price': row[8],
+            'item_type': row[9],
+            'discount_amount': row[10] or 0,
+            'promotion': row[11] or ''
         }
     
+    def get_bills_by_ids(self, bill_ids: List[int], chunk_size: int = 500) -> List[Dict]:
+        """Get several bills with their items in a few queries (same order as bill_ids, missing IDs skipped)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        bills = {}
+        bill_ids = list(bill_ids)
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(bill_ids), chunk_size):
+            chunk = bill_ids[start:start + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT id, customer_name, customer_phone, total_amount, total_items, 
+                       total_weight, total_sgst, total_cgst, created_at, total_discount 
+                FROM bills WHERE id IN ({placeholders})
+            ''', chunk)
+            for row in cursor.fetchall():
+                bills[row[0]] = {
+                    'id': row[0],
+                    'customer_name': row[1],
+                    'customer_phone': row[2],
+                    'total_amount': row[3],
+                    'total_items': row[4],
+                    'total_weight': row[5],
+                    'total_sgst': row[6],
+                    'total_cgst': row[7],
+                    'created_at': row[8],
+                    'total_discount': row[9] or 0,
+                    'items': []
+                }
+            cursor.execute(f'''
+                SELECT item_name, hsn_code, quantity, base_price, sgst_percent, cgst_percent, 
+                sgst_amount, cgst_amount, final_price, item_type, discount_amount, promotion, bill_id
+                FROM bill_items WHERE bill_id IN ({placeholders}) ORDER BY id
+            ''', chunk)
+            for row in cursor.fetchall():
+                if row[12] in bills:
+                    bills[row[12]]['items'].append(self._bill_item_from_row(row))
+        conn.close()
+        return [bills[bill_id] for bill_id in bill_ids if bill_id in bills]
+    
+    # Bills in a range of local days; compares created_at directly so idx_bills_created is used
+    _PERIOD_FILTER = "b.created_at >= ? AND b.created_at < ?"
+    
+    @staticmethod
+    def _period_bounds(start_date: str, end_date: str) -> Tuple[str, str]:
+        """UTC created_at bounds [start, end) of the local calendar days start_date..end_date"""
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+        end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+        return utc_timestamp(start), utc_timestamp(end)
+    
+    def get_bill_ids_by_date_range(self, start_date: str, end_date: str) -> List[int]:
+        """IDs of the bills made on the local days start_date..end_date, oldest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT b.id FROM bills b WHERE {self._PERIOD_FILTER} ORDER BY b.created_at, b.id
+        ''', self._period_bounds(start_date, end_date))
+        results = cursor.fetchall()
+        conn.close()
+        return [row[0] for row in results]
+    
+    @classmethod
+    def _bill_filter(cls, customer_name: Optional[str] = None, start_date: Optional[str] = None,
+                     end_date: Optional[str] = None, after: Optional[Tuple[str, int]] = None) -> Tuple[str, list]:
+        """WHERE clause and parameters for the Bill History filters (customer name, date range).
+        
+        Dates are local calendar days, bounded like the GST periods.
+        
+        after = (created_at, id) of the last bill already read restricts the
+        result to the bills after it in newest-first order (keyset paging).
+        """
+        conditions, params = [], []
+        if customer_name:
+            conditions.append("b.customer_name LIKE ?")
+            params.append(f'%{customer_name}%')
+        if start_date and end_date:
+            conditions.append(cls._PERIOD_FILTER)
+            params.extend(cls._period_bounds(start_date, end_date))
+        if after is not None:
+            conditions.append("(b.created_at < ? OR (b.created_at = ? AND b.id < ?))")
+            params.extend((after[0], after[0], after[1]))
+        return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+    
+    def count_bills(self, customer_name: Optional[str] = None, start_date: Optional[str] = None,
+                    end_date: Optional[str] = None) -> int:
+        """Number of bills matching the Bill History filters"""
+        where, params = self._bill_filter(customer_name, start_date, end_date)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM bills b {where}', params)
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def get_bills_page(self, after: Optional[Tuple[str, int]] = None, limit: int = 200,
+                       customer_name: Optional[str] = None, start_date: Optional[str] = None,
+                       end_date: Optional[str] = None) -> List[Dict]:
+        """Up to limit bills (without items) matching the Bill History filters, newest first,
+        continuing after the (created_at, id) of the last bill of the previous page"""
+        where, params = self._bill_filter(customer_name, start_date, end_date, after)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT b.id, b.customer_name, b.customer_phone, b.total_amount, b.total_items, 
+                   b.total_weight, b.total_sgst, b.total_cgst, b.created_at 
+            FROM bills b {where} ORDER BY b.created_at DESC, b.id DESC LIMIT ?
+        ''', params + [limit])
+        results = cursor.fetchall()
+        conn.close()
+        
+        return [
+            {
+                'id': row[0],
+                'customer_name': row[1],
+                'customer_phone': row[2],
+                'total_amount': row[3],
+                'total_items': row[4],
+                'total_weight': row[5],
+                'total_sgst': row[6],
+                'total_cgst': row[7],
+                'created_at': row[8]
+            }
+            for row in results
+        ]
+    
+    def iter_bills_with_items(self, customer_name: Optional[str] = None, start_date: Optional[str] = None,
+                              end_date: Optional[str] = None, chunk_size: int = 500) -> Iterator[Dict]:
+        """Yield bills with their items, newest first, chunk_size bills per JOIN query.
+        
+        Each chunk is read completely and its connection closed before the
+        bills are yielded, so a long export holds no read lock while it
+        writes (checkouts and the queues can save in between) and only one
+        chunk is in memory. Chunks continue from the last (created_at, id)
+        read, so bills saved meanwhile do not shift the pages.
+        """
+        after = None
+        while True:
+            where, params = self._bill_filter(customer_name, start_date, end_date, after)
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT b.id, b.customer_name, b.customer_phone, b.total_amount, b.total_items,
+                       b.total_weight, b.total_sgst, b.total_cgst, b.created_at, b.total_discount,
+                       bi.item_name, bi.hsn_code, bi.quantity, bi.base_price, bi.sgst_percent, bi.cgst_percent,
+                       bi.sgst_amount, bi.cgst_amount, bi.final_price, bi.item_type, bi.discount_amount, bi.promotion
+                FROM (
+                    SELECT id, customer_name, customer_phone, total_amount, total_items,
+                           total_weight, total_sgst, total_cgst, created_at, total_discount
+                    FROM bills b {where}
+                    ORDER BY b.created_at DESC, b.id DESC LIMIT ?
+                ) b LEFT JOIN bill_items bi ON bi.bill_id = b.id
+                ORDER BY b.created_at DESC, b.id DESC, bi.id
+            ''', params + [chunk_size])
+            rows = cursor.fetchall()
+            conn.close()
+            bills = []
+            for row in rows:
+                if not bills or bills[-1]['id'] != row[0]:
+                    bills.append({
+                        'id': row[0],
+                        'customer_name': row[1],
+                        'customer_phone': row[2],
+                        'total_amount': row[3],
+                        'total_items': row[4],
+                        'total_weight': row[5],
+                        'total_sgst': row[6],
+                        'total_cgst': row[7],
+                        'created_at': row[8],
+                        'total_discount': row[9] or 0,
+                        'items': []
+                    })
+                if row[10] is not None:
+                    bills[-1]['items'].append(self._bill_item_from_row(row[10:]))
+            yield from bills
+            if len(bills) < chunk_size:
+                return
+            after = (bills[-1]['created_at'], bills[-1]['id'])
+    
+    def get_gst_rate_summary(self, start_date: str, end_date: str) -> List[Dict]:
+        """Taxable value and GST of the bill lines in a period, grouped by GST rate"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT ROUND(COALESCE(bi.sgst_percent, 0) + COALESCE(bi.cgst_percent, 0), 2) AS rate,
+                   SUM(bi.final_price - COALESCE(bi.sgst_amount, 0) - COALESCE(bi.cgst_amount, 0)),
+                   SUM(COALESCE(bi.sgst_amount, 0)), SUM(COALESCE(bi.cgst_amount, 0)), SUM(bi.final_price)
+            FROM bill_items bi JOIN bills b ON b.id = bi.bill_id
+            WHERE {self._PERIOD_FILTER}
+            GROUP BY rate ORDER BY rate
+        ''', self._period_bounds(start_date, end_date))
+        results = cursor.fetchall()
+        conn.close()
+        return [
+            {
+                'gst_rate': row[0],
+                'taxable_amount': row[1] or 0,
+                'sgst_amount': row[2] or 0,
+                'cgst_amount': row[3] or 0,
+                'total_amount': row[4] or 0
+            }
+            for row in results
+        ]
+    
+    def get_gst_hsn_summary(self, start_date: str, end_date: str) -> List[Dict]:
+        """Quantity, taxable value and GST of the bill lines in a period, grouped by HSN code, item type and rate"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT COALESCE(bi.hsn_code, '') AS hsn, bi.item_type,
+                   ROUND(COALESCE(bi.sgst_percent, 0) + COALESCE(bi.cgst_percent, 0), 2) AS rate,
+                   MAX(COALESCE(h.description, '')), SUM(bi.quantity),
+                   SUM(bi.final_price - COALESCE(bi.sgst_amount, 0) - COALESCE(bi.cgst_amount, 0)),
+                   SUM(COALESCE(bi.sgst_amount, 0)), SUM(COALESCE(bi.cgst_amount, 0)), SUM(bi.final_price),
+                   COUNT(*)
+            FROM bill_items bi JOIN bills b ON b.id = bi.bill_id
+            LEFT JOIN hsn_codes h ON h.code = bi.hsn_code
+            WHERE {self._PERIOD_FILTER}
+            GROUP BY hsn, bi.item_type, rate ORDER BY hsn, rate, bi.item_type
+        ''', self._period_bounds(start_date, end_date))
+        results = cursor.fetchall()
+        conn.close()
+        return [
+            {
+                'hsn_code': row[0],
+                'item_type': row[1],
+                'gst_rate': row[2],
+                'description': row[3],
+                'quantity': row[4] or 0,
+                'taxable_amount': row[5] or 0,
+                'sgst_amount': row[6] or 0,
+                'cgst_amount': row[7] or 0,
+                'total_amount': row[8] or 0,
+                'lines': row[9]
+            }
+            for row in results
+        ]
+    
+    def get_bill_number_range(self, start_date: str, end_date: str) -> Dict:
+        """First and last bill number and the number of bills in a period"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT MIN(b.id), MAX(b.id), COUNT(*) FROM bills b WHERE {self._PERIOD_FILTER}',
+                       self._period_bounds(start_date, end_date))
+        row = cursor.fetchone()
+        conn.close()
+        return {'first': row[0], 'last': row[1], 'count': row[2]}
+    
     def search_bills(self, customer_name: str) -> List[Dict]:
         """Search bills by customer name"""
         conn = self.get_connection()
@@ -636,6 +1062,679 @@ class Database:
         
         return [row[0] for row in results]
     
+    # Parked Carts Methods
+    def save_parked_cart(self, label: str, items: List[Dict]) -> int:
+        """Persist a parked cart and return its ID"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO parked_carts (label, items_json) VALUES (?, ?)
+        ''', (label, json.dumps(items)))
+        cart_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return cart_id
+    
+    def get_parked_carts(self) -> List[Dict]:
+        """Get all parked carts, oldest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, label, items_json, created_at FROM parked_carts ORDER BY id
+        ''')
+        results = cursor.fetchall()
+        conn.close()
+        
+        carts = []
+        for row in results:
+            try:
+                items = json.loads(row[2])
+            except ValueError:
+                items = []
+            carts.append({
+                'id': row[0],
+                'label': row[1],
+                'items': items,
+                'created_at': row[3]
+            })
+        return carts
+    
+    def delete_parked_cart(self, cart_id: int) -> bool:
+        """Delete a parked cart (after it has been resumed)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM parked_carts WHERE id = ?', (cart_id,))
+            conn.commit()
+            conn.close()
+            return True
+        except:
+            return False
+    
+    # Print Jobs Methods
+    def _print_job_from_row(self, row) -> Dict:
+        try:
+            payload = json.loads(row[3] or '{}')
+        except ValueError:
+            payload = {}
+        return {
+            'id': row[0],
+            'kind': row[1],
+            'bill_id': row[2],
+            'payload': payload,
+            'status': row[4],
+            'attempts': row[5],
+            'last_error': row[6] or '',
+            'created_at': row[7],
+            'updated_at': row[8]
+        }
+    
+    def add_print_job(self, kind: str, bill_id: Optional[int], payload: Dict) -> int:
+        """Queue a print job and return its ID"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO print_jobs (kind, bill_id, payload_json) VALUES (?, ?, ?)
+        ''', (kind, bill_id, json.dumps(payload, default=str)))
+        job_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return job_id
+    
+    def add_print_jobs(self, kind: str, jobs: List[Tuple[Optional[int], Dict]]) -> List[int]:
+        """Queue several (bill_id, payload) print jobs in one transaction, in order"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        job_ids = []
+        for bill_id, payload in jobs:
+            cursor.execute('''
+                INSERT INTO print_jobs (kind, bill_id, payload_json) VALUES (?, ?, ?)
+            ''', (kind, bill_id, json.dumps(payload, default=str)))
+            job_ids.append(cursor.lastrowid)
+        conn.commit()
+        conn.close()
+        return job_ids
+    
+    def get_print_job(self, job_id: int) -> Optional[Dict]:
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, kind, bill_id, payload_json, status, attempts, last_error, created_at, updated_at
+            FROM print_jobs WHERE id = ?
+        ''', (job_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return self._print_job_from_row(row) if row else None
+    
+    def get_next_print_job(self, statuses: Tuple[str, ...]) -> Optional[Dict]:
+        """Oldest job in one of the given statuses (the head of the queue)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT id, kind, bill_id, payload_json, status, attempts, last_error, created_at, updated_at
+            FROM print_jobs WHERE status IN ({','.join('?' * len(statuses))}) ORDER BY id LIMIT 1
+        ''', statuses)
+        row = cursor.fetchone()
+        conn.close()
+        return self._print_job_from_row(row) if row else None
+    
+    def get_print_jobs(self, limit: int = 100) -> List[Dict]:
+        """Most recent print jobs, oldest first (payload omitted)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, kind, bill_id, '{}', status, attempts, last_error, created_at, updated_at
+            FROM (SELECT * FROM print_jobs ORDER BY id DESC LIMIT ?) ORDER BY id
+        ''', (limit,))
+        results = cursor.fetchall()
+        conn.close()
+        return [self._print_job_from_row(row) for row in results]
+    
+    def update_print_job(self, job_id: int, status: str, attempts: Optional[int] = None,
+                         last_error: Optional[str] = None) -> bool:
+        """Update a job's status (and attempt count / error when given)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE print_jobs SET status = ?, attempts = COALESCE(?, attempts),
+                last_error = COALESCE(?, last_error), updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (status, attempts, last_error, job_id))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error updating print job: {e}")
+            return False
+    
+    def reset_print_jobs(self, from_statuses: Tuple[str, ...], to_status: str) -> int:
+        """Move every job in from_statuses to to_status; returns how many changed"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            UPDATE print_jobs SET status = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE status IN ({','.join('?' * len(from_statuses))})
+        ''', (to_status,) + tuple(from_statuses))
+        changed = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return changed
+    
+    def delete_print_jobs(self, statuses: Tuple[str, ...], keep: int = 0) -> bool:
+        """Delete jobs in the given statuses (e.g. clear finished jobs), except the newest keep of them"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            placeholders = ','.join('?' * len(statuses))
+            cursor.execute(f'''
+                DELETE FROM print_jobs WHERE status IN ({placeholders}) AND id NOT IN (
+                    SELECT id FROM print_jobs WHERE status IN ({placeholders}) ORDER BY id DESC LIMIT ?)
+            ''', tuple(statuses) * 2 + (keep,))
+            conn.commit()
+            conn.close()
+            return True
+        except:
+            return False
+    
+    # --- WhatsApp outbox ---
+    _OUTBOX_COLUMNS = '''id, bill_id, phone, image_path, caption, status, attempts, last_error,
+                         next_attempt_at, sent_at, created_at, updated_at'''
+    
+    def _outbox_message_from_row(self, row) -> Dict:
+        return {
+            'id': row[0],
+            'bill_id': row[1],
+            'phone': row[2],
+            'image_path': row[3] or '',
+            'caption': row[4] or '',
+            'status': row[5],
+            'attempts': row[6],
+            'last_error': row[7] or '',
+            'next_attempt_at': row[8],
+            'sent_at': row[9],
+            'created_at': row[10],
+            'updated_at': row[11]
+        }
+    
+    def add_outbox_messages(self, messages: List[Dict]) -> List[int]:
+        """Queue messages (dicts with bill_id, phone, image_path, caption) in one transaction"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        message_ids = []
+        for message in messages:
+            cursor.execute('''
+                INSERT INTO whatsapp_outbox (bill_id, phone, image_path, caption) VALUES (?, ?, ?, ?)
+            ''', (message.get('bill_id'), message['phone'], message.get('image_path', ''),
+                  message.get('caption', '')))
+            message_ids.append(cursor.lastrowid)
+        conn.commit()
+        conn.close()
+        return message_ids
+    
+    def get_outbox_message(self, message_id: int) -> Optional[Dict]:
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {self._OUTBOX_COLUMNS} FROM whatsapp_outbox WHERE id = ?', (message_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return self._outbox_message_from_row(row) if row else None
+    
+    def get_next_outbox_message(self, status: str) -> Optional[Dict]:
+        """Oldest message in status whose retry time (if any) has come"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {self._OUTBOX_COLUMNS} FROM whatsapp_outbox
+            WHERE status = ? AND (next_attempt_at IS NULL OR next_attempt_at <= CURRENT_TIMESTAMP)
+            ORDER BY id LIMIT 1
+        ''', (status,))
+        row = cursor.fetchone()
+        conn.close()
+        return self._outbox_message_from_row(row) if row else None
+    
+    def get_outbox_messages(self, limit: int = 100) -> List[Dict]:
+        """Most recent outbox messages, oldest first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {self._OUTBOX_COLUMNS}
+            FROM (SELECT * FROM whatsapp_outbox ORDER BY id DESC LIMIT ?) ORDER BY id
+        ''', (limit,))
+        results = cursor.fetchall()
+        conn.close()
+        return [self._outbox_message_from_row(row) for row in results]
+    
+    def update_outbox_message(self, message_id: int, status: str, attempts: Optional[int] = None,
+                              last_error: Optional[str] = None, retry_in: Optional[int] = None) -> bool:
+        """Update a message's status; retry_in (seconds) delays its next attempt"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                UPDATE whatsapp_outbox SET status = ?, attempts = COALESCE(?, attempts),
+                last_error = COALESCE(?, last_error),
+                next_attempt_at = CASE WHEN ? IS NULL THEN NULL ELSE datetime('now', '+' || ? || ' seconds') END,
+                sent_at = CASE WHEN ? = 'sent' THEN CURRENT_TIMESTAMP ELSE sent_at END,
+                updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (status, attempts, last_error, retry_in, retry_in, status, message_id))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error updating outbox message: {e}")
+            return False
+    
+    def claim_outbox_message(self, message_id: int, attempts: int) -> bool:
+        """Mark a queued message as sending; False if another worker or a cancel got there first"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE whatsapp_outbox SET status = 'sending', attempts = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'queued'
+        ''', (attempts, message_id))
+        claimed = cursor.rowcount == 1
+        conn.commit()
+        conn.close()
+        return claimed
+    
+    def reset_outbox_messages(self, from_status: str, to_status: str, last_error: str = '') -> int:
+        """Move every message in from_status to to_status; returns how many changed"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE whatsapp_outbox SET status = ?, last_error = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE status = ?
+        ''', (to_status, last_error, from_status))
+        changed = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return changed
+    
+    def delete_outbox_messages(self, statuses: Tuple[str, ...]) -> bool:
+        """Delete messages in the given statuses (e.g. clear sent messages)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f'DELETE FROM whatsapp_outbox WHERE status IN ({",".join("?" * len(statuses))})',
+                           statuses)
+            conn.commit()
+            conn.close()
+            return True
+        except:
+            return False
+    
+    # --- Bill artifacts ---
+    _ARTIFACT_COLUMNS = 'id, bill_id, kind, content_hash, file_name, size_bytes, created_at, last_used_at'
+    
+    def _bill_artifact_from_row(self, row) -> Dict:
+        return {
+            'id': row[0],
+            'bill_id': row[1],
+            'kind': row[2],
+            'content_hash': row[3],
+            'file_name': row[4],
+            'size_bytes': row[5],
+            'created_at': row[6],
+            'last_used_at': row[7]
+        }
+    
+    def get_bill_artifact(self, bill_id: int, kind: str, touch: bool = False) -> Optional[Dict]:
+        """Artifact record for a bill; touch=True marks it as used now (for retention)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {self._ARTIFACT_COLUMNS} FROM bill_artifacts WHERE bill_id = ? AND kind = ?',
+                       (bill_id, kind))
+        row = cursor.fetchone()
+        if row and touch:
+            cursor.execute('UPDATE bill_artifacts SET last_used_at = CURRENT_TIMESTAMP WHERE id = ?', (row[0],))
+            conn.commit()
+        conn.close()
+        return self._bill_artifact_from_row(row) if row else None
+    
+    def save_bill_artifact(self, bill_id: int, kind: str, content_hash: str, file_name: str,
+                           size_bytes: int) -> Optional[Dict]:
+        """Record (or replace) a bill's artifact; returns the record it replaced, if any"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT {self._ARTIFACT_COLUMNS} FROM bill_artifacts WHERE bill_id = ? AND kind = ?',
+                       (bill_id, kind))
+        previous = cursor.fetchone()
+        cursor.execute('''
+            INSERT INTO bill_artifacts (bill_id, kind, content_hash, file_name, size_bytes)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(bill_id, kind) DO UPDATE SET content_hash = excluded.content_hash,
+                file_name = excluded.file_name, size_bytes = excluded.size_bytes,
+                created_at = CURRENT_TIMESTAMP, last_used_at = CURRENT_TIMESTAMP
+        ''', (bill_id, kind, content_hash, file_name, size_bytes))
+        conn.commit()
+        conn.close()
+        return self._bill_artifact_from_row(previous) if previous else None
+    
+    def count_artifacts_with_hash(self, content_hash: str) -> int:
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM bill_artifacts WHERE content_hash = ?', (content_hash,))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def get_expired_bill_artifacts(self, keep_days: int) -> List[Dict]:
+        """Artifacts not used for keep_days, except bills still waiting in the WhatsApp outbox"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {self._ARTIFACT_COLUMNS} FROM bill_artifacts
+            WHERE last_used_at < datetime('now', ?)
+            AND bill_id NOT IN (SELECT bill_id FROM whatsapp_outbox
+                                WHERE status IN ('queued', 'sending') AND bill_id IS NOT NULL)
+            ORDER BY last_used_at
+        ''', (f'-{int(keep_days)} days',))
+        results = cursor.fetchall()
+        conn.close()
+        return [self._bill_artifact_from_row(row) for row in results]
+    
+    def get_bill_artifacts_by_use(self) -> List[Dict]:
+        """All artifacts, least recently used first, except bills waiting in the WhatsApp outbox"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT {self._ARTIFACT_COLUMNS} FROM bill_artifacts
+            WHERE bill_id NOT IN (SELECT bill_id FROM whatsapp_outbox
+                                  WHERE status IN ('queued', 'sending') AND bill_id IS NOT NULL)
+            ORDER BY last_used_at, id
+        ''')
+        results = cursor.fetchall()
+        conn.close()
+        return [self._bill_artifact_from_row(row) for row in results]
+    
+    def get_artifact_usage(self) -> Dict:
+        """Number of artifact records and bytes on disk (each distinct file counted once)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COUNT(*), (SELECT COALESCE(SUM(size_bytes), 0) FROM
+                              (SELECT DISTINCT content_hash, file_name, size_bytes FROM bill_artifacts))
+            FROM bill_artifacts
+        ''')
+        count, total_bytes = cursor.fetchone()
+        conn.close()
+        return {'count': count, 'bytes': total_bytes}
+    
+    def delete_bill_artifacts(self, artifact_ids: List[int]) -> bool:
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.executemany('DELETE FROM bill_artifacts WHERE id = ?', [(artifact_id,) for artifact_id in artifact_ids])
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error deleting bill artifacts: {e}")
+            return False
+    
+    # App Settings Methods
+    def get_setting(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Get a single setting value"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT value FROM app_settings WHERE key = ?', (key,))
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] if result and result[0] is not None else default
+    
+    def get_settings(self, prefix: str = '') -> Dict[str, str]:
+        """Get all settings whose key starts with prefix"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        # substr rather than LIKE: setting keys contain '_', which LIKE treats as a wildcard
+        cursor.execute('SELECT key, value FROM app_settings WHERE substr(key, 1, length(?)) = ?',
+                       (prefix, prefix))
+        results = cursor.fetchall()
+        conn.close()
+        return {row[0]: row[1] for row in results}
+    
+    def set_settings(self, values: Dict[str, str]) -> bool:
+        """Insert or update several settings at once"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO app_settings (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            ''', [(key, None if value is None else str(value)) for key, value in values.items()])
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error saving settings: {e}")
+            return False
+    
+    def set_setting(self, key: str, value: str) -> bool:
+        """Insert or update a single setting"""
+        return self.set_settings({key: value})
+    
+    # HSN Master Methods
+    def get_hsn_codes(self) -> List[Dict]:
+        """Get all HSN master entries"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT code, description, gst_rate FROM hsn_codes ORDER BY code')
+        results = cursor.fetchall()
+        conn.close()
+        return [{'code': row[0], 'description': row[1], 'gst_rate': row[2]} for row in results]
+    
+    def get_hsn_master(self) -> HsnMaster:
+        """Cached in-memory HSN master for rate lookups"""
+        master = _hsn_master_cache.get(self.db_path)
+        if master is None:
+            master = HsnMaster(self.get_hsn_codes())
+            _hsn_master_cache[self.db_path] = master
+        return master
+    
+    def save_hsn_code(self, code: str, description: str, gst_rate: float) -> bool:
+        """Insert or update an HSN master entry"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO hsn_codes (code, description, gst_rate) VALUES (?, ?, ?)
+                ON CONFLICT(code) DO UPDATE SET description = excluded.description, gst_rate = excluded.gst_rate
+            ''', (normalize_hsn(code), description, gst_rate))
+            conn.commit()
+            conn.close()
+            _hsn_master_cache.pop(self.db_path, None)
+            return True
+        except Exception as e:
+            print(f"Error saving HSN code: {e}")
+            return False
+    
+    def delete_hsn_code(self, code: str) -> bool:
+        """Delete an HSN master entry"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM hsn_codes WHERE code = ?', (code,))
+            conn.commit()
+            conn.close()
+            _hsn_master_cache.pop(self.db_path, None)
+            return True
+        except:
+            return False
+    
+    def apply_hsn_rates(self, dry_run: bool = False) -> int:
+        """Bring item SGST/CGST in line with the HSN master, keeping each item's final price.
+        Returns the number of items that differ (and were updated unless dry_run)."""
+        master = self.get_hsn_master()
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        changed = 0
+        for table in ('barcode_items', 'loose_items'):
+            cursor.execute(f'SELECT id, hsn_code, sgst_percent, cgst_percent, total_price FROM {table}')
+            updates = []
+            for item_id, hsn_code, sgst, cgst, total_price in cursor.fetchall():
+                entry = master.lookup(hsn_code)
+                if entry is None or not master.check_rates(hsn_code, sgst or 0, cgst or 0):
+                    continue
+                base_price = base_from_inclusive(total_price, entry.sgst_percent, entry.cgst_percent)
+                updates.append((entry.sgst_percent, entry.cgst_percent, base_price, item_id))
+            changed += len(updates)
+            if updates and not dry_run:
+                cursor.executemany(
+                    f'UPDATE {table} SET sgst_percent = ?, cgst_percent = ?, base_price = ? WHERE id = ?',
+                    updates)
+        conn.commit()
+        conn.close()
+        return changed
+    
+    # Scale PLU Mapping Methods
+    def get_scale_plu_map(self) -> List[Dict]:
+        """Get all PLU mappings with the mapped loose item name"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT m.plu, m.loose_item_id, li.name
+            FROM scale_plu_map m LEFT JOIN loose_items li ON li.id = m.loose_item_id
+            ORDER BY m.plu
+        ''')
+        results = cursor.fetchall()
+        conn.close()
+        return [{'plu': row[0], 'loose_item_id': row[1], 'name': row[2] or '(deleted item)'} for row in results]
+    
+    def get_loose_item_by_plu(self, plu: str) -> Optional[Dict]:
+        """Get the loose item mapped to a scale PLU"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT li.id, li.name, li.hsn_code, li.quantity, li.base_price, li.sgst_percent,
+                   li.cgst_percent, li.total_price, li.image_path, li.category_id
+            FROM scale_plu_map m JOIN loose_items li ON li.id = m.loose_item_id
+            WHERE m.plu = ?
+        ''', (plu,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row:
+            return {
+                'id': row[0],
+                'name': row[1],
+                'hsn_code': row[2],
+                'quantity': row[3],
+                'base_price': row[4],
+                'sgst_percent': row[5],
+                'cgst_percent': row[6],
+                'total_price': row[7],
+                'image_path': row[8],
+                'category_id': row[9]
+            }
+        return None
+    
+    def set_scale_plu(self, plu: str, loose_item_id: int) -> bool:
+        """Map a scale PLU to a loose item (replacing any existing mapping)"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO scale_plu_map (plu, loose_item_id) VALUES (?, ?)
+                ON CONFLICT(plu) DO UPDATE SET loose_item_id = excluded.loose_item_id
+            ''', (plu, loose_item_id))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error saving PLU mapping: {e}")
+            return False
+    
+    def delete_scale_plu(self, plu: str) -> bool:
+        """Remove a PLU mapping"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM scale_plu_map WHERE plu = ?', (plu,))
+            conn.commit()
+            conn.close()
+            return True
+        except:
+            return False
+    
+    # Promotions Methods
+    def _promotion_from_row(self, row) -> Dict:
+        def load_list(value):
+            try:
+                return json.loads(value or '[]')
+            except ValueError:
+                return []
+        return {
+            'id': row[0],
+            'name': row[1],
+            'promo_type': row[2],
+            'value': row[3],
+            'buy_qty': row[4],
+            'get_qty': row[5],
+            'min_qty': row[6],
+            'item_keys': load_list(row[7]),
+            'category_ids': load_list(row[8]),
+            'starts_on': row[9],
+            'ends_on': row[10],
+            'active': bool(row[11])
+        }
+    
+    def get_promotions(self) -> List[Dict]:
+        """Get all promotions"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, name, promo_type, value, buy_qty, get_qty, min_qty, item_keys, category_ids,
+                   starts_on, ends_on, active
+            FROM promotions ORDER BY name
+        ''')
+        results = cursor.fetchall()
+        conn.close()
+        return [self._promotion_from_row(row) for row in results]
+    
+    def save_promotion(self, promotion: Dict) -> bool:
+        """Insert a promotion, or update it when promotion has an 'id'"""
+        values = (promotion['name'], promotion['promo_type'], promotion.get('value', 0),
+                  promotion.get('buy_qty', 0), promotion.get('get_qty', 0), promotion.get('min_qty', 0),
+                  json.dumps(sorted(promotion.get('item_keys', []))),
+                  json.dumps(sorted(promotion.get('category_ids', []))),
+                  promotion.get('starts_on') or None, promotion.get('ends_on') or None,
+                  1 if promotion.get('active', True) else 0)
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            if promotion.get('id'):
+                cursor.execute('''
+                    UPDATE promotions SET name = ?, promo_type = ?, value = ?, buy_qty = ?, get_qty = ?,
+                    min_qty = ?, item_keys = ?, category_ids = ?, starts_on = ?, ends_on = ?, active = ?
+                    WHERE id = ?
+                ''', values + (promotion['id'],))
+            else:
+                cursor.execute('''
+                    INSERT INTO promotions (name, promo_type, value, buy_qty, get_qty, min_qty,
+                    item_keys, category_ids, starts_on, ends_on, active)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', values)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"Error saving promotion: {e}")
+            return False
+    
+    def delete_promotion(self, promotion_id: int) -> bool:
+        """Delete a promotion"""
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM promotions WHERE id = ?', (promotion_id,))
+            conn.commit()
+            conn.close()
+            return True
+        except:
+            return False
+    
     # Admin Details Methods
     def get_admin_details(self) -> Optional[Dict]:
         """Get admin details"""
@@ -770,12 +1869,33 @@ class Database:
         
         return result > 0
 
+    def _import_row_rates(self, row: Dict, hsn_master: HsnMaster) -> Tuple[str, float, float]:
+        """HSN code and SGST/CGST for a CSV row: blank rates are filled from the HSN master,
+        given rates must match it. Raises ValueError with the reason otherwise."""
+        hsn_code = normalize_hsn(row["hsn_code"])
+        if not is_valid_hsn(hsn_code):
+            raise ValueError(f"Invalid HSN code '{row['hsn_code'].strip()}'")
+        sgst_text = (row.get("sgst") or '').strip()
+        cgst_text = (row.get("cgst") or '').strip()
+        if not sgst_text and not cgst_text:
+            entry = hsn_master.lookup(hsn_code)
+            if entry is None:
+                raise ValueError(f"HSN {hsn_code} not in HSN master; sgst and cgst are required")
+            return hsn_code, entry.sgst_percent, entry.cgst_percent
+        sgst = float(sgst_text or 0)
+        cgst = float(cgst_text or 0)
+        error = hsn_master.check_rates(hsn_code, sgst, cgst)
+        if error:
+            raise ValueError(error)
+        return hsn_code, sgst, cgst
+
     def import_barcode_items_from_csv(self, file_path: str):
         """Import barcode items from a CSV file. Returns (success_count, fail_count, fail_rows)"""
-        required_fields = ["barcode", "name", "hsn_code", "quantity", "sgst", "cgst", "total_price"]
+        required_fields = ["barcode", "name", "hsn_code", "quantity", "total_price"]
         success_count = 0
         fail_count = 0
         fail_rows = []
+        hsn_master = self.get_hsn_master()
         # Pre-fetch all existing barcodes
         existing_barcodes = set()
         conn = self.get_connection()
@@ -800,10 +1920,8 @@ class Database:
                         fail_rows.append((idx, "Duplicate barcode"))
                         continue
                     name = row["name"].strip()
-                    hsn_code = row["hsn_code"].strip()
+                    hsn_code, sgst, cgst = self._import_row_rates(row, hsn_master)
                     quantity = int(row["quantity"])
-                    sgst = float(row["sgst"])
-                    cgst = float(row["cgst"])
                     total_price = float(row["total_price"])
                     to_insert.append((barcode, name, hsn_code, quantity, total_price, sgst, cgst))
                     existing_barcodes.add(barcode)
@@ -814,7 +1932,7 @@ class Database:
         conn = self.get_connection()
         cursor = conn.cursor()
         for barcode, name, hsn_code, quantity, total_price, sgst, cgst in to_insert:
-            base_price = total_price / (1 + (sgst + cgst) / 100)
+            base_price = base_from_inclusive(total_price, sgst, cgst)
             cursor.execute('''INSERT OR IGNORE INTO barcode_items (barcode, name, hsn_code, quantity, base_price, sgst_percent, cgst_percent, total_price) VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', (barcode, name, hsn_code, quantity, base_price, sgst, cgst, total_price))
             success_count += 1
         conn.commit()
@@ -823,10 +1941,11 @@ class Database:
 
     def import_loose_items_from_csv(self, file_path: str):
         """Import loose items from a CSV file. Returns (success_count, fail_count, fail_rows)"""
-        required_fields = ["category", "name", "hsn_code", "quantity", "sgst", "cgst", "total_price"]
+        required_fields = ["category", "name", "hsn_code", "quantity", "total_price"]
         success_count = 0
         fail_count = 0
         fail_rows = []
+        hsn_master = self.get_hsn_master()
         # Build category name to id map
         categories = {cat['name']: cat['id'] for cat in self.get_loose_categories()}
         # Pre-fetch all existing (category_id, name, hsn_code)
@@ -853,15 +1972,13 @@ class Database:
                         continue
                     category_id = categories[category_name]
                     name = row["name"].strip()
-                    hsn_code = row["hsn_code"].strip()
+                    hsn_code, sgst, cgst = self._import_row_rates(row, hsn_master)
                     key = (category_id, name, hsn_code)
                     if key in existing_keys:
                         fail_count += 1
                         fail_rows.append((idx, "Duplicate item (category, name, hsn_code)"))
                         continue
                     quantity = int(row["quantity"])
-                    sgst = float(row["sgst"])
-                    cgst = float(row["cgst"])
                     total_price = float(row["total_price"])
                     to_insert.append((category_id, name, hsn_code, quantity, total_price, sgst, cgst))
                     existing_keys.add(key)
@@ -872,9 +1989,9 @@ class Database:
         conn = self.get_connection()
         cursor = conn.cursor()
         for category_id, name, hsn_code, quantity, total_price, sgst, cgst in to_insert:
-            base_price = total_price / (1 + (sgst + cgst) / 100)
+            base_price = base_from_inclusive(total_price, sgst, cgst)
             cursor.execute('''INSERT OR IGNORE INTO loose_items (category_id, name, hsn_code, quantity, base_price, sgst_percent, cgst_percent, total_price) VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', (category_id, name, hsn_code, quantity, base_price, sgst, cgst, total_price))
             success_count += 1
         conn.commit()
         conn.close()
-        return success_count, fail_count, fail_rows
\ No newline at end of file
+        return success_count, fail_count, fail_rows
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+from billing_tabs.cart_journal import CartJournal
+
+
+class CartJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'journal', 'cart.jsonl')
+        self.journal = CartJournal(self.path)
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.folder)
+
+    def test_replay_applies_operations_in_order(self):
+        self.journal.add({'name': 'A', 'quantity': 1})
+        self.journal.add({'name': 'B', 'quantity': 1})
+        self.journal.add({'name': 'C', 'quantity': 1})
+        self.journal.update(1, {'name': 'B', 'quantity': 3})
+        self.journal.remove(0)
+        self.journal.close()
+        self.assertEqual(CartJournal(self.path).replay(),
+                         [{'name': 'B', 'quantity': 3}, {'name': 'C', 'quantity': 1}])
+
+    def test_replay_stops_at_a_torn_last_line(self):
+        self.journal.add({'name': 'A', 'quantity': 1})
+        self.journal.update(0, {'name': 'A', 'quantity': 2})
+        self.journal.close()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('{"op":"add","item":{"name":"B"')
+        self.assertEqual(CartJournal(self.path).replay(), [{'name': 'A', 'quantity': 2}])
+
+    def test_reset_checkpoints_the_cart(self):
+        self.journal.add({'name': 'A'})
+        self.journal.reset([{'name': 'X'}])
+        self.journal.add({'name': 'Y'})
+        self.journal.close()
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 2)
+        self.assertEqual(CartJournal(self.path).replay(), [{'name': 'X'}, {'name': 'Y'}])
+
+    def test_out_of_range_rows_are_ignored(self):
+        self.journal.add({'name': 'A'})
+        self.journal.update(5, {'name': 'Z'})
+        self.journal.remove(-1)
+        self.journal.close()
+        self.assertEqual(CartJournal(self.path).replay(), [{'name': 'A'}])
+
+    def test_missing_or_empty_journal(self):
+        self.assertEqual(self.journal.replay(), [])
+        self.journal.reset()
+        self.assertEqual(self.journal.replay(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
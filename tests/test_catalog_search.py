@@ -0,0 +1,54 @@
+import unittest
+from billing_tabs.catalog_search import CatalogIndex
+
+
+def build_index():
+    index = CatalogIndex()
+    index.build(
+        [
+            {'name': 'Basmati Rice 5kg', 'barcode': '8901234567890', 'hsn_code': '1006'},
+            {'name': 'Rice Bran Oil 1L', 'barcode': '8901111111116', 'hsn_code': '1515'},
+            {'name': 'Bath Soap', 'barcode': '8902222222222', 'hsn_code': '3401'},
+        ],
+        [
+            {'name': 'Rice', 'hsn_code': '1006'},
+            {'name': 'Toor Dal', 'hsn_code': '0713'},
+        ],
+    )
+    return index
+
+
+class CatalogIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = build_index()
+
+    def names(self, query, limit=20):
+        return [entry.name for entry in self.index.search(query, limit)]
+
+    def test_exact_barcode(self):
+        self.assertEqual(self.names('8901111111116'), ['Rice Bran Oil 1L'])
+        self.assertEqual(self.index.get_by_barcode('8902222222222').name, 'Bath Soap')
+        self.assertIsNone(self.index.get_by_barcode('0000000000000'))
+
+    def test_name_prefix_ranks_shorter_names_first(self):
+        self.assertEqual(self.names('rice'), ['Rice', 'Rice Bran Oil 1L', 'Basmati Rice 5kg'])
+
+    def test_words_in_any_order(self):
+        self.assertEqual(self.names('oil rice')[0], 'Rice Bran Oil 1L')
+
+    def test_short_query_and_hsn_digits(self):
+        self.assertEqual(self.names('to'), ['Toor Dal'])
+        self.assertEqual(set(self.names('1006')), {'Rice', 'Basmati Rice 5kg'})
+
+    def test_typo_still_matches(self):
+        self.assertIn('Basmati Rice 5kg', self.names('basmti'))
+
+    def test_limit_and_empty_query(self):
+        self.assertEqual(len(self.names('rice', limit=1)), 1)
+        self.assertEqual(self.names('  '), [])
+        self.assertEqual(CatalogIndex().search('rice'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from billing_tabs import tax_engine
+from billing_tabs.promotions import (PromotionEngine, PERCENT, FLAT, COMBO, BUY_X_GET_Y,
+                                     active_promotions, barcode_item_key)
+
+
+def line(barcode, price, quantity=1, category_id=None):
+    return {'item_type': 'barcode', 'barcode': barcode, 'name': barcode, 'quantity': quantity,
+            'base_price': price, 'sgst_percent': 0, 'cgst_percent': 0, 'category_id': category_id}
+
+
+def promotion(promo_id, promo_type, value, barcodes=(), **extra):
+    row = {'id': promo_id, 'name': f"Promo {promo_id}", 'promo_type': promo_type, 'value': value,
+           'item_keys': [barcode_item_key(b) for b in barcodes]}
+    row.update(extra)
+    return row
+
+
+def amount_due(lines):
+    return sum(Decimal(str(tax_engine.apply_line_totals(l)['final_price'])) for l in lines)
+
+
+class EngineTest(unittest.TestCase):
+
+    def test_percent_and_flat_rules_stack(self):
+        engine = PromotionEngine([
+            promotion(1, PERCENT, 10, category_ids=[3]),
+            promotion(2, FLAT, 2, ['A']),
+        ])
+        lines = [line('A', 50, quantity=2, category_id=3), line('B', 40, category_id=3)]
+        updated = engine.apply(lines)
+        self.assertEqual(len(updated), 2)
+        self.assertEqual(lines[0]['discount_amount'], 14.0)
+        self.assertEqual(lines[0]['promotion'], "Promo 1, Promo 2")
+        self.assertEqual(lines[1]['discount_amount'], 4.0)
+
+    def test_min_qty_and_incremental_update(self):
+        engine = PromotionEngine([promotion(1, PERCENT, 20, ['A'], min_qty=3)])
+        a = line('A', 10, quantity=2)
+        lines = [a, line('B', 10)]
+        self.assertEqual(engine.apply(lines), [])
+        a['quantity'] = 3
+        self.assertEqual(engine.apply(lines, [a]), [a])
+        self.assertEqual(a['discount_amount'], 6.0)
+        removed = lines.pop(0)
+        engine.apply(lines, [removed])
+        self.assertEqual(lines[0].get('discount_amount', 0), 0)
+
+    def test_active_promotions(self):
+        rows = [
+            {'id': 1, 'active': 1},
+            {'id': 2, 'active': 0},
+            {'id': 3, 'active': 1, 'starts_on': '2026-11-01'},
+            {'id': 4, 'active': 1, 'ends_on': '2026-10-18'},
+            {'id': 5, 'active': 1, 'starts_on': '2026-10-19', 'ends_on': '2026-10-19'},
+        ]
+        self.assertEqual([row['id'] for row in active_promotions(rows, date(2026, 10, 19))], [1, 5])
+
+
+class ComboTest(unittest.TestCase):
+
+    def test_combo_price_is_not_undercut_by_other_rules(self):
+        engine = PromotionEngine([
+            promotion(1, PERCENT, 10, ['A']),
+            promotion(2, COMBO, 150, ['A', 'B']),
+        ])
+        lines = [line('A', 100), line('B', 80)]
+        engine.apply(lines)
+        self.assertEqual(amount_due(lines), Decimal('150.00'))
+
+    def test_combo_is_repriced_when_another_rule_changes(self):
+        engine = PromotionEngine([
+            promotion(1, PERCENT, 10, ['A']),
+            promotion(2, COMBO, 150, ['A', 'B']),
+        ])
+        a, b = line('A', 100), line('B', 80)
+        lines = [a, b]
+        engine.apply(lines)
+        a['quantity'] = 2
+        engine.apply(lines, [a])
+        # One combo at 150 plus the second A at 10% off
+        self.assertEqual(amount_due(lines), Decimal('240.00'))
+
+    def test_combo_saving_is_spread_over_split_lines(self):
+        engine = PromotionEngine([promotion(1, COMBO, 40, ['A', 'B'])])
+        lines = [line('A', 30), line('A', 30, quantity=2), line('B', 20, quantity=3)]
+        engine.apply(lines)
+        self.assertEqual([l['discount_amount'] for l in lines], [6.0, 12.0, 12.0])
+        self.assertEqual(amount_due(lines), Decimal('120.00'))
+
+    def test_combo_needs_every_item(self):
+        engine = PromotionEngine([promotion(1, COMBO, 40, ['A', 'B'])])
+        lines = [line('A', 30, quantity=2)]
+        self.assertEqual(engine.apply(lines), [])
+
+
+class BuyXGetYTest(unittest.TestCase):
+
+    def test_cheapest_units_are_free(self):
+        engine = PromotionEngine([promotion(1, BUY_X_GET_Y, 0, category_ids=[5], buy_qty=2, get_qty=1)])
+        lines = [line('A', 50, quantity=2, category_id=5), line('B', 20, category_id=5)]
+        engine.apply(lines)
+        self.assertEqual([l.get('discount_amount', 0) for l in lines], [0, 20.0])
+
+    def test_partial_groups_get_nothing(self):
+        engine = PromotionEngine([promotion(1, BUY_X_GET_Y, 50, ['A'], buy_qty=2, get_qty=1)])
+        lines = [line('A', 40, quantity=5)]
+        engine.apply(lines)
+        # One complete group of three: one unit at 50% off
+        self.assertEqual(lines[0]['discount_amount'], 20.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from decimal import Decimal
+from billing_tabs import tax_engine
+from billing_tabs.scale_barcode import (ScaleBarcodeFormat, VALUE_PRICE, VALUE_WEIGHT, SETTING_PLU_DIGITS,
+                                        ean13_check_digit, is_valid_ean13, make_scale_barcode)
+
+
+class Ean13Test(unittest.TestCase):
+
+    def test_check_digit(self):
+        self.assertEqual(ean13_check_digit('400638133393'), 1)
+        self.assertEqual(ean13_check_digit('890123456789'), 0)
+        self.assertEqual(ean13_check_digit('200000000000'), 8)
+
+    def test_validation(self):
+        self.assertTrue(is_valid_ean13('4006381333931'))
+        self.assertFalse(is_valid_ean13('4006381333932'))
+        self.assertFalse(is_valid_ean13('400638133393'))
+        self.assertFalse(is_valid_ean13('40063813339a1'))
+
+
+class ScaleLabelTest(unittest.TestCase):
+
+    def test_weight_label(self):
+        code = make_scale_barcode('21', '123', 1250)
+        self.assertEqual(code, '2100123012503')
+        reading = ScaleBarcodeFormat(value_type=VALUE_WEIGHT).decode(code)
+        self.assertEqual(reading.plu, '00123')
+        self.assertEqual(reading.weight, Decimal('1.25'))
+        self.assertIsNone(reading.price)
+
+    def test_price_label(self):
+        code = make_scale_barcode('22', '42', 4650, plu_digits=4)
+        reading = ScaleBarcodeFormat(plu_digits=4, value_type=VALUE_PRICE).decode(code)
+        self.assertEqual(reading.plu, '0042')
+        self.assertEqual(reading.price, Decimal('46.50'))
+        self.assertIsNone(reading.weight)
+
+    def test_other_codes_are_not_labels(self):
+        scale_format = ScaleBarcodeFormat()
+        self.assertIsNone(scale_format.decode('8901234567890'))
+        code = make_scale_barcode('21', '123', 1250)
+        self.assertIsNone(scale_format.decode(code[:-1] + str((int(code[-1]) + 1) % 10)))
+
+    def test_settings_round_trip_and_clamp(self):
+        scale_format = ScaleBarcodeFormat('23, 24', 6, VALUE_PRICE)
+        restored = ScaleBarcodeFormat.from_settings(scale_format.to_settings())
+        self.assertEqual((restored.prefixes, restored.plu_digits, restored.value_type), (('23', '24'), 6, VALUE_PRICE))
+        self.assertEqual(ScaleBarcodeFormat.from_settings({SETTING_PLU_DIGITS: '9'}).plu_digits, 6)
+        self.assertEqual(ScaleBarcodeFormat.from_settings({SETTING_PLU_DIGITS: 'x'}).plu_digits, 5)
+
+    def test_price_label_line_is_charged_the_printed_amount(self):
+        reading = ScaleBarcodeFormat(value_type=VALUE_PRICE).decode(make_scale_barcode('20', '7', 4650))
+        base_price = tax_engine.base_from_inclusive(120, 2.5, 2.5)
+        unit_price = tax_engine.inclusive_unit_price(base_price, 2.5, 2.5)
+        # The weight shown on the bill is rounded to grams; 0.388 kg x 120 would be 46.56
+        item = {'quantity': float(round(reading.price / unit_price, 3)), 'base_price': base_price,
+                'sgst_percent': 2.5, 'cgst_percent': 2.5, 'label_price': float(reading.price)}
+        tax_engine.apply_line_totals(item)
+        self.assertEqual(item['quantity'], 0.388)
+        self.assertEqual(item['final_price'], 46.5)
+        self.assertAlmostEqual(item['taxable_amount'] + item['sgst_amount'] + item['cgst_amount'], 46.5, places=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from decimal import Decimal
+from billing_tabs import tax_engine
+
+
+class RoundingTest(unittest.TestCase):
+
+    def test_money_rounds_half_up_to_paise(self):
+        self.assertEqual(tax_engine.money('2.675'), Decimal('2.68'))
+        self.assertEqual(tax_engine.money('2.665'), Decimal('2.67'))
+        self.assertEqual(tax_engine.money(0.1 + 0.2), Decimal('0.30'))
+
+    def test_to_decimal_avoids_float_artefacts(self):
+        self.assertEqual(tax_engine.to_decimal(2.675), Decimal('2.675'))
+        self.assertEqual(tax_engine.to_decimal(None), Decimal(0))
+        self.assertEqual(tax_engine.to_decimal(''), Decimal(0))
+
+    def test_base_price_round_trips_to_shelf_price(self):
+        for price in ('99.99', '0.01', '1234.56', '45'):
+            base = tax_engine.base_from_inclusive(price, 9, 9)
+            self.assertEqual(tax_engine.inclusive_unit_price(base, 9, 9), Decimal(price))
+
+
+class LineTest(unittest.TestCase):
+
+    def test_line_parts_add_up_to_the_total(self):
+        base = tax_engine.base_from_inclusive('33.33', 9, 9)
+        line = tax_engine.compute_line(3, base, 9, 9)
+        self.assertEqual(line['gross_amount'], Decimal('99.99'))
+        self.assertEqual(line['final_price'], Decimal('99.99'))
+        self.assertEqual(line['taxable_amount'], Decimal('84.74'))
+        self.assertEqual(line['taxable_amount'] + line['sgst_amount'] + line['cgst_amount'],
+                         line['final_price'])
+        self.assertLessEqual(abs(line['sgst_amount'] - line['cgst_amount']), Decimal('0.01'))
+
+    def test_discount_reduces_taxable_value_and_is_capped(self):
+        line = tax_engine.compute_line(1, 100, 0, 0, discount=150)
+        self.assertEqual(line['discount_amount'], Decimal('100.00'))
+        self.assertEqual(line['final_price'], Decimal('0.00'))
+        base = tax_engine.base_from_inclusive(118, 9, 9)
+        line = tax_engine.compute_line(1, base, 9, 9, discount='18')
+        self.assertEqual(line['final_price'], Decimal('100.00'))
+        self.assertEqual(line['taxable_amount'], Decimal('84.75'))
+
+    def test_zero_rated_line_has_no_tax(self):
+        line = tax_engine.compute_line('0.250', 80, 0, 0)
+        self.assertEqual(line['final_price'], Decimal('20.00'))
+        self.assertEqual(line['sgst_amount'] + line['cgst_amount'], Decimal(0))
+
+    def test_gross_override_fixes_the_line_amount(self):
+        line = tax_engine.compute_line('0.388', 120, 0, 0, gross='46.50')
+        self.assertEqual(line['gross_amount'], Decimal('46.50'))
+        self.assertEqual(line['final_price'], Decimal('46.50'))
+
+
+class CartTest(unittest.TestCase):
+
+    def items(self):
+        return [
+            {'name': 'Rice', 'hsn_code': '1006', 'item_type': 'loose', 'quantity': 1.5,
+             'base_price': tax_engine.base_from_inclusive(60, 2.5, 2.5), 'sgst_percent': 2.5, 'cgst_percent': 2.5},
+            {'name': 'Soap', 'hsn_code': '3401', 'item_type': 'barcode', 'quantity': 2,
+             'base_price': tax_engine.base_from_inclusive('35.50', 9, 9), 'sgst_percent': 9, 'cgst_percent': 9,
+             'discount_amount': 5},
+            {'name': 'Dal', 'hsn_code': '1006', 'item_type': 'loose', 'quantity': 0.5,
+             'base_price': tax_engine.base_from_inclusive(60, 2.5, 2.5), 'sgst_percent': 2.5, 'cgst_percent': 2.5},
+        ]
+
+    def test_cart_totals(self):
+        totals = tax_engine.compute_cart(self.items())
+        self.assertEqual(totals['total_items'], 3)
+        self.assertEqual(totals['total_amount'], 186.0)
+        self.assertEqual(totals['total_discount'], 5.0)
+        self.assertEqual(totals['total_weight'], 2.0)
+        self.assertAlmostEqual(totals['taxable_amount'] + totals['total_sgst'] + totals['total_cgst'],
+                               totals['total_amount'], places=2)
+
+    def test_hsn_summary_groups_by_code_and_rate(self):
+        items = self.items()
+        tax_engine.compute_cart(items)
+        summary = tax_engine.hsn_summary(items)
+        self.assertEqual([(row['hsn_code'], row['gst_rate']) for row in summary], [('1006', 5.0), ('3401', 18.0)])
+        self.assertEqual(summary[0]['quantity'], 2.0)
+        self.assertEqual(summary[0]['total_amount'], 120.0)
+        self.assertEqual(sum(row['total_amount'] for row in summary), 186.0)
+
+
+if __name__ == '__main__':
+    unittest.main()